@@ -11,22 +11,214 @@ __all__ = [
     'mqtt5_client_builder',
     'V2ServiceException',
     'V2DeserializationFailure',
-    'ServiceStreamOptions'
+    'ServiceStreamOptions',
+    'JsonCodec',
+    'OrjsonCodec',
+    'UjsonCodec',
+    'MsgspecCodec',
+    'get_default_json_codec',
+    'set_default_json_codec',
+    'V2RequestTopics',
+    'get_v2_request_topics',
+    'set_v2_topic_cache_size',
 ]
 
 import awscrt
 from awscrt import mqtt, mqtt5, mqtt_request_response
-from concurrent.futures import Future
+from awsiot import metrics, serialization
+from awsiot.connection_pool import ConnectionPool
+from awsiot.topic_filter import TopicTrie, filter_covers, validate_topic_filter
+from collections import deque
+from concurrent.futures import Executor, Future
 from dataclasses import dataclass
+import functools
 import json
-from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar, Union
+import logging
+import string
+from threading import Lock
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Deque, Dict, Generic, Hashable, Optional, Tuple, TypeVar, Union
 
 __version__ = '1.0.0-dev'
 
+logger = logging.getLogger(__name__)
+
 T = TypeVar('T')
 
+# Number of topics whose dispatch results a service client remembers
+_DISPATCH_CACHE_SIZE = 4096
+
 PayloadObj = Dict[str, Any]
 PayloadToClassFn = Callable[[PayloadObj], T]
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class JsonCodec:
+    """
+    Encodes and decodes the JSON payloads exchanged with AWS IoT services.
+
+    This default implementation uses the standard library's :mod:`json` module.
+    Subclasses wrap faster third-party JSON libraries. To plug in any other library,
+    subclass this and override :meth:`encode` and :meth:`decode`.
+    """
+
+    #: Name of the underlying JSON library
+    name = 'json'
+
+    def encode(self, obj: Any) -> bytes:
+        """
+        Serialize an object to a UTF-8 encoded JSON document.
+
+        Args:
+            obj: JSON-compatible object (usually a dict)
+
+        Returns:
+            UTF-8 encoded JSON document
+        """
+        return json.dumps(obj).encode()
+
+    def decode(self, data: BytesLike) -> Any:
+        """
+        Parse a UTF-8 encoded JSON document.
+
+        The standard library parser decodes the document to a `str` before
+        parsing it, and a memoryview is copied to `bytes` first, since
+        :func:`json.loads()` does not take one. The third-party codecs parse
+        the bytes directly.
+
+        Args:
+            data: UTF-8 encoded JSON document
+
+        Returns:
+            The parsed object
+        """
+        if isinstance(data, memoryview):
+            # json.loads() takes bytes and bytearray, but not memoryview
+            data = data.tobytes()
+        return json.loads(data)
+
+    def __repr__(self):
+        return '{}.{}()'.format(self.__class__.__module__, self.__class__.__name__)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    JSON codec backed by the `orjson <https://pypi.org/project/orjson/>`_ library.
+
+    Raises:
+        ImportError: if orjson is not installed.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def encode(self, obj: Any) -> bytes:
+        return self._dumps(obj)
+
+    def decode(self, data: BytesLike) -> Any:
+        return self._loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    """
+    JSON codec backed by the `msgspec <https://pypi.org/project/msgspec/>`_ library.
+
+    Raises:
+        ImportError: if msgspec is not installed.
+    """
+
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec.json
+        self._encode = msgspec.json.Encoder().encode
+        self._decode = msgspec.json.Decoder().decode
+
+    def encode(self, obj: Any) -> bytes:
+        return self._encode(obj)
+
+    def decode(self, data: BytesLike) -> Any:
+        return self._decode(data)
+
+
+class UjsonCodec(JsonCodec):
+    """
+    JSON codec backed by the `ujson <https://pypi.org/project/ujson/>`_ library.
+
+    Raises:
+        ImportError: if ujson is not installed.
+    """
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._dumps = ujson.dumps
+        self._loads = ujson.loads
+
+    def encode(self, obj: Any) -> bytes:
+        return self._dumps(obj).encode()
+
+    def decode(self, data: BytesLike) -> Any:
+        if not isinstance(data, bytes):
+            # ujson.loads() takes bytes, but not other buffer types
+            data = bytes(data)
+        return self._loads(data)
+
+
+# Codecs to try, fastest first, when picking the default
+_JSON_CODEC_PREFERENCE = (OrjsonCodec, MsgspecCodec, UjsonCodec)
+
+_default_json_codec = None  # type: Optional[JsonCodec]
+_default_json_codec_lock = Lock()
+
+
+def _find_fastest_json_codec() -> JsonCodec:
+    for codec_type in _JSON_CODEC_PREFERENCE:
+        try:
+            return codec_type()
+        except ImportError:
+            pass
+    return JsonCodec()
+
+
+def get_default_json_codec() -> JsonCodec:
+    """
+    Returns the process-wide JSON codec used by service clients that were not given one explicitly.
+
+    Unless :func:`set_default_json_codec()` has been called, this is the fastest installed codec:
+    :class:`OrjsonCodec`, then :class:`MsgspecCodec`, then :class:`UjsonCodec`,
+    falling back to the standard library's :class:`JsonCodec`.
+    """
+    global _default_json_codec
+    codec = _default_json_codec
+    if codec is None:
+        with _default_json_codec_lock:
+            if _default_json_codec is None:
+                _default_json_codec = _find_fastest_json_codec()
+            codec = _default_json_codec
+    return codec
+
+
+def set_default_json_codec(codec: Optional[JsonCodec]):
+    """
+    Set the process-wide JSON codec.
+
+    Service clients capture the default codec when they are created,
+    so call this before creating any clients.
+
+    Args:
+        codec: Codec to use by default. Pass None to go back to the fastest installed codec.
+    """
+    global _default_json_codec
+    assert isinstance(codec, JsonCodec) or codec is None
+    with _default_json_codec_lock:
+        _default_json_codec = codec
 
 
 class MqttServiceClient:
@@ -34,17 +226,61 @@ class MqttServiceClient:
     Base class for an AWS MQTT Service Client
 
     Args:
-        mqtt_connection: MQTT connection to use
+        mqtt_connection: MQTT connection to use. A
+            :class:`~awsiot.connection_pool.ConnectionPool` can be passed
+            instead, to spread topics over its clients by thing name.
+        json_codec: Codec for message payloads. Defaults to :func:`get_default_json_codec()`.
+        lazy_deserialization: If True, received messages are converted with
+            :meth:`ModeledClass.from_payload_lazy()`, so fields are only built when first accessed.
+        executor: Executor to run subscription callbacks on, so a slow callback
+            does not hold up the connection's network thread. Callbacks for
+            messages on the same topic run one at a time, in the order the
+            messages arrived. An executor with a `submit_ordered(key, fn, *args)`
+            method, such as :class:`~awsiot.dispatcher.StreamDispatcher`, is
+            given the topic as the key. Other executors get one task at a time
+            per topic. The client does not shut the executor down. If None
+            (the default), callbacks run on the network thread.
+        decode_on_executor: If True, received payloads are also decoded on
+            the `executor`, and the network thread only hands the bytes over.
+            Requires an `executor`.
     """
 
-    def __init__(self, mqtt_connection: Union[mqtt.Connection, mqtt5.Client]):
+    def __init__(self, mqtt_connection: 'Union[mqtt.Connection, mqtt5.Client, ConnectionPool]', *,
+                 json_codec: Optional[JsonCodec] = None,
+                 lazy_deserialization: bool = False,
+                 executor: Optional[Executor] = None,
+                 decode_on_executor: bool = False):
         if isinstance(mqtt_connection, mqtt.Connection):
             self._mqtt_connection = mqtt_connection  # type: mqtt.Connection
         elif isinstance(mqtt_connection, mqtt5.Client):
             self._mqtt_connection = mqtt_connection.new_connection()
             self._mqtt5_client = mqtt_connection
+        elif isinstance(mqtt_connection, ConnectionPool):
+            self._mqtt_connection = mqtt_connection.connection()
         else:
-            raise TypeError("The service client could only take mqtt.Connection and mqtt5.Client as argument")
+            raise TypeError(
+                "The service client could only take mqtt.Connection, mqtt5.Client and ConnectionPool as argument")
+
+        self._json_codec = json_codec if json_codec is not None else get_default_json_codec()
+        self._lazy_deserialization = lazy_deserialization
+
+        if decode_on_executor and executor is None:
+            raise ValueError("decode_on_executor requires an executor")
+        self._executor = executor
+        self._decode_on_executor = decode_on_executor
+        if executor is not None:
+            submit_ordered = getattr(executor, 'submit_ordered', None)
+            if submit_ordered is None:
+                submit_ordered = _OrderedSubmitter(executor).submit_ordered
+            self._submit_ordered = submit_ordered  # type: Callable[..., Any]
+
+        self._dispatch_lock = Lock()
+        # topic filters subscribed by add_dispatch_subscription(), and their SUBACK futures
+        self._dispatch_filters = {}  # type: Dict[str, Future]
+        # (dispatch filter, callback) of each topic served by a dispatch subscription
+        self._dispatch_index = TopicTrie()  # type: TopicTrie[Tuple[str, Callable]]
+        # topic -> matches in _dispatch_index, replaced whenever the index changes
+        self._dispatch_cache = {}  # type: Dict[str, Tuple[Tuple[str, Callable], ...]]
 
     @property
     def mqtt_connection(self) -> mqtt.Connection:
@@ -53,6 +289,20 @@ class MqttServiceClient:
         """
         return self._mqtt_connection
 
+    @property
+    def json_codec(self) -> JsonCodec:
+        """
+        Codec used to encode and decode message payloads
+        """
+        return self._json_codec
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        """
+        Executor that subscription callbacks run on, or None if they run on the network thread
+        """
+        return self._executor
+
     def unsubscribe(self, topic: str) -> Future:
         """
         Tell the MQTT server to stop sending messages to this topic.
@@ -65,6 +315,18 @@ class MqttServiceClient:
             has acknowledged the unsubscribe.
         """
         future = Future()  # type: Future
+        with self._dispatch_lock:
+            if topic in self._dispatch_filters:
+                self._drop_dispatch_filter(topic)
+            else:
+                entries = self._dispatch_index.get(topic)
+                if entries:
+                    # served by a dispatch subscription, there is nothing to tell the server
+                    for entry in entries:
+                        self._dispatch_index.remove(topic, entry)
+                    self._dispatch_cache = {}
+                    future.set_result(None)
+                    return future
         try:
             def on_unsuback(unsuback_future):
                 if unsuback_future.exception():
@@ -80,41 +342,148 @@ class MqttServiceClient:
 
         return future
 
-    def _publish_operation(self, topic: str, qos: int, payload: Optional[PayloadObj]) -> Future:
+    def add_dispatch_subscription(self, topic_filter: str, qos: int) -> Future:
+        """
+        Subscribe to a topic filter once, and serve every topic under it locally.
+
+        Afterwards, `subscribe_to_*()` calls whose topic matches `topic_filter`
+        do not send a SUBSCRIBE to the server. Their callbacks are added to a
+        local index instead, and messages arriving through this subscription
+        are routed to them at a cost that depends on the depth of the topic,
+        not on the number of callbacks. A gateway handling the shadows of many
+        child things can subscribe to `$aws/things/+/shadow/#` once, instead of
+        to several topics per thing.
+
+        Topics subscribed before this call keep their own subscriptions.
+        Calling `unsubscribe()` with a topic served this way only removes its
+        callbacks, and calling it with `topic_filter` ends this subscription
+        along with the callbacks it served.
+
+        Args:
+            topic_filter: Topic filter to subscribe to, usually with `+` or `#` wildcards.
+            qos: Quality of Service of the subscription.
+
+        Returns:
+            `Future` whose result will be the `awscrt.mqtt.QoS` granted by the
+            server, or an exception if the subscription fails. The futures
+            returned by `subscribe_to_*()` calls served by this subscription
+            complete with it.
+        """
+        validate_topic_filter(topic_filter)
+        with self._dispatch_lock:
+            future = self._dispatch_filters.get(topic_filter)
+            if future is not None:
+                return future
+            future = Future()
+            self._dispatch_filters[topic_filter] = future
+
+        def on_suback(suback_future):
+            try:
+                future.set_result(suback_future.result()['qos'])
+            except Exception as e:
+                self._remove_dispatch_filter(topic_filter, future)
+                future.set_exception(e)
+
+        try:
+            sub_future, _ = self.mqtt_connection.subscribe(
+                topic=topic_filter,
+                qos=qos,
+                callback=functools.partial(self._dispatch, topic_filter),
+            )
+            sub_future.add_done_callback(on_suback)
+        except Exception as e:
+            self._remove_dispatch_filter(topic_filter, future)
+            future.set_exception(e)
+
+        return future
+
+    def _remove_dispatch_filter(self, topic_filter: str, future: Future):
+        with self._dispatch_lock:
+            if self._dispatch_filters.get(topic_filter) is future:
+                self._drop_dispatch_filter(topic_filter)
+
+    def _drop_dispatch_filter(self, topic_filter: str):
+        # called with the dispatch lock held
+        del self._dispatch_filters[topic_filter]
+        for served_topic, entry in list(self._dispatch_index.items()):
+            if entry[0] == topic_filter:
+                self._dispatch_index.remove(served_topic, entry)
+        self._dispatch_cache = {}
+
+    def _add_dispatch_callback(self, topic: str, callback: Callable) -> Optional[Future]:
+        """
+        If a dispatch subscription covers `topic`, routes its messages to `callback`
+        and returns the subscription's SUBACK future. Otherwise returns None.
+        """
+        with self._dispatch_lock:
+            for topic_filter, future in self._dispatch_filters.items():
+                if filter_covers(topic_filter, topic):
+                    self._dispatch_index.add(topic, (topic_filter, callback))
+                    self._dispatch_cache = {}
+                    return future
+        return None
+
+    def _dispatch(self, topic_filter: str, topic: str, payload: bytes, dup: bool, qos: int, retain: bool, **kwargs):
+        # invoked by the connection for messages of dispatch subscription `topic_filter`
+        entries = self._dispatch_cache.get(topic)
+        if entries is None:
+            with self._dispatch_lock:
+                entries = tuple(self._dispatch_index.match(topic))
+                cache = self._dispatch_cache
+                if len(cache) >= _DISPATCH_CACHE_SIZE:
+                    del cache[next(iter(cache))]
+                cache[topic] = entries
+        for owner, callback in entries:
+            # a topic under two dispatch subscriptions arrives through each of them
+            if owner == topic_filter:
+                callback(topic=topic, payload=payload, dup=dup, qos=qos, retain=retain, **kwargs)
+
+    def _publish_operation(self, topic: str, qos: int, payload: Optional[PayloadObj],
+                           operation_name: str = 'publish') -> Future:
         """
         Performs a 'Publish' style operation for an MQTT service.
 
         Parameters:
         topic - The topic to publish this message to.
         qos   - The Quality of Service guarantee of this message
-        payload - (Optional) If set, the message will be a string of JSON, built from this object.
+        payload - (Optional) If set, the message will be a JSON document, built from this object.
                 If unset, an empty message is sent.
+        operation_name - (Optional) Name of the operation, for metrics.
 
         Returns a `Future` which will contain a result of `None` when the
         server has acknowledged the message, or an exception if the
         publish fails.
         """
         future = Future()  # type: Future
+        recorder = metrics._recorder
+        if recorder is not None:
+            start = time.perf_counter()
+            recorder.add_in_flight(operation_name, 1)
         try:
             def on_puback(puback_future):
+                if recorder is not None:
+                    recorder.record(metrics.Metric.REQUEST_LATENCY, operation_name, time.perf_counter() - start)
+                    recorder.add_in_flight(operation_name, -1)
                 if puback_future.exception():
                     future.set_exception(puback_future.exception())
                 else:
                     future.set_result(None)
 
             if payload is None:
-                payload_str = ""
+                payload_bytes = b""
             else:
-                payload_str = json.dumps(payload)
+                payload_bytes = self._json_codec.encode(payload)
 
             pub_future, _ = self.mqtt_connection.publish(
                 topic=topic,
-                payload=payload_str,
+                payload=payload_bytes,
                 qos=qos,
             )
             pub_future.add_done_callback(on_puback)
 
         except Exception as e:
+            if recorder is not None:
+                recorder.add_in_flight(operation_name, -1)
             future.set_exception(e)
 
         return future
@@ -123,7 +492,8 @@ class MqttServiceClient:
                              topic: str,
                              qos: int,
                              callback: Callable[[T], None],
-                             payload_to_class_fn: PayloadToClassFn) -> Tuple[Future, str]:
+                             payload_to_class_fn: PayloadToClassFn,
+                             operation_name: str = 'subscribe') -> Tuple[Future, str]:
         """
         Performs a 'Subscribe' style operation for an MQTT service.
         Messages received from this topic are processed as JSON,
@@ -141,12 +511,17 @@ class MqttServiceClient:
                 a dict, and returns a class of the type expected by
                 `callback`. The dict comes from parsing the received
                 message as JSON.
+        operation_name - (Optional) Name of the operation, for metrics.
 
         Returns two values. The first is a `Future` whose result will be the
         `awscrt.mqtt.QoS` granted by the server, or an exception if the
         subscription fails. The second value is a topic which may be passed to
         `unsubscribe()` to stop receiving messages.
         Note that messages may arrive before the subscription is acknowledged.
+        If the client has an executor, `callback` runs on it.
+        If a subscription made with `add_dispatch_subscription()` covers the
+        topic, no SUBSCRIBE is sent, and the `Future` completes with that
+        subscription's.
         """
 
         future = Future()  # type: Future
@@ -158,14 +533,46 @@ class MqttServiceClient:
                 except Exception as e:
                     future.set_exception(e)
 
-            def callback_wrapper(topic, payload, dup, qos, retain, **kwargs):
-                try:
-                    payload_obj = json.loads(payload.decode())
-                    event = payload_to_class_fn(payload_obj)
-                except BaseException:
-                    # can't deliver payload, invoke callback with None
-                    event = None
-                callback(event)
+            def on_suback_qos(qos_future):
+                if qos_future.exception():
+                    future.set_exception(qos_future.exception())
+                else:
+                    future.set_result(qos_future.result())
+
+            decode = self._json_codec.decode
+            if self._lazy_deserialization:
+                payload_to_class_fn = _lazy_payload_to_class_fn(payload_to_class_fn)
+            else:
+                payload_to_class_fn = _compiled_payload_to_class_fn(payload_to_class_fn)
+
+            if self._executor is not None:
+                callback_wrapper = self._executor_callback_wrapper(
+                    topic, callback, decode, payload_to_class_fn, operation_name)
+            else:
+                def callback_wrapper(topic, payload, dup, qos, retain, **kwargs):
+                    recorder = metrics._recorder
+                    if recorder is not None:
+                        start = time.perf_counter()
+                    try:
+                        payload_obj = decode(payload)
+                        event = payload_to_class_fn(payload_obj)
+                    except BaseException:
+                        # can't deliver payload, invoke callback with None
+                        event = None
+                    if recorder is None:
+                        callback(event)
+                        return
+                    decoded = time.perf_counter()
+                    recorder.record(metrics.Metric.DESERIALIZATION, operation_name, decoded - start)
+                    try:
+                        callback(event)
+                    finally:
+                        recorder.record(metrics.Metric.CALLBACK, operation_name, time.perf_counter() - decoded)
+
+            dispatch_future = self._add_dispatch_callback(topic, callback_wrapper)
+            if dispatch_future is not None:
+                dispatch_future.add_done_callback(on_suback_qos)
+                return future, topic
 
             sub_future, _ = self.mqtt_connection.subscribe(
                 topic=topic,
@@ -179,6 +586,108 @@ class MqttServiceClient:
 
         return future, topic
 
+    def _executor_callback_wrapper(self, subscription_topic: str, callback: Callable, decode: Callable,
+                                   payload_to_class_fn: Callable, operation_name: str) -> Callable:
+        """
+        Returns a subscription callback that runs `callback` on the executor,
+        keeping the callbacks of each topic in order.
+        """
+        decode_on_executor = self._decode_on_executor
+        submit_ordered = self._submit_ordered
+
+        def to_event(payload, recorder):
+            if recorder is not None:
+                start = time.perf_counter()
+            try:
+                event = payload_to_class_fn(decode(payload))
+            except BaseException:
+                # can't deliver payload, invoke callback with None
+                event = None
+            if recorder is not None:
+                recorder.record(metrics.Metric.DESERIALIZATION, operation_name, time.perf_counter() - start)
+            return event
+
+        def run(payload, event, submitted):
+            recorder = metrics._recorder
+            if recorder is not None:
+                start = time.perf_counter()
+                if submitted is not None:
+                    recorder.record(metrics.Metric.EXECUTOR_QUEUE_WAIT, operation_name, start - submitted)
+            try:
+                if payload is not None:
+                    event = to_event(payload, recorder)
+                    if recorder is not None:
+                        start = time.perf_counter()
+                try:
+                    callback(event)
+                finally:
+                    if recorder is not None:
+                        recorder.record(metrics.Metric.CALLBACK, operation_name, time.perf_counter() - start)
+            except Exception:
+                logger.exception("%r callback for %s raised an exception", self, subscription_topic)
+
+        def callback_wrapper(topic, payload, dup, qos, retain, **kwargs):
+            recorder = metrics._recorder
+            if decode_on_executor:
+                event = None
+            else:
+                event = to_event(payload, recorder)
+                payload = None
+            try:
+                submit_ordered(topic, run, payload, event, time.perf_counter() if recorder is not None else None)
+            except RuntimeError:
+                logger.warning("%r dropped a message on %s, its executor has been shut down", self, topic)
+
+        return callback_wrapper
+
+
+class _OrderedSubmitter:
+    """
+    Runs callbacks on an executor one at a time per key, in the order they
+    were submitted, like :meth:`~awsiot.dispatcher.StreamDispatcher.submit_ordered`.
+    """
+
+    def __init__(self, executor: Executor):
+        self._executor = executor
+        self._lock = Lock()
+        # key -> callbacks waiting for the key's running callback to finish
+        self._waiting = {}  # type: Dict[Hashable, Deque[Tuple[Callable, tuple]]]
+
+    def submit_ordered(self, key: Hashable, fn: Callable, *args):
+        with self._lock:
+            waiting = self._waiting.get(key)
+            if waiting is not None:
+                waiting.append((fn, args))
+                return
+            self._waiting[key] = deque()
+        try:
+            self._executor.submit(self._run, key, fn, args)
+        except BaseException:
+            self._drop(key)
+            raise
+
+    def _run(self, key: Hashable, fn: Callable, args: tuple):
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception("%r callback raised an exception", self)
+
+        with self._lock:
+            waiting = self._waiting[key]
+            if not waiting:
+                del self._waiting[key]
+                return
+            fn, args = waiting.popleft()
+        try:
+            self._executor.submit(self._run, key, fn, args)
+        except RuntimeError:
+            logger.warning("%r dropped callbacks, its executor has been shut down", self)
+            self._drop(key)
+
+    def _drop(self, key: Hashable):
+        with self._lock:
+            self._waiting.pop(key, None)
+
 
 class ModeledClass:
     """
@@ -198,6 +707,118 @@ class ModeledClass:
             self.__class__.__name__,
             ', '.join(properties))
 
+    @classmethod
+    def from_payload_lazy(cls, payload: PayloadObj):
+        """
+        Like `from_payload()`, but defers the work of converting each field
+        until that field is first accessed.
+
+        The returned object is an instance of `cls` that keeps a reference
+        to `payload`. Nested classes, lists and timestamps are only built
+        for the fields that are actually read, so this is cheaper when
+        most messages are discarded after inspecting a field or two.
+        The payload must not be modified afterwards.
+
+        Args:
+            payload: dict parsed from the JSON message
+
+        Returns:
+            An instance of `cls`
+        """
+        new = object.__new__(_lazy_modeled_class(cls))
+        new._lazy_payload = payload
+        return new
+
+
+def _payload_key(attr: str) -> str:
+    """Returns the JSON payload key that a ModeledClass attribute is read from"""
+    if attr.endswith('_is_nullable'):
+        attr = attr[:-len('_is_nullable')]
+    first, *rest = attr.split('_')
+    return first + ''.join(word.title() for word in rest)
+
+
+def _lazy_getattr(self, name):
+    # Only invoked when a slot has not been assigned yet,
+    # which for a lazy instance means the field has not been materialized
+    modeled_class, payload_keys, defaults = type(self)._lazy_info
+    key = payload_keys.get(name)
+    if key is None:
+        raise AttributeError("'{}' object has no attribute '{}'".format(modeled_class.__name__, name))
+
+    payload = self._lazy_payload
+    if key in payload:
+        value = getattr(modeled_class.from_payload({key: payload[key]}), name)
+    else:
+        value = getattr(defaults, name)
+    setattr(self, name, value)
+    return value
+
+
+def _lazy_repr(self):
+    properties = []
+    for slot in type(self)._lazy_info[0].__slots__:
+        properties.append("{}={}".format(slot, repr(getattr(self, slot))))
+
+    return '{}.{}({})'.format(
+        self.__class__.__module__,
+        self.__class__.__name__,
+        ', '.join(properties))
+
+
+_lazy_modeled_classes = {}  # type: Dict[type, type]
+
+
+def _lazy_modeled_class(modeled_class: type) -> type:
+    lazy_class = _lazy_modeled_classes.get(modeled_class)
+    if lazy_class is None:
+        if not hasattr(modeled_class, 'from_payload'):
+            raise TypeError("{} cannot be deserialized".format(modeled_class.__name__))
+
+        payload_keys = {attr: _payload_key(attr) for attr in modeled_class.__slots__}
+        lazy_class = type(modeled_class.__name__, (modeled_class,), {
+            '__slots__': ('_lazy_payload',),
+            '__module__': modeled_class.__module__,
+            '__qualname__': modeled_class.__qualname__,
+            '__getattr__': _lazy_getattr,
+            '__repr__': _lazy_repr,
+            '_lazy_info': (modeled_class, payload_keys, modeled_class()),
+        })
+        # a race here just builds an equivalent class twice
+        lazy_class = _lazy_modeled_classes.setdefault(modeled_class, lazy_class)
+    return lazy_class
+
+
+def _modeled_class_of(payload_to_class_fn: PayloadToClassFn) -> Optional[type]:
+    """Returns the ModeledClass if `payload_to_class_fn` is its `from_payload()`"""
+    modeled_class = getattr(payload_to_class_fn, '__self__', None)
+    if isinstance(modeled_class, type) and issubclass(modeled_class, ModeledClass) and \
+            getattr(payload_to_class_fn, '__name__', None) == 'from_payload':
+        return modeled_class
+    return None
+
+
+def _lazy_payload_to_class_fn(payload_to_class_fn: PayloadToClassFn) -> PayloadToClassFn:
+    """
+    If `payload_to_class_fn` is a ModeledClass's `from_payload()`,
+    returns the class's `from_payload_lazy()` instead.
+    """
+    modeled_class = _modeled_class_of(payload_to_class_fn)
+    if modeled_class is not None:
+        return modeled_class.from_payload_lazy
+    return payload_to_class_fn
+
+
+def _compiled_payload_to_class_fn(payload_to_class_fn: PayloadToClassFn) -> PayloadToClassFn:
+    """
+    If `payload_to_class_fn` is a ModeledClass's `from_payload()`,
+    returns the class's compiled decoder instead.
+    """
+    modeled_class = _modeled_class_of(payload_to_class_fn)
+    if modeled_class is not None:
+        return serialization.decoder_for(modeled_class)
+    return payload_to_class_fn
+
 
 class V2ServiceException(Exception):
     """
@@ -214,32 +835,170 @@ class V2ServiceException(Exception):
         self.inner_error = inner_error
         self.modeled_error = modeled_error
 
-def create_v2_service_modeled_future(internal_unmodeled_future : Future, operation_name : str, accepted_topic : str, response_class, modeled_error_class):
+def create_v2_service_modeled_future(internal_unmodeled_future : Future, operation_name : str, accepted_topic : str, response_class, modeled_error_class, json_codec : Optional[JsonCodec] = None, lazy_deserialization : bool = False):
     modeled_future = Future()
+    decode = (json_codec if json_codec is not None else get_default_json_codec()).decode
+    response_from_payload = response_class.from_payload_lazy if lazy_deserialization else serialization.decoder_for(response_class)
 
     # force a strong ref to the hidden/internal unmodeled future so that it can't be GCed prior to completion
     modeled_future.unmodeled_future = internal_unmodeled_future
 
+    # futures owned by a RequestScheduler are dropped from its queue when the caller cancels;
+    # futures owned by awscrt are left alone, since awscrt completes them itself
+    cancel_with = getattr(internal_unmodeled_future, '_cancel_with', None)
+    if cancel_with is not None:
+        cancel_with(modeled_future)
+
+    recorder = metrics._recorder
+    if recorder is not None:
+        start = time.perf_counter()
+        recorder.add_in_flight(operation_name, 1)
+
     def complete_modeled_future(unmodeled_future):
+        if recorder is not None:
+            received = time.perf_counter()
+            recorder.record(metrics.Metric.REQUEST_LATENCY, operation_name, received - start)
+            recorder.add_in_flight(operation_name, -1)
+        if modeled_future.done():
+            # cancelled by the caller
+            return
         if unmodeled_future.exception():
             service_error = V2ServiceException(f"{operation_name} failure", unmodeled_future.exception(), None)
             modeled_future.set_exception(service_error)
         else:
             unmodeled_result = unmodeled_future.result()
+            result, error = None, None
             try:
-                payload_as_json = json.loads(unmodeled_result.payload.decode())
+                payload_as_json = decode(unmodeled_result.payload)
                 if unmodeled_result.topic == accepted_topic:
-                    modeled_future.set_result(response_class.from_payload(payload_as_json))
+                    result = response_from_payload(payload_as_json)
                 else:
                     modeled_error = modeled_error_class.from_payload(payload_as_json)
-                    modeled_future.set_exception(V2ServiceException(f"{operation_name} failure", None, modeled_error))
+                    error = V2ServiceException(f"{operation_name} failure", None, modeled_error)
             except Exception as e:
-                modeled_future.set_exception(V2ServiceException(f"{operation_name} failure", e, None))
+                error = V2ServiceException(f"{operation_name} failure", e, None)
+            if recorder is not None:
+                decoded = time.perf_counter()
+                recorder.record(metrics.Metric.DESERIALIZATION, operation_name, decoded - received)
+            if error is None:
+                modeled_future.set_result(result)
+            else:
+                modeled_future.set_exception(error)
+            if recorder is not None:
+                # completing the future runs the callbacks added to it
+                recorder.record(metrics.Metric.CALLBACK, operation_name, time.perf_counter() - decoded)
 
     internal_unmodeled_future.add_done_callback(lambda f: complete_modeled_future(f))
 
     return modeled_future
 
+@dataclass(frozen=True)
+class V2RequestTopics:
+    """
+    Topics and response paths of a V2 request/response operation, for one set of
+    request values (thing name, shadow name, job ID, ...).
+
+    Instances are cached and shared by every request with the same values,
+    see :func:`get_v2_request_topics`.
+
+    Args:
+        publish_topic (str): Topic the request is published to
+        accepted_topic (str): Topic of successful responses
+        rejected_topic (str): Topic of error responses
+        subscription_topic_filters (Tuple[str, ...]): Topic filters to subscribe to for responses
+        response_paths (Tuple[awscrt.mqtt_request_response.ResponsePath, ...]): Response paths for the request.
+            These are shared, so they must not be modified.
+    """
+    publish_topic: str
+    accepted_topic: str
+    rejected_topic: str
+    subscription_topic_filters: 'Tuple[str, ...]'
+    response_paths: 'Tuple[mqtt_request_response.ResponsePath, ...]'
+
+
+_DEFAULT_V2_TOPIC_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=None)
+def _v2_topic_template_fields(publish_template: str, subscription_templates: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Returns the names of the request attributes used by a set of topic templates, e.g. ('thing_name',)"""
+    fields = {}
+    for template in (publish_template,) + subscription_templates:
+        for _, field_name, _, _ in string.Formatter().parse(template):
+            if field_name:
+                # templates refer to attributes of the request, like '{0.thing_name}'
+                fields[field_name.split('.', 1)[1]] = None
+    return tuple(fields)
+
+
+def _build_v2_request_topics(publish_template: str, subscription_templates: Tuple[str, ...],
+                             correlation_token_path: Optional[str], fields: Tuple[str, ...],
+                             values: Tuple[Any, ...]) -> V2RequestTopics:
+    request = SimpleNamespace(**dict(zip(fields, values)))
+    publish_topic = publish_template.format(request)
+    accepted_topic = publish_topic + "/accepted"
+    rejected_topic = publish_topic + "/rejected"
+    return V2RequestTopics(
+        publish_topic=publish_topic,
+        accepted_topic=accepted_topic,
+        rejected_topic=rejected_topic,
+        subscription_topic_filters=tuple(template.format(request) for template in subscription_templates),
+        response_paths=(
+            mqtt_request_response.ResponsePath(accepted_topic, correlation_token_path),
+            mqtt_request_response.ResponsePath(rejected_topic, correlation_token_path),
+        ))
+
+
+_cached_v2_request_topics = functools.lru_cache(maxsize=_DEFAULT_V2_TOPIC_CACHE_SIZE)(_build_v2_request_topics)
+
+
+def get_v2_request_topics(publish_template: str, subscription_templates: Tuple[str, ...],
+                          correlation_token_path: Optional[str], request: Any) -> V2RequestTopics:
+    """
+    Returns the topics and response paths for a V2 request/response operation.
+
+    Results are kept in a process-wide LRU cache, keyed by the templates and the
+    request values they use, so repeated requests against the same things and
+    shadows skip formatting topics and building response paths.
+    The size of the cache is set by :func:`set_v2_topic_cache_size()`.
+
+    Args:
+        publish_template: Template of the request topic, e.g. '$aws/things/{0.thing_name}/shadow/get'.
+            Responses arrive on this topic plus '/accepted' or '/rejected'.
+        subscription_templates: Templates of the topic filters to subscribe to for responses
+        correlation_token_path: JSON path of the correlation token in responses, or None
+        request: Request whose attributes fill in the templates
+
+    Returns:
+        :class:`V2RequestTopics`
+    """
+    fields = _v2_topic_template_fields(publish_template, subscription_templates)
+    values = tuple(getattr(request, field) for field in fields)
+    try:
+        return _cached_v2_request_topics(
+            publish_template, subscription_templates, correlation_token_path, fields, values)
+    except TypeError:
+        # unhashable values can't be cached
+        return _build_v2_request_topics(
+            publish_template, subscription_templates, correlation_token_path, fields, values)
+
+
+def set_v2_topic_cache_size(maxsize: int):
+    """
+    Set how many sets of request topics V2 service clients keep cached.
+
+    Each distinct combination of operation and request values (thing name,
+    shadow name, job ID, ...) takes one entry, and the least recently used
+    entries are evicted first. The default is 1024. Calling this clears the cache.
+
+    Args:
+        maxsize: Maximum number of cached entries. Pass 0 to disable caching.
+    """
+    global _cached_v2_request_topics
+    assert isinstance(maxsize, int) and maxsize >= 0
+    _cached_v2_request_topics = functools.lru_cache(maxsize=maxsize)(_build_v2_request_topics)
+
+
 class V2DeserializationFailure(Exception):
     """
     An exception raised when deserialization from an MQTT message payload to a modeled type fails
@@ -278,12 +1037,26 @@ class ServiceStreamOptions(Generic[T]):
         assert callable(self.deserialization_failure_listener) or self.deserialization_failure_listener is None
 
 
-def create_streaming_unmodeled_options(stream_options: ServiceStreamOptions[T], subscription_topic: str, event_name: str, event_class):
+def create_streaming_unmodeled_options(stream_options: ServiceStreamOptions[T], subscription_topic: str, event_name: str, event_class, json_codec: Optional[JsonCodec] = None, lazy_deserialization: bool = False):
+    decode = (json_codec if json_codec is not None else get_default_json_codec()).decode
+    event_from_payload = event_class.from_payload_lazy if lazy_deserialization else serialization.decoder_for(event_class)
+
     def modeled_event_callback(unmodeled_event : mqtt_request_response.IncomingPublishEvent):
+        recorder = metrics._recorder
         try:
-            payload_as_json = json.loads(unmodeled_event.payload.decode())
-            modeled_event = event_class.from_payload(payload_as_json)
-            stream_options.incoming_event_listener(modeled_event)
+            if recorder is not None:
+                start = time.perf_counter()
+            payload_as_json = decode(unmodeled_event.payload)
+            modeled_event = event_from_payload(payload_as_json)
+            if recorder is None:
+                stream_options.incoming_event_listener(modeled_event)
+                return
+            decoded = time.perf_counter()
+            recorder.record(metrics.Metric.DESERIALIZATION, event_name, decoded - start)
+            try:
+                stream_options.incoming_event_listener(modeled_event)
+            finally:
+                recorder.record(metrics.Metric.CALLBACK, event_name, time.perf_counter() - decoded)
         except Exception as e:
             if stream_options.deserialization_failure_listener is not None:
                 failure_event = V2DeserializationFailure(f"{event_name} stream deserialization failure", e, unmodeled_event.payload)
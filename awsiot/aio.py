@@ -0,0 +1,315 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+asyncio facade for the V2 service clients.
+
+Each class here wraps an existing V2 client, and exposes every operation
+as a coroutine. Results travel back to the event loop the facade is bound
+to through the client's futures (see :func:`asyncio.wrap_future`), so any
+number of requests can be awaited at once without a thread per waiter.
+
+Streaming operations return a :class:`~awsiot.streaming.BufferedStream`,
+which is an async iterator over the stream's events with a bounded buffer.
+By default, the oldest event is dropped when the buffer is full, so a slow
+consumer never stalls the thread that delivers events and responses.
+
+Example::
+
+    async def main():
+        shadow = AsyncIotShadowClientV2(IotShadowClientV2(mqtt5_client, options))
+        response = await shadow.get_shadow(GetShadowRequest(thing_name="thing"))
+
+        stream = shadow.create_shadow_delta_updated_stream(
+            ShadowDeltaUpdatedSubscriptionRequest(thing_name="thing"))
+        async with stream:
+            async for delta in stream:
+                ...
+"""
+
+import asyncio
+from awsiot import iotidentity, iotjobs, iotshadow, streaming
+from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2
+from awsiot.streaming import BufferedStream, OverflowPolicy
+import inspect
+from typing import Any, Callable, Hashable, Optional
+
+__all__ = [
+    'AsyncIotShadowClientV2',
+    'AsyncIotJobsClientV2',
+    'AsyncIotIdentityClientV2',
+    'AsyncGreengrassCoreIPCClientV2',
+]
+
+
+class _AsyncClient:
+    """Shared plumbing for the async facades"""
+
+    def __init__(self, client, loop: Optional[asyncio.AbstractEventLoop], stream_maxsize: int):
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        self.client = client
+        self.loop = loop
+        self.stream_maxsize = stream_maxsize
+
+    def _wrap(self, future) -> asyncio.Future:
+        return asyncio.wrap_future(future, loop=self.loop)
+
+
+def _operation_doc(sync_class, name: str, summary: str) -> str:
+    return "{} :meth:`{}.{}.{}`.".format(summary, sync_class.__module__, sync_class.__qualname__, name)
+
+
+def _name_operation(method, name: str, signature: inspect.Signature, doc: str):
+    method.__name__ = method.__qualname__ = name
+    method.__signature__ = signature
+    method.__doc__ = doc
+    return method
+
+
+def _v2_request(sync_class, name: str):
+    async def method(self, request):
+        return await self._wrap(getattr(self.client, name)(request))
+
+    signature = inspect.signature(getattr(sync_class, name))
+    return _name_operation(
+        method, name, signature.replace(return_annotation=inspect.Signature.empty),
+        _operation_doc(sync_class, name, "Awaitable version of") + """
+
+        Returns:
+            The operation's response. If the operation fails, raises
+            :class:`awsiot.V2ServiceException`.
+        """)
+
+
+def _v2_stream(sync_class, name: str):
+    def method(self, request, *,
+               maxsize: Optional[int] = None,
+               overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+               key: Optional[Callable[[Any], Hashable]] = None,
+               subscription_status_listener: Optional[Callable] = None,
+               deserialization_failure_listener: Optional[Callable] = None) -> BufferedStream:
+        return streaming.open_stream(
+            getattr(self.client, name), request,
+            maxsize=maxsize if maxsize is not None else self.stream_maxsize,
+            overflow=overflow,
+            key=key,
+            subscription_status_listener=subscription_status_listener,
+            deserialization_failure_listener=deserialization_failure_listener)
+
+    request_parameter = inspect.signature(getattr(sync_class, name)).parameters['request']
+    signature = inspect.signature(method)
+    signature = signature.replace(parameters=[
+        p.replace(annotation=request_parameter.annotation) if p.name == 'request' else p
+        for p in signature.parameters.values()])
+    return _name_operation(method, name, signature, _operation_doc(sync_class, name, "Async iterator version of") + """
+
+        The stream is opened before it is returned. Iteration ends with an
+        error if the stream's subscription is halted.
+
+        Args:
+            request: configuration for the streaming operation to create
+            maxsize: Number of events to buffer. Defaults to the client's `stream_maxsize`.
+            overflow: What to do with events that arrive while the buffer is full.
+                Defaults to :attr:`~awsiot.streaming.OverflowPolicy.DROP_OLDEST`, which never
+                holds up the thread delivering events.
+                :attr:`~awsiot.streaming.OverflowPolicy.BLOCK` loses nothing, but stalls that
+                thread while the buffer is full. If the consumer is then awaiting a response
+                delivered by the same thread, the two deadlock.
+            key: Function returning the key of an event, for :attr:`~awsiot.streaming.OverflowPolicy.COALESCE_BY_KEY`.
+            subscription_status_listener: Optional function object to invoke when the
+                stream's subscription status changes
+            deserialization_failure_listener: Optional function object to invoke when
+                an event cannot be deserialized
+
+        Returns:
+            A :class:`~awsiot.streaming.BufferedStream`
+        """)
+
+
+def _add_v2_operations(async_class, sync_class):
+    for name, member in vars(sync_class).items():
+        if name.startswith('_') or not inspect.isfunction(member):
+            continue
+        if name.startswith('create_') and name.endswith('_stream'):
+            setattr(async_class, name, _v2_stream(sync_class, name))
+        else:
+            setattr(async_class, name, _v2_request(sync_class, name))
+    return async_class
+
+
+class AsyncIotShadowClientV2(_AsyncClient):
+    """
+    asyncio facade for :class:`awsiot.iotshadow.IotShadowClientV2`.
+
+    Every request operation of the wrapped client is available as a
+    coroutine of the same name, and every `create_*_stream` operation
+    returns an opened :class:`~awsiot.streaming.BufferedStream`.
+
+    Args:
+        client: Client to wrap.
+        loop: Event loop to deliver results on. Defaults to the running loop.
+        stream_maxsize: Default number of events each stream buffers.
+    """
+
+    def __init__(self, client: iotshadow.IotShadowClientV2, *,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 stream_maxsize: int = streaming.DEFAULT_MAXSIZE):
+        super().__init__(client, loop, stream_maxsize)
+
+
+class AsyncIotJobsClientV2(_AsyncClient):
+    """
+    asyncio facade for :class:`awsiot.iotjobs.IotJobsClientV2`.
+
+    Every request operation of the wrapped client is available as a
+    coroutine of the same name, and every `create_*_stream` operation
+    returns an opened :class:`~awsiot.streaming.BufferedStream`.
+
+    Args:
+        client: Client to wrap.
+        loop: Event loop to deliver results on. Defaults to the running loop.
+        stream_maxsize: Default number of events each stream buffers.
+    """
+
+    def __init__(self, client: iotjobs.IotJobsClientV2, *,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 stream_maxsize: int = streaming.DEFAULT_MAXSIZE):
+        super().__init__(client, loop, stream_maxsize)
+
+
+class AsyncIotIdentityClientV2(_AsyncClient):
+    """
+    asyncio facade for :class:`awsiot.iotidentity.IotIdentityClientV2`.
+
+    Every operation of the wrapped client is available as a coroutine
+    of the same name.
+
+    Args:
+        client: Client to wrap.
+        loop: Event loop to deliver results on. Defaults to the running loop.
+    """
+
+    def __init__(self, client: iotidentity.IotIdentityClientV2, *,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        super().__init__(client, loop, streaming.DEFAULT_MAXSIZE)
+
+
+_add_v2_operations(AsyncIotShadowClientV2, iotshadow.IotShadowClientV2)
+_add_v2_operations(AsyncIotJobsClientV2, iotjobs.IotJobsClientV2)
+_add_v2_operations(AsyncIotIdentityClientV2, iotidentity.IotIdentityClientV2)
+
+
+_STREAM_HANDLER_PARAMETERS = ('stream_handler', 'on_stream_event', 'on_stream_error', 'on_stream_closed')
+
+
+def _ipc_request(name: str):
+    sync_method = getattr(GreengrassCoreIPCClientV2, name)
+
+    async def method(self, **kwargs):
+        return await self._wrap(getattr(self.client, name + '_async')(**kwargs))
+
+    return _name_operation(
+        method, name, inspect.signature(sync_method),
+        _operation_doc(GreengrassCoreIPCClientV2, name, "Awaitable version of") + """
+
+        Returns:
+            The operation's response.
+        """)
+
+
+def _ipc_stream(name: str):
+    sync_method = getattr(GreengrassCoreIPCClientV2, name)
+
+    async def method(self, *, maxsize: Optional[int] = None, overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                     key: Optional[Callable[[Any], Hashable]] = None, **kwargs):
+        future, stream = streaming.subscribe(
+            getattr(self.client, name + '_async'),
+            maxsize=maxsize if maxsize is not None else self.stream_maxsize,
+            overflow=overflow,
+            key=key,
+            **kwargs)
+        try:
+            response = await self._wrap(future)
+        except BaseException:
+            stream.close()
+            raise
+        return response, stream
+
+    signature = inspect.signature(sync_method)
+    parameters = [p for p in signature.parameters.values() if p.name not in _STREAM_HANDLER_PARAMETERS]
+    parameters += [
+        inspect.Parameter('maxsize', inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Optional[int]),
+        inspect.Parameter('overflow', inspect.Parameter.KEYWORD_ONLY, default=OverflowPolicy.DROP_OLDEST,
+                          annotation=OverflowPolicy),
+        inspect.Parameter('key', inspect.Parameter.KEYWORD_ONLY, default=None,
+                          annotation=Optional[Callable[[Any], Hashable]]),
+    ]
+    return _name_operation(
+        method, name, signature.replace(parameters=parameters, return_annotation=inspect.Signature.empty),
+        _operation_doc(GreengrassCoreIPCClientV2, name, "Async iterator version of") + """
+
+        Args:
+            maxsize: Number of events to buffer. Defaults to the client's `stream_maxsize`.
+            overflow: What to do with events that arrive while the buffer is full.
+                Defaults to :attr:`~awsiot.streaming.OverflowPolicy.DROP_OLDEST`, which never
+                holds up the thread delivering events.
+                :attr:`~awsiot.streaming.OverflowPolicy.BLOCK` loses nothing, but stalls that
+                thread while the buffer is full. If the consumer is then awaiting a response
+                delivered by the same thread, the two deadlock.
+            key: Function returning the key of an event, for :attr:`~awsiot.streaming.OverflowPolicy.COALESCE_BY_KEY`.
+
+        Returns:
+            A tuple of the operation's initial response, and a
+            :class:`~awsiot.streaming.BufferedStream` of its events.
+        """)
+
+
+class AsyncGreengrassCoreIPCClientV2(_AsyncClient):
+    """
+    asyncio facade for :class:`awsiot.greengrasscoreipc.clientv2.GreengrassCoreIPCClientV2`.
+
+    Every operation of the wrapped client is available as a coroutine of
+    the same name. Streaming operations (`subscribe_to_*`) return a tuple
+    of the initial response and a :class:`~awsiot.streaming.BufferedStream`
+    of the events, in place of the stream handler callbacks.
+
+    Stream events are handed over by the :class:`~awsiot.streaming.BufferedStream`,
+    so the wrapped client needs no executor of its own. One created by
+    this class has none, which keeps each stream's events in order.
+
+    Args:
+        client: Client to wrap. If you do not provide one, it will be made automatically.
+        loop: Event loop to deliver results on. Defaults to the running loop.
+        stream_maxsize: Default number of events each stream buffers.
+    """
+
+    def __init__(self, client: Optional[GreengrassCoreIPCClientV2] = None, *,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 stream_maxsize: int = streaming.DEFAULT_MAXSIZE):
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        if client is None:
+            client = GreengrassCoreIPCClientV2(executor=None)
+        super().__init__(client, loop, stream_maxsize)
+
+    async def close(self):
+        """
+        Close the underlying connection, and wait until it has shut down.
+        """
+        await self._wrap(self.client.close(executor_wait=False))
+
+
+def _add_ipc_operations(async_class):
+    for name, member in vars(GreengrassCoreIPCClientV2).items():
+        if name.startswith('_') or not name.endswith('_async') or not inspect.isfunction(member):
+            continue
+        name = name[:-len('_async')]
+        if 'on_stream_event' in inspect.signature(member).parameters:
+            setattr(async_class, name, _ipc_stream(name))
+        else:
+            setattr(async_class, name, _ipc_request(name))
+    return async_class
+
+
+_add_ipc_operations(AsyncGreengrassCoreIPCClientV2)
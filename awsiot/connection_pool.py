@@ -0,0 +1,397 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Spread many things over a few MQTT5 connections.
+
+One connection for every thing a process serves exhausts file descriptors,
+while a single connection runs into the broker's per-connection limits on
+subscriptions and publish rate. A :class:`ConnectionPool` holds N
+:class:`awscrt.mqtt5.Client` instances that share a client bootstrap and a
+TLS context. Things are consistently hashed onto them, so each thing's
+topics always use the same connection while it is up::
+
+    pool = ConnectionPool.build(16, mqtt5_client_builder.mtls_from_path,
+                                endpoint=endpoint, client_id='bridge',
+                                cert_filepath=cert_path, pri_key_filepath=key_path)
+    pool.start()
+
+    shadow = iotshadow.IotShadowClient(pool)
+    shadow_v2 = pool.v2_client(iotshadow.IotShadowClientV2, options)
+
+When a connection goes down, its things move to the next connections on the
+hash ring, and subscriptions made through the pool follow them. They move
+back when it reconnects. Things on other connections do not move.
+"""
+
+from awscrt import mqtt, mqtt5
+from awsiot.resource_cache import ResourceCache
+import bisect
+from concurrent.futures import Future
+import functools
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+import weakref
+
+__all__ = [
+    'ConnectionPool',
+    'PooledClient',
+    'PooledConnection',
+    'shard_key',
+]
+
+logger = logging.getLogger(__name__)
+
+_THINGS_PREFIX = '$aws/things/'
+
+
+def shard_key(topic: str) -> str:
+    """
+    Returns the key a topic is hashed by: the thing name for
+    `$aws/things/<thingName>/...` topics, so all of a thing's shadow and
+    jobs topics share a connection, or else the whole topic.
+
+    Args:
+        topic: Topic or topic filter.
+    """
+    if topic.startswith(_THINGS_PREFIX):
+        thing_name = topic[len(_THINGS_PREFIX):].split('/', 1)[0]
+        if thing_name and thing_name not in ('+', '#'):
+            return thing_name
+    return topic
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ConnectionPool:
+    """
+    Consistently hashes things and topics onto a fixed set of MQTT5 clients.
+
+    The pool needs to know which clients are connected. :meth:`build` wires
+    that up. Pools made from existing clients need :meth:`set_connected`
+    called from each client's lifecycle callbacks. Clients are assumed
+    connected until told otherwise, and if none are, keys go to the client
+    they would normally use, whose offline queue holds the operations.
+
+    Pass the pool to a :class:`~awsiot.MqttServiceClient`, such as
+    :class:`~awsiot.iotshadow.IotShadowClient`, in place of a connection,
+    or use :meth:`v2_client` for the request-response clients.
+
+    This class is thread-safe.
+
+    Args:
+        clients: Clients to spread keys over. Their order decides the hash
+            ring, so keep it the same between runs for stable placement.
+        replicas: Points each client gets on the hash ring. More points
+            spread keys more evenly.
+    """
+
+    def __init__(self, clients: Sequence[mqtt5.Client], *, replicas: int = 100):
+        if not clients:
+            raise ValueError("ConnectionPool needs at least one client")
+        if replicas < 1:
+            raise ValueError("replicas must be at least 1")
+        self._clients = tuple(clients)
+        self._lock = threading.Lock()
+        self._connected = [True] * len(self._clients)
+        self._connections = [None] * len(self._clients)  # type: List[Optional[mqtt.Connection]]
+        self._listeners = weakref.WeakSet()  # type: weakref.WeakSet[PooledConnection]
+
+        points = sorted(
+            (_hash('{}#{}'.format(index, replica)), index)
+            for index in range(len(self._clients))
+            for replica in range(replicas))
+        self._ring_hashes = [point[0] for point in points]
+        self._ring_members = [point[1] for point in points]
+
+    @classmethod
+    def build(cls, size: int, builder: Callable[..., mqtt5.Client], *, replicas: int = 100,
+              **kwargs) -> 'ConnectionPool':
+        """
+        Builds a pool of `size` clients with one of the
+        :mod:`~awsiot.mqtt5_client_builder` functions.
+
+        Client `i` gets the client ID `"<client_id>-<i>"`. All clients share
+        the `resource_cache`, and so one TLS context, creating one if none is
+        passed, and the `client_bootstrap`, which defaults to the static
+        default. Lifecycle callbacks passed in are still called.
+
+        Args:
+            size: Number of clients.
+            builder: Builder function, such as :func:`~awsiot.mqtt5_client_builder.mtls_from_path`.
+            replicas: Points each client gets on the hash ring.
+            **kwargs: Arguments for the builder.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        client_id = kwargs.pop('client_id', None)
+        if not client_id:
+            raise TypeError("Builder needs keyword-only argument 'client_id'")
+        if kwargs.get('resource_cache') is None:
+            kwargs['resource_cache'] = ResourceCache()
+
+        pool = None  # type: Optional[ConnectionPool]
+        clients = []
+
+        def wrap(index, name, connected):
+            user_callback = kwargs.get(name)
+
+            def callback(data):
+                if pool is not None:
+                    pool._set_connected_index(index, connected)
+                if user_callback is not None:
+                    user_callback(data)
+            return callback
+
+        for index in range(size):
+            client_kwargs = dict(kwargs)
+            client_kwargs['on_lifecycle_connection_success'] = wrap(index, 'on_lifecycle_connection_success', True)
+            client_kwargs['on_lifecycle_disconnection'] = wrap(index, 'on_lifecycle_disconnection', False)
+            client_kwargs['on_lifecycle_stopped'] = wrap(index, 'on_lifecycle_stopped', False)
+            clients.append(builder(client_id='{}-{}'.format(client_id, index), **client_kwargs))
+
+        pool = cls(clients, replicas=replicas)
+        return pool
+
+    @property
+    def clients(self) -> Tuple[mqtt5.Client, ...]:
+        """The pooled clients, in hash ring order"""
+        return self._clients
+
+    @property
+    def connected_count(self) -> int:
+        """Number of clients currently thought to be connected"""
+        with self._lock:
+            return sum(self._connected)
+
+    def start(self):
+        """Start every client"""
+        for client in self._clients:
+            client.start()
+
+    def stop(self, disconnect_packet: Optional[mqtt5.DisconnectPacket] = None):
+        """
+        Stop every client.
+
+        Args:
+            disconnect_packet: DISCONNECT packet each client sends, if any.
+        """
+        for client in self._clients:
+            client.stop(disconnect_packet)
+
+    def set_connected(self, client: mqtt5.Client, connected: bool):
+        """
+        Tell the pool whether a client is connected. Keys move off a client
+        while it is down, and move back when it is up again.
+
+        Args:
+            client: One of the pooled clients.
+            connected: Whether it is connected.
+        """
+        for index, pooled in enumerate(self._clients):
+            if pooled is client:
+                self._set_connected_index(index, connected)
+                return
+        raise ValueError("client is not in this pool")
+
+    def _set_connected_index(self, index: int, connected: bool):
+        with self._lock:
+            if self._connected[index] == connected:
+                return
+            self._connected[index] = connected
+            listeners = list(self._listeners)
+        logger.info("pooled client %d %s", index, "connected" if connected else "disconnected")
+        for listener in listeners:
+            listener._rebalance()
+
+    def _index_for(self, key: str) -> int:
+        hashes = self._ring_hashes
+        members = self._ring_members
+        start = bisect.bisect_left(hashes, _hash(key))
+        with self._lock:
+            connected = self._connected
+            for offset in range(len(members)):
+                index = members[(start + offset) % len(members)]
+                if connected[index]:
+                    return index
+        # nothing is connected, so stay where the key would normally go
+        return members[start % len(members)]
+
+    def client_for(self, key: str) -> mqtt5.Client:
+        """
+        Returns the client that serves a key, such as a thing name.
+
+        Args:
+            key: Key to look up.
+        """
+        return self._clients[self._index_for(key)]
+
+    def client_for_topic(self, topic: str) -> mqtt5.Client:
+        """
+        Returns the client that serves a topic, by its :func:`shard_key`.
+
+        Args:
+            topic: Topic or topic filter.
+        """
+        return self.client_for(shard_key(topic))
+
+    def _connection(self, index: int) -> mqtt.Connection:
+        with self._lock:
+            connection = self._connections[index]
+            if connection is None:
+                connection = self._connections[index] = self._clients[index].new_connection()
+            return connection
+
+    def connection(self) -> 'PooledConnection':
+        """
+        Returns a :class:`PooledConnection` over this pool, the object a
+        :class:`~awsiot.MqttServiceClient` uses when given the pool.
+        """
+        connection = PooledConnection(self)
+        with self._lock:
+            self._listeners.add(connection)
+        return connection
+
+    def v2_client(self, client_class: Callable[..., Any], options, **kwargs) -> 'PooledClient':
+        """
+        Returns a :class:`PooledClient` that sends each request through an
+        instance of `client_class`, such as
+        :class:`~awsiot.iotshadow.IotShadowClientV2`, on the client that
+        serves the request's thing.
+
+        Args:
+            client_class: V2 service client class.
+            options: :class:`awscrt.mqtt_request_response.ClientOptions` for each instance.
+            **kwargs: Other arguments for `client_class`.
+        """
+        return PooledClient(self, functools.partial(client_class, options=options, **kwargs))
+
+
+class _Subscription:
+    __slots__ = ('qos', 'callback', 'index')
+
+    def __init__(self, qos: mqtt.QoS, callback: Optional[Callable], index: int):
+        self.qos = qos
+        self.callback = callback
+        self.index = index
+
+
+class PooledConnection:
+    """
+    Stands in for an :class:`awscrt.mqtt.Connection`, sending each publish,
+    subscribe and unsubscribe over the pooled client that serves its topic,
+    by :func:`shard_key`.
+
+    Subscriptions move with their key when clients disconnect and
+    reconnect: the new client subscribes before the old one unsubscribes,
+    so a message may arrive twice while a subscription moves.
+
+    Get one from :meth:`ConnectionPool.connection`.
+    """
+
+    def __init__(self, pool: ConnectionPool):
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._subscriptions = {}  # type: Dict[str, _Subscription]
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """The pool this connection sends through"""
+        return self._pool
+
+    def publish(self, topic: str, payload, qos: mqtt.QoS, retain: bool = False) -> Tuple[Future, int]:
+        index = self._pool._index_for(shard_key(topic))
+        return self._pool._connection(index).publish(topic=topic, payload=payload, qos=qos, retain=retain)
+
+    def subscribe(self, topic: str, qos: mqtt.QoS, callback: Optional[Callable] = None) -> Tuple[Future, int]:
+        index = self._pool._index_for(shard_key(topic))
+        with self._lock:
+            previous = self._subscriptions.get(topic)
+            self._subscriptions[topic] = _Subscription(qos, callback, index)
+        if previous is not None and previous.index != index:
+            self._pool._connection(previous.index).unsubscribe(topic)
+        return self._pool._connection(index).subscribe(topic=topic, qos=qos, callback=callback)
+
+    def unsubscribe(self, topic: str) -> Tuple[Future, int]:
+        with self._lock:
+            subscription = self._subscriptions.pop(topic, None)
+        if subscription is not None:
+            index = subscription.index
+        else:
+            index = self._pool._index_for(shard_key(topic))
+        return self._pool._connection(index).unsubscribe(topic)
+
+    def _rebalance(self):
+        moves = []  # type: List[Tuple[str, _Subscription, int]]
+        with self._lock:
+            for topic, subscription in self._subscriptions.items():
+                index = self._pool._index_for(shard_key(topic))
+                if index != subscription.index:
+                    moves.append((topic, subscription, subscription.index))
+                    subscription.index = index
+
+        for topic, subscription, old_index in moves:
+            logger.debug("moving subscription %s from pooled client %d to %d", topic, old_index, subscription.index)
+            try:
+                self._pool._connection(subscription.index).subscribe(
+                    topic=topic, qos=subscription.qos, callback=subscription.callback)
+                self._pool._connection(old_index).unsubscribe(topic)
+            except Exception:
+                logger.exception("failed to move subscription %s", topic)
+
+
+class PooledClient:
+    """
+    Wraps one V2 service client per pooled client, such as
+    :class:`~awsiot.iotshadow.IotShadowClientV2`, and sends each request
+    through the one whose client serves the request's `thing_name`.
+    Requests without a thing name are routed by operation name.
+
+    Streaming operations stay on the client they were opened on, which
+    resubscribes them when it reconnects.
+
+    Every operation of the wrapped class can be called on it.
+
+    Get one from :meth:`ConnectionPool.v2_client`.
+    """
+
+    def __init__(self, pool: ConnectionPool, factory: Callable[[mqtt5.Client], Any]):
+        self._pool = pool
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._instances = {}  # type: Dict[int, Any]
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """The pool this client sends through"""
+        return self._pool
+
+    def client_for(self, key: Hashable) -> Any:
+        """
+        Returns the wrapped service client that serves a key, such as a thing name.
+
+        Args:
+            key: Key to look up.
+        """
+        index = self._pool._index_for(str(key))
+        with self._lock:
+            instance = self._instances.get(index)
+            if instance is None:
+                instance = self._instances[index] = self._factory(self._pool.clients[index])
+            return instance
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def operation(request, *args, **kwargs):
+            thing_name = getattr(request, 'thing_name', None)
+            client = self.client_for(thing_name if thing_name is not None else name)
+            return getattr(client, name)(request, *args, **kwargs)
+
+        operation.__name__ = name
+        return operation
@@ -0,0 +1,323 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Bounded executor that keeps the callbacks of each stream in order.
+"""
+
+from awsiot.streaming import OverflowPolicy
+from collections import deque
+from concurrent.futures import Executor, Future
+import os
+import threading
+import time
+from typing import Callable, Deque, Dict, Hashable, List, NamedTuple, Optional, Set
+
+__all__ = [
+    'StreamDispatcher',
+    'DispatcherStats',
+]
+
+
+class DispatcherStats(NamedTuple):
+    """
+    Snapshot of a :class:`StreamDispatcher`'s activity.
+
+    Args:
+        queue_depth (int): Number of callbacks waiting to run.
+        max_queue_depth (int): Highest `queue_depth` seen.
+        submitted (int): Number of callbacks accepted.
+        completed (int): Number of callbacks that have run.
+        dropped (int): Number of callbacks discarded by the overflow policy.
+        mean_queue_latency (float): Average seconds a callback waited before it ran.
+        max_queue_latency (float): Longest seconds a callback waited before it ran.
+        mean_callback_latency (float): Average seconds a callback took to run.
+        max_callback_latency (float): Longest seconds a callback took to run.
+    """
+    queue_depth: int
+    max_queue_depth: int
+    submitted: int
+    completed: int
+    dropped: int
+    mean_queue_latency: float
+    max_queue_latency: float
+    mean_callback_latency: float
+    max_callback_latency: float
+
+
+class _WorkItem:
+    __slots__ = ('key', 'future', 'fn', 'args', 'kwargs', 'queued_at', 'queued')
+
+    def __init__(self, key: Hashable, future: Future, fn: Callable, args, kwargs):
+        self.key = key
+        # False once the item has been taken by a worker or dropped
+        self.queued = True
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.queued_at = time.monotonic()
+
+
+class StreamDispatcher(Executor):
+    """
+    Executor that runs callbacks on a pool of threads, keeping the callbacks
+    of each stream in order.
+
+    Callbacks submitted with the same key through :meth:`submit_ordered` run
+    one at a time, in the order they were submitted. Callbacks with different
+    keys run in parallel. :meth:`submit` gives each callback a key of its own.
+
+    Pass one to :class:`~awsiot.greengrasscoreipc.clientv2.GreengrassCoreIPCClientV2`
+    as its `executor`, and the client keys each stream's callbacks by the stream,
+    so events are handled in the order they arrived, and `on_stream_closed`
+    runs after the stream's last event.
+
+    At most `max_queue_size` callbacks wait to run. When the queue is full,
+    `overflow` decides what happens to the next one:
+
+    * :attr:`~awsiot.streaming.OverflowPolicy.BLOCK`: the submitting thread waits
+      for room. Submissions from the dispatcher's own threads do not wait, since
+      they could be the ones to make room.
+    * :attr:`~awsiot.streaming.OverflowPolicy.DROP_OLDEST`: the callback that has
+      waited longest is discarded, and its future is cancelled.
+    * :attr:`~awsiot.streaming.OverflowPolicy.DROP_NEWEST`: the new callback is
+      discarded, and a cancelled future is returned.
+
+    Args:
+        max_workers: Number of threads to run callbacks on.
+            Defaults to the same number as :class:`concurrent.futures.ThreadPoolExecutor`.
+        max_queue_size: Number of callbacks that may wait to run.
+        overflow: What to do with a callback submitted while the queue is full.
+        thread_name_prefix: Prefix of the names of the dispatcher's threads.
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 max_queue_size: int = 1024,
+                 overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+                 thread_name_prefix: str = 'StreamDispatcher'):
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size must be at least 1")
+        if overflow == OverflowPolicy.COALESCE_BY_KEY:
+            raise ValueError("StreamDispatcher does not support COALESCE_BY_KEY")
+
+        self._max_workers = max_workers
+        self._max_queue_size = max_queue_size
+        self._overflow = overflow
+        self._thread_name_prefix = thread_name_prefix
+
+        self._lock = threading.Lock()
+        self._work_ready = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        # callbacks waiting to run, by key
+        self._queues = {}  # type: Dict[Hashable, Deque[_WorkItem]]
+        # keys with a waiting callback and none running, in the order they became ready
+        self._ready = deque()  # type: Deque[Hashable]
+        # every waiting callback in submission order, trimmed lazily
+        self._fifo = deque()  # type: Deque[_WorkItem]
+        self._depth = 0
+        self._threads = []  # type: List[threading.Thread]
+        self._thread_set = set()  # type: Set[threading.Thread]
+        self._idle = 0
+        self._shutdown = False
+
+        self._max_depth = 0
+        self._submitted = 0
+        self._completed = 0
+        self._dropped = 0
+        self._queue_latency_total = 0.0
+        self._queue_latency_max = 0.0
+        self._callback_latency_total = 0.0
+        self._callback_latency_max = 0.0
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """
+        Schedules `fn(*args, **kwargs)` to run, with no ordering relative
+        to other callbacks.
+
+        Returns:
+            A Future of the callback's result.
+        """
+        return self.submit_ordered(object(), fn, *args, **kwargs)
+
+    def submit_ordered(self, key: Hashable, fn: Callable, /, *args, **kwargs) -> Future:
+        """
+        Schedules `fn(*args, **kwargs)` to run after every callback submitted
+        earlier with the same `key`.
+
+        Args:
+            key: Identifies the sequence the callback belongs to, such as a stream.
+            fn: Callback to run.
+
+        Returns:
+            A Future of the callback's result. It is cancelled if the
+            callback is discarded by the overflow policy.
+
+        Raises:
+            RuntimeError: if the dispatcher has been shut down
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+
+            if self._depth >= self._max_queue_size:
+                if self._overflow == OverflowPolicy.DROP_NEWEST:
+                    self._dropped += 1
+                    future.cancel()
+                    return future
+                if self._overflow == OverflowPolicy.DROP_OLDEST:
+                    self._drop_oldest()
+                elif threading.current_thread() not in self._thread_set:
+                    while self._depth >= self._max_queue_size and not self._shutdown:
+                        self._not_full.wait()
+                    if self._shutdown:
+                        raise RuntimeError('cannot schedule new futures after shutdown')
+
+            item = _WorkItem(key, future, fn, args, kwargs)
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+                self._ready.append(key)
+                self._work_ready.notify()
+            queue.append(item)
+            self._fifo.append(item)
+            self._depth += 1
+            self._submitted += 1
+            if self._depth > self._max_depth:
+                self._max_depth = self._depth
+
+            if self._idle == 0 and len(self._threads) < self._max_workers:
+                self._start_thread()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        """
+        Stops accepting callbacks. Callbacks already submitted still run,
+        unless `cancel_futures` is True.
+
+        Args:
+            wait: If True, block until every thread has finished.
+            cancel_futures: If True, cancel callbacks that have not started.
+        """
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                for item in self._fifo:
+                    if item.queued:
+                        item.queued = False
+                        item.future.cancel()
+                self._fifo.clear()
+                for key in self._ready:
+                    del self._queues[key]
+                self._ready.clear()
+                # the remaining keys have a callback running
+                for queue in self._queues.values():
+                    queue.clear()
+                self._depth = 0
+            self._work_ready.notify_all()
+            self._not_full.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+    def stats(self) -> DispatcherStats:
+        """
+        Returns:
+            A snapshot of the dispatcher's queue depth, counters and latencies.
+        """
+        with self._lock:
+            return DispatcherStats(
+                queue_depth=self._depth,
+                max_queue_depth=self._max_depth,
+                submitted=self._submitted,
+                completed=self._completed,
+                dropped=self._dropped,
+                mean_queue_latency=self._queue_latency_total / self._completed if self._completed else 0.0,
+                max_queue_latency=self._queue_latency_max,
+                mean_callback_latency=self._callback_latency_total / self._completed if self._completed else 0.0,
+                max_callback_latency=self._callback_latency_max)
+
+    def _start_thread(self):
+        thread = threading.Thread(
+            target=self._work,
+            name='{}_{}'.format(self._thread_name_prefix, len(self._threads)),
+            daemon=True)
+        self._threads.append(thread)
+        self._thread_set.add(thread)
+        thread.start()
+
+    def _drop_oldest(self):
+        # called with the lock held, when the queue is full
+        while self._fifo:
+            item = self._fifo.popleft()
+            if not item.queued:
+                continue
+            # the oldest waiting callback is also the first of its key
+            item.queued = False
+            queue = self._queues[item.key]
+            queue.popleft()
+            if not queue and item.key in self._ready:
+                self._ready.remove(item.key)
+                del self._queues[item.key]
+            self._depth -= 1
+            self._dropped += 1
+            item.future.cancel()
+            return
+
+    def _next_item(self) -> Optional[_WorkItem]:
+        # called with the lock held
+        while not self._ready:
+            if self._shutdown:
+                return None
+            self._idle += 1
+            self._work_ready.wait()
+            self._idle -= 1
+        item = self._queues[self._ready.popleft()].popleft()
+        item.queued = False
+        self._depth -= 1
+        while self._fifo and not self._fifo[0].queued:
+            self._fifo.popleft()
+        self._not_full.notify()
+        return item
+
+    def _work(self):
+        while True:
+            with self._lock:
+                item = self._next_item()
+                if item is None:
+                    return
+
+            started = time.monotonic()
+            if item.future.set_running_or_notify_cancel():
+                try:
+                    result = item.fn(*item.args, **item.kwargs)
+                except BaseException as e:
+                    item.future.set_exception(e)
+                else:
+                    item.future.set_result(result)
+            finished = time.monotonic()
+
+            with self._lock:
+                self._completed += 1
+                queue_latency = started - item.queued_at
+                self._queue_latency_total += queue_latency
+                self._queue_latency_max = max(self._queue_latency_max, queue_latency)
+                callback_latency = finished - started
+                self._callback_latency_total += callback_latency
+                self._callback_latency_max = max(self._callback_latency_max, callback_latency)
+
+                # the key's next callback may run now
+                queue = self._queues[item.key]
+                if queue:
+                    self._ready.append(item.key)
+                    self._work_ready.notify()
+                else:
+                    del self._queues[item.key]
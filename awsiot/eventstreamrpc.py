@@ -7,12 +7,16 @@ Classes for building a service that uses the event-stream RPC protocol.
 from awscrt.eventstream import Header, HeaderType
 import awscrt.eventstream.rpc as protocol
 from awscrt.io import (ClientBootstrap, SocketOptions, TlsConnectionOptions)
+import awsiot
+from awsiot import metrics, serialization
+from collections import deque
 from concurrent.futures import Future
 from enum import Enum
-import json
 import logging
-from threading import Lock
-from typing import (Any, Callable, Dict, Optional, Sequence)
+import random
+from threading import Lock, RLock, Timer
+import time
+from typing import (Any, Callable, Deque, Dict, List, Optional, Sequence)
 
 VERSION_TUPLE = (0, 1, 0)
 VERSION_STRING = "{v[0]}.{v[1]}.{v[2]}".format(v=VERSION_TUPLE)
@@ -507,10 +511,377 @@ class Connection:
                 raise ConnectionClosedError()
             return synced.current_connection.new_stream(handler)
 
+    def _on_operation_disconnected(self, operation: 'ClientOperation') -> bool:
+        # Called when an operation's stream closed without the operation or the service ending it.
+        # Returns True if the connection will resume the operation later.
+        return False
+
+    def _on_operation_closing(self, operation: 'ClientOperation'):
+        # Called when close() is called on an operation
+        pass
+
     def __repr__(self):
         return "<%s at %#x %s:%d>" % (self.__class__.__name__, id(self), self.host_name, self.port)
 
 
+class _ReconnectLifecycleHandler(LifecycleHandler):
+    """Passes lifecycle events to the user's handler, and lets a ReconnectingConnection react to them"""
+
+    def __init__(self, owner: 'ReconnectingConnection', lifecycle_handler: LifecycleHandler):
+        self.owner = owner
+        self.lifecycle_handler = lifecycle_handler
+
+    def on_connect(self):
+        try:
+            self.lifecycle_handler.on_connect()
+        finally:
+            self.owner._on_connected()
+
+    def on_disconnect(self, reason: Optional[Exception]):
+        try:
+            self.lifecycle_handler.on_disconnect(reason)
+        finally:
+            self.owner._on_disconnected(reason)
+
+    def on_error(self, error: Exception) -> bool:
+        return self.lifecycle_handler.on_error(error)
+
+    def on_ping(self, headers: Sequence[Header], payload: bytes):
+        self.lifecycle_handler.on_ping(headers, payload)
+
+
+class _QueuedContinuation:
+    """
+    Stands in for the continuation of an operation created while a
+    ReconnectingConnection is disconnected. Its activation is held in the
+    connection's queue, and sent on a real continuation once the connection is back.
+    """
+
+    def __init__(self, owner: 'ReconnectingConnection', handler: protocol.ClientContinuationHandler):
+        self._owner = owner
+        self._handler = handler
+        self._continuation = None  # type: Optional[protocol.ClientContinuation]
+        self._activation = None  # type: Optional[tuple]
+
+    def activate(self, **kwargs) -> Future:
+        with self._owner._reconnect_lock:
+            if self._continuation is None and not self._owner._online:
+                if not self._owner._enqueue(self):
+                    raise ConnectionClosedError("Too many requests queued while disconnected")
+                future = Future()
+                self._activation = (kwargs, future)
+                return future
+        if self._continuation is None:
+            self._continuation = Connection._new_stream(self._owner, self._handler)
+        return self._continuation.activate(**kwargs)
+
+    def send_message(self, **kwargs) -> Future:
+        with self._owner._reconnect_lock:
+            continuation = self._continuation
+            if continuation is None:
+                self._owner._dequeue(self)
+        if continuation is not None:
+            return continuation.send_message(**kwargs)
+        if kwargs.get('flags', 0) & protocol.MessageFlag.TERMINATE_STREAM:
+            # never sent, so there is nothing to terminate on the wire
+            self._abandon(ConnectionClosedError("Operation closed before it was sent"))
+            future = Future()
+            future.set_result(None)
+            return future
+        raise ConnectionClosedError()
+
+    def _start(self):
+        # called once the connection is back
+        kwargs, future = self._activation
+        self._activation = None
+        try:
+            self._continuation = Connection._new_stream(self._owner, self._handler)
+            activated = self._continuation.activate(**kwargs)
+        except Exception as e:
+            future.set_exception(e)
+            self._handler.on_continuation_closed()
+            return
+
+        def on_activated(activated_future):
+            if activated_future.exception() is not None:
+                future.set_exception(activated_future.exception())
+            else:
+                future.set_result(activated_future.result())
+        activated.add_done_callback(on_activated)
+
+    def _abandon(self, error: Exception):
+        activation, self._activation = self._activation, None
+        if activation is not None:
+            activation[1].set_exception(error)
+        self._handler.on_continuation_closed()
+
+
+class ReconnectingConnection(Connection):
+    """
+    A :class:`Connection` that reconnects on its own when its network
+    connection is lost, until close() is called.
+
+    Reconnect attempts are spaced by an exponential backoff with full jitter:
+    the wait before each attempt is picked at random, up to a limit that
+    starts at `min_reconnect_delay` and doubles with each failed attempt,
+    up to `max_reconnect_delay`.
+
+    Streaming operations that were active when the connection was lost are
+    resumed once it is back, by activating them again with their original
+    request. Their stream handlers see no close in between. If an operation
+    cannot be resumed, its handler's `on_stream_error` is invoked with the
+    error, and the operation is closed.
+
+    Operations activated while the connection is down are queued, and sent
+    once it is back. At most `max_queued_requests` are queued; beyond that,
+    activation raises :class:`ConnectionClosedError`.
+
+    The first connect() must succeed for reconnecting to begin. If it fails,
+    call connect() again.
+
+    Args:
+        host_name: Remote host name.
+
+        port: Remote port.
+
+        bootstrap: ClientBootstrap to use when initiating socket connection.
+
+        socket_options: Optional socket options.
+
+        tls_connection_options: Optional TLS connection options.
+
+        connect_message_amender: Optional callable that should return a
+            :class:`MessageAmendment` for the CONNECT message.
+
+        min_reconnect_delay: Seconds to wait, at most, before the first reconnect attempt.
+
+        max_reconnect_delay: Longest wait, in seconds, between reconnect attempts.
+
+        max_reconnect_attempts: Number of attempts to make before giving up,
+            or None to keep trying. Once it gives up, the connection closes
+            as if close() had been called.
+
+        max_queued_requests: Number of operations that can wait to be sent
+            while the connection is down.
+
+        resume_streams: Whether to resume streaming operations after reconnecting.
+    """
+
+    def __init__(self,
+                 *,
+                 host_name: str,
+                 port: int,
+                 bootstrap: ClientBootstrap,
+                 socket_options: Optional[SocketOptions] = None,
+                 tls_connection_options: Optional[TlsConnectionOptions] = None,
+                 connect_message_amender: Optional[Callable[[], MessageAmendment]] = None,
+                 min_reconnect_delay: float = 0.1,
+                 max_reconnect_delay: float = 30.0,
+                 max_reconnect_attempts: Optional[int] = None,
+                 max_queued_requests: int = 64,
+                 resume_streams: bool = True):
+        super().__init__(
+            host_name=host_name,
+            port=port,
+            bootstrap=bootstrap,
+            socket_options=socket_options,
+            tls_connection_options=tls_connection_options,
+            connect_message_amender=connect_message_amender)
+        if min_reconnect_delay <= 0 or max_reconnect_delay < min_reconnect_delay:
+            raise ValueError("reconnect delays must satisfy 0 < min_reconnect_delay <= max_reconnect_delay")
+        if max_queued_requests < 0:
+            raise ValueError("max_queued_requests cannot be negative")
+        self.min_reconnect_delay = min_reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.max_queued_requests = max_queued_requests
+        self.resume_streams = resume_streams
+
+        self._reconnect_lock = RLock()
+        self._lifecycle_handler = None  # type: Optional[_ReconnectLifecycleHandler]
+        # True while the network connection is up
+        self._online = False
+        # True until connect() is called, and again once close() is called
+        self._stopped = True
+        self._attempts = 0
+        self._timer = None  # type: Optional[Timer]
+        # streaming operations waiting to be resumed
+        self._suspended = []  # type: List[ClientOperation]
+        # operations activated while disconnected, waiting to be sent
+        self._queued = deque()  # type: Deque[_QueuedContinuation]
+
+    def connect(self, lifecycle_handler: LifecycleHandler) -> Future:
+        """
+        Asynchronously open a network connection. Once it has succeeded,
+        the connection is re-established whenever it is lost, until close() is called.
+
+        Args:
+            lifecycle_handler: Handler for events over the course of this
+                connection. Its on_connect() and on_disconnect() are invoked
+                for each network connection.
+
+        Returns:
+            A Future which completes when the first connect attempt succeeds or fails.
+        """
+        with self._reconnect_lock:
+            self._lifecycle_handler = _ReconnectLifecycleHandler(self, lifecycle_handler)
+            self._stopped = False
+            self._attempts = 0
+            future = super().connect(self._lifecycle_handler)
+
+        def on_first_connect(connect_future):
+            if connect_future.exception() is not None:
+                self._stop(connect_future.exception())
+        future.add_done_callback(on_first_connect)
+        return future
+
+    def close(self, reason: Optional[Exception] = None) -> Future:
+        """
+        Close the connection, and stop reconnecting.
+
+        Operations waiting to be resumed or sent are closed.
+
+        Args:
+            reason: If set, the connection will
+                close with this error as the reason (unless
+                it was already closing for another reason).
+
+        Returns:
+            The future which will complete
+            when the shutdown process is done.
+        """
+        self._stop(reason if reason is not None else ConnectionClosedError("close() called"))
+        return super().close(reason)
+
+    def _new_stream(self, handler: protocol.ClientContinuationHandler) -> protocol.ClientContinuation:
+        with self._reconnect_lock:
+            if not self._online and not self._stopped:
+                return _QueuedContinuation(self, handler)
+        return super()._new_stream(handler)
+
+    def _enqueue(self, queued: _QueuedContinuation) -> bool:
+        # called with the lock held
+        if len(self._queued) >= self.max_queued_requests:
+            return False
+        self._queued.append(queued)
+        return True
+
+    def _dequeue(self, queued: _QueuedContinuation):
+        # called with the lock held
+        try:
+            self._queued.remove(queued)
+        except ValueError:
+            pass
+
+    def _on_operation_disconnected(self, operation: 'ClientOperation') -> bool:
+        if (not self.resume_streams
+                or operation._close_requested
+                or operation._terminated_by_service
+                or operation._request is None
+                or operation._stream_handler is None
+                or operation._response_stream_type() is None
+                or isinstance(operation._continuation, _QueuedContinuation)):
+            return False
+        response = operation._initial_response_future
+        if response.done() and response.exception() is not None:
+            return False
+        with self._reconnect_lock:
+            if self._stopped:
+                return False
+            self._suspended.append(operation)
+            return True
+
+    def _on_operation_closing(self, operation: 'ClientOperation'):
+        with self._reconnect_lock:
+            try:
+                self._suspended.remove(operation)
+            except ValueError:
+                return
+        # it will not be resumed, so it is closed now
+        operation._on_continuation_closed()
+
+    def _on_connected(self):
+        with self._reconnect_lock:
+            if self._stopped:
+                return
+            self._online = True
+            self._attempts = 0
+            suspended, self._suspended = self._suspended, []
+            queued, self._queued = self._queued, deque()
+
+        for operation in suspended:
+            try:
+                activated = operation._resume()
+            except Exception as e:
+                operation._resume_failed(e)
+                continue
+
+            def on_activated(future, operation=operation):
+                if future.exception() is not None:
+                    operation._resume_failed(future.exception())
+            activated.add_done_callback(on_activated)
+
+        for continuation in queued:
+            continuation._start()
+
+    def _on_disconnected(self, reason: Optional[Exception]):
+        with self._reconnect_lock:
+            self._online = False
+            if self._stopped:
+                return
+        self._schedule_reconnect(reason)
+
+    def _schedule_reconnect(self, reason: Optional[Exception]):
+        with self._reconnect_lock:
+            if self._stopped:
+                return
+            if self.max_reconnect_attempts is not None and self._attempts >= self.max_reconnect_attempts:
+                give_up = True
+            else:
+                give_up = False
+                limit = min(self.max_reconnect_delay, self.min_reconnect_delay * 2 ** min(self._attempts, 32))
+                delay = random.uniform(0, limit)
+                self._attempts += 1
+                logger.info("%r reconnecting in %.3fs (attempt %d)", self, delay, self._attempts)
+                self._timer = Timer(delay, self._reconnect)
+                self._timer.daemon = True
+                self._timer.start()
+        if give_up:
+            logger.error("%r giving up after %d reconnect attempts", self, self._attempts)
+            self._stop(reason if reason is not None else ConnectionClosedError("Failed to reconnect"))
+
+    def _reconnect(self):
+        with self._reconnect_lock:
+            self._timer = None
+            if self._stopped:
+                return
+            try:
+                future = Connection.connect(self, self._lifecycle_handler)
+            except Exception as e:
+                logger.error("%r reconnect attempt failed: %r", self, e)
+                future = Future()
+                future.set_exception(e)
+
+        def on_reconnect(connect_future):
+            if connect_future.exception() is not None:
+                self._schedule_reconnect(connect_future.exception())
+        future.add_done_callback(on_reconnect)
+
+    def _stop(self, error: Exception):
+        with self._reconnect_lock:
+            self._stopped = True
+            self._online = False
+            timer, self._timer = self._timer, None
+            suspended, self._suspended = self._suspended, []
+            queued, self._queued = self._queued, deque()
+        if timer is not None:
+            timer.cancel()
+        for continuation in queued:
+            continuation._abandon(error)
+        for operation in suspended:
+            operation._on_continuation_closed()
+
+
 class Shape:
     """
     Base class for shapes serialized by a service
@@ -557,6 +928,10 @@ class StreamResponseHandler:
     after the initial response).
     """
 
+    # True if the handler records the time spent in its application callbacks
+    # itself, such as when it only hands events over to an executor
+    _records_callback_metrics = False
+
     def on_stream_event(self, event: Shape) -> None:
         pass
 
@@ -600,13 +975,24 @@ class ClientOperation(Operation):
     rewrite public API to properly document the types they deal with.
     """
 
-    def __init__(self, stream_handler: StreamResponseHandler, shape_index: ShapeIndex, connection: Connection):
+    def __init__(self, stream_handler: StreamResponseHandler, shape_index: ShapeIndex, connection: Connection,
+                 json_codec: Optional[awsiot.JsonCodec] = None):
         # do not instantiate directly, created by ServiceClient.new_operation()
         # all callbacks that modify state fire on the same thread,
         # so don't need locks to protect members
         self._stream_handler = stream_handler
         self._shape_index = shape_index
+        self._json_codec = json_codec if json_codec is not None else awsiot.get_default_json_codec()
+        self._connection = connection
         self._message_count = 0
+        # request the operation was activated with, kept so that it can be resumed
+        self._request = None
+        self._close_requested = False
+        self._terminated_by_service = False
+        # True while waiting for the response to re-activation on a new network connection
+        self._resuming = False
+        # (recorder, start time) from activation until the response arrives
+        self._request_timing = None
         self._closed_future = Future()
         self._closed_future.set_running_or_notify_cancel()  # prevent cancel
         self._initial_response_future = Future()
@@ -615,17 +1001,37 @@ class ClientOperation(Operation):
         self._continuation = connection._new_stream(protocol_handler)
 
     def _activate(self, request: Shape) -> Future:
+        self._request = request
         headers = [Header.from_string(CONTENT_TYPE_HEADER,
                                       CONTENT_TYPE_APPLICATION_JSON),
                    Header.from_string(SERVICE_MODEL_TYPE_HEADER,
                                       request._model_name())]
         payload = self._json_payload_from_shape(request)
         logger.debug("%r sending request APPLICATION_MESSAGE %s %r", self, headers, payload)
-        return self._continuation.activate(
-            operation=self._model_name(),
-            headers=headers,
-            payload=payload,
-            message_type=protocol.MessageType.APPLICATION_MESSAGE)
+        recorder = metrics._recorder
+        if recorder is not None and self._request_timing is None:
+            recorder.add_in_flight(self._model_name(), 1)
+            self._request_timing = (recorder, time.perf_counter())
+        try:
+            return self._continuation.activate(
+                operation=self._model_name(),
+                headers=headers,
+                payload=payload,
+                message_type=protocol.MessageType.APPLICATION_MESSAGE)
+        except Exception:
+            self._end_request_timing(responded=False)
+            raise
+
+    def _end_request_timing(self, responded: bool):
+        # called when the response arrives, or can no longer arrive
+        timing = self._request_timing
+        if timing is None:
+            return
+        self._request_timing = None
+        recorder, start = timing
+        if responded:
+            recorder.record(metrics.Metric.REQUEST_LATENCY, self._model_name(), time.perf_counter() - start)
+        recorder.add_in_flight(self._model_name(), -1)
 
     def _send_stream_event(self, event: Shape) -> Future:
         headers = [Header.from_string(CONTENT_TYPE_HEADER,
@@ -643,6 +1049,8 @@ class ClientOperation(Operation):
         return self._initial_response_future
 
     def close(self) -> Future:
+        self._close_requested = True
+        self._connection._on_operation_closing(self)
         try:
             # try to send empty APPLICATION_MESSAGE with TERMINATE_STREAM flag.
             # this fails if stream is already closed, so just ignore errors.
@@ -653,6 +1061,24 @@ class ClientOperation(Operation):
             pass
         return self._closed_future
 
+    def _resume(self) -> Future:
+        """Re-activates the operation with its original request, on the connection's current network connection"""
+        self._message_count = 0
+        self._resuming = self._initial_response_future.done()
+        self._continuation = self._connection._new_stream(_ProtocolContinuationHandler(self))
+        return self._activate(self._request)
+
+    def _resume_failed(self, error: Exception, close: bool = True):
+        # the operation could not be resumed, so its stream ends here
+        logger.error("%r failed to resume: %r", self, error)
+        self._resuming = False
+        self._close_requested = True
+        try:
+            self._stream_handler.on_stream_error(error)
+        finally:
+            if close:
+                self.close()
+
     def _find_header(self, headers, name, header_type=HeaderType.STRING):
         """Return header value, or None"""
         name_lower = name.lower()
@@ -663,20 +1089,22 @@ class ClientOperation(Operation):
         return None
 
     def _shape_from_json_payload(self, payload_bytes, shape_type):
+        recorder = metrics._recorder
+        if recorder is not None:
+            start = time.perf_counter()
         try:
-            payload_str = payload_bytes.decode()
-            payload_obj = json.loads(payload_str)
-            shape = shape_type._from_payload(payload_obj)
-            return shape
+            payload_obj = self._json_codec.decode(payload_bytes)
+            shape = serialization.decoder_for(shape_type)(payload_obj)
         except Exception as e:
             raise DeserializeError("Failed to deserialize %s" % shape_type._model_name(), e, payload_bytes)
+        if recorder is not None:
+            recorder.record(metrics.Metric.DESERIALIZATION, self._model_name(), time.perf_counter() - start)
+        return shape
 
     def _json_payload_from_shape(self, shape):
         try:
             payload_obj = shape._to_payload()
-            payload_str = json.dumps(payload_obj)
-            payload_bytes = payload_str.encode()
-            return payload_bytes
+            return self._json_codec.encode(payload_obj)
         except Exception as e:
             raise SerializeError("Failed to serialize", shape, e)
 
@@ -689,6 +1117,10 @@ class ClientOperation(Operation):
             **kwargs):
         self._message_count += 1
         logger.debug("%r received #%d %s %s %r", self, self._message_count, message_type.name, headers, payload)
+        if self._message_count == 1 and self._request_timing is not None:
+            self._end_request_timing(responded=True)
+        if flags & protocol.MessageFlag.TERMINATE_STREAM:
+            self._terminated_by_service = True
         try:
             model_name = self._find_header(headers, SERVICE_MODEL_TYPE_HEADER)
             if model_name is None:
@@ -738,6 +1170,11 @@ class ClientOperation(Operation):
                 msg = "Unexpected response type: {}, expected: {}".format(model_name, expected_name)
                 raise UnmappedDataError(msg, payload)
             shape = self._shape_from_json_payload(payload, expected_type)
+            if self._resuming:
+                # the caller already has the response from the first activation
+                self._resuming = False
+                logger.info("%r resumed", self)
+                return
             self._initial_response_future.set_result(shape)
         else:
             # messages after the 1st are "stream events"
@@ -750,7 +1187,15 @@ class ClientOperation(Operation):
                 msg = "Unexpected response stream event type: {}, expected: {}".format(model_name, expected_name)
                 raise UnmappedDataError(msg, payload)
             shape = self._shape_from_json_payload(payload, expected_type)
-            self._stream_handler.on_stream_event(shape)
+            recorder = metrics._recorder
+            if recorder is None or getattr(self._stream_handler, '_records_callback_metrics', False):
+                self._stream_handler.on_stream_event(shape)
+                return
+            start = time.perf_counter()
+            try:
+                self._stream_handler.on_stream_event(shape)
+            finally:
+                recorder.record(metrics.Metric.CALLBACK, self._model_name(), time.perf_counter() - start)
 
     def _handle_error(self, error, message_flags):
         """
@@ -760,7 +1205,9 @@ class ClientOperation(Operation):
         """
         stream_already_terminated = message_flags & protocol.MessageFlag.TERMINATE_STREAM
         try:
-            if self._message_count == 1:
+            if self._message_count == 1 and self._resuming:
+                self._resume_failed(error, close=not stream_already_terminated)
+            elif self._message_count == 1:
                 # error from 1st message is "response" error.
                 self._initial_response_future.set_exception(error)
                 # errors on initial response must terminate the stream
@@ -781,7 +1228,12 @@ class ClientOperation(Operation):
             logger.exception("%r unhandled exception while receiving message", self)
 
     def _on_continuation_closed(self, **kwargs) -> None:
+        if self._connection._on_operation_disconnected(self):
+            logger.info("%r lost its network connection, will resume", self)
+            return
+
         logger.debug("%r closed", self)
+        self._end_request_timing(responded=False)
         if not self._initial_response_future.done():
             self._initial_response_future.set_exception(StreamClosedError())
 
@@ -815,11 +1267,18 @@ class Client:
     Base class for a service client.
 
     Child class should add public API functions for each operation.
+
+    Attributes:
+        json_codec: Codec used to serialize and deserialize the messages of
+            operations created after it is set.
+            Defaults to :func:`awsiot.get_default_json_codec()`.
     """
 
-    def __init__(self, connection: Connection, shape_index: ShapeIndex):
+    def __init__(self, connection: Connection, shape_index: ShapeIndex,
+                 json_codec: Optional[awsiot.JsonCodec] = None):
         self._connection = connection
         self._shape_index = shape_index
+        self.json_codec = json_codec if json_codec is not None else awsiot.get_default_json_codec()
 
     def close(self, reason: Optional[Exception] = None) -> Future:
         """
@@ -842,7 +1301,7 @@ class Client:
         return self._connection.close(reason=reason)
 
     def _new_operation(self, operation_type: type, stream_handler: StreamResponseHandler = None):
-        return operation_type(stream_handler, self._shape_index, self._connection)
+        return operation_type(stream_handler, self._shape_index, self._connection, self.json_codec)
 
     @classmethod
     def _model_name(cls):
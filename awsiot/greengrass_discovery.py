@@ -5,7 +5,6 @@ from awscrt.http import HttpClientConnection, HttpRequest, HttpHeaders, HttpProx
 from awscrt.io import ClientBootstrap, ClientTlsContext, is_alpn_available, SocketOptions, TlsConnectionOptions
 import awsiot
 from concurrent.futures import Future
-import json
 from typing import Any, Dict, List, Optional
 
 
@@ -30,7 +29,8 @@ class DiscoveryClient:
         '_gg_server_name',
         'gg_url',
         'port',
-        "_proxy_options"]
+        "_proxy_options",
+        '_json_codec']
 
     def __init__(
             self,
@@ -50,6 +50,7 @@ class DiscoveryClient:
         self._bootstrap = bootstrap
         self._socket_options = socket_options
         self._region = region
+        self._json_codec = awsiot.get_default_json_codec()
         if gg_server_name is None:
             self._gg_server_name = 'greengrass-ats.iot.{}.amazonaws.com'.format(region)
         else:
@@ -86,8 +87,8 @@ class DiscoveryClient:
             try:
                 response_code = completion_future.result()
                 if response_code == 200:
-                    payload_str = discovery['response_body'].decode('utf-8')
-                    discover_res = DiscoverResponse.from_payload(json.loads(payload_str))
+                    payload_obj = self._json_codec.decode(discovery['response_body'])
+                    discover_res = DiscoverResponse.from_payload(payload_obj)
                     discovery['future'].set_result(discover_res)
                 else:
                     discovery['future'].set_exception(
@@ -11,10 +11,12 @@ from awscrt.io import (
     SocketDomain,
     SocketOptions,
 )
+from awsiot import JsonCodec
 from awsiot.eventstreamrpc import (
     Connection,
     LifecycleHandler,
     MessageAmendment,
+    ReconnectingConnection,
 )
 from awsiot.greengrasscoreipc.client import GreengrassCoreIPCClient
 
@@ -23,7 +25,9 @@ def connect(*,
             ipc_socket: str=None,
             authtoken: str=None,
             lifecycle_handler: Optional[LifecycleHandler]=None,
-            timeout: float=10.0) -> GreengrassCoreIPCClient:
+            timeout: float=10.0,
+            json_codec: Optional[JsonCodec]=None,
+            reconnect: bool=False) -> GreengrassCoreIPCClient:
     """
     Creates an IPC client and connects to the GreengrassCoreIPC service.  When finished with the client,
     you must call close() to free the client's native resources.
@@ -37,6 +41,11 @@ def connect(*,
             Handler methods will only be invoked if the connect attempt
             succeeds.
         timeout: The number of seconds to wait for establishing the connection.
+        json_codec: Codec used to serialize and deserialize messages,
+            defaults to :func:`awsiot.get_default_json_codec()`.
+        reconnect: If True, reconnect whenever the connection is lost (for example,
+            when Greengrass Nucleus restarts) and resume streaming operations.
+            See :class:`awsiot.eventstreamrpc.ReconnectingConnection` for more info.
 
     Returns:
         Client for the GreengrassCoreIPC service.
@@ -56,7 +65,8 @@ def connect(*,
     socket_options.domain = SocketDomain.Local
     amender = MessageAmendment.create_static_authtoken_amender(authtoken)
 
-    connection = Connection(
+    connection_type = ReconnectingConnection if reconnect else Connection
+    connection = connection_type(
         host_name=ipc_socket,
         port=0, # dummy port number, not needed for Unix domain sockets
         bootstrap=bootstrap,
@@ -66,4 +76,7 @@ def connect(*,
     connect_future = connection.connect(lifecycle_handler)
     connect_future.result(timeout)
 
-    return GreengrassCoreIPCClient(connection)
+    client = GreengrassCoreIPCClient(connection)
+    if json_codec is not None:
+        client.json_codec = json_codec
+    return client
@@ -6,9 +6,11 @@
 from . import model
 from .client import GreengrassCoreIPCClient
 from . import client
+from awsiot import metrics
 
 import concurrent.futures
 import datetime
+import time
 import typing
 
 
@@ -22,7 +24,8 @@ class GreengrassCoreIPCClientV2:
         executor: Executor used to run on_stream_event and on_stream_closed callbacks to avoid blocking the networking
          thread. By default, a ThreadPoolExecutor will be created and used. Use None to run callbacks in the
          networking thread, but understand that your code can deadlock the networking thread if it performs a
-         synchronous network call.
+         synchronous network call. Use an awsiot.dispatcher.StreamDispatcher to bound the number of waiting
+         callbacks and run each stream's callbacks in order.
     """
 
     def __init__(self, client: typing.Optional[GreengrassCoreIPCClient] = None,
@@ -83,14 +86,42 @@ class GreengrassCoreIPCClientV2:
                 raise e
         return wrapper
 
+    @staticmethod
+    def __time_executor_callback(recorder, operation_name, func):
+        submitted = time.perf_counter()
+        def timed(*args):
+            start = time.perf_counter()
+            recorder.record(metrics.Metric.EXECUTOR_QUEUE_WAIT, operation_name, start - submitted)
+            try:
+                return func(*args)
+            finally:
+                recorder.record(metrics.Metric.CALLBACK, operation_name, time.perf_counter() - start)
+        return timed
+
+    def __submit(self, stream_key, func, *args):
+        # executors that can keep a stream's callbacks in order, such as
+        # awsiot.dispatcher.StreamDispatcher, are given the stream as the key
+        submit_ordered = getattr(self.executor, "submit_ordered", None)
+        if submit_ordered is not None:
+            return submit_ordered(stream_key, func, *args)
+        return self.executor.submit(func, *args)
+
     def __create_stream_handler(real_self, operation, on_stream_event, on_stream_error, on_stream_closed):
-        stream_handler_type = type(operation + 'Handler', (getattr(client, operation + "StreamHandler"),), {})
+        # with an executor, the time callbacks take is recorded where they run
+        stream_handler_type = type(operation + 'Handler', (getattr(client, operation + "StreamHandler"),),
+                                   {'_records_callback_metrics': real_self.executor is not None})
+        stream_key = object()
+        operation_name = getattr(client, operation + "Operation")._model_name()
         if on_stream_event is not None:
             on_stream_event = real_self.__wrap_error(on_stream_event)
             def handler(self, event):
                 if real_self.executor is not None:
+                    recorder = metrics._recorder
+                    callback = on_stream_event
+                    if recorder is not None:
+                        callback = real_self.__time_executor_callback(recorder, operation_name, on_stream_event)
                     try:
-                        real_self.executor.submit(on_stream_event, event)
+                        real_self.__submit(stream_key, callback, event)
                     except RuntimeError:
                         if not real_self.ignore_executor_exceptions:
                             raise
@@ -107,7 +138,7 @@ class GreengrassCoreIPCClientV2:
             def handler(self):
                 if real_self.executor is not None:
                     try:
-                        real_self.executor.submit(on_stream_closed)
+                        real_self.__submit(stream_key, on_stream_closed)
                     except RuntimeError:
                         if real_self.ignore_executor_exceptions:
                             raise
@@ -71,6 +71,11 @@ class UserProperty(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('key', 'key'),
+        ('value', 'value'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.key is not None:
@@ -136,6 +141,11 @@ class SystemResourceLimits(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('memory', 'memory', 'int'),
+        ('cpus', 'cpus', 'float'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.memory is not None:
@@ -217,6 +227,13 @@ class DeploymentStatusDetails(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('detailed_deployment_status', 'detailedDeploymentStatus'),
+        ('deployment_error_stack', 'deploymentErrorStack'),
+        ('deployment_error_types', 'deploymentErrorTypes'),
+        ('deployment_failure_cause', 'deploymentFailureCause'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.detailed_deployment_status is not None:
@@ -312,6 +329,10 @@ class MessageContext(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('topic', 'topic'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.topic is not None:
@@ -403,6 +424,12 @@ class RunWithInfo(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('posix_user', 'posixUser'),
+        ('windows_user', 'windowsUser'),
+        ('system_resource_limits', 'systemResourceLimits', 'shape', 'SystemResourceLimits'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.posix_user is not None:
@@ -488,6 +515,13 @@ class LocalDeployment(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('deployment_id', 'deploymentId'),
+        ('status', 'status'),
+        ('created_on', 'createdOn'),
+        ('deployment_status_details', 'deploymentStatusDetails', 'shape', 'DeploymentStatusDetails'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.deployment_id is not None:
@@ -553,6 +587,10 @@ class PostComponentUpdateEvent(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('deployment_id', 'deploymentId'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.deployment_id is not None:
@@ -614,6 +652,11 @@ class PreComponentUpdateEvent(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('deployment_id', 'deploymentId'),
+        ('is_ggc_restarting', 'isGgcRestarting'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.deployment_id is not None:
@@ -704,6 +747,13 @@ class ComponentDetails(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+        ('version', 'version'),
+        ('state', 'state'),
+        ('configuration', 'configuration'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -793,6 +843,13 @@ class CertificateUpdate(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('private_key', 'privateKey'),
+        ('public_key', 'publicKey'),
+        ('certificate', 'certificate'),
+        ('ca_certificates', 'caCertificates'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.private_key is not None:
@@ -878,6 +935,11 @@ class BinaryMessage(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('message', 'message', 'blob'),
+        ('context', 'context', 'shape', 'MessageContext'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -943,6 +1005,11 @@ class JsonMessage(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('message', 'message'),
+        ('context', 'context', 'shape', 'MessageContext'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -1024,6 +1091,13 @@ class MQTTCredential(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('client_id', 'clientId'),
+        ('certificate_pem', 'certificatePem'),
+        ('username', 'username'),
+        ('password', 'password'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.client_id is not None:
@@ -1097,6 +1171,11 @@ class ValidateConfigurationUpdateEvent(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('configuration', 'configuration'),
+        ('deployment_id', 'deploymentId'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.configuration is not None:
@@ -1170,6 +1249,12 @@ class Metric(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('name', 'name'),
+        ('unit', 'unit'),
+        ('value', 'value', 'float'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.name is not None:
@@ -1239,6 +1324,11 @@ class ConfigurationUpdateEvent(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+        ('key_path', 'keyPath'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -1368,6 +1458,18 @@ class MQTTMessage(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('topic_name', 'topicName'),
+        ('payload', 'payload', 'blob'),
+        ('retain', 'retain'),
+        ('user_properties', 'userProperties', 'shape_list', 'UserProperty'),
+        ('message_expiry_interval_seconds', 'messageExpiryIntervalSeconds', 'int'),
+        ('correlation_data', 'correlationData', 'blob'),
+        ('response_topic', 'responseTopic'),
+        ('payload_format', 'payloadFormat'),
+        ('content_type', 'contentType'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.topic_name is not None:
@@ -1481,6 +1583,11 @@ class ComponentUpdatePolicyEvents(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('pre_update_event', 'preUpdateEvent', 'shape', 'PreComponentUpdateEvent'),
+        ('post_update_event', 'postUpdateEvent', 'shape', 'PostComponentUpdateEvent'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.pre_update_event is not None:
@@ -1561,6 +1668,11 @@ class SecretValue(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('secret_string', 'secretString'),
+        ('secret_binary', 'secretBinary', 'blob'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.secret_string is not None:
@@ -1634,6 +1746,12 @@ class ConfigurationValidityReport(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('status', 'status'),
+        ('deployment_id', 'deploymentId'),
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.status is not None:
@@ -1697,6 +1815,10 @@ class ClientDeviceCredential(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('client_device_certificate', 'clientDeviceCertificate'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.client_device_certificate is not None:
@@ -1752,6 +1874,10 @@ class CertificateUpdateEvent(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('certificate_update', 'certificateUpdate', 'shape', 'CertificateUpdate'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.certificate_update is not None:
@@ -1805,6 +1931,10 @@ class CertificateOptions(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('certificate_type', 'certificateType'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.certificate_type is not None:
@@ -1868,6 +1998,11 @@ class PublishMessage(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('json_message', 'jsonMessage', 'shape', 'JsonMessage'),
+        ('binary_message', 'binaryMessage', 'shape', 'BinaryMessage'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.json_message is not None:
@@ -1927,6 +2062,10 @@ class CredentialDocument(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('mqtt_credential', 'mqttCredential', 'shape', 'MQTTCredential'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.mqtt_credential is not None:
@@ -1990,6 +2129,11 @@ class SubscriptionResponseMessage(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('json_message', 'jsonMessage', 'shape', 'JsonMessage'),
+        ('binary_message', 'binaryMessage', 'shape', 'BinaryMessage'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.json_message is not None:
@@ -2058,6 +2202,10 @@ class ValidateConfigurationUpdateEvents(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('validate_configuration_update_event', 'validateConfigurationUpdateEvent', 'shape', 'ValidateConfigurationUpdateEvent'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.validate_configuration_update_event is not None:
@@ -2113,6 +2261,10 @@ class ConfigurationUpdateEvents(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('configuration_update_event', 'configurationUpdateEvent', 'shape', 'ConfigurationUpdateEvent'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.configuration_update_event is not None:
@@ -2177,6 +2329,10 @@ class IoTCoreMessage(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('message', 'message', 'shape', 'MQTTMessage'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -2233,6 +2389,10 @@ class InvalidArgumentsError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -2289,6 +2449,10 @@ class InvalidArtifactsDirectoryPathError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -2345,6 +2509,10 @@ class InvalidRecipeDirectoryPathError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -2409,6 +2577,11 @@ class ServiceError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'server'
 
+    _payload_fields = (
+        ('message', 'message'),
+        ('context', 'context'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -2466,6 +2639,10 @@ class CreateLocalDeploymentResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('deployment_id', 'deploymentId'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.deployment_id is not None:
@@ -2575,6 +2752,17 @@ class CreateLocalDeploymentRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('group_name', 'groupName'),
+        ('root_component_versions_to_add', 'rootComponentVersionsToAdd'),
+        ('root_components_to_remove', 'rootComponentsToRemove'),
+        ('component_to_configuration', 'componentToConfiguration'),
+        ('component_to_run_with_info', 'componentToRunWithInfo', 'shape_map', 'RunWithInfo'),
+        ('recipe_directory_path', 'recipeDirectoryPath'),
+        ('artifacts_directory_path', 'artifactsDirectoryPath'),
+        ('failure_handling_policy', 'failureHandlingPolicy'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.group_name is not None:
@@ -2675,6 +2863,12 @@ class ResourceNotFoundError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+        ('resource_type', 'resourceType'),
+        ('resource_name', 'resourceName'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -2739,6 +2933,10 @@ class UnauthorizedError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -2778,6 +2976,8 @@ class PauseComponentResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -2827,6 +3027,10 @@ class PauseComponentRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -2883,6 +3087,10 @@ class ComponentNotFoundError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -2944,6 +3152,11 @@ class StopComponentResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('stop_status', 'stopStatus'),
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.stop_status is not None:
@@ -3001,6 +3214,10 @@ class StopComponentRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -3054,6 +3271,10 @@ class ListLocalDeploymentsResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('local_deployments', 'localDeployments', 'shape_list', 'LocalDeployment'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.local_deployments is not None:
@@ -3093,6 +3314,8 @@ class ListLocalDeploymentsRequest(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -3128,6 +3351,8 @@ class SubscribeToComponentUpdatesResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -3163,6 +3388,8 @@ class SubscribeToComponentUpdatesRequest(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -3228,6 +3455,12 @@ class ListNamedShadowsForThingResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('results', 'results'),
+        ('timestamp', 'timestamp', 'timestamp_utc'),
+        ('next_token', 'nextToken'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.results is not None:
@@ -3305,6 +3538,12 @@ class ListNamedShadowsForThingRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('thing_name', 'thingName'),
+        ('next_token', 'nextToken'),
+        ('page_size', 'pageSize', 'int'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.thing_name is not None:
@@ -3366,6 +3605,10 @@ class CancelLocalDeploymentResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -3419,6 +3662,10 @@ class CancelLocalDeploymentRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('deployment_id', 'deploymentId'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.deployment_id is not None:
@@ -3458,6 +3705,8 @@ class UpdateStateResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -3507,6 +3756,10 @@ class UpdateStateRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('state', 'state'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.state is not None:
@@ -3584,6 +3837,13 @@ class GetSecretValueResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('secret_id', 'secretId'),
+        ('version_id', 'versionId'),
+        ('version_stage', 'versionStage'),
+        ('secret_value', 'secretValue', 'shape', 'SecretValue'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.secret_id is not None:
@@ -3673,6 +3933,13 @@ class GetSecretValueRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('secret_id', 'secretId'),
+        ('version_id', 'versionId'),
+        ('version_stage', 'versionStage'),
+        ('refresh', 'refresh'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.secret_id is not None:
@@ -3738,6 +4005,10 @@ class GetLocalDeploymentStatusResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('deployment', 'deployment', 'shape', 'LocalDeployment'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.deployment is not None:
@@ -3791,6 +4062,10 @@ class GetLocalDeploymentStatusRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('deployment_id', 'deploymentId'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.deployment_id is not None:
@@ -3852,6 +4127,11 @@ class RestartComponentResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('restart_status', 'restartStatus'),
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.restart_status is not None:
@@ -3909,6 +4189,10 @@ class RestartComponentRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -3965,6 +4249,10 @@ class InvalidTokenError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'server'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -4018,6 +4306,10 @@ class ValidateAuthorizationTokenResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('is_valid', 'isValid'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.is_valid is not None:
@@ -4071,6 +4363,10 @@ class ValidateAuthorizationTokenRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('token', 'token'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.token is not None:
@@ -4127,6 +4423,10 @@ class FailedUpdateConditionCheckError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -4183,6 +4483,10 @@ class ConflictError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -4222,6 +4526,8 @@ class UpdateConfigurationResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -4287,6 +4593,12 @@ class UpdateConfigurationRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('key_path', 'keyPath'),
+        ('timestamp', 'timestamp', 'timestamp_utc'),
+        ('value_to_merge', 'valueToMerge'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.key_path is not None:
@@ -4352,6 +4664,10 @@ class UpdateThingShadowResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('payload', 'payload', 'blob'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.payload is not None:
@@ -4425,6 +4741,12 @@ class UpdateThingShadowRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('thing_name', 'thingName'),
+        ('shadow_name', 'shadowName'),
+        ('payload', 'payload', 'blob'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.thing_name is not None:
@@ -4472,6 +4794,8 @@ class SendConfigurationValidityReportResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -4521,6 +4845,10 @@ class SendConfigurationValidityReportRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('configuration_validity_report', 'configurationValidityReport', 'shape', 'ConfigurationValidityReport'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.configuration_validity_report is not None:
@@ -4578,6 +4906,10 @@ class GetThingShadowResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('payload', 'payload', 'blob'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.payload is not None:
@@ -4639,6 +4971,11 @@ class GetThingShadowRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('thing_name', 'thingName'),
+        ('shadow_name', 'shadowName'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.thing_name is not None:
@@ -4728,6 +5065,14 @@ class CreateDebugPasswordResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('password', 'password'),
+        ('username', 'username'),
+        ('password_expiration', 'passwordExpiration', 'timestamp_utc'),
+        ('certificate_sha256_hash', 'certificateSHA256Hash'),
+        ('certificate_sha1_hash', 'certificateSHA1Hash'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.password is not None:
@@ -4783,6 +5128,8 @@ class CreateDebugPasswordRequest(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -4832,6 +5179,10 @@ class ListComponentsResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('components', 'components', 'shape_list', 'ComponentDetails'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.components is not None:
@@ -4871,6 +5222,8 @@ class ListComponentsRequest(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -4923,6 +5276,10 @@ class InvalidClientDeviceAuthTokenError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -4976,6 +5333,10 @@ class AuthorizeClientDeviceActionResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('is_authorized', 'isAuthorized'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.is_authorized is not None:
@@ -5045,6 +5406,12 @@ class AuthorizeClientDeviceActionRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('client_device_auth_token', 'clientDeviceAuthToken'),
+        ('operation', 'operation'),
+        ('resource', 'resource'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.client_device_auth_token is not None:
@@ -5106,6 +5473,10 @@ class VerifyClientDeviceIdentityResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('is_valid_client_device', 'isValidClientDevice'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.is_valid_client_device is not None:
@@ -5159,6 +5530,10 @@ class VerifyClientDeviceIdentityRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('credential', 'credential', 'shape', 'ClientDeviceCredential'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.credential is not None:
@@ -5198,6 +5573,8 @@ class SubscribeToCertificateUpdatesResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -5247,6 +5624,10 @@ class SubscribeToCertificateUpdatesRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('certificate_options', 'certificateOptions', 'shape', 'CertificateOptions'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.certificate_options is not None:
@@ -5286,6 +5667,8 @@ class PublishToTopicResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -5343,6 +5726,11 @@ class PublishToTopicRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('topic', 'topic'),
+        ('publish_message', 'publishMessage', 'shape', 'PublishMessage'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.topic is not None:
@@ -5403,6 +5791,10 @@ class InvalidCredentialError(GreengrassCoreIPCError):
     def _get_error_type_string(self):
         return 'client'
 
+    _payload_fields = (
+        ('message', 'message'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.message is not None:
@@ -5456,6 +5848,10 @@ class GetClientDeviceAuthTokenResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('client_device_auth_token', 'clientDeviceAuthToken'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.client_device_auth_token is not None:
@@ -5509,6 +5905,10 @@ class GetClientDeviceAuthTokenRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('credential', 'credential', 'shape', 'CredentialDocument'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.credential is not None:
@@ -5562,6 +5962,10 @@ class GetComponentDetailsResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_details', 'componentDetails', 'shape', 'ComponentDetails'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_details is not None:
@@ -5615,6 +6019,10 @@ class GetComponentDetailsRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -5668,6 +6076,10 @@ class SubscribeToTopicResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('topic_name', 'topicName'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.topic_name is not None:
@@ -5729,6 +6141,11 @@ class SubscribeToTopicRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('topic', 'topic'),
+        ('receive_mode', 'receiveMode'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.topic is not None:
@@ -5794,6 +6211,11 @@ class GetConfigurationResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+        ('value', 'value'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -5859,6 +6281,11 @@ class GetConfigurationRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+        ('key_path', 'keyPath'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -5902,6 +6329,8 @@ class SubscribeToValidateConfigurationUpdatesResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -5937,6 +6366,8 @@ class SubscribeToValidateConfigurationUpdatesRequest(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -5972,6 +6403,8 @@ class DeferComponentUpdateResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -6037,6 +6470,12 @@ class DeferComponentUpdateRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('deployment_id', 'deploymentId'),
+        ('message', 'message'),
+        ('recheck_after_ms', 'recheckAfterMs', 'int'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.deployment_id is not None:
@@ -6084,6 +6523,8 @@ class PutComponentMetricResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -6133,6 +6574,10 @@ class PutComponentMetricRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('metrics', 'metrics', 'shape_list', 'Metric'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.metrics is not None:
@@ -6190,6 +6635,10 @@ class DeleteThingShadowResponse(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('payload', 'payload', 'blob'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.payload is not None:
@@ -6251,6 +6700,11 @@ class DeleteThingShadowRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('thing_name', 'thingName'),
+        ('shadow_name', 'shadowName'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.thing_name is not None:
@@ -6294,6 +6748,8 @@ class SubscribeToConfigurationUpdateResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -6351,6 +6807,11 @@ class SubscribeToConfigurationUpdateRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+        ('key_path', 'keyPath'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -6394,6 +6855,8 @@ class PublishToIoTCoreResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -6523,6 +6986,19 @@ class PublishToIoTCoreRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('topic_name', 'topicName'),
+        ('qos', 'qos'),
+        ('payload', 'payload', 'blob'),
+        ('retain', 'retain'),
+        ('user_properties', 'userProperties', 'shape_list', 'UserProperty'),
+        ('message_expiry_interval_seconds', 'messageExpiryIntervalSeconds', 'int'),
+        ('correlation_data', 'correlationData', 'blob'),
+        ('response_topic', 'responseTopic'),
+        ('payload_format', 'payloadFormat'),
+        ('content_type', 'contentType'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.topic_name is not None:
@@ -6598,6 +7074,8 @@ class ResumeComponentResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -6647,6 +7125,10 @@ class ResumeComponentRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('component_name', 'componentName'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.component_name is not None:
@@ -6686,6 +7168,8 @@ class SubscribeToIoTCoreResponse(rpc.Shape):
         super().__init__()
 
 
+    _payload_fields = ()
+
     def _to_payload(self):
         payload = {}
         return payload
@@ -6743,6 +7227,11 @@ class SubscribeToIoTCoreRequest(rpc.Shape):
         return self
 
 
+    _payload_fields = (
+        ('topic_name', 'topicName'),
+        ('qos', 'qos'),
+    )
+
     def _to_payload(self):
         payload = {}
         if self.topic_name is not None:
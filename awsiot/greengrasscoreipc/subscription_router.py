@@ -0,0 +1,360 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Routes messages from a few IPC subscriptions to many local handlers.
+"""
+
+from awsiot.greengrasscoreipc import model
+from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2
+from awsiot.topic_filter import TopicTrie, filter_covers, validate_topic_filter
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+__all__ = [
+    'SubscriptionRouter',
+    'RoutedSubscription',
+]
+
+logger = logging.getLogger(__name__)
+
+
+class RoutedSubscription:
+    """
+    A handler registered with a :class:`SubscriptionRouter`.
+    Call :meth:`close` to stop receiving messages.
+
+    Attributes:
+        topic_filter (str): Filter the handler was registered with.
+        closed (bool): True once the subscription has been closed, by :meth:`close`
+            or because the IPC subscription carrying its messages closed.
+    """
+
+    def __init__(self, space: '_TopicSpace', topic_filter: str,
+                 on_message: Callable[[Any], None],
+                 on_closed: Optional[Callable[[], None]]):
+        self._space = space
+        self.topic_filter = topic_filter
+        self._on_message = on_message
+        self._on_closed = on_closed
+        self.closed = False
+
+    def close(self):
+        """
+        Stops delivering messages to the handler. The IPC subscription is
+        closed once no handler needs it. `on_closed` is not invoked.
+        """
+        self._space.remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return '<RoutedSubscription {!r}>'.format(self.topic_filter)
+
+
+class _Upstream:
+    """One IPC subscription"""
+
+    def __init__(self, topic_filter: str):
+        self.topic_filter = topic_filter
+        self.operation = None
+        # False once closed, by us or by the service
+        self.open = True
+
+
+class _TopicSpace:
+    """
+    Handlers of one kind of subscription (local or IoT Core), and the
+    IPC subscriptions carrying their messages.
+    """
+
+    def __init__(self, subscribe: Callable, topic_of: Callable[[Any], Optional[str]]):
+        self._subscribe = subscribe
+        self._topic_of = topic_of
+        # serializes changes to the set of IPC subscriptions, which block on the service
+        self._change_lock = threading.Lock()
+        # guards the state below, and is never held while calling out
+        self._lock = threading.Lock()
+        # local filter -> its handlers
+        self._handlers = TopicTrie()  # type: TopicTrie[RoutedSubscription]
+        # local filter -> number of handlers
+        self._filters = {}  # type: Dict[str, int]
+        # IPC subscriptions, by filter
+        self._upstreams = {}  # type: Dict[str, _Upstream]
+        # local filter -> the IPC subscription delivering its messages
+        self._owners = {}  # type: Dict[str, _Upstream]
+        self._closed = False
+
+    def add(self, topic_filter: str, on_message: Callable, on_closed: Optional[Callable]) -> RoutedSubscription:
+        validate_topic_filter(topic_filter)
+        subscription = RoutedSubscription(self, topic_filter, on_message, on_closed)
+        with self._change_lock:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("SubscriptionRouter is closed")
+                self._handlers.add(topic_filter, subscription)
+                self._filters[topic_filter] = self._filters.get(topic_filter, 0) + 1
+            try:
+                self._reconcile()
+            except Exception:
+                self._forget(subscription)
+                raise
+        return subscription
+
+    def remove(self, subscription: RoutedSubscription):
+        with self._change_lock:
+            if not self._forget(subscription):
+                return
+            try:
+                self._reconcile()
+            except Exception as e:
+                logger.error("%r failed to update IPC subscriptions: %r", subscription, e)
+
+    def close(self):
+        with self._change_lock:
+            with self._lock:
+                self._closed = True
+                upstreams = list(self._upstreams.values())
+                subscriptions = [s for _, s in self._handlers.items()]
+                self._handlers = TopicTrie()
+                self._filters.clear()
+                self._upstreams.clear()
+                self._owners.clear()
+                for upstream in upstreams:
+                    upstream.open = False
+                for subscription in subscriptions:
+                    subscription.closed = True
+        for upstream in upstreams:
+            self._close_upstream(upstream)
+
+    def _forget(self, subscription: RoutedSubscription) -> bool:
+        with self._lock:
+            if subscription.closed:
+                return False
+            subscription.closed = True
+            topic_filter = subscription.topic_filter
+            self._handlers.remove(topic_filter, subscription)
+            remaining = self._filters[topic_filter] - 1
+            if remaining:
+                self._filters[topic_filter] = remaining
+            else:
+                del self._filters[topic_filter]
+            return True
+
+    def _reconcile(self):
+        # Called with the change lock held. Works out the fewest IPC
+        # subscriptions covering every local filter, opens the missing ones,
+        # moves local filters over to them, then closes those no longer needed.
+        with self._lock:
+            filters = sorted(self._filters)
+            current = dict(self._upstreams)
+        # distinct filters never cover each other both ways, so this keeps one of each chain
+        needed = [f for f in filters if not any(g != f and filter_covers(g, f) for g in filters)]
+
+        opened = []  # type: List[_Upstream]
+        try:
+            for topic_filter in needed:
+                if topic_filter not in current:
+                    upstream = _Upstream(topic_filter)
+                    opened.append(upstream)
+                    self._open_upstream(upstream)
+        except Exception:
+            for upstream in opened:
+                upstream.open = False
+                self._close_upstream(upstream)
+            raise
+
+        with self._lock:
+            for upstream in opened:
+                self._upstreams[upstream.topic_filter] = upstream
+            obsolete = [u for f, u in self._upstreams.items() if f not in needed]
+            for upstream in obsolete:
+                del self._upstreams[upstream.topic_filter]
+                upstream.open = False
+            # an IPC subscription closed by the service meanwhile owns nothing
+            self._owners = {f: self._upstreams.get(next(g for g in needed if filter_covers(g, f)))
+                            for f in filters}
+        for upstream in obsolete:
+            self._close_upstream(upstream)
+
+    def _open_upstream(self, upstream: _Upstream):
+        def on_stream_event(event):
+            self._dispatch(upstream, event)
+
+        def on_stream_error(error):
+            logger.error("IPC subscription to %r failed: %r", upstream.topic_filter, error)
+            return True
+
+        def on_stream_closed():
+            self._upstream_closed(upstream)
+
+        _, upstream.operation = self._subscribe(
+            upstream.topic_filter,
+            on_stream_event=on_stream_event,
+            on_stream_error=on_stream_error,
+            on_stream_closed=on_stream_closed)
+
+    def _close_upstream(self, upstream: _Upstream):
+        if upstream.operation is not None:
+            try:
+                upstream.operation.close()
+            except Exception as e:
+                logger.debug("failed to close IPC subscription to %r: %r", upstream.topic_filter, e)
+
+    def _dispatch(self, upstream: _Upstream, event):
+        topic = self._topic_of(event)
+        with self._lock:
+            if not upstream.open:
+                return
+            owners = self._owners
+            if topic is None:
+                # no topic to match against, so deliver to every handler of the IPC subscription
+                matches = [s for f, s in self._handlers.items() if owners.get(f) is upstream]
+            else:
+                # a topic matching several IPC subscriptions arrives on each of them,
+                # so each handler takes it only from the one that owns its filter
+                matches = [s for s in self._handlers.match(topic) if owners.get(s.topic_filter) is upstream]
+
+        for subscription in matches:
+            if subscription.closed:
+                continue
+            try:
+                subscription._on_message(event)
+            except Exception as e:
+                logger.error("%r handler raised: %r", subscription, e)
+
+    def _upstream_closed(self, upstream: _Upstream):
+        with self._lock:
+            if not upstream.open:
+                return
+            # closed by the service: the handlers relying on it will get no more messages
+            upstream.open = False
+            if self._upstreams.get(upstream.topic_filter) is upstream:
+                del self._upstreams[upstream.topic_filter]
+            orphans = [s for f, s in self._handlers.items() if self._owners.get(f) is upstream]
+        logger.error("IPC subscription to %r was closed by the service", upstream.topic_filter)
+        for subscription in orphans:
+            if self._forget(subscription) and subscription._on_closed is not None:
+                try:
+                    subscription._on_closed()
+                except Exception as e:
+                    logger.error("%r on_closed raised: %r", subscription, e)
+
+
+def _message_topic(event: model.SubscriptionResponseMessage) -> Optional[str]:
+    message = event.json_message or event.binary_message
+    if message is None or message.context is None:
+        return None
+    return message.context.topic
+
+
+def _iot_core_topic(event: model.IoTCoreMessage) -> Optional[str]:
+    if event.message is None:
+        return None
+    return event.message.topic_name
+
+
+class SubscriptionRouter:
+    """
+    Shares IPC subscriptions between many local handlers.
+
+    Every call to :meth:`GreengrassCoreIPCClientV2.subscribe_to_topic()
+    <awsiot.greengrasscoreipc.clientv2.GreengrassCoreIPCClientV2.subscribe_to_topic>`
+    opens a stream of its own, so a component with many handlers on
+    overlapping topics has each message sent over IPC and decoded once per
+    handler. The router instead opens one IPC subscription per distinct
+    filter, and none for a filter that another one already covers, such as
+    `sensors/temperature` under `sensors/+`. Each message is decoded once,
+    and passed to every handler whose filter matches its topic. Handlers are
+    passed the same message object, and must not modify it.
+
+    Handlers run on the thread delivering the IPC subscription's events,
+    which is the client's executor if it has one. An exception raised by a
+    handler is logged, and does not affect other handlers.
+
+    Adding or removing a handler may open or close IPC subscriptions, and
+    blocks until the service has responded. If the service closes an IPC
+    subscription, the handlers whose messages it carried are closed, and
+    their `on_closed` callbacks invoked.
+
+    Args:
+        client: Client to subscribe through.
+        receive_mode: :class:`~awsiot.greengrasscoreipc.model.ReceiveMode` of
+            the local subscriptions.
+        iot_core_qos: :class:`~awsiot.greengrasscoreipc.model.QOS` of the
+            IoT Core subscriptions.
+    """
+
+    def __init__(self, client: GreengrassCoreIPCClientV2, *,
+                 receive_mode: Optional[str] = None,
+                 iot_core_qos: str = model.QOS.AT_LEAST_ONCE):
+        self._client = client
+
+        def subscribe_to_topic(topic_filter, **handlers):
+            return client.subscribe_to_topic(topic=topic_filter, receive_mode=receive_mode, **handlers)
+
+        def subscribe_to_iot_core(topic_filter, **handlers):
+            return client.subscribe_to_iot_core(topic_name=topic_filter, qos=iot_core_qos, **handlers)
+
+        self._local = _TopicSpace(subscribe_to_topic, _message_topic)
+        self._iot_core = _TopicSpace(subscribe_to_iot_core, _iot_core_topic)
+
+    def subscribe_to_topic(self, topic: str,
+                           on_message: Callable[[model.SubscriptionResponseMessage], None],
+                           on_closed: Optional[Callable[[], None]] = None) -> RoutedSubscription:
+        """
+        Calls `on_message` with each local publish/subscribe message whose
+        topic matches `topic`.
+
+        Args:
+            topic: Topic filter, which may use the `+` and `#` wildcards.
+            on_message: Callback for messages.
+            on_closed: Callback for when the subscription is closed by the service.
+
+        Returns:
+            The subscription. Close it to stop receiving messages.
+
+        Raises:
+            ValueError: if `topic` is not a valid topic filter
+            Exception: the service's error, if it rejected a new IPC subscription
+        """
+        return self._local.add(topic, on_message, on_closed)
+
+    def subscribe_to_iot_core(self, topic_name: str,
+                              on_message: Callable[[model.IoTCoreMessage], None],
+                              on_closed: Optional[Callable[[], None]] = None) -> RoutedSubscription:
+        """
+        Calls `on_message` with each AWS IoT Core MQTT message whose topic
+        matches `topic_name`.
+
+        Args:
+            topic_name: Topic filter, which may use the `+` and `#` wildcards.
+            on_message: Callback for messages.
+            on_closed: Callback for when the subscription is closed by the service.
+
+        Returns:
+            The subscription. Close it to stop receiving messages.
+
+        Raises:
+            ValueError: if `topic_name` is not a valid topic filter
+            Exception: the service's error, if it rejected a new IPC subscription
+        """
+        return self._iot_core.add(topic_name, on_message, on_closed)
+
+    def close(self):
+        """
+        Closes every subscription. The client is left open.
+        """
+        self._local.close()
+        self._iot_core.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
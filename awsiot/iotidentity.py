@@ -6,7 +6,6 @@
 import awscrt
 import awsiot
 import concurrent.futures
-import json
 import typing
 
 class IotIdentityClient(awsiot.MqttServiceClient):
@@ -40,7 +39,8 @@ class IotIdentityClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/certificates/create-from-csr/json',
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_create_certificate_from_csr')
 
     def publish_create_keys_and_certificate(self, request, qos):
         # type: (CreateKeysAndCertificateRequest, int) -> concurrent.futures.Future
@@ -64,7 +64,8 @@ class IotIdentityClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/certificates/create/json',
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_create_keys_and_certificate')
 
     def publish_register_thing(self, request, qos):
         # type: (RegisterThingRequest, int) -> concurrent.futures.Future
@@ -88,7 +89,8 @@ class IotIdentityClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/provisioning-templates/{0.template_name}/provision/json'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_register_thing')
 
     def subscribe_to_create_certificate_from_csr_accepted(self, request, qos, callback):
         # type: (CreateCertificateFromCsrSubscriptionRequest, int, typing.Callable[[CreateCertificateFromCsrResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -121,7 +123,8 @@ class IotIdentityClient(awsiot.MqttServiceClient):
             topic='$aws/certificates/create-from-csr/json/accepted',
             qos=qos,
             callback=callback,
-            payload_to_class_fn=CreateCertificateFromCsrResponse.from_payload)
+            payload_to_class_fn=CreateCertificateFromCsrResponse.from_payload,
+            operation_name='subscribe_to_create_certificate_from_csr_accepted')
 
     def subscribe_to_create_certificate_from_csr_rejected(self, request, qos, callback):
         # type: (CreateCertificateFromCsrSubscriptionRequest, int, typing.Callable[[ErrorResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -154,7 +157,8 @@ class IotIdentityClient(awsiot.MqttServiceClient):
             topic='$aws/certificates/create-from-csr/json/rejected',
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ErrorResponse.from_payload)
+            payload_to_class_fn=ErrorResponse.from_payload,
+            operation_name='subscribe_to_create_certificate_from_csr_rejected')
 
     def subscribe_to_create_keys_and_certificate_accepted(self, request, qos, callback):
         # type: (CreateKeysAndCertificateSubscriptionRequest, int, typing.Callable[[CreateKeysAndCertificateResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -187,7 +191,8 @@ class IotIdentityClient(awsiot.MqttServiceClient):
             topic='$aws/certificates/create/json/accepted',
             qos=qos,
             callback=callback,
-            payload_to_class_fn=CreateKeysAndCertificateResponse.from_payload)
+            payload_to_class_fn=CreateKeysAndCertificateResponse.from_payload,
+            operation_name='subscribe_to_create_keys_and_certificate_accepted')
 
     def subscribe_to_create_keys_and_certificate_rejected(self, request, qos, callback):
         # type: (CreateKeysAndCertificateSubscriptionRequest, int, typing.Callable[[ErrorResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -220,7 +225,8 @@ class IotIdentityClient(awsiot.MqttServiceClient):
             topic='$aws/certificates/create/json/rejected',
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ErrorResponse.from_payload)
+            payload_to_class_fn=ErrorResponse.from_payload,
+            operation_name='subscribe_to_create_keys_and_certificate_rejected')
 
     def subscribe_to_register_thing_accepted(self, request, qos, callback):
         # type: (RegisterThingSubscriptionRequest, int, typing.Callable[[RegisterThingResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -253,7 +259,8 @@ class IotIdentityClient(awsiot.MqttServiceClient):
             topic='$aws/provisioning-templates/{0.template_name}/provision/json/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=RegisterThingResponse.from_payload)
+            payload_to_class_fn=RegisterThingResponse.from_payload,
+            operation_name='subscribe_to_register_thing_accepted')
 
     def subscribe_to_register_thing_rejected(self, request, qos, callback):
         # type: (RegisterThingSubscriptionRequest, int, typing.Callable[[ErrorResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -286,7 +293,8 @@ class IotIdentityClient(awsiot.MqttServiceClient):
             topic='$aws/provisioning-templates/{0.template_name}/provision/json/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ErrorResponse.from_payload)
+            payload_to_class_fn=ErrorResponse.from_payload,
+            operation_name='subscribe_to_register_thing_rejected')
 
 class CreateCertificateFromCsrRequest(awsiot.ModeledClass):
     """
@@ -311,6 +319,10 @@ class CreateCertificateFromCsrRequest(awsiot.ModeledClass):
         for key, val in zip(['certificate_signing_request'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('certificate_signing_request', 'certificateSigningRequest'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -350,6 +362,12 @@ class CreateCertificateFromCsrResponse(awsiot.ModeledClass):
         for key, val in zip(['certificate_id', 'certificate_ownership_token', 'certificate_pem'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('certificate_id', 'certificateId'),
+        ('certificate_ownership_token', 'certificateOwnershipToken'),
+        ('certificate_pem', 'certificatePem'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> CreateCertificateFromCsrResponse
@@ -403,6 +421,8 @@ class CreateKeysAndCertificateRequest(awsiot.ModeledClass):
         for key, val in zip([], args):
             setattr(self, key, val)
 
+    _payload_fields = ()
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -443,6 +463,13 @@ class CreateKeysAndCertificateResponse(awsiot.ModeledClass):
         for key, val in zip(['certificate_id', 'certificate_ownership_token', 'certificate_pem', 'private_key'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('certificate_id', 'certificateId'),
+        ('certificate_ownership_token', 'certificateOwnershipToken'),
+        ('certificate_pem', 'certificatePem'),
+        ('private_key', 'privateKey'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> CreateKeysAndCertificateResponse
@@ -512,6 +539,12 @@ class ErrorResponse(awsiot.ModeledClass):
         for key, val in zip(['error_code', 'error_message', 'status_code'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('error_code', 'errorCode'),
+        ('error_message', 'errorMessage'),
+        ('status_code', 'statusCode'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> ErrorResponse
@@ -559,6 +592,11 @@ class RegisterThingRequest(awsiot.ModeledClass):
         for key, val in zip(['certificate_ownership_token', 'parameters', 'template_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('certificate_ownership_token', 'certificateOwnershipToken'),
+        ('parameters', 'parameters'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -599,6 +637,11 @@ class RegisterThingResponse(awsiot.ModeledClass):
         for key, val in zip(['device_configuration', 'thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('device_configuration', 'deviceConfiguration'),
+        ('thing_name', 'thingName'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> RegisterThingResponse
@@ -671,6 +714,12 @@ class V2ErrorResponse(awsiot.ModeledClass):
         for key, val in zip([], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('error_code', 'errorCode'),
+        ('error_message', 'errorMessage'),
+        ('status_code', 'statusCode'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> V2ErrorResponse
@@ -698,8 +747,27 @@ class IotIdentityClientV2:
 
     """
 
-    def __init__(self, protocol_client: awscrt.mqtt.Connection or awscrt.mqtt5.Client, options: awscrt.mqtt_request_response.ClientOptions):
+    def __init__(self, protocol_client: awscrt.mqtt.Connection or awscrt.mqtt5.Client, options: awscrt.mqtt_request_response.ClientOptions, json_codec: typing.Optional[awsiot.JsonCodec] = None, lazy_deserialization: bool = False, request_scheduler: 'typing.Optional[awsiot.scheduler.SchedulerLane]' = None):
         self._rr_client = awscrt.mqtt_request_response.Client(protocol_client, options)
+        if request_scheduler is not None:
+            self._rr_client = request_scheduler.wrap(self._rr_client)
+        self._json_codec = json_codec if json_codec is not None else awsiot.get_default_json_codec()
+        self._lazy_deserialization = lazy_deserialization
+
+    @property
+    def json_codec(self) -> awsiot.JsonCodec:
+        """
+        Codec used to encode and decode message payloads
+        """
+        return self._json_codec
+
+    @property
+    def request_response_client(self) -> awscrt.mqtt_request_response.Client:
+        """
+        Request-response client that requests are made and streams are opened with.
+        If a request scheduler was given, this is the scheduler's wrapper around it.
+        """
+        return self._rr_client
 
     def create_certificate_from_csr(self, request : CreateCertificateFromCsrRequest) -> concurrent.futures.Future :
         """
@@ -717,33 +785,25 @@ class IotIdentityClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/certificates/create-from-csr/json'
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/certificates/create-from-csr/json/accepted';
-        subscription1 = '$aws/certificates/create-from-csr/json/rejected';
+        topics = awsiot.get_v2_request_topics(
+            '$aws/certificates/create-from-csr/json',
+            (
+                '$aws/certificates/create-from-csr/json/accepted',
+                '$aws/certificates/create-from-csr/json/rejected',
+            ),
+            None,
+            request)
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-                subscription1,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "create_certificate_from_csr", accepted_topic, CreateCertificateFromCsrResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "create_certificate_from_csr", topics.accepted_topic, CreateCertificateFromCsrResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def create_keys_and_certificate(self, request : CreateKeysAndCertificateRequest) -> concurrent.futures.Future :
         """
@@ -761,33 +821,25 @@ class IotIdentityClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/certificates/create/json'
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/certificates/create/json/accepted';
-        subscription1 = '$aws/certificates/create/json/rejected';
+        topics = awsiot.get_v2_request_topics(
+            '$aws/certificates/create/json',
+            (
+                '$aws/certificates/create/json/accepted',
+                '$aws/certificates/create/json/rejected',
+            ),
+            None,
+            request)
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-                subscription1,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "create_keys_and_certificate", accepted_topic, CreateKeysAndCertificateResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "create_keys_and_certificate", topics.accepted_topic, CreateKeysAndCertificateResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def register_thing(self, request : RegisterThingRequest) -> concurrent.futures.Future :
         """
@@ -805,31 +857,23 @@ class IotIdentityClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/provisioning-templates/{0.template_name}/provision/json'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/provisioning-templates/{0.template_name}/provision/json/accepted'.format(request);
-        subscription1 = '$aws/provisioning-templates/{0.template_name}/provision/json/rejected'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/provisioning-templates/{0.template_name}/provision/json',
+            (
+                '$aws/provisioning-templates/{0.template_name}/provision/json/accepted',
+                '$aws/provisioning-templates/{0.template_name}/provision/json/rejected',
+            ),
+            None,
+            request)
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-                subscription1,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "register_thing", accepted_topic, RegisterThingResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "register_thing", topics.accepted_topic, RegisterThingResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
@@ -7,7 +7,6 @@ import awscrt
 import awsiot
 import concurrent.futures
 import datetime
-import json
 import typing
 import uuid
 
@@ -42,7 +41,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/jobs/{0.job_id}/get'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_describe_job_execution')
 
     def publish_get_pending_job_executions(self, request, qos):
         # type: (GetPendingJobExecutionsRequest, int) -> concurrent.futures.Future
@@ -66,7 +66,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/jobs/get'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_get_pending_job_executions')
 
     def publish_start_next_pending_job_execution(self, request, qos):
         # type: (StartNextPendingJobExecutionRequest, int) -> concurrent.futures.Future
@@ -90,7 +91,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/jobs/start-next'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_start_next_pending_job_execution')
 
     def publish_update_job_execution(self, request, qos):
         # type: (UpdateJobExecutionRequest, int) -> concurrent.futures.Future
@@ -114,7 +116,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/jobs/{0.job_id}/update'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_update_job_execution')
 
     def subscribe_to_describe_job_execution_accepted(self, request, qos, callback):
         # type: (DescribeJobExecutionSubscriptionRequest, int, typing.Callable[[DescribeJobExecutionResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -147,7 +150,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/{0.job_id}/get/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=DescribeJobExecutionResponse.from_payload)
+            payload_to_class_fn=DescribeJobExecutionResponse.from_payload,
+            operation_name='subscribe_to_describe_job_execution_accepted')
 
     def subscribe_to_describe_job_execution_rejected(self, request, qos, callback):
         # type: (DescribeJobExecutionSubscriptionRequest, int, typing.Callable[[RejectedError], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -180,7 +184,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/{0.job_id}/get/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=RejectedError.from_payload)
+            payload_to_class_fn=RejectedError.from_payload,
+            operation_name='subscribe_to_describe_job_execution_rejected')
 
     def subscribe_to_get_pending_job_executions_accepted(self, request, qos, callback):
         # type: (GetPendingJobExecutionsSubscriptionRequest, int, typing.Callable[[GetPendingJobExecutionsResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -213,7 +218,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/get/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=GetPendingJobExecutionsResponse.from_payload)
+            payload_to_class_fn=GetPendingJobExecutionsResponse.from_payload,
+            operation_name='subscribe_to_get_pending_job_executions_accepted')
 
     def subscribe_to_get_pending_job_executions_rejected(self, request, qos, callback):
         # type: (GetPendingJobExecutionsSubscriptionRequest, int, typing.Callable[[RejectedError], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -246,7 +252,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/get/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=RejectedError.from_payload)
+            payload_to_class_fn=RejectedError.from_payload,
+            operation_name='subscribe_to_get_pending_job_executions_rejected')
 
     def subscribe_to_job_executions_changed_events(self, request, qos, callback):
         # type: (JobExecutionsChangedSubscriptionRequest, int, typing.Callable[[JobExecutionsChangedEvent], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -279,7 +286,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/notify'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=JobExecutionsChangedEvent.from_payload)
+            payload_to_class_fn=JobExecutionsChangedEvent.from_payload,
+            operation_name='subscribe_to_job_executions_changed_events')
 
     def subscribe_to_next_job_execution_changed_events(self, request, qos, callback):
         # type: (NextJobExecutionChangedSubscriptionRequest, int, typing.Callable[[NextJobExecutionChangedEvent], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -310,7 +318,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/notify-next'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=NextJobExecutionChangedEvent.from_payload)
+            payload_to_class_fn=NextJobExecutionChangedEvent.from_payload,
+            operation_name='subscribe_to_next_job_execution_changed_events')
 
     def subscribe_to_start_next_pending_job_execution_accepted(self, request, qos, callback):
         # type: (StartNextPendingJobExecutionSubscriptionRequest, int, typing.Callable[[StartNextJobExecutionResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -343,7 +352,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/start-next/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=StartNextJobExecutionResponse.from_payload)
+            payload_to_class_fn=StartNextJobExecutionResponse.from_payload,
+            operation_name='subscribe_to_start_next_pending_job_execution_accepted')
 
     def subscribe_to_start_next_pending_job_execution_rejected(self, request, qos, callback):
         # type: (StartNextPendingJobExecutionSubscriptionRequest, int, typing.Callable[[RejectedError], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -376,7 +386,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/start-next/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=RejectedError.from_payload)
+            payload_to_class_fn=RejectedError.from_payload,
+            operation_name='subscribe_to_start_next_pending_job_execution_rejected')
 
     def subscribe_to_update_job_execution_accepted(self, request, qos, callback):
         # type: (UpdateJobExecutionSubscriptionRequest, int, typing.Callable[[UpdateJobExecutionResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -409,7 +420,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/{0.job_id}/update/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=UpdateJobExecutionResponse.from_payload)
+            payload_to_class_fn=UpdateJobExecutionResponse.from_payload,
+            operation_name='subscribe_to_update_job_execution_accepted')
 
     def subscribe_to_update_job_execution_rejected(self, request, qos, callback):
         # type: (UpdateJobExecutionSubscriptionRequest, int, typing.Callable[[RejectedError], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -442,7 +454,8 @@ class IotJobsClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/jobs/{0.job_id}/update/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=RejectedError.from_payload)
+            payload_to_class_fn=RejectedError.from_payload,
+            operation_name='subscribe_to_update_job_execution_rejected')
 
 class DescribeJobExecutionRequest(awsiot.ModeledClass):
     """
@@ -479,6 +492,12 @@ class DescribeJobExecutionRequest(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'execution_number', 'include_job_document', 'job_id', 'thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('execution_number', 'executionNumber'),
+        ('include_job_document', 'includeJobDocument'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -526,6 +545,12 @@ class DescribeJobExecutionResponse(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'execution', 'timestamp'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('execution', 'execution', 'shape', 'JobExecutionData'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> DescribeJobExecutionResponse
@@ -603,6 +628,10 @@ class GetPendingJobExecutionsRequest(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -647,6 +676,13 @@ class GetPendingJobExecutionsResponse(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'in_progress_jobs', 'queued_jobs', 'timestamp'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('in_progress_jobs', 'inProgressJobs', 'shape_list', 'JobExecutionSummary'),
+        ('queued_jobs', 'queuedJobs', 'shape_list', 'JobExecutionSummary'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> GetPendingJobExecutionsResponse
@@ -746,6 +782,19 @@ class JobExecutionData(awsiot.ModeledClass):
         for key, val in zip(['execution_number', 'job_document', 'job_id', 'last_updated_at', 'queued_at', 'started_at', 'status', 'status_details', 'thing_name', 'version_number'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('execution_number', 'executionNumber'),
+        ('job_document', 'jobDocument'),
+        ('job_id', 'jobId'),
+        ('last_updated_at', 'lastUpdatedAt', 'timestamp'),
+        ('queued_at', 'queuedAt', 'timestamp'),
+        ('started_at', 'startedAt', 'timestamp'),
+        ('status', 'status'),
+        ('status_details', 'statusDetails'),
+        ('thing_name', 'thingName'),
+        ('version_number', 'versionNumber'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> JobExecutionData
@@ -814,6 +863,12 @@ class JobExecutionState(awsiot.ModeledClass):
         for key, val in zip(['status', 'status_details', 'version_number'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('status', 'status'),
+        ('status_details', 'statusDetails'),
+        ('version_number', 'versionNumber'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> JobExecutionState
@@ -870,6 +925,15 @@ class JobExecutionSummary(awsiot.ModeledClass):
         for key, val in zip(['execution_number', 'job_id', 'last_updated_at', 'queued_at', 'started_at', 'version_number'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('execution_number', 'executionNumber'),
+        ('job_id', 'jobId'),
+        ('last_updated_at', 'lastUpdatedAt', 'timestamp'),
+        ('queued_at', 'queuedAt', 'timestamp'),
+        ('started_at', 'startedAt', 'timestamp'),
+        ('version_number', 'versionNumber'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> JobExecutionSummary
@@ -923,6 +987,11 @@ class JobExecutionsChangedEvent(awsiot.ModeledClass):
         for key, val in zip(['jobs', 'timestamp'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('jobs', 'jobs', 'shape_list_map', 'JobExecutionSummary'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> JobExecutionsChangedEvent
@@ -961,6 +1030,8 @@ class JobExecutionsChangedSubscriptionRequest(awsiot.ModeledClass):
         for key, val in zip(['thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = ()
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -997,6 +1068,11 @@ class NextJobExecutionChangedEvent(awsiot.ModeledClass):
         for key, val in zip(['execution', 'timestamp'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('execution', 'execution', 'shape', 'JobExecutionData'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> NextJobExecutionChangedEvent
@@ -1035,6 +1111,8 @@ class NextJobExecutionChangedSubscriptionRequest(awsiot.ModeledClass):
         for key, val in zip(['thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = ()
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1080,6 +1158,14 @@ class RejectedError(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'code', 'execution_state', 'message', 'timestamp'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('code', 'code'),
+        ('execution_state', 'executionState', 'shape', 'JobExecutionState'),
+        ('message', 'message'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> RejectedError
@@ -1133,6 +1219,12 @@ class StartNextJobExecutionResponse(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'execution', 'timestamp'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('execution', 'execution', 'shape', 'JobExecutionData'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> StartNextJobExecutionResponse
@@ -1183,6 +1275,12 @@ class StartNextPendingJobExecutionRequest(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'status_details', 'step_timeout_in_minutes', 'thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('status_details', 'statusDetails'),
+        ('step_timeout_in_minutes', 'stepTimeoutInMinutes'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1277,6 +1375,17 @@ class UpdateJobExecutionRequest(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'execution_number', 'expected_version', 'include_job_document', 'include_job_execution_state', 'job_id', 'status', 'status_details', 'step_timeout_in_minutes', 'thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('execution_number', 'executionNumber'),
+        ('expected_version', 'expectedVersion'),
+        ('include_job_document', 'includeJobDocument'),
+        ('include_job_execution_state', 'includeJobExecutionState'),
+        ('status', 'status'),
+        ('status_details', 'statusDetails'),
+        ('step_timeout_in_minutes', 'stepTimeoutInMinutes'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1337,6 +1446,13 @@ class UpdateJobExecutionResponse(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'execution_state', 'job_document', 'timestamp'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('execution_state', 'executionState', 'shape', 'JobExecutionState'),
+        ('job_document', 'jobDocument'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> UpdateJobExecutionResponse
@@ -1426,6 +1542,14 @@ class V2ErrorResponse(awsiot.ModeledClass):
         for key, val in zip([], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('code', 'code'),
+        ('execution_state', 'executionState', 'shape', 'JobExecutionState'),
+        ('message', 'message'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> V2ErrorResponse
@@ -1550,8 +1674,27 @@ class IotJobsClientV2:
 
     """
 
-    def __init__(self, protocol_client: awscrt.mqtt.Connection or awscrt.mqtt5.Client, options: awscrt.mqtt_request_response.ClientOptions):
+    def __init__(self, protocol_client: awscrt.mqtt.Connection or awscrt.mqtt5.Client, options: awscrt.mqtt_request_response.ClientOptions, json_codec: typing.Optional[awsiot.JsonCodec] = None, lazy_deserialization: bool = False, request_scheduler: 'typing.Optional[awsiot.scheduler.SchedulerLane]' = None):
         self._rr_client = awscrt.mqtt_request_response.Client(protocol_client, options)
+        if request_scheduler is not None:
+            self._rr_client = request_scheduler.wrap(self._rr_client)
+        self._json_codec = json_codec if json_codec is not None else awsiot.get_default_json_codec()
+        self._lazy_deserialization = lazy_deserialization
+
+    @property
+    def json_codec(self) -> awsiot.JsonCodec:
+        """
+        Codec used to encode and decode message payloads
+        """
+        return self._json_codec
+
+    @property
+    def request_response_client(self) -> awscrt.mqtt_request_response.Client:
+        """
+        Request-response client that requests are made and streams are opened with.
+        If a request scheduler was given, this is the scheduler's wrapper around it.
+        """
+        return self._rr_client
 
     def describe_job_execution(self, request : DescribeJobExecutionRequest) -> concurrent.futures.Future :
         """
@@ -1569,37 +1712,28 @@ class IotJobsClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/jobs/{0.job_id}/get'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/jobs/{0.job_id}/get/+'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/jobs/{0.job_id}/get',
+            (
+                '$aws/things/{0.thing_name}/jobs/{0.job_id}/get/+',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "describe_job_execution", accepted_topic, DescribeJobExecutionResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "describe_job_execution", topics.accepted_topic, DescribeJobExecutionResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def get_pending_job_executions(self, request : GetPendingJobExecutionsRequest) -> concurrent.futures.Future :
         """
@@ -1617,37 +1751,28 @@ class IotJobsClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/jobs/get'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/jobs/get/+'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/jobs/get',
+            (
+                '$aws/things/{0.thing_name}/jobs/get/+',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "get_pending_job_executions", accepted_topic, GetPendingJobExecutionsResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "get_pending_job_executions", topics.accepted_topic, GetPendingJobExecutionsResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def start_next_pending_job_execution(self, request : StartNextPendingJobExecutionRequest) -> concurrent.futures.Future :
         """
@@ -1665,37 +1790,28 @@ class IotJobsClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/jobs/start-next'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/jobs/start-next/+'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/jobs/start-next',
+            (
+                '$aws/things/{0.thing_name}/jobs/start-next/+',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "start_next_pending_job_execution", accepted_topic, StartNextJobExecutionResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "start_next_pending_job_execution", topics.accepted_topic, StartNextJobExecutionResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def update_job_execution(self, request : UpdateJobExecutionRequest) -> concurrent.futures.Future :
         """
@@ -1713,37 +1829,28 @@ class IotJobsClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/jobs/{0.job_id}/update'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/jobs/{0.job_id}/update/+'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/jobs/{0.job_id}/update',
+            (
+                '$aws/things/{0.thing_name}/jobs/{0.job_id}/update/+',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "update_job_execution", accepted_topic, UpdateJobExecutionResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "update_job_execution", topics.accepted_topic, UpdateJobExecutionResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def create_job_executions_changed_stream(self, request : JobExecutionsChangedSubscriptionRequest, options: awsiot.ServiceStreamOptions[JobExecutionsChangedEvent]):
         """
@@ -1764,7 +1871,7 @@ class IotJobsClientV2:
 
         subscription_topic_filter = '$aws/things/{0.thing_name}/jobs/notify'.format(request)
 
-        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "JobExecutionsChangedEvent", JobExecutionsChangedEvent)
+        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "JobExecutionsChangedEvent", JobExecutionsChangedEvent, self._json_codec, self._lazy_deserialization)
 
         return self._rr_client.create_stream(unmodeled_options)
 
@@ -1785,7 +1892,7 @@ class IotJobsClientV2:
 
         subscription_topic_filter = '$aws/things/{0.thing_name}/jobs/notify-next'.format(request)
 
-        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "NextJobExecutionChangedEvent", NextJobExecutionChangedEvent)
+        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "NextJobExecutionChangedEvent", NextJobExecutionChangedEvent, self._json_codec, self._lazy_deserialization)
 
         return self._rr_client.create_stream(unmodeled_options)
 
@@ -7,7 +7,6 @@ import awscrt
 import awsiot
 import concurrent.futures
 import datetime
-import json
 import typing
 import uuid
 
@@ -42,7 +41,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/delete'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_delete_named_shadow')
 
     def publish_delete_shadow(self, request, qos):
         # type: (DeleteShadowRequest, int) -> concurrent.futures.Future
@@ -66,7 +66,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/shadow/delete'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_delete_shadow')
 
     def publish_get_named_shadow(self, request, qos):
         # type: (GetNamedShadowRequest, int) -> concurrent.futures.Future
@@ -90,7 +91,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/get'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_get_named_shadow')
 
     def publish_get_shadow(self, request, qos):
         # type: (GetShadowRequest, int) -> concurrent.futures.Future
@@ -114,7 +116,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/shadow/get'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_get_shadow')
 
     def publish_update_named_shadow(self, request, qos):
         # type: (UpdateNamedShadowRequest, int) -> concurrent.futures.Future
@@ -138,7 +141,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_update_named_shadow')
 
     def publish_update_shadow(self, request, qos):
         # type: (UpdateShadowRequest, int) -> concurrent.futures.Future
@@ -162,7 +166,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
         return self._publish_operation(
             topic='$aws/things/{0.thing_name}/shadow/update'.format(request),
             qos=qos,
-            payload=request.to_payload())
+            payload=request.to_payload(),
+            operation_name='publish_update_shadow')
 
     def subscribe_to_delete_named_shadow_accepted(self, request, qos, callback):
         # type: (DeleteNamedShadowSubscriptionRequest, int, typing.Callable[[DeleteShadowResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -195,7 +200,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/delete/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=DeleteShadowResponse.from_payload)
+            payload_to_class_fn=DeleteShadowResponse.from_payload,
+            operation_name='subscribe_to_delete_named_shadow_accepted')
 
     def subscribe_to_delete_named_shadow_rejected(self, request, qos, callback):
         # type: (DeleteNamedShadowSubscriptionRequest, int, typing.Callable[[ErrorResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -228,7 +234,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/delete/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ErrorResponse.from_payload)
+            payload_to_class_fn=ErrorResponse.from_payload,
+            operation_name='subscribe_to_delete_named_shadow_rejected')
 
     def subscribe_to_delete_shadow_accepted(self, request, qos, callback):
         # type: (DeleteShadowSubscriptionRequest, int, typing.Callable[[DeleteShadowResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -261,7 +268,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/delete/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=DeleteShadowResponse.from_payload)
+            payload_to_class_fn=DeleteShadowResponse.from_payload,
+            operation_name='subscribe_to_delete_shadow_accepted')
 
     def subscribe_to_delete_shadow_rejected(self, request, qos, callback):
         # type: (DeleteShadowSubscriptionRequest, int, typing.Callable[[ErrorResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -294,7 +302,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/delete/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ErrorResponse.from_payload)
+            payload_to_class_fn=ErrorResponse.from_payload,
+            operation_name='subscribe_to_delete_shadow_rejected')
 
     def subscribe_to_get_named_shadow_accepted(self, request, qos, callback):
         # type: (GetNamedShadowSubscriptionRequest, int, typing.Callable[[GetShadowResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -327,7 +336,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/get/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=GetShadowResponse.from_payload)
+            payload_to_class_fn=GetShadowResponse.from_payload,
+            operation_name='subscribe_to_get_named_shadow_accepted')
 
     def subscribe_to_get_named_shadow_rejected(self, request, qos, callback):
         # type: (GetNamedShadowSubscriptionRequest, int, typing.Callable[[ErrorResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -360,7 +370,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/get/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ErrorResponse.from_payload)
+            payload_to_class_fn=ErrorResponse.from_payload,
+            operation_name='subscribe_to_get_named_shadow_rejected')
 
     def subscribe_to_get_shadow_accepted(self, request, qos, callback):
         # type: (GetShadowSubscriptionRequest, int, typing.Callable[[GetShadowResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -393,7 +404,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/get/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=GetShadowResponse.from_payload)
+            payload_to_class_fn=GetShadowResponse.from_payload,
+            operation_name='subscribe_to_get_shadow_accepted')
 
     def subscribe_to_get_shadow_rejected(self, request, qos, callback):
         # type: (GetShadowSubscriptionRequest, int, typing.Callable[[ErrorResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -426,7 +438,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/get/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ErrorResponse.from_payload)
+            payload_to_class_fn=ErrorResponse.from_payload,
+            operation_name='subscribe_to_get_shadow_rejected')
 
     def subscribe_to_named_shadow_delta_updated_events(self, request, qos, callback):
         # type: (NamedShadowDeltaUpdatedSubscriptionRequest, int, typing.Callable[[ShadowDeltaUpdatedEvent], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -459,7 +472,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/delta'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ShadowDeltaUpdatedEvent.from_payload)
+            payload_to_class_fn=ShadowDeltaUpdatedEvent.from_payload,
+            operation_name='subscribe_to_named_shadow_delta_updated_events')
 
     def subscribe_to_named_shadow_updated_events(self, request, qos, callback):
         # type: (NamedShadowUpdatedSubscriptionRequest, int, typing.Callable[[ShadowUpdatedEvent], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -492,7 +506,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/documents'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ShadowUpdatedEvent.from_payload)
+            payload_to_class_fn=ShadowUpdatedEvent.from_payload,
+            operation_name='subscribe_to_named_shadow_updated_events')
 
     def subscribe_to_shadow_delta_updated_events(self, request, qos, callback):
         # type: (ShadowDeltaUpdatedSubscriptionRequest, int, typing.Callable[[ShadowDeltaUpdatedEvent], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -525,7 +540,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/update/delta'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ShadowDeltaUpdatedEvent.from_payload)
+            payload_to_class_fn=ShadowDeltaUpdatedEvent.from_payload,
+            operation_name='subscribe_to_shadow_delta_updated_events')
 
     def subscribe_to_shadow_updated_events(self, request, qos, callback):
         # type: (ShadowUpdatedSubscriptionRequest, int, typing.Callable[[ShadowUpdatedEvent], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -558,7 +574,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/update/documents'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ShadowUpdatedEvent.from_payload)
+            payload_to_class_fn=ShadowUpdatedEvent.from_payload,
+            operation_name='subscribe_to_shadow_updated_events')
 
     def subscribe_to_update_named_shadow_accepted(self, request, qos, callback):
         # type: (UpdateNamedShadowSubscriptionRequest, int, typing.Callable[[UpdateShadowResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -591,7 +608,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=UpdateShadowResponse.from_payload)
+            payload_to_class_fn=UpdateShadowResponse.from_payload,
+            operation_name='subscribe_to_update_named_shadow_accepted')
 
     def subscribe_to_update_named_shadow_rejected(self, request, qos, callback):
         # type: (UpdateNamedShadowSubscriptionRequest, int, typing.Callable[[ErrorResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -624,7 +642,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ErrorResponse.from_payload)
+            payload_to_class_fn=ErrorResponse.from_payload,
+            operation_name='subscribe_to_update_named_shadow_rejected')
 
     def subscribe_to_update_shadow_accepted(self, request, qos, callback):
         # type: (UpdateShadowSubscriptionRequest, int, typing.Callable[[UpdateShadowResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -657,7 +676,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/update/accepted'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=UpdateShadowResponse.from_payload)
+            payload_to_class_fn=UpdateShadowResponse.from_payload,
+            operation_name='subscribe_to_update_shadow_accepted')
 
     def subscribe_to_update_shadow_rejected(self, request, qos, callback):
         # type: (UpdateShadowSubscriptionRequest, int, typing.Callable[[ErrorResponse], None]) -> typing.Tuple[concurrent.futures.Future, str]
@@ -690,7 +710,8 @@ class IotShadowClient(awsiot.MqttServiceClient):
             topic='$aws/things/{0.thing_name}/shadow/update/rejected'.format(request),
             qos=qos,
             callback=callback,
-            payload_to_class_fn=ErrorResponse.from_payload)
+            payload_to_class_fn=ErrorResponse.from_payload,
+            operation_name='subscribe_to_update_shadow_rejected')
 
 class DeleteNamedShadowRequest(awsiot.ModeledClass):
     """
@@ -721,6 +742,10 @@ class DeleteNamedShadowRequest(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'shadow_name', 'thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -794,6 +819,10 @@ class DeleteShadowRequest(awsiot.ModeledClass):
         for key, val in zip(['thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -835,6 +864,12 @@ class DeleteShadowResponse(awsiot.ModeledClass):
         for key, val in zip(['timestamp', 'version'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('timestamp', 'timestamp', 'timestamp'),
+        ('version', 'version'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> DeleteShadowResponse
@@ -913,6 +948,13 @@ class ErrorResponse(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'code', 'message', 'timestamp'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('code', 'code'),
+        ('message', 'message'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> ErrorResponse
@@ -963,6 +1005,10 @@ class GetNamedShadowRequest(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'shadow_name', 'thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1036,6 +1082,10 @@ class GetShadowRequest(awsiot.ModeledClass):
         for key, val in zip(['thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1083,6 +1133,14 @@ class GetShadowResponse(awsiot.ModeledClass):
         for key, val in zip(['metadata', 'state', 'timestamp', 'version'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('metadata', 'metadata', 'shape', 'ShadowMetadata'),
+        ('state', 'state', 'shape', 'ShadowStateWithDelta'),
+        ('timestamp', 'timestamp', 'timestamp'),
+        ('version', 'version'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> GetShadowResponse
@@ -1161,6 +1219,8 @@ class NamedShadowDeltaUpdatedSubscriptionRequest(awsiot.ModeledClass):
         for key, val in zip(['shadow_name', 'thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = ()
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1199,6 +1259,8 @@ class NamedShadowUpdatedSubscriptionRequest(awsiot.ModeledClass):
         for key, val in zip(['shadow_name', 'thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = ()
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1246,6 +1308,14 @@ class ShadowDeltaUpdatedEvent(awsiot.ModeledClass):
         for key, val in zip(['metadata', 'state', 'timestamp', 'version'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('metadata', 'metadata'),
+        ('state', 'state'),
+        ('timestamp', 'timestamp', 'timestamp'),
+        ('version', 'version'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> ShadowDeltaUpdatedEvent
@@ -1293,6 +1363,8 @@ class ShadowDeltaUpdatedSubscriptionRequest(awsiot.ModeledClass):
         for key, val in zip(['thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = ()
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1329,6 +1401,11 @@ class ShadowMetadata(awsiot.ModeledClass):
         for key, val in zip(['desired', 'reported'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('desired', 'desired'),
+        ('reported', 'reported'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> ShadowMetadata
@@ -1377,6 +1454,11 @@ class ShadowState(awsiot.ModeledClass):
         for key, val in zip(['desired', 'reported'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('desired', 'desired', 'plain', None, True),
+        ('reported', 'reported', 'plain', None, True),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> ShadowState
@@ -1438,6 +1520,12 @@ class ShadowStateWithDelta(awsiot.ModeledClass):
         for key, val in zip(['delta', 'desired', 'reported'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('delta', 'delta'),
+        ('desired', 'desired'),
+        ('reported', 'reported'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> ShadowStateWithDelta
@@ -1485,6 +1573,12 @@ class ShadowUpdatedEvent(awsiot.ModeledClass):
         for key, val in zip(['current', 'previous', 'timestamp'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('current', 'current', 'shape', 'ShadowUpdatedSnapshot'),
+        ('previous', 'previous', 'shape', 'ShadowUpdatedSnapshot'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> ShadowUpdatedEvent
@@ -1532,6 +1626,12 @@ class ShadowUpdatedSnapshot(awsiot.ModeledClass):
         for key, val in zip(['metadata', 'state', 'version'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('metadata', 'metadata', 'shape', 'ShadowMetadata'),
+        ('state', 'state', 'shape', 'ShadowState'),
+        ('version', 'version'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> ShadowUpdatedSnapshot
@@ -1573,6 +1673,8 @@ class ShadowUpdatedSubscriptionRequest(awsiot.ModeledClass):
         for key, val in zip(['thing_name'], args):
             setattr(self, key, val)
 
+    _payload_fields = ()
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1618,6 +1720,12 @@ class UpdateNamedShadowRequest(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'shadow_name', 'state', 'thing_name', 'version'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('state', 'state', 'shape', 'ShadowState'),
+        ('version', 'version'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1701,6 +1809,12 @@ class UpdateShadowRequest(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'state', 'thing_name', 'version'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('state', 'state', 'shape', 'ShadowState'),
+        ('version', 'version'),
+    )
+
     def to_payload(self):
         # type: () -> typing.Dict[str, typing.Any]
         payload = {} # type: typing.Dict[str, typing.Any]
@@ -1752,6 +1866,14 @@ class UpdateShadowResponse(awsiot.ModeledClass):
         for key, val in zip(['client_token', 'metadata', 'state', 'timestamp', 'version'], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('metadata', 'metadata', 'shape', 'ShadowMetadata'),
+        ('state', 'state', 'shape', 'ShadowState'),
+        ('timestamp', 'timestamp', 'timestamp'),
+        ('version', 'version'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> UpdateShadowResponse
@@ -1836,6 +1958,13 @@ class V2ErrorResponse(awsiot.ModeledClass):
         for key, val in zip([], args):
             setattr(self, key, val)
 
+    _payload_fields = (
+        ('client_token', 'clientToken'),
+        ('code', 'code'),
+        ('message', 'message'),
+        ('timestamp', 'timestamp', 'timestamp'),
+    )
+
     @classmethod
     def from_payload(cls, payload):
         # type: (typing.Dict[str, typing.Any]) -> V2ErrorResponse
@@ -1866,8 +1995,27 @@ class IotShadowClientV2:
 
     """
 
-    def __init__(self, protocol_client: awscrt.mqtt.Connection or awscrt.mqtt5.Client, options: awscrt.mqtt_request_response.ClientOptions):
+    def __init__(self, protocol_client: awscrt.mqtt.Connection or awscrt.mqtt5.Client, options: awscrt.mqtt_request_response.ClientOptions, json_codec: typing.Optional[awsiot.JsonCodec] = None, lazy_deserialization: bool = False, request_scheduler: 'typing.Optional[awsiot.scheduler.SchedulerLane]' = None):
         self._rr_client = awscrt.mqtt_request_response.Client(protocol_client, options)
+        if request_scheduler is not None:
+            self._rr_client = request_scheduler.wrap(self._rr_client)
+        self._json_codec = json_codec if json_codec is not None else awsiot.get_default_json_codec()
+        self._lazy_deserialization = lazy_deserialization
+
+    @property
+    def json_codec(self) -> awsiot.JsonCodec:
+        """
+        Codec used to encode and decode message payloads
+        """
+        return self._json_codec
+
+    @property
+    def request_response_client(self) -> awscrt.mqtt_request_response.Client:
+        """
+        Request-response client that requests are made and streams are opened with.
+        If a request scheduler was given, this is the scheduler's wrapper around it.
+        """
+        return self._rr_client
 
     def delete_named_shadow(self, request : DeleteNamedShadowRequest) -> concurrent.futures.Future :
         """
@@ -1885,37 +2033,28 @@ class IotShadowClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/delete'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/delete/+'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/delete',
+            (
+                '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/delete/+',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "delete_named_shadow", accepted_topic, DeleteShadowResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "delete_named_shadow", topics.accepted_topic, DeleteShadowResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def delete_shadow(self, request : DeleteShadowRequest) -> concurrent.futures.Future :
         """
@@ -1933,37 +2072,28 @@ class IotShadowClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/shadow/delete'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/shadow/delete/+'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/shadow/delete',
+            (
+                '$aws/things/{0.thing_name}/shadow/delete/+',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "delete_shadow", accepted_topic, DeleteShadowResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "delete_shadow", topics.accepted_topic, DeleteShadowResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def get_named_shadow(self, request : GetNamedShadowRequest) -> concurrent.futures.Future :
         """
@@ -1981,37 +2111,28 @@ class IotShadowClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/get'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/get/+'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/get',
+            (
+                '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/get/+',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "get_named_shadow", accepted_topic, GetShadowResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "get_named_shadow", topics.accepted_topic, GetShadowResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def get_shadow(self, request : GetShadowRequest) -> concurrent.futures.Future :
         """
@@ -2029,37 +2150,28 @@ class IotShadowClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/shadow/get'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/shadow/get/+'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/shadow/get',
+            (
+                '$aws/things/{0.thing_name}/shadow/get/+',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "get_shadow", accepted_topic, GetShadowResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "get_shadow", topics.accepted_topic, GetShadowResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def update_named_shadow(self, request : UpdateNamedShadowRequest) -> concurrent.futures.Future :
         """
@@ -2077,39 +2189,29 @@ class IotShadowClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/accepted'.format(request);
-        subscription1 = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/rejected'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update',
+            (
+                '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/accepted',
+                '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/rejected',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-                subscription1,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "update_named_shadow", accepted_topic, UpdateShadowResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "update_named_shadow", topics.accepted_topic, UpdateShadowResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def update_shadow(self, request : UpdateShadowRequest) -> concurrent.futures.Future :
         """
@@ -2127,39 +2229,29 @@ class IotShadowClientV2:
         """
         request._validate()
 
-        publish_topic = '$aws/things/{0.thing_name}/shadow/update'.format(request)
-        accepted_topic = publish_topic + "/accepted";
-        rejected_topic = publish_topic + "/rejected";
-
-        subscription0 = '$aws/things/{0.thing_name}/shadow/update/accepted'.format(request);
-        subscription1 = '$aws/things/{0.thing_name}/shadow/update/rejected'.format(request);
+        topics = awsiot.get_v2_request_topics(
+            '$aws/things/{0.thing_name}/shadow/update',
+            (
+                '$aws/things/{0.thing_name}/shadow/update/accepted',
+                '$aws/things/{0.thing_name}/shadow/update/rejected',
+            ),
+            "clientToken",
+            request)
 
         correlation_token = str(uuid.uuid4())
         request.client_token = correlation_token
 
         request_options = awscrt.mqtt_request_response.RequestOptions(
-            subscription_topic_filters = [
-                subscription0,
-                subscription1,
-            ],
-            response_paths = [
-                awscrt.mqtt_request_response.ResponsePath(
-                    accepted_topic,
-                    "clientToken"
-                ),
-                awscrt.mqtt_request_response.ResponsePath(
-                    rejected_topic,
-                    "clientToken"
-                )
-            ],
-            publish_topic = publish_topic,
-            payload = json.dumps(request.to_payload()).encode(),
+            subscription_topic_filters = topics.subscription_topic_filters,
+            response_paths = topics.response_paths,
+            publish_topic = topics.publish_topic,
+            payload = self._json_codec.encode(request.to_payload()),
             correlation_token = correlation_token,
         )
 
         internal_unmodeled_future = self._rr_client.make_request(request_options)
 
-        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "update_shadow", accepted_topic, UpdateShadowResponse, V2ErrorResponse)
+        return awsiot.create_v2_service_modeled_future(internal_unmodeled_future, "update_shadow", topics.accepted_topic, UpdateShadowResponse, V2ErrorResponse, self._json_codec, self._lazy_deserialization)
 
     def create_named_shadow_delta_updated_stream(self, request : NamedShadowDeltaUpdatedSubscriptionRequest, options: awsiot.ServiceStreamOptions[ShadowDeltaUpdatedEvent]):
         """
@@ -2180,7 +2272,7 @@ class IotShadowClientV2:
 
         subscription_topic_filter = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/delta'.format(request)
 
-        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "ShadowDeltaUpdatedEvent", ShadowDeltaUpdatedEvent)
+        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "ShadowDeltaUpdatedEvent", ShadowDeltaUpdatedEvent, self._json_codec, self._lazy_deserialization)
 
         return self._rr_client.create_stream(unmodeled_options)
 
@@ -2203,7 +2295,7 @@ class IotShadowClientV2:
 
         subscription_topic_filter = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/update/documents'.format(request)
 
-        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "ShadowUpdatedEvent", ShadowUpdatedEvent)
+        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "ShadowUpdatedEvent", ShadowUpdatedEvent, self._json_codec, self._lazy_deserialization)
 
         return self._rr_client.create_stream(unmodeled_options)
 
@@ -2226,7 +2318,7 @@ class IotShadowClientV2:
 
         subscription_topic_filter = '$aws/things/{0.thing_name}/shadow/update/delta'.format(request)
 
-        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "ShadowDeltaUpdatedEvent", ShadowDeltaUpdatedEvent)
+        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "ShadowDeltaUpdatedEvent", ShadowDeltaUpdatedEvent, self._json_codec, self._lazy_deserialization)
 
         return self._rr_client.create_stream(unmodeled_options)
 
@@ -2249,7 +2341,7 @@ class IotShadowClientV2:
 
         subscription_topic_filter = '$aws/things/{0.thing_name}/shadow/update/documents'.format(request)
 
-        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "ShadowUpdatedEvent", ShadowUpdatedEvent)
+        unmodeled_options = awsiot.create_streaming_unmodeled_options(options, subscription_topic_filter, "ShadowUpdatedEvent", ShadowUpdatedEvent, self._json_codec, self._lazy_deserialization)
 
         return self._rr_client.create_stream(unmodeled_options)
 
@@ -0,0 +1,497 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Large job documents, kept out of memory until they are needed, and the
+artifacts they reference, downloaded in chunks.
+"""
+
+import awsiot
+from awsiot import BytesLike, JsonCodec
+from collections.abc import Mapping
+import hashlib
+import http.client
+import io
+import json
+import logging
+import mmap
+import os
+import re
+import tempfile
+import time
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import urllib.error
+import urllib.request
+
+__all__ = [
+    'JobDocument',
+    'JobDocumentCodec',
+    'artifact_urls',
+    'download_artifact',
+]
+
+logger = logging.getLogger(__name__)
+
+# Documents at least this many bytes long are spilled to a temporary file by default
+DEFAULT_SPILL_THRESHOLD = 16 * 1024
+
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(rb'[^,\]}\s]+')
+_STRUCTURE = re.compile(rb'["\[\]{}]')
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-\d+/(\d+|\*)')
+_UNSATISFIED_RANGE = re.compile(r'bytes \*/(\d+)')
+
+
+def _skip_whitespace(buffer, index: int) -> int:
+    return _WHITESPACE.match(buffer, index).end()
+
+
+def _value_end(buffer, index: int) -> int:
+    """Returns the index just past the JSON value that starts at `index`"""
+    first = buffer[index:index + 1]
+    if first == b'"':
+        match = _STRING.match(buffer, index)
+        if match is None:
+            raise ValueError("unterminated string at {}".format(index))
+        return match.end()
+    if first == b'{' or first == b'[':
+        depth = 0
+        position = index
+        while True:
+            match = _STRUCTURE.search(buffer, position)
+            if match is None:
+                raise ValueError("unterminated value at {}".format(index))
+            char = match.group()
+            if char == b'"':
+                match = _STRING.match(buffer, match.start())
+                if match is None:
+                    raise ValueError("unterminated string in value at {}".format(index))
+            elif char == b'{' or char == b'[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+            position = match.end()
+    match = _SCALAR.match(buffer, index)
+    if match is None:
+        raise ValueError("expected a value at {}".format(index))
+    return match.end()
+
+
+def _members(buffer, index: int = 0) -> Iterator[Tuple[str, int, int]]:
+    """Yields the key, and the start and end of the value, of each member of the object at `index`"""
+    index = _skip_whitespace(buffer, index)
+    if buffer[index:index + 1] != b'{':
+        raise ValueError("expected an object at {}".format(index))
+    index = _skip_whitespace(buffer, index + 1)
+    if buffer[index:index + 1] == b'}':
+        return
+    while True:
+        match = _STRING.match(buffer, index)
+        if match is None:
+            raise ValueError("expected a key at {}".format(index))
+        raw_key = buffer[match.start() + 1:match.end() - 1]
+        key = raw_key.decode() if b'\\' not in raw_key else json.loads(buffer[match.start():match.end()])
+        index = _skip_whitespace(buffer, match.end())
+        if buffer[index:index + 1] != b':':
+            raise ValueError("expected ':' at {}".format(index))
+        start = _skip_whitespace(buffer, index + 1)
+        end = _value_end(buffer, start)
+        yield key, start, end
+        index = _skip_whitespace(buffer, end)
+        separator = buffer[index:index + 1]
+        if separator == b'}':
+            return
+        if separator != b',':
+            raise ValueError("expected ',' or '}}' at {}".format(index))
+        index = _skip_whitespace(buffer, index + 1)
+
+
+class JobDocument(Mapping):
+    """
+    A JSON object kept as its UTF-8 text, and parsed a member at a time.
+
+    Looking up a key finds the member by scanning the text, and parses
+    only its value. Iterating yields the keys without parsing any values.
+    Nothing is cached, so each lookup parses the value anew: keep the
+    result rather than looking it up again in a loop.
+
+    Documents of at least `spill_threshold` bytes are written to an
+    anonymous temporary file and read through a memory map, so their
+    pages can be dropped by the OS when memory is short. Smaller ones are
+    kept as bytes.
+
+    A JobDocument compares equal to a dict with the same content. Call
+    :meth:`load` for a plain dict, for example to serialize it again.
+
+    Args:
+        data: UTF-8 encoded JSON object.
+        spill_threshold: Size in bytes from which the document is spilled to a file.
+        directory: Directory for the temporary file, or None for the system default.
+        json_codec: Codec to parse values with. Defaults to :func:`~awsiot.get_default_json_codec()`.
+
+    Raises:
+        ValueError: if `data` is not a JSON object
+    """
+
+    def __init__(self, data: BytesLike, *,
+                 spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+                 directory: Optional[str] = None,
+                 json_codec: Optional[JsonCodec] = None):
+        self._json_codec = json_codec if json_codec is not None else awsiot.get_default_json_codec()
+        self._size = len(data)
+        self._file = None  # type: Optional[BinaryIO]
+        start = _skip_whitespace(data, 0)
+        if data[start:start + 1] != b'{':
+            raise ValueError("job document is not a JSON object")
+
+        if self._size and self._size >= spill_threshold:
+            self._file = tempfile.TemporaryFile(dir=directory)
+            try:
+                self._file.write(data)
+                self._file.flush()
+                self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except BaseException:
+                self._file.close()
+                raise
+        else:
+            self._buffer = bytes(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return '{}.{}(size={}, spilled={})'.format(
+            self.__class__.__module__, self.__class__.__name__, self._size, self.spilled)
+
+    @property
+    def size(self) -> int:
+        """Size of the document in bytes"""
+        return self._size
+
+    @property
+    def spilled(self) -> bool:
+        """True if the document is kept in a temporary file"""
+        return self._file is not None
+
+    def __getitem__(self, key: str) -> Any:
+        for member_key, start, end in _members(self._buffer):
+            if member_key == key:
+                return self._json_codec.decode(self._buffer[start:end])
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key, _, _ in _members(self._buffer):
+            yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in _members(self._buffer))
+
+    def items(self):
+        """Yields each key and its parsed value, one member at a time"""
+        decode = self._json_codec.decode
+        for key, start, end in _members(self._buffer):
+            yield key, decode(self._buffer[start:end])
+
+    def open(self) -> BinaryIO:
+        """
+        Returns a binary file object that reads the document's JSON text,
+        for example to hand to an incremental parser.
+        """
+        if self._file is not None:
+            return io.BufferedReader(_MappedReader(self._buffer))
+        return io.BytesIO(self._buffer)
+
+    def read(self) -> bytes:
+        """Returns the document's JSON text"""
+        return bytes(self._buffer[:])
+
+    def load(self) -> Dict[str, Any]:
+        """Parses the whole document, and returns it as a dict"""
+        return self._json_codec.decode(self._buffer[:])
+
+    def close(self):
+        """
+        Releases the temporary file, if there is one. The document may not be used afterwards.
+        """
+        if self._file is not None:
+            self._buffer.close()
+            self._file.close()
+
+
+class _MappedReader(io.RawIOBase):
+    """Reads a memory map like a file, without copying it"""
+
+    def __init__(self, buffer: mmap.mmap):
+        self._buffer = buffer
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        chunk = self._buffer[self._position:self._position + len(b)]
+        b[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+
+class JobDocumentCodec(JsonCodec):
+    """
+    Codec for jobs clients that keeps job documents out of the parsed payload.
+
+    When a payload is decoded, the `jobDocument` members in it, at its top
+    level or inside a top-level object such as `execution`, are cut out of
+    the JSON text before it is parsed. Each becomes a :class:`JobDocument`,
+    which ends up as the `job_document` of the response or event. The rest
+    of the payload is parsed by `json_codec` as usual.
+
+    Pass one as the `json_codec` of an :class:`~awsiot.iotjobs.IotJobsClientV2`
+    or :class:`~awsiot.iotjobs.IotJobsClient`. Several large executions
+    handled at once then hold their documents as compact text, or on disk,
+    instead of as dicts.
+
+    Args:
+        json_codec: Codec for everything else. Defaults to :func:`~awsiot.get_default_json_codec()`.
+        spill_threshold: Size in bytes from which a document is spilled to a temporary file.
+        directory: Directory for the temporary files, or None for the system default.
+        fields: Names of the members to keep as :class:`JobDocument`. Members
+            that are not JSON objects are parsed as usual.
+    """
+
+    def __init__(self, json_codec: Optional[JsonCodec] = None, *,
+                 spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+                 directory: Optional[str] = None,
+                 fields: Sequence[str] = ('jobDocument',)):
+        self._json_codec = json_codec if json_codec is not None else awsiot.get_default_json_codec()
+        self._spill_threshold = spill_threshold
+        self._directory = directory
+        self._fields = frozenset(fields)
+        self.name = self._json_codec.name
+
+    def encode(self, obj: Any) -> bytes:
+        return self._json_codec.encode(obj)
+
+    def decode(self, data: BytesLike) -> Any:
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        try:
+            spans = self._find_documents(data)
+        except ValueError:
+            # let the codec report what is wrong with the payload
+            return self._json_codec.decode(data)
+        if not spans:
+            return self._json_codec.decode(data)
+
+        pieces = []
+        documents = []
+        position = 0
+        for path, start, end in spans:
+            pieces.append(data[position:start])
+            pieces.append(b'null')
+            position = end
+            documents.append((path, JobDocument(
+                data[start:end], spill_threshold=self._spill_threshold,
+                directory=self._directory, json_codec=self._json_codec)))
+        pieces.append(data[position:])
+        payload = self._json_codec.decode(b''.join(pieces))
+
+        for path, document in documents:
+            parent = payload
+            for key in path[:-1]:
+                parent = parent[key]
+            parent[path[-1]] = document
+        return payload
+
+    def _find_documents(self, data: bytes) -> List[Tuple[Tuple[str, ...], int, int]]:
+        spans = []
+        for key, start, end in _members(data):
+            first = data[start:start + 1]
+            if first != b'{':
+                continue
+            if key in self._fields:
+                spans.append(((key,), start, end))
+                continue
+            for inner_key, inner_start, inner_end in _members(data, start):
+                if inner_key in self._fields and data[inner_start:inner_start + 1] == b'{':
+                    spans.append(((key, inner_key), inner_start, inner_end))
+        return spans
+
+
+def artifact_urls(document: Mapping, schemes: Sequence[str] = ('https',)) -> List[Tuple[str, str]]:
+    """
+    Finds the URLs in a job document, such as the presigned URLs that AWS IoT
+    puts in place of `${aws:iot:s3-presigned-url:...}` placeholders.
+
+    Args:
+        document: The job document, as a dict or a :class:`JobDocument`.
+        schemes: URL schemes to look for.
+
+    Returns:
+        `(path, url)` of each string value that is a URL, where `path`
+        locates the value, such as `"files[0].url"`.
+    """
+    prefixes = tuple(scheme + '://' for scheme in schemes)
+    found = []  # type: List[Tuple[str, str]]
+
+    def visit(value, path):
+        if isinstance(value, str):
+            if value.startswith(prefixes):
+                found.append((path, value))
+        elif isinstance(value, Mapping):
+            for key, member in value.items():
+                visit(member, '{}.{}'.format(path, key) if path else key)
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                visit(item, '{}[{}]'.format(path, i))
+
+    visit(document, '')
+    return found
+
+
+class _IncompleteDownload(Exception):
+    pass
+
+
+def download_artifact(url: str, path: str, *,
+                      sha256: Optional[str] = None,
+                      headers: Optional[Dict[str, str]] = None,
+                      chunk_size: int = 64 * 1024,
+                      timeout: float = 30.0,
+                      max_attempts: int = 5,
+                      retry_delay: float = 1.0,
+                      on_progress: Optional[Callable[[int, Optional[int]], None]] = None) -> int:
+    """
+    Downloads a job's artifact to a file, a chunk at a time, resuming where
+    an interrupted download stopped.
+
+    Data is written to `path` + ".part", which is renamed to `path` once
+    the download is complete. If that file already exists, because an
+    earlier call was interrupted, or when an attempt fails part way, only
+    the missing bytes are requested, with an HTTP Range request. If the
+    server ignores the range, the file is written again from the start.
+
+    An attempt that fails with a network error, an HTTP 5xx, 408 or 429
+    status, or a response cut short, is retried after `retry_delay`
+    seconds, doubling each time. The count of attempts starts over
+    whenever an attempt makes progress.
+
+    Args:
+        url: URL of the artifact, such as a presigned S3 URL.
+        path: File to write the artifact to.
+        sha256: If given, the hex SHA-256 digest the artifact must have.
+        headers: Extra HTTP request headers.
+        chunk_size: Bytes to read and write at a time.
+        timeout: Seconds to wait for the server at each step.
+        max_attempts: Attempts in a row without progress before giving up.
+        retry_delay: Seconds to wait before the first retry.
+        on_progress: Called after each chunk with the bytes written so far,
+            and the size of the artifact, or None if the server did not say.
+
+    Returns:
+        Size of the artifact in bytes.
+
+    Raises:
+        urllib.error.HTTPError: if the server refuses the request
+        urllib.error.URLError: if the server cannot be reached after `max_attempts` attempts
+        ValueError: if the artifact does not have the expected `sha256` digest.
+            The partial file is removed.
+    """
+    part_path = path + '.part'
+    failures = 0
+    while True:
+        try:
+            size = _download_attempt(url, part_path, headers, chunk_size, timeout, on_progress)
+            break
+        except urllib.error.HTTPError as e:
+            if e.code < 500 and e.code not in (408, 429):
+                raise
+            error = e  # type: Exception
+        except (urllib.error.URLError, OSError, http.client.HTTPException, _IncompleteDownload) as e:
+            error = e
+        progressed = getattr(error, 'progressed', False)
+        failures = 1 if progressed else failures + 1
+        if failures >= max_attempts:
+            raise error
+        delay = retry_delay * 2 ** (failures - 1)
+        logger.info("artifact download from %s failed, retrying in %.1fs: %r", url, delay, error)
+        time.sleep(delay)
+
+    if sha256 is not None:
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != sha256.lower():
+            os.remove(part_path)
+            raise ValueError("artifact from {} has SHA-256 {}, expected {}".format(url, digest.hexdigest(), sha256))
+    os.replace(part_path, path)
+    return size
+
+
+def _download_attempt(url: str, part_path: str, headers: Optional[Dict[str, str]], chunk_size: int,
+                      timeout: float, on_progress: Optional[Callable[[int, Optional[int]], None]]) -> int:
+    """Continues the download into `part_path`, and returns the artifact's size once it is complete"""
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    request = urllib.request.Request(url, headers=dict(headers or {}))
+    if offset:
+        request.add_header('Range', 'bytes={}-'.format(offset))
+
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and offset:
+            match = _UNSATISFIED_RANGE.match(e.headers.get('Content-Range', ''))
+            if match is not None and int(match.group(1)) == offset:
+                # the earlier attempt got all of it
+                return offset
+            # the artifact is not the one partly downloaded, start over
+            os.remove(part_path)
+            error = _IncompleteDownload("range of a different artifact requested")
+            error.progressed = True
+            raise error
+        raise
+
+    with response:
+        total = None  # type: Optional[int]
+        if response.status == 206:
+            match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+            if match is None or int(match.group(1)) > offset:
+                raise _IncompleteDownload("unexpected Content-Range {!r}".format(response.headers.get('Content-Range')))
+            offset = int(match.group(1))
+            if match.group(2) != '*':
+                total = int(match.group(2))
+            mode = 'r+b'
+        else:
+            offset = 0
+            length = response.headers.get('Content-Length')
+            total = int(length) if length is not None else None
+            mode = 'wb'
+
+        start = offset
+        with open(part_path, mode) as f:
+            f.seek(offset)
+            f.truncate()
+            try:
+                while True:
+                    chunk = response.read(chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    offset += len(chunk)
+                    if on_progress is not None:
+                        on_progress(offset, total)
+            except (OSError, http.client.HTTPException) as e:
+                e.progressed = offset > start
+                raise
+
+    if total is not None and offset < total:
+        error = _IncompleteDownload("received {} of {} bytes".format(offset, total))
+        error.progressed = offset > start
+        raise error
+    return offset
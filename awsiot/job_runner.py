@@ -0,0 +1,571 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Runs the jobs of a thing, several at a time.
+"""
+
+import awsiot
+from awsiot import iotjobs
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import tempfile
+from threading import Condition, Event, Lock, Thread
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+__all__ = [
+    'CheckpointStore',
+    'FileCheckpointStore',
+    'JobContext',
+    'JobFailure',
+    'JobRunner',
+]
+
+logger = logging.getLogger(__name__)
+
+# Statuses in which a job execution may still be run
+_PENDING_STATUSES = (iotjobs.JobStatus.QUEUED, iotjobs.JobStatus.IN_PROGRESS)
+
+
+class CheckpointStore:
+    """
+    Keeps the checkpoints that running jobs save, so a :class:`JobRunner`
+    can hand them back when it resumes a job.
+
+    This base class keeps them in memory, which only covers a job resumed by
+    the same process. :class:`FileCheckpointStore` keeps them across restarts.
+    Subclass this to keep them anywhere else.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._checkpoints = {}  # type: Dict[str, Tuple[Optional[int], Any]]
+
+    def load(self, job_id: str) -> Optional[Tuple[Optional[int], Any]]:
+        """
+        Returns the `(execution_number, data)` last saved for a job, or None if there is none.
+        """
+        with self._lock:
+            return self._checkpoints.get(job_id)
+
+    def save(self, job_id: str, execution_number: Optional[int], data: Any):
+        """
+        Replaces the checkpoint of a job.
+
+        Args:
+            job_id: Job the checkpoint belongs to.
+            execution_number: Execution of the job the checkpoint belongs to.
+            data: Checkpoint to save. It should be JSON serializable.
+        """
+        with self._lock:
+            self._checkpoints[job_id] = (execution_number, data)
+
+    def delete(self, job_id: str):
+        """
+        Removes the checkpoint of a job, if it has one.
+        """
+        with self._lock:
+            self._checkpoints.pop(job_id, None)
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Keeps each job's checkpoint as a JSON file in a directory.
+
+    A checkpoint is written to a temporary file that then replaces the old
+    one, so a crash while saving leaves the previous checkpoint in place.
+
+    Args:
+        directory: Directory to keep the files in. It is created if missing.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self._directory, quote(job_id, safe='') + '.json')
+
+    def load(self, job_id: str) -> Optional[Tuple[Optional[int], Any]]:
+        try:
+            with open(self._path(job_id), 'rb') as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning("ignoring unreadable checkpoint of job %s", job_id)
+            return None
+        return record.get('executionNumber'), record.get('data')
+
+    def save(self, job_id: str, execution_number: Optional[int], data: Any):
+        record = json.dumps({'executionNumber': execution_number, 'data': data}).encode()
+        fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self._path(job_id))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def delete(self, job_id: str):
+        try:
+            os.remove(self._path(job_id))
+        except FileNotFoundError:
+            pass
+
+
+class JobFailure(Exception):
+    """
+    Raised by a job handler to end its job as FAILED, or as REJECTED,
+    with particular status details.
+
+    Args:
+        message: Why the job failed. Reported as the `reason` status detail
+            unless `status_details` is given.
+        status_details: Status details to report.
+        rejected: If True, the job ends as REJECTED instead of FAILED.
+    """
+
+    def __init__(self, message: str, status_details: Optional[Dict[str, str]] = None, rejected: bool = False):
+        super().__init__(message)
+        self.status_details = status_details
+        self.rejected = rejected
+
+
+class JobContext:
+    """
+    A job execution run by a :class:`JobRunner`, as its handler sees it.
+
+    Attributes:
+        thing_name (str): Thing the job runs on.
+        job_id (str): Job being run.
+        execution_number (Optional[int]): Execution of the job being run.
+        job_document (Dict[str, Any]): The job document.
+        status_details (Dict[str, str]): Status details of the execution when it was started.
+        checkpoint (Any): Checkpoint saved by an earlier run of this execution, or None.
+        resumed (bool): True if the execution was already in progress when the runner picked it up.
+    """
+
+    def __init__(self, runner: 'JobRunner', execution: iotjobs.JobExecutionData, checkpoint: Any, resumed: bool):
+        self.thing_name = runner.thing_name
+        self.job_id = execution.job_id
+        self.execution_number = execution.execution_number
+        self.job_document = execution.job_document if execution.job_document is not None else {}
+        self.status_details = dict(execution.status_details or {})
+        self.checkpoint = checkpoint
+        self.resumed = resumed
+
+        self._runner = runner
+        # serializes the execution's updates, each of which expects the version the last one produced
+        self._update_lock = Lock()
+        self._version = execution.version_number
+        # True if the service may have applied an update whose response never arrived
+        self._unacknowledged = False
+        self._last_update = time.monotonic()
+        self._cancelled = Event()
+
+    def __repr__(self):
+        return 'JobContext(job_id={!r}, execution_number={!r})'.format(self.job_id, self.execution_number)
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        True once the execution is no longer this device's to run, because
+        it was canceled, removed or timed out, or changed by someone else.
+        Handlers of long jobs should check it, and stop early when it is set.
+        """
+        return self._cancelled.is_set()
+
+    def save_checkpoint(self, data: Any):
+        """
+        Saves how far the job has got. If the job is interrupted, for example
+        by a restart, the handler that resumes it finds `data` in :attr:`checkpoint`.
+
+        Args:
+            data: Checkpoint to save. It should be JSON serializable.
+        """
+        self._runner._checkpoint_store.save(self.job_id, self.execution_number, data)
+
+    def report_progress(self, status_details: Optional[Dict[str, str]] = None):
+        """
+        Sends an IN_PROGRESS update for the execution now, which also
+        restarts its step timeout.
+
+        Args:
+            status_details: Status details to report, or None to keep the current ones.
+
+        Raises:
+            awsiot.V2ServiceException: if the service rejects the update
+            RuntimeError: if the job has been cancelled
+        """
+        self._runner._update(self, iotjobs.JobStatus.IN_PROGRESS, status_details)
+
+
+JobHandler = Callable[[JobContext], Optional[Dict[str, str]]]
+
+
+class JobRunner:
+    """
+    Runs the jobs of a thing through an :class:`~awsiot.iotjobs.IotJobsClientV2`,
+    up to `max_concurrent_jobs` at once.
+
+    After :meth:`start`, the runner follows the thing's JobExecutionsChanged
+    and NextJobExecutionChanged events. Whenever they report a change, it
+    lists the pending executions and starts any it has room for. Each one
+    runs on a thread of its own:
+
+    1. The runner fetches the job document, and marks the execution
+       IN_PROGRESS, giving the version it just read as `expected_version`.
+       If the execution changed in the meantime, the service refuses the
+       update and the runner skips the job.
+    2. It calls `handler` with a :class:`JobContext`.
+    3. When the handler returns, the execution is marked SUCCEEDED with the
+       status details the handler returned, if any. If the handler raises,
+       the execution is marked FAILED, or as :class:`JobFailure` says.
+
+    Every update of an execution carries the version the previous one
+    produced, so an execution changed elsewhere is never overwritten. Such
+    a job is marked as :attr:`JobContext.cancelled`, as are jobs that are
+    canceled or removed while they run.
+
+    If `step_timeout_in_minutes` is set, each update gives the job that long
+    to reach its next step, and a background thread sends IN_PROGRESS
+    heartbeats every `heartbeat_interval` seconds, half the step timeout by
+    default, while the handler runs.
+
+    Executions that are already IN_PROGRESS when the runner lists them,
+    such as the ones a previous run of the program was running when it
+    stopped, are resumed: the handler is called again, and finds the last
+    checkpoint the job saved through :meth:`JobContext.save_checkpoint`.
+    Pass a :class:`FileCheckpointStore` to keep checkpoints across restarts.
+
+    This class is thread-safe. It may be used as a context manager, which
+    calls :meth:`start` on entry and :meth:`close` on exit.
+
+    Args:
+        jobs_client: Client to send requests and open streams with.
+        thing_name: Thing whose jobs are run.
+        handler: Called to run each job. It may return status details to report on success.
+        max_concurrent_jobs: Number of jobs that may run at once.
+        step_timeout_in_minutes: Step timeout to set with each update, or None to set none.
+        heartbeat_interval: Seconds between heartbeats of a running job.
+            Defaults to half the step timeout, or no heartbeats if there is none.
+        checkpoint_store: Where jobs save their checkpoints. Defaults to an in-memory :class:`CheckpointStore`.
+        request_timeout: Seconds to wait for each response from the service.
+    """
+
+    def __init__(self, jobs_client: iotjobs.IotJobsClientV2, thing_name: str, handler: JobHandler, *,
+                 max_concurrent_jobs: int = 4,
+                 step_timeout_in_minutes: Optional[int] = None,
+                 heartbeat_interval: Optional[float] = None,
+                 checkpoint_store: Optional[CheckpointStore] = None,
+                 request_timeout: float = 30.0):
+        if max_concurrent_jobs < 1:
+            raise ValueError("max_concurrent_jobs must be at least 1")
+        if heartbeat_interval is None and step_timeout_in_minutes is not None:
+            heartbeat_interval = step_timeout_in_minutes * 60 / 2
+        if heartbeat_interval is not None and heartbeat_interval <= 0:
+            raise ValueError("heartbeat_interval must be positive")
+
+        self.thing_name = thing_name
+        self._jobs_client = jobs_client
+        self._handler = handler
+        self._max_concurrent_jobs = max_concurrent_jobs
+        self._step_timeout_in_minutes = step_timeout_in_minutes
+        self._heartbeat_interval = heartbeat_interval
+        self._checkpoint_store = checkpoint_store if checkpoint_store is not None else CheckpointStore()
+        self._request_timeout = request_timeout
+
+        self._lock = Lock()
+        self._heartbeat_due = Condition(self._lock)
+        # job ID -> its context, or None while the job is being started
+        self._running = {}  # type: Dict[str, Optional[JobContext]]
+        # (job ID, resumed) of pending executions waiting for room, in the order the service listed them
+        self._backlog = deque()  # type: Deque[Tuple[str, bool]]
+        self._polling = False
+        self._repoll = False
+        self._started = False
+        self._closed = False
+        self._streams = []  # type: list
+        self._executor = ThreadPoolExecutor(max_concurrent_jobs, thread_name_prefix='JobRunner')
+        self._heartbeat_thread = None  # type: Optional[Thread]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def running(self) -> List[str]:
+        """IDs of the jobs being run"""
+        with self._lock:
+            return list(self._running)
+
+    def start(self):
+        """
+        Opens the event streams, and starts the pending jobs.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("JobRunner is closed")
+            if self._started:
+                return
+            self._started = True
+            if self._heartbeat_interval is not None:
+                self._heartbeat_thread = Thread(target=self._run_heartbeats, name='JobRunnerHeartbeat', daemon=True)
+                self._heartbeat_thread.start()
+
+        client = self._jobs_client
+        streams = (
+            (client.create_job_executions_changed_stream,
+             iotjobs.JobExecutionsChangedSubscriptionRequest(thing_name=self.thing_name),
+             self._on_job_executions_changed),
+            (client.create_next_job_execution_changed_stream,
+             iotjobs.NextJobExecutionChangedSubscriptionRequest(thing_name=self.thing_name),
+             lambda event: self.poll()),
+        )
+        for create_stream, request, listener in streams:
+            stream = create_stream(request, awsiot.ServiceStreamOptions(incoming_event_listener=listener))
+            stream.open()
+            with self._lock:
+                self._streams.append(stream)
+        self.poll()
+
+    def poll(self):
+        """
+        Lists the pending executions now, and starts any there is room for.
+        The runner does this by itself whenever the service reports a change.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            if self._polling:
+                # ask again once the current answer is in, since it may predate the change
+                self._repoll = True
+                return
+            self._polling = True
+
+        try:
+            future = self._jobs_client.get_pending_job_executions(
+                iotjobs.GetPendingJobExecutionsRequest(thing_name=self.thing_name))
+        except Exception as e:
+            logger.warning("%r failed to list pending jobs: %r", self, e)
+            with self._lock:
+                self._polling = False
+            return
+        future.add_done_callback(self._on_pending_job_executions)
+
+    def close(self, wait: bool = True):
+        """
+        Stops starting jobs, and closes the event streams. Jobs being run
+        carry on, and stay IN_PROGRESS if the program exits before they end,
+        to be resumed when it runs again.
+
+        Args:
+            wait: If True, block until the jobs being run have ended.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._backlog.clear()
+            self._streams.clear()
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            self._heartbeat_due.notify_all()
+        if wait and self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+
+    def _on_job_executions_changed(self, event: iotjobs.JobExecutionsChangedEvent):
+        pending = set()
+        for summaries in (event.jobs or {}).values():
+            pending.update(summary.job_id for summary in summaries or ())
+        with self._lock:
+            for job_id, context in self._running.items():
+                if context is not None and job_id not in pending:
+                    logger.info("%r job %s is no longer pending", self, job_id)
+                    context._cancelled.set()
+        self.poll()
+
+    def _on_pending_job_executions(self, future):
+        try:
+            response = future.result()  # type: Optional[iotjobs.GetPendingJobExecutionsResponse]
+        except Exception as e:
+            logger.warning("%r failed to list pending jobs: %r", self, e)
+            response = None
+
+        with self._lock:
+            self._polling = False
+            repoll, self._repoll = self._repoll, False
+            if response is not None and not self._closed:
+                self._backlog = deque((summary.job_id, True) for summary in response.in_progress_jobs or ())
+                self._backlog.extend((summary.job_id, False) for summary in response.queued_jobs or ())
+            to_start = self._take_backlog()
+        self._start_all(to_start)
+        if repoll:
+            self.poll()
+
+    def _take_backlog(self) -> List[Tuple[str, bool]]:
+        # must be called with the lock held. Claims slots for as many jobs as may start now.
+        to_start = []
+        while self._backlog and len(self._running) < self._max_concurrent_jobs and not self._closed:
+            job_id, resumed = self._backlog.popleft()
+            if job_id not in self._running:
+                self._running[job_id] = None
+                to_start.append((job_id, resumed))
+        return to_start
+
+    def _start_all(self, to_start: List[Tuple[str, bool]]):
+        for job_id, resumed in to_start:
+            try:
+                self._executor.submit(self._run_job, job_id, resumed)
+            except RuntimeError:
+                # closed in the meantime
+                self._job_ended(job_id)
+
+    def _job_ended(self, job_id: str):
+        with self._lock:
+            del self._running[job_id]
+            self._heartbeat_due.notify()
+            to_start = self._take_backlog()
+        self._start_all(to_start)
+
+    def _run_job(self, job_id: str, resumed: bool):
+        try:
+            context = self._begin_job(job_id, resumed)
+            if context is not None:
+                self._finish_job(context)
+        finally:
+            self._job_ended(job_id)
+
+    def _begin_job(self, job_id: str, resumed: bool) -> Optional[JobContext]:
+        try:
+            response = self._jobs_client.describe_job_execution(iotjobs.DescribeJobExecutionRequest(
+                thing_name=self.thing_name, job_id=job_id,
+                include_job_document=True)).result(self._request_timeout)
+        except Exception as e:
+            logger.warning("%r failed to describe job %s: %r", self, job_id, e)
+            return None
+        execution = response.execution
+        if execution is None or execution.status not in _PENDING_STATUSES:
+            return None
+
+        checkpoint = self._checkpoint_store.load(job_id)
+        if checkpoint is not None and checkpoint[0] != execution.execution_number:
+            # saved by an earlier execution of the job
+            checkpoint = None
+        context = JobContext(self, execution, checkpoint[1] if checkpoint is not None else None,
+                             resumed or execution.status == iotjobs.JobStatus.IN_PROGRESS)
+        try:
+            self._update(context, iotjobs.JobStatus.IN_PROGRESS, None)
+        except Exception as e:
+            logger.info("%r could not start job %s: %r", self, job_id, e)
+            return None
+
+        with self._lock:
+            self._running[job_id] = context
+        return context
+
+    def _finish_job(self, context: JobContext):
+        try:
+            status_details = self._handler(context)
+            status = iotjobs.JobStatus.SUCCEEDED
+        except JobFailure as e:
+            status = iotjobs.JobStatus.REJECTED if e.rejected else iotjobs.JobStatus.FAILED
+            status_details = e.status_details if e.status_details is not None else {'reason': str(e)}
+        except Exception as e:
+            logger.exception("%r handler of job %s raised an exception", self, context.job_id)
+            status = iotjobs.JobStatus.FAILED
+            status_details = {'reason': repr(e)}
+
+        if context.cancelled:
+            self._checkpoint_store.delete(context.job_id)
+            return
+        try:
+            self._update(context, status, status_details)
+        except Exception as e:
+            # the checkpoint stays, for the handler to find when the job is resumed
+            logger.error("%r failed to mark job %s %s: %r", self, context.job_id, status, e)
+            return
+        self._checkpoint_store.delete(context.job_id)
+
+    def _update(self, context: JobContext, status: str, status_details: Optional[Dict[str, str]]):
+        with context._update_lock:
+            if context.cancelled:
+                raise RuntimeError("job {} was cancelled".format(context.job_id))
+            for attempt in range(2):
+                request = iotjobs.UpdateJobExecutionRequest(
+                    thing_name=self.thing_name,
+                    job_id=context.job_id,
+                    execution_number=context.execution_number,
+                    status=status,
+                    status_details=status_details,
+                    expected_version=context._version,
+                    step_timeout_in_minutes=(self._step_timeout_in_minutes
+                                             if status == iotjobs.JobStatus.IN_PROGRESS else None),
+                    include_job_execution_state=True)
+                try:
+                    response = self._jobs_client.update_job_execution(request).result(self._request_timeout)
+                except Exception as e:
+                    modeled_error = getattr(e, 'modeled_error', None)
+                    if modeled_error is None:
+                        # timed out or lost, the service may still have applied it
+                        context._unacknowledged = True
+                        raise
+                    state = modeled_error.execution_state
+                    code = modeled_error.code
+                    if (attempt == 0 and context._unacknowledged and code == iotjobs.RejectedErrorCode.VERSION_MISMATCH
+                            and state is not None and state.status == iotjobs.JobStatus.IN_PROGRESS):
+                        # the version moved on because of our own unacknowledged update, not someone else's
+                        context._unacknowledged = False
+                        context._version = state.version_number
+                        continue
+                    if code in (iotjobs.RejectedErrorCode.VERSION_MISMATCH,
+                                iotjobs.RejectedErrorCode.INVALID_STATE_TRANSITION,
+                                iotjobs.RejectedErrorCode.RESOURCE_NOT_FOUND):
+                        context._cancelled.set()
+                    raise
+
+                state = response.execution_state
+                if state is not None and state.version_number is not None:
+                    context._version = state.version_number
+                elif context._version is not None:
+                    context._version += 1
+                context._unacknowledged = False
+                context._last_update = time.monotonic()
+                return
+
+    def _run_heartbeats(self):
+        interval = self._heartbeat_interval
+        with self._lock:
+            while not (self._closed and not self._running):
+                now = time.monotonic()
+                # a cancelled job cannot be updated any more, its handler just has to notice
+                contexts = [c for c in self._running.values() if c is not None and not c.cancelled]
+                due = [c for c in contexts if now - c._last_update >= interval]
+                if not due:
+                    next_due = min((c._last_update + interval for c in contexts), default=now + interval)
+                    self._heartbeat_due.wait(max(next_due - now, 0.01))
+                    continue
+                self._lock.release()
+                try:
+                    for context in due:
+                        try:
+                            context.report_progress()
+                        except Exception as e:
+                            # wait a whole interval before trying again
+                            context._last_update = time.monotonic()
+                            logger.warning("%r heartbeat of job %s failed: %r", self, context.job_id, e)
+                finally:
+                    self._lock.acquire()
@@ -0,0 +1,398 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Timing of the SDK's hot paths, for telling apart time spent waiting on the
+service, time spent in the SDK, and time spent in application callbacks.
+
+Nothing is recorded until a recorder is installed with
+:func:`set_metrics_recorder()`. Until then, each instrumented path pays for
+a single check. Install a :class:`HistogramRecorder` to keep latency
+histograms in memory, or a :class:`PrometheusRecorder` or
+:class:`OpenTelemetryRecorder` to export them::
+
+    recorder = awsiot.metrics.HistogramRecorder()
+    awsiot.metrics.set_metrics_recorder(recorder)
+    ...
+    for summary in recorder.summaries():
+        print(summary)
+
+The following are recorded, labeled with the name of the operation:
+
+*   Service clients: the time from publishing a request until the server
+    acknowledges it, or until a V2 client's response arrives. The time spent
+    decoding each message received, and the time spent in the callback
+    it is passed to.
+*   Greengrass IPC: the time from activating an operation until its
+    response arrives. The time spent decoding each message received, and
+    the time spent in `on_stream_event`.
+    :class:`~awsiot.greengrasscoreipc.clientv2.GreengrassCoreIPCClientV2`
+    also records how long events waited for its executor.
+*   The number of requests awaiting a response.
+"""
+
+from enum import Enum
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+__all__ = [
+    'Metric',
+    'MetricsRecorder',
+    'set_metrics_recorder',
+    'get_metrics_recorder',
+    'LatencyHistogram',
+    'HistogramSummary',
+    'HistogramRecorder',
+    'PrometheusRecorder',
+    'OpenTelemetryRecorder',
+]
+
+
+class Metric(Enum):
+    """
+    The durations recorded.
+    """
+
+    REQUEST_LATENCY = 'request_latency'
+    """From sending a request until its acknowledgement or response arrives"""
+
+    DESERIALIZATION = 'deserialization'
+    """Decoding a received message into its modeled class"""
+
+    CALLBACK = 'callback'
+    """Running the application's callback for a received message"""
+
+    EXECUTOR_QUEUE_WAIT = 'executor_queue_wait'
+    """From submitting a callback to an executor until it starts running"""
+
+
+class MetricsRecorder:
+    """
+    Receives measurements from the SDK. This base class discards them.
+    Subclass it and override its methods to keep them.
+
+    Methods are called on the thread doing the measured work, which is often
+    a networking thread, so they must be quick and thread-safe.
+    """
+
+    def record(self, metric: Metric, operation: str, seconds: float):
+        """
+        Records a duration.
+
+        Args:
+            metric: What was measured.
+            operation: Name of the operation, such as `get_shadow` or `aws.greengrass#PublishToTopic`.
+            seconds: The duration.
+        """
+        pass
+
+    def add_in_flight(self, operation: str, delta: int):
+        """
+        Records a change in the number of requests awaiting a response.
+
+        Args:
+            operation: Name of the operation.
+            delta: 1 when a request is sent, -1 when it completes.
+        """
+        pass
+
+
+# Read directly by instrumented code, so that checking it costs no call
+_recorder = None  # type: Optional[MetricsRecorder]
+
+
+def set_metrics_recorder(recorder: Optional[MetricsRecorder]):
+    """
+    Sets the process-wide recorder for the SDK's measurements.
+
+    Args:
+        recorder: Recorder to use, or None to stop recording.
+    """
+    global _recorder
+    _recorder = recorder
+
+
+def get_metrics_recorder() -> Optional[MetricsRecorder]:
+    """
+    Returns the recorder set with :func:`set_metrics_recorder()`, or None.
+    """
+    return _recorder
+
+
+# Durations are kept in nanoseconds, in buckets whose width is at most 1/128th
+# of their value. A bucket reports its middle, so percentiles are off by at
+# most 1/256 (0.39%) of their value, and durations under 256ns are exact.
+_SUB_BUCKET_BITS = 8
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1
+
+
+def _bucket_index(nanoseconds: int) -> int:
+    shift = nanoseconds.bit_length() - _SUB_BUCKET_BITS
+    if shift <= 0:
+        return nanoseconds
+    return shift * _SUB_BUCKET_HALF + (nanoseconds >> shift)
+
+
+def _bucket_value(index: int) -> int:
+    """Returns the middle of a bucket"""
+    if index < _SUB_BUCKET_COUNT:
+        return index
+    shift = index // _SUB_BUCKET_HALF - 1
+    return ((index - shift * _SUB_BUCKET_HALF) << shift) + (1 << (shift - 1))
+
+
+class LatencyHistogram:
+    """
+    Histogram of durations, with the high dynamic range histogram's layout:
+    buckets grow with their value, so durations from nanoseconds to hours
+    are all kept to within 0.39% (1/256) of their value, in little memory.
+
+    This class is not thread-safe.
+    """
+
+    def __init__(self):
+        self._counts = {}  # type: Dict[int, int]
+        self._count = 0
+        self._total = 0.0
+        self._min = None  # type: Optional[float]
+        self._max = None  # type: Optional[float]
+
+    def record(self, seconds: float):
+        """
+        Adds a duration.
+
+        Args:
+            seconds: The duration. Negative durations are counted as 0.
+        """
+        seconds = max(seconds, 0.0)
+        index = _bucket_index(int(seconds * 1e9))
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self._count += 1
+        self._total += seconds
+        if self._min is None or seconds < self._min:
+            self._min = seconds
+        if self._max is None or seconds > self._max:
+            self._max = seconds
+
+    def merge(self, other: 'LatencyHistogram'):
+        """
+        Adds every duration of another histogram to this one.
+        """
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self._count += other._count
+        self._total += other._total
+        for value in (other._min, other._max):
+            if value is not None:
+                self._min = value if self._min is None else min(self._min, value)
+                self._max = value if self._max is None else max(self._max, value)
+
+    def copy(self) -> 'LatencyHistogram':
+        """Returns a copy of the histogram"""
+        histogram = LatencyHistogram()
+        histogram.merge(self)
+        return histogram
+
+    @property
+    def count(self) -> int:
+        """Number of durations recorded"""
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        """Mean duration in seconds, or 0 if none were recorded"""
+        return self._total / self._count if self._count else 0.0
+
+    @property
+    def min(self) -> float:
+        """Shortest duration in seconds, or 0 if none were recorded"""
+        return self._min or 0.0
+
+    @property
+    def max(self) -> float:
+        """Longest duration in seconds, or 0 if none were recorded"""
+        return self._max or 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the duration in seconds that `percent` percent of durations
+        are no longer than, or 0 if none were recorded.
+
+        Args:
+            percent: Percentile, from 0 to 100.
+        """
+        if not self._count:
+            return 0.0
+        rank = max(1, int(round(self._count * min(max(percent, 0.0), 100.0) / 100.0)))
+        # the exact extremes are known, and beat a bucket's middle
+        if rank == 1:
+            return self.min
+        if rank >= self._count:
+            return self.max
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(max(_bucket_value(index) / 1e9, self.min), self.max)
+        return self.max
+
+
+class HistogramSummary(NamedTuple):
+    """
+    Summary of one histogram of a :class:`HistogramRecorder`. Durations are in seconds.
+    """
+    metric: Metric
+    operation: str
+    count: int
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+
+class HistogramRecorder(MetricsRecorder):
+    """
+    Keeps a :class:`LatencyHistogram` for each metric of each operation,
+    and a count of each operation's requests in flight.
+
+    This class is thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # type: Dict[Tuple[Metric, str], LatencyHistogram]
+        self._in_flight = {}  # type: Dict[str, int]
+
+    def record(self, metric: Metric, operation: str, seconds: float):
+        key = (metric, operation)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def add_in_flight(self, operation: str, delta: int):
+        with self._lock:
+            self._in_flight[operation] = self._in_flight.get(operation, 0) + delta
+
+    def histogram(self, metric: Metric, operation: str) -> LatencyHistogram:
+        """
+        Returns a copy of the histogram of one metric of one operation,
+        which is empty if nothing was recorded.
+        """
+        with self._lock:
+            histogram = self._histograms.get((metric, operation))
+            return histogram.copy() if histogram is not None else LatencyHistogram()
+
+    def in_flight(self, operation: Optional[str] = None) -> int:
+        """
+        Returns the number of requests of an operation awaiting a response,
+        or of all operations if `operation` is None.
+        """
+        with self._lock:
+            if operation is None:
+                return sum(self._in_flight.values())
+            return self._in_flight.get(operation, 0)
+
+    def summaries(self) -> List[HistogramSummary]:
+        """
+        Returns a summary of every histogram, by metric and operation.
+        """
+        with self._lock:
+            histograms = [(key, histogram.copy()) for key, histogram in self._histograms.items()]
+        histograms.sort(key=lambda item: (item[0][0].value, item[0][1]))
+        return [HistogramSummary(metric=metric, operation=operation, count=h.count, mean=h.mean,
+                                 p50=h.percentile(50), p90=h.percentile(90), p99=h.percentile(99), max=h.max)
+                for (metric, operation), h in histograms]
+
+    def reset(self):
+        """
+        Discards every duration recorded. Counts of requests in flight are kept.
+        """
+        with self._lock:
+            self._histograms.clear()
+
+
+# Bucket bounds for exported histograms, in seconds. The SDK's own work
+# takes microseconds, and a round trip to the service milliseconds to seconds.
+_EXPORT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_DESCRIPTIONS = {
+    Metric.REQUEST_LATENCY: "Time from sending a request until its acknowledgement or response arrives",
+    Metric.DESERIALIZATION: "Time spent decoding received messages",
+    Metric.CALLBACK: "Time spent in callbacks for received messages",
+    Metric.EXECUTOR_QUEUE_WAIT: "Time callbacks waited for an executor",
+}
+
+
+class PrometheusRecorder(MetricsRecorder):
+    """
+    Exports the SDK's measurements with the
+    `prometheus_client <https://pypi.org/project/prometheus-client/>`_ library,
+    as a histogram named `<prefix>_<metric>_seconds` for each :class:`Metric`,
+    and a gauge named `<prefix>_in_flight`, all labeled by `operation`.
+
+    Args:
+        registry: Registry to register the metrics with. Defaults to prometheus_client's default registry.
+        prefix: Prefix of the metric names.
+        buckets: Bucket bounds of the histograms, in seconds.
+
+    Raises:
+        ImportError: if prometheus_client is not installed.
+    """
+
+    def __init__(self, *, registry=None, prefix: str = 'awsiot', buckets: Optional[Tuple[float, ...]] = None):
+        import prometheus_client
+        kwargs = {} if registry is None else {'registry': registry}
+        self._histograms = {
+            metric: prometheus_client.Histogram(
+                '{}_{}_seconds'.format(prefix, metric.value), _DESCRIPTIONS[metric], ['operation'],
+                buckets=buckets or _EXPORT_BUCKETS, **kwargs)
+            for metric in Metric
+        }
+        self._in_flight = prometheus_client.Gauge(
+            '{}_in_flight'.format(prefix), "Requests awaiting a response", ['operation'], **kwargs)
+
+    def record(self, metric: Metric, operation: str, seconds: float):
+        self._histograms[metric].labels(operation).observe(seconds)
+
+    def add_in_flight(self, operation: str, delta: int):
+        self._in_flight.labels(operation).inc(delta)
+
+
+class OpenTelemetryRecorder(MetricsRecorder):
+    """
+    Exports the SDK's measurements with the
+    `OpenTelemetry <https://pypi.org/project/opentelemetry-api/>`_ metrics API,
+    as a histogram named `<prefix>.<metric>` for each :class:`Metric`, and an
+    up-down counter named `<prefix>.in_flight`, all with an `operation` attribute.
+
+    Args:
+        meter: Meter to create the instruments with. Defaults to the global
+            meter provider's meter for `awsiot`.
+        prefix: Prefix of the instrument names.
+
+    Raises:
+        ImportError: if `meter` is not given and opentelemetry-api is not installed.
+    """
+
+    def __init__(self, meter=None, *, prefix: str = 'awsiot'):
+        if meter is None:
+            from opentelemetry import metrics as otel_metrics
+            meter = otel_metrics.get_meter('awsiot')
+        self._histograms = {
+            metric: meter.create_histogram('{}.{}'.format(prefix, metric.value), unit='s',
+                                           description=_DESCRIPTIONS[metric])
+            for metric in Metric
+        }
+        self._in_flight = meter.create_up_down_counter(
+            '{}.in_flight'.format(prefix), unit='{request}', description="Requests awaiting a response")
+
+    def record(self, metric: Metric, operation: str, seconds: float):
+        self._histograms[metric].record(seconds, {'operation': operation})
+
+    def add_in_flight(self, operation: str, delta: int):
+        self._in_flight.add(delta, {'operation': operation})
@@ -173,6 +173,10 @@ Optional Keyword Arguments (omit, or set `None` to get default value):
     **enable_metrics_collection** (`bool`): Whether to send the SDK version number in the CONNECT packet.
         Default is True.
 
+    **resource_cache** (:class:`awsiot.resource_cache.ResourceCache`): Cache to share TLS contexts with
+        other clients built with the same cache, instead of creating new ones for each client.
+        Certificate files are read through the cache too.
+
 
 """
 
@@ -345,9 +349,13 @@ def _builder(
     ca_bytes = _get(kwargs, 'ca_bytes')
     ca_filepath = _get(kwargs, 'ca_filepath')
     ca_dirpath = _get(kwargs, 'ca_dirpath')
+    resource_cache = _get(kwargs, 'resource_cache')
     if ca_bytes:
         tls_ctx_options.override_default_trust_store(ca_bytes)
     elif ca_filepath or ca_dirpath:
+        if ca_filepath and resource_cache is not None:
+            tls_ctx_options.override_default_trust_store(resource_cache.read_file(ca_filepath))
+            ca_filepath = None
         tls_ctx_options.override_default_trust_store_from_path(ca_dirpath, ca_filepath)
 
     tls_ctx_options.cipher_pref = cipher_pref
@@ -362,7 +370,10 @@ def _builder(
     if client_options.port == 443 and awscrt.io.is_alpn_available() and use_custom_authorizer is False:
         tls_ctx_options.alpn_list = ['http/1.1'] if use_websockets else ['x-amzn-mqtt-ca']
 
-    tls_ctx = awscrt.io.ClientTlsContext(tls_ctx_options)
+    if resource_cache is not None:
+        tls_ctx = resource_cache.tls_context(tls_ctx_options)
+    else:
+        tls_ctx = awscrt.io.ClientTlsContext(tls_ctx_options)
     client_options.tls_ctx = tls_ctx
     client = awscrt.mqtt5.Client(client_options=client_options)
 
@@ -383,7 +394,12 @@ def mtls_from_path(cert_filepath, pri_key_filepath, **kwargs) -> awscrt.mqtt5.Cl
         pri_key_filepath (str): Path to private key file.
     """
     _check_required_kwargs(**kwargs)
-    tls_ctx_options = awscrt.io.TlsContextOptions.create_client_with_mtls_from_path(cert_filepath, pri_key_filepath)
+    resource_cache = _get(kwargs, 'resource_cache')
+    if resource_cache is not None:
+        tls_ctx_options = awscrt.io.TlsContextOptions.create_client_with_mtls(
+            resource_cache.read_file(cert_filepath), resource_cache.read_file(pri_key_filepath))
+    else:
+        tls_ctx_options = awscrt.io.TlsContextOptions.create_client_with_mtls_from_path(cert_filepath, pri_key_filepath)
     return _builder(tls_ctx_options, **kwargs)
 
 
@@ -116,6 +116,10 @@ Optional Keyword Arguments (omit, or set `None` to get default value):
     **enable_metrics_collection** (`bool`): Whether to send the SDK version number in the CONNECT packet.
         Default is True.
 
+    **resource_cache** (:class:`awsiot.resource_cache.ResourceCache`): Cache to share TLS contexts and MQTT clients with
+        other clients built with the same cache, instead of creating new ones for each client.
+        Certificate files are read through the cache too.
+
     **http_proxy_options** (:class: 'awscrt.http.HttpProxyOptions'): HTTP proxy options to use
 """
 
@@ -191,9 +195,13 @@ def _builder(
     ca_bytes = _get(kwargs, 'ca_bytes')
     ca_filepath = _get(kwargs, 'ca_filepath')
     ca_dirpath = _get(kwargs, 'ca_dirpath')
+    resource_cache = _get(kwargs, 'resource_cache')
     if ca_bytes:
         tls_ctx_options.override_default_trust_store(ca_bytes)
     elif ca_filepath or ca_dirpath:
+        if ca_filepath and resource_cache is not None:
+            tls_ctx_options.override_default_trust_store(resource_cache.read_file(ca_filepath))
+            ca_filepath = None
         tls_ctx_options.override_default_trust_store_from_path(ca_dirpath, ca_filepath)
 
     port = _get(kwargs, 'port')
@@ -235,8 +243,12 @@ def _builder(
     if client_bootstrap is None:
         client_bootstrap = awscrt.io.ClientBootstrap.get_or_create_static_default()
 
-    tls_ctx = awscrt.io.ClientTlsContext(tls_ctx_options)
-    mqtt_client = awscrt.mqtt.Client(client_bootstrap, tls_ctx)
+    if resource_cache is not None:
+        tls_ctx = resource_cache.tls_context(tls_ctx_options)
+        mqtt_client = resource_cache.mqtt_client(client_bootstrap, tls_ctx)
+    else:
+        tls_ctx = awscrt.io.ClientTlsContext(tls_ctx_options)
+        mqtt_client = awscrt.mqtt.Client(client_bootstrap, tls_ctx)
 
     proxy_options = kwargs.get('http_proxy_options', kwargs.get('websocket_proxy_options', None))
     return awscrt.mqtt.Connection(
@@ -279,7 +291,12 @@ def mtls_from_path(cert_filepath, pri_key_filepath, **kwargs) -> awscrt.mqtt.Con
         pri_key_filepath (str): Path to private key file.
     """
     _check_required_kwargs(**kwargs)
-    tls_ctx_options = awscrt.io.TlsContextOptions.create_client_with_mtls_from_path(cert_filepath, pri_key_filepath)
+    resource_cache = _get(kwargs, 'resource_cache')
+    if resource_cache is not None:
+        tls_ctx_options = awscrt.io.TlsContextOptions.create_client_with_mtls(
+            resource_cache.read_file(cert_filepath), resource_cache.read_file(pri_key_filepath))
+    else:
+        tls_ctx_options = awscrt.io.TlsContextOptions.create_client_with_mtls_from_path(cert_filepath, pri_key_filepath)
     return _builder(tls_ctx_options, **kwargs)
 
 
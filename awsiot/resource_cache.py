@@ -0,0 +1,260 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Share TLS contexts and client bootstraps between many clients.
+
+Each builder call in :mod:`awsiot.mqtt5_client_builder` and
+:mod:`awsiot.mqtt_connection_builder` normally creates a new
+:class:`awscrt.io.ClientTlsContext`. That parses the certificate, the private
+key and the trust store again, and the `*_from_path` builders read them from
+disk again too. A process that creates many clients can pass the same
+:class:`ResourceCache` to every builder call as `resource_cache`. Clients
+with the same TLS settings then share one context::
+
+    cache = ResourceCache()
+    for thing_name in thing_names:
+        client = mqtt5_client_builder.mtls_from_path(
+            endpoint=endpoint, client_id=thing_name,
+            cert_filepath=cert_path, pri_key_filepath=key_path,
+            resource_cache=cache)
+
+The cache holds references until :meth:`ResourceCache.clear` or
+:meth:`ResourceCache.close` is called. Clients that were already built keep
+the resources they use, so clearing the cache never breaks them.
+"""
+
+import awscrt.io
+import awscrt.mqtt
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+__all__ = [
+    'CacheStats',
+    'ResourceCache',
+]
+
+# TlsContextOptions fields that may hold secrets, or large buffers, and are keyed by digest
+_DIGESTED_FIELDS = (
+    'ca_buffer',
+    'certificate_buffer',
+    'private_key_buffer',
+    'pkcs12_password',
+    '_pkcs11_user_pin',
+    '_pkcs11_cert_file_contents',
+)
+
+
+class CacheStats(NamedTuple):
+    """
+    Counts of :class:`ResourceCache` lookups.
+
+    Attributes:
+        hits (int): Lookups that returned an existing resource.
+        misses (int): Lookups that created a new resource.
+        size (int): Number of resources held.
+    """
+    hits: int
+    misses: int
+    size: int
+
+
+def _digest(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(value).digest()
+    return value
+
+
+def _tls_context_key(tls_ctx_options: awscrt.io.TlsContextOptions) -> Tuple[Hashable, ...]:
+    """
+    Key under which a context made from these options is cached.
+
+    Buffers are keyed by their SHA-256 digest. Paths that the native code
+    reads itself (`ca_dirpath`, `pkcs12_filepath`, PKCS#11 certificate files)
+    are keyed by path, not content.
+    """
+    key = []
+    for name in awscrt.io.TlsContextOptions.__slots__:
+        value = getattr(tls_ctx_options, name)
+        if name in _DIGESTED_FIELDS:
+            value = _digest(value)
+        elif isinstance(value, list):
+            value = tuple(value)
+        key.append(value)
+    return tuple(key)
+
+
+class ResourceCache:
+    """
+    Keyed cache of :class:`awscrt.io.ClientTlsContext`,
+    :class:`awscrt.io.ClientBootstrap` and :class:`awscrt.mqtt.Client`
+    instances, and of certificate files read from disk.
+
+    Pass it to the builder functions as `resource_cache`, or call its methods
+    directly. All methods are thread-safe.
+
+    It can be used as a context manager, which closes it on exit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._closed = False
+        self._files = {}  # type: Dict[str, Tuple[Tuple[int, int, int], bytes]]
+        self._tls_contexts = {}  # type: Dict[Tuple[Hashable, ...], awscrt.io.ClientTlsContext]
+        self._bootstraps = {}  # type: Dict[Tuple[Hashable, ...], awscrt.io.ClientBootstrap]
+        self._mqtt_clients = {}  # type: Dict[Tuple[int, int], Tuple[Any, Any, awscrt.mqtt.Client]]
+        self._hits = 0
+        self._misses = 0
+
+    def __enter__(self) -> 'ResourceCache':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size()
+
+    # must be called with the lock held
+    def _size(self) -> int:
+        return len(self._files) + len(self._tls_contexts) + len(self._bootstraps) + len(self._mqtt_clients)
+
+    @property
+    def stats(self) -> CacheStats:
+        """Counts of lookups so far, and of resources held."""
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._size())
+
+    # must be called with the lock held
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("ResourceCache is closed")
+
+    def _get_or_create(self, table: Dict, key: Hashable, create):
+        with self._lock:
+            self._check_open()
+            value = table.get(key)
+            if value is not None:
+                self._hits += 1
+                return value
+
+        # create outside the lock, native construction can be slow
+        value = create()
+        with self._lock:
+            self._check_open()
+            existing = table.get(key)
+            if existing is not None:
+                self._hits += 1
+                return existing
+            self._misses += 1
+            table[key] = value
+            return value
+
+    def read_file(self, path: str) -> bytes:
+        """
+        Returns the contents of a file, such as a certificate or private key.
+
+        The file is read again only if its size, modification time or inode
+        changed since it was last read, so rotated certificates are picked up.
+
+        Args:
+            path: Path to the file.
+        """
+        stat = os.stat(path)
+        version = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            self._check_open()
+            entry = self._files.get(path)
+            if entry is not None and entry[0] == version:
+                self._hits += 1
+                return entry[1]
+
+        with open(path, 'rb') as f:
+            contents = f.read()
+        with self._lock:
+            self._check_open()
+            self._misses += 1
+            self._files[path] = (version, contents)
+        return contents
+
+    def tls_context(self, tls_ctx_options: awscrt.io.TlsContextOptions) -> awscrt.io.ClientTlsContext:
+        """
+        Returns a :class:`awscrt.io.ClientTlsContext` for these options,
+        creating it only if no context with the same settings is cached.
+
+        Contexts are keyed by a digest of the certificate, private key and
+        trust store, and by the ALPN list, cipher preference, minimum TLS
+        version and the remaining options. Do not change `tls_ctx_options`
+        after passing it in.
+
+        Args:
+            tls_ctx_options: Options for the context.
+        """
+        return self._get_or_create(
+            self._tls_contexts,
+            _tls_context_key(tls_ctx_options),
+            lambda: awscrt.io.ClientTlsContext(tls_ctx_options))
+
+    def client_bootstrap(self, num_threads: Optional[int] = None, cpu_group: Optional[int] = None,
+                         max_hosts: int = 16) -> awscrt.io.ClientBootstrap:
+        """
+        Returns a :class:`awscrt.io.ClientBootstrap` with its own
+        :class:`awscrt.io.EventLoopGroup` and
+        :class:`awscrt.io.DefaultHostResolver`, one per set of arguments.
+
+        Builders use the static default bootstrap unless `client_bootstrap`
+        is passed, so this is only needed to give a group of clients
+        dedicated event-loop threads.
+
+        Args:
+            num_threads: Number of event-loop threads. If None, one per processor.
+            cpu_group: Processor group to pin the threads to.
+            max_hosts: Number of host names the resolver caches.
+        """
+        def create():
+            event_loop_group = awscrt.io.EventLoopGroup(num_threads, cpu_group)
+            host_resolver = awscrt.io.DefaultHostResolver(event_loop_group, max_hosts)
+            return awscrt.io.ClientBootstrap(event_loop_group, host_resolver)
+
+        return self._get_or_create(self._bootstraps, (num_threads, cpu_group, max_hosts), create)
+
+    def mqtt_client(self, client_bootstrap: awscrt.io.ClientBootstrap,
+                    tls_ctx: Optional[awscrt.io.ClientTlsContext]) -> awscrt.mqtt.Client:
+        """
+        Returns an :class:`awscrt.mqtt.Client` for this bootstrap and TLS
+        context. Many :class:`awscrt.mqtt.Connection` instances can share one.
+
+        Args:
+            client_bootstrap: Bootstrap used to establish connections.
+            tls_ctx: TLS context, or None for plain connections.
+        """
+        # entries hold the bootstrap and context, so their ids cannot be reused while cached
+        entry = self._get_or_create(
+            self._mqtt_clients,
+            (id(client_bootstrap), id(tls_ctx)),
+            lambda: (client_bootstrap, tls_ctx, awscrt.mqtt.Client(client_bootstrap, tls_ctx)))
+        return entry[2]
+
+    def clear(self):
+        """
+        Drop every cached resource. Clients built earlier keep working, since
+        they hold their own references.
+        """
+        with self._lock:
+            self._files.clear()
+            self._tls_contexts.clear()
+            self._bootstraps.clear()
+            self._mqtt_clients.clear()
+
+    def close(self):
+        """
+        Drop every cached resource, and fail further lookups with RuntimeError.
+        """
+        with self._lock:
+            self._closed = True
+        self.clear()
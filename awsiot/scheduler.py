@@ -0,0 +1,425 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Queues the requests of V2 service clients, sending them by priority
+with a limit on how many are in flight.
+"""
+
+from awscrt import mqtt_request_response
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+import contextlib
+import contextvars
+import heapq
+from enum import IntEnum
+import itertools
+import threading
+import time
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+__all__ = [
+    'Priority',
+    'RequestScheduler',
+    'SchedulerLane',
+    'SchedulerStats',
+    'RequestRejectedError',
+]
+
+
+class Priority(IntEnum):
+    """
+    Lanes of a :class:`RequestScheduler`. Requests in a lower-numbered lane
+    are sent first. Any int may be used as a priority.
+    """
+
+    HIGH = 0
+    """For requests that must not wait behind bulk work, like job status updates."""
+
+    NORMAL = 1
+    """The default."""
+
+    LOW = 2
+    """For bulk work, like syncing many shadows."""
+
+
+class RequestRejectedError(Exception):
+    """
+    A request was not queued, because the scheduler's queue was full of
+    requests of the same or higher priority, or the scheduler was closed.
+    """
+
+
+class SchedulerStats(NamedTuple):
+    """
+    Snapshot of a :class:`RequestScheduler`'s activity.
+
+    Args:
+        queue_depth (int): Number of requests waiting to be sent.
+        in_flight (int): Number of requests sent and awaiting a response.
+        submitted (int): Number of requests accepted.
+        completed (int): Number of requests that got a response or failed after being sent.
+        rejected (int): Number of requests refused or evicted because the queue was full.
+        timed_out (int): Number of requests whose deadline passed.
+        cancelled (int): Number of requests cancelled while waiting to be sent.
+        mean_queue_wait (float): Average seconds a request waited before it was sent.
+        max_queue_wait (float): Longest seconds a request waited before it was sent.
+        mean_service_time (float): Average seconds from sending a request to its response.
+        max_service_time (float): Longest seconds from sending a request to its response.
+    """
+    queue_depth: int
+    in_flight: int
+    submitted: int
+    completed: int
+    rejected: int
+    timed_out: int
+    cancelled: int
+    mean_queue_wait: float
+    max_queue_wait: float
+    mean_service_time: float
+    max_service_time: float
+
+
+# (priority, timeout) set by RequestScheduler.request_options()
+_request_options = contextvars.ContextVar('awsiot_scheduler_request_options', default=None)
+
+_QUEUED = 0
+_SENT = 1
+_DONE = 2
+
+
+class _ScheduledFuture(Future):
+    """Future of a scheduled request, which a caller's own future can cancel"""
+
+    def _cancel_with(self, outer: Future):
+        outer.add_done_callback(lambda f: self.cancel() if f.cancelled() else None)
+
+
+class _Request:
+    __slots__ = ('client', 'options', 'future', 'priority', 'state', 'queued_at', 'sent_at')
+
+    def __init__(self, client, options: mqtt_request_response.RequestOptions, priority: int):
+        self.client = client
+        self.options = options
+        self.future = _ScheduledFuture()  # type: _ScheduledFuture
+        self.priority = priority
+        self.state = _QUEUED
+        self.queued_at = time.monotonic()
+        self.sent_at = 0.0
+
+
+class RequestScheduler:
+    """
+    Sends requests for one or more V2 service clients, such as
+    :class:`~awsiot.iotshadow.IotShadowClientV2` and
+    :class:`~awsiot.iotjobs.IotJobsClientV2`, so that at most `max_in_flight`
+    await a response at once. The rest wait in a queue of up to `max_queued`
+    requests, rather than failing when the request-response client's own
+    in-flight limit is reached.
+
+    Each client is given a lane, and so a :class:`Priority`, when it is
+    created::
+
+        scheduler = RequestScheduler(max_in_flight=8)
+        jobs_client = IotJobsClientV2(connection, options,
+                                      request_scheduler=scheduler.lane(Priority.HIGH))
+        shadow_client = IotShadowClientV2(connection, options,
+                                          request_scheduler=scheduler.lane(Priority.LOW, timeout=30.0))
+
+    Queued requests are sent highest priority first, and in order within a
+    priority. When the queue is full, a new request evicts the newest queued
+    request of a lower priority, or is refused if there is none. Either way,
+    the request left out fails with :class:`RequestRejectedError`.
+
+    A request's deadline is its lane's `timeout`, or the one set with
+    :meth:`request_options`. Once it passes, the request fails with a
+    `TimeoutError`, and is never sent if it was still queued. Cancelling the
+    Future returned by the client also drops the request from the queue.
+
+    Streaming operations are not scheduled.
+
+    This class is thread-safe.
+
+    Args:
+        max_in_flight: Number of requests that may await a response at once.
+            Keep this no higher than the `max_request_response_subscriptions`
+            of the clients' `ClientOptions`.
+        max_queued: Number of requests that may wait to be sent.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_queued: int = 1024):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        if max_queued < 0:
+            raise ValueError("max_queued must not be negative")
+
+        self._max_in_flight = max_in_flight
+        self._max_queued = max_queued
+        self._lock = threading.Lock()
+        # queued requests by priority
+        self._queues = {}  # type: Dict[int, Deque[_Request]]
+        self._depth = 0
+        self._in_flight = 0
+        self._closed = False
+
+        # (deadline, sequence, request) of requests that have one
+        self._deadlines = []  # type: List[Tuple[float, int, _Request]]
+        self._deadline_sequence = itertools.count()
+        self._deadline_changed = threading.Condition(self._lock)
+        self._deadline_thread = None  # type: Optional[threading.Thread]
+
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._cancelled = 0
+        self._sent = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._service_time_total = 0.0
+        self._service_time_max = 0.0
+
+    def lane(self, priority: int = Priority.NORMAL, timeout: Optional[float] = None) -> 'SchedulerLane':
+        """
+        Returns a lane to pass as a V2 service client's `request_scheduler`.
+
+        Args:
+            priority: Priority of the client's requests.
+            timeout: Seconds each request may take, from being queued to
+                its response, or None for no limit.
+        """
+        return SchedulerLane(self, priority, timeout)
+
+    def wrap(self, rr_client):
+        """
+        Lets a V2 service client take the scheduler itself as its
+        `request_scheduler`, using a :attr:`Priority.NORMAL` lane with no timeout.
+        """
+        return self.lane().wrap(rr_client)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def request_options(*, priority: Optional[int] = None, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Context manager that overrides the priority or timeout of the
+        requests made within it, by any scheduler, in this thread or task::
+
+            with RequestScheduler.request_options(priority=Priority.HIGH, timeout=2.0):
+                future = shadow_client.get_shadow(request)
+
+        Args:
+            priority: Priority to use instead of the lane's, or None to keep it.
+            timeout: Timeout to use instead of the lane's, or None to keep it.
+        """
+        token = _request_options.set((priority, timeout))
+        try:
+            yield
+        finally:
+            _request_options.reset(token)
+
+    def stats(self) -> SchedulerStats:
+        """
+        Returns:
+            A snapshot of the scheduler's queue, counters and latencies.
+        """
+        with self._lock:
+            return SchedulerStats(
+                queue_depth=self._depth,
+                in_flight=self._in_flight,
+                submitted=self._submitted,
+                completed=self._completed,
+                rejected=self._rejected,
+                timed_out=self._timed_out,
+                cancelled=self._cancelled,
+                mean_queue_wait=self._queue_wait_total / self._sent if self._sent else 0.0,
+                max_queue_wait=self._queue_wait_max,
+                mean_service_time=self._service_time_total / self._completed if self._completed else 0.0,
+                max_service_time=self._service_time_max)
+
+    def close(self):
+        """
+        Fails every queued request with :class:`RequestRejectedError`, and
+        refuses new ones. Requests in flight still complete.
+        """
+        with self._lock:
+            self._closed = True
+            queued = [request for queue in self._queues.values() for request in queue]
+            self._deadline_changed.notify_all()
+        for request in queued:
+            _try_set_exception(request.future, RequestRejectedError("RequestScheduler is closed"))
+
+    def _submit(self, client, options: mqtt_request_response.RequestOptions,
+                priority: int, timeout: Optional[float]) -> Future:
+        override = _request_options.get()
+        if override is not None:
+            if override[0] is not None:
+                priority = override[0]
+            if override[1] is not None:
+                timeout = override[1]
+
+        request = _Request(client, options, priority)
+        evicted = None
+        with self._lock:
+            if self._closed:
+                raise RequestRejectedError("RequestScheduler is closed")
+
+            self._submitted += 1
+            if self._in_flight >= self._max_in_flight and self._depth >= self._max_queued:
+                evicted = self._newest_below(priority)
+                self._rejected += 1
+                if evicted is None:
+                    request.state = _DONE
+                    request.future.set_exception(RequestRejectedError("request queue is full"))
+                    return request.future
+
+            queue = self._queues.get(priority)
+            if queue is None:
+                queue = self._queues[priority] = deque()
+            queue.append(request)
+            self._depth += 1
+
+            if timeout is not None:
+                heapq.heappush(self._deadlines, (request.queued_at + timeout, next(self._deadline_sequence), request))
+                self._watch_deadlines()
+            to_send = self._take_sendable()
+
+        if evicted is not None:
+            _try_set_exception(evicted.future, RequestRejectedError("evicted by a request of higher priority"))
+        # leaving the queue early, by eviction, cancellation or deadline, is handled here
+        request.future.add_done_callback(lambda _: self._on_done(request))
+        self._send(to_send)
+        return request.future
+
+    def _newest_below(self, priority: int) -> Optional[_Request]:
+        # must be called with the lock held
+        for lowest in sorted(self._queues, reverse=True):
+            if lowest <= priority:
+                break
+            queue = self._queues[lowest]
+            if queue:
+                return queue[-1]
+        return None
+
+    def _take_sendable(self) -> List[_Request]:
+        # must be called with the lock held. Claims a slot for each request that may be sent now.
+        to_send = []
+        while self._in_flight < self._max_in_flight and self._depth:
+            queue = self._queues[min(p for p, q in self._queues.items() if q)]
+            request = queue.popleft()
+            self._depth -= 1
+            request.state = _SENT
+            request.sent_at = time.monotonic()
+            wait = request.sent_at - request.queued_at
+            self._sent += 1
+            self._queue_wait_total += wait
+            self._queue_wait_max = max(self._queue_wait_max, wait)
+            self._in_flight += 1
+            to_send.append(request)
+        return to_send
+
+    def _send(self, to_send: List[_Request]):
+        for request in to_send:
+            try:
+                response_future = request.client.make_request(request.options)
+            except Exception as e:
+                response_future = Future()
+                response_future.set_exception(e)
+            response_future.add_done_callback(lambda f, r=request: self._on_response(r, f))
+
+    def _on_response(self, request: _Request, response_future: Future):
+        with self._lock:
+            request.state = _DONE
+            self._in_flight -= 1
+            self._completed += 1
+            service_time = time.monotonic() - request.sent_at
+            self._service_time_total += service_time
+            self._service_time_max = max(self._service_time_max, service_time)
+            to_send = self._take_sendable() if not self._closed else []
+        self._send(to_send)
+
+        exception = response_future.exception()
+        if exception is not None:
+            _try_set_exception(request.future, exception)
+        else:
+            try:
+                request.future.set_result(response_future.result())
+            except InvalidStateError:
+                # timed out or cancelled while in flight
+                pass
+
+    def _on_done(self, request: _Request):
+        # the request's future completed. If it was still queued, it must not be sent.
+        with self._lock:
+            if request.state != _QUEUED:
+                return
+            request.state = _DONE
+            self._queues[request.priority].remove(request)
+            self._depth -= 1
+            if request.future.cancelled():
+                self._cancelled += 1
+
+    def _watch_deadlines(self):
+        # must be called with the lock held
+        if self._deadline_thread is None:
+            self._deadline_thread = threading.Thread(
+                target=self._expire_deadlines, name='RequestScheduler', daemon=True)
+            self._deadline_thread.start()
+        else:
+            self._deadline_changed.notify()
+
+    def _expire_deadlines(self):
+        while True:
+            with self._lock:
+                while True:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    if self._deadlines and self._deadlines[0][0] <= now:
+                        _, _, request = heapq.heappop(self._deadlines)
+                        if request.state == _DONE or request.future.done():
+                            continue
+                        self._timed_out += 1
+                        break
+                    self._deadline_changed.wait(self._deadlines[0][0] - now if self._deadlines else None)
+            _try_set_exception(request.future, TimeoutError("request deadline passed"))
+
+
+class SchedulerLane:
+    """
+    A :class:`RequestScheduler`, with the priority and timeout of one
+    client's requests. Pass one to a V2 service client as its `request_scheduler`.
+    See :meth:`RequestScheduler.lane`.
+    """
+
+    def __init__(self, scheduler: RequestScheduler, priority: int, timeout: Optional[float]):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.timeout = timeout
+
+    def wrap(self, rr_client: mqtt_request_response.Client) -> '_ScheduledClient':
+        """
+        Returns a stand-in for `rr_client` whose requests go through the scheduler.
+        """
+        return _ScheduledClient(self, rr_client)
+
+
+class _ScheduledClient:
+    """Stand-in for an mqtt_request_response.Client, used by a V2 service client"""
+
+    def __init__(self, lane: SchedulerLane, rr_client: mqtt_request_response.Client):
+        self._lane = lane
+        self._rr_client = rr_client
+
+    def make_request(self, options: mqtt_request_response.RequestOptions) -> Future:
+        lane = self._lane
+        return lane.scheduler._submit(self._rr_client, options, lane.priority, lane.timeout)
+
+    def create_stream(self, options: mqtt_request_response.StreamingOperationOptions):
+        return self._rr_client.create_stream(options)
+
+
+def _try_set_exception(future: Future, exception: BaseException):
+    try:
+        future.set_exception(exception)
+    except InvalidStateError:
+        pass
@@ -0,0 +1,436 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Table-driven serializers for generated classes.
+
+Every :class:`awsiot.ModeledClass` (shadow, jobs and identity clients) and every
+:class:`awsiot.eventstreamrpc.Shape` (Greengrass IPC) converts to and from JSON
+payloads through a generated `from_payload()` and `to_payload()` method, which
+is a hand-expanded chain of per-field branches.
+
+Each generated class also declares its fields in a `_payload_fields` table,
+which this module turns into :class:`Field` descriptors and compiles into a
+specialized function for each direction. Flat classes, whose fields need no
+conversion, decode with a single dict lookup per field and no branching. The compiled functions produce
+the same results as the generated methods, including the treatment of
+missing and null values. Malformed payloads raise an exception either way,
+though not necessarily of the same type.
+
+Serializers are built on first use and cached, so importing a service module
+costs nothing extra. Classes without a field table, such as hand-written
+subclasses, use serializers that call the generated methods.
+
+Example::
+
+    from awsiot import iotjobs, serialization
+
+    serializer = serialization.get_serializer(iotjobs.JobExecutionSummary)
+    summaries = serializer.from_payloads(payload['inProgressJobs'])
+"""
+
+import base64
+import datetime
+from enum import Enum
+import keyword
+import logging
+import sys
+from threading import RLock
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+__all__ = [
+    'FieldKind',
+    'Field',
+    'ShapeSerializer',
+    'get_serializer',
+    'decoder_for',
+]
+
+_logger = logging.getLogger(__name__)
+
+
+class FieldKind(Enum):
+    """
+    How a field's value is converted between its payload and attribute forms.
+    """
+
+    PLAIN = 'plain'
+    """Value is used as-is"""
+
+    INT = 'int'
+    """Decoded with int()"""
+
+    FLOAT = 'float'
+    """Decoded with float()"""
+
+    BLOB = 'blob'
+    """bytes, carried in the payload as a base64 string"""
+
+    TIMESTAMP = 'timestamp'
+    """datetime, carried in the payload as epoch seconds and decoded to local time"""
+
+    TIMESTAMP_UTC = 'timestamp_utc'
+    """datetime, carried in the payload as epoch seconds and decoded to UTC"""
+
+    SHAPE = 'shape'
+    """Nested class"""
+
+    SHAPE_LIST = 'shape_list'
+    """List of nested classes"""
+
+    SHAPE_MAP = 'shape_map'
+    """Dict of nested classes"""
+
+    SHAPE_LIST_MAP = 'shape_list_map'
+    """Dict of lists of nested classes"""
+
+
+_NESTED_KINDS = (FieldKind.SHAPE, FieldKind.SHAPE_LIST, FieldKind.SHAPE_MAP, FieldKind.SHAPE_LIST_MAP)
+
+
+class Field(NamedTuple):
+    """
+    Describes how one attribute of a generated class maps to its payload.
+
+    Args:
+        attr: Attribute name on the class
+        key: Key in the JSON payload
+        kind: How the value is converted
+        shape: Nested class, for the SHAPE kinds
+        nullable: Whether an explicit null is tracked by a companion
+            `<attr>_is_nullable` attribute (e.g. shadow state documents)
+    """
+    attr: str
+    key: str
+    kind: FieldKind = FieldKind.PLAIN
+    shape: Optional[type] = None
+    nullable: bool = False
+
+
+def _declared_fields(shape_type: type) -> Tuple[Field, ...]:
+    """
+    Returns the field table a generated class declares in `_payload_fields`.
+
+    Each entry is `(attr, key[, kind[, shape[, nullable]]])`, with `kind` a
+    :class:`FieldKind` value and `shape` the name of a class in the same module.
+    """
+    table = shape_type.__dict__.get('_payload_fields')
+    if table is None:
+        raise ValueError("class declares no _payload_fields")
+
+    namespace = vars(sys.modules[shape_type.__module__])
+    fields = []
+    for entry in table:
+        attr, key, kind, shape_name, nullable = tuple(entry) + (FieldKind.PLAIN.value, None, False)[len(entry) - 2:]
+        kind = FieldKind(kind)
+        shape = None
+        if shape_name is not None:
+            shape = namespace.get(shape_name)
+            if not isinstance(shape, type):
+                raise ValueError("unknown nested class: {}".format(shape_name))
+        if (shape is not None) != (kind in _NESTED_KINDS):
+            raise ValueError("field {} of kind {} has nested class {}".format(attr, kind.value, shape_name))
+        if nullable and kind is not FieldKind.PLAIN:
+            raise ValueError("unsupported nullable field: {}".format(attr))
+        fields.append(Field(attr, key, kind, shape, nullable))
+    return tuple(fields)
+
+
+class ShapeSerializer:
+    """
+    Converts one generated class to and from JSON payloads.
+
+    Obtain instances with :func:`get_serializer`.
+
+    Attributes:
+        shape_type (type): The class this serializer converts.
+        fields (Tuple[Field, ...]): Field table the serializer was compiled from.
+            Empty if the serializer falls back to the generated methods.
+        compiled (bool): True if the conversions run compiled code,
+            False if they call the class's generated methods.
+        from_payload (Optional[Callable[[Dict[str, Any]], Any]]): Returns a new
+            instance of the class, built from a dict parsed from a JSON payload.
+            None if the class is never deserialized.
+        to_payload (Optional[Callable[[Any], Dict[str, Any]]]): Returns a dict,
+            ready for JSON encoding, built from an instance of the class.
+            None if the class is never serialized.
+    """
+
+    __slots__ = ('shape_type', 'fields', 'compiled', 'from_payload', 'to_payload')
+
+    def __init__(self, shape_type: type, fields: Tuple[Field, ...], compiled: bool,
+                 from_payload: Callable[[Dict[str, Any]], Any],
+                 to_payload: Callable[[Any], Dict[str, Any]]):
+        self.shape_type = shape_type
+        self.fields = fields
+        self.compiled = compiled
+        self.from_payload = from_payload
+        self.to_payload = to_payload
+
+    def from_payloads(self, payloads: Iterable[Dict[str, Any]]) -> List[Any]:
+        """
+        Returns a list of new instances, one for each dict in `payloads`.
+        """
+        return list(map(self.from_payload, payloads))
+
+    def to_payloads(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        """
+        Returns a list of dicts, one for each instance in `objs`.
+        """
+        return list(map(self.to_payload, objs))
+
+    def __repr__(self):
+        return '{}({}.{}, compiled={})'.format(
+            self.__class__.__name__,
+            self.shape_type.__module__,
+            self.shape_type.__qualname__,
+            self.compiled)
+
+
+_VALUE_DECODERS = {
+    FieldKind.PLAIN: '{v}',
+    FieldKind.INT: '_int({v})',
+    FieldKind.FLOAT: '_float({v})',
+    FieldKind.BLOB: '_b64decode({v})',
+    FieldKind.TIMESTAMP: '_fromtimestamp({v})',
+    FieldKind.TIMESTAMP_UTC: '_fromtimestamp({v}, _utc)',
+    FieldKind.SHAPE: '{d}({v})',
+    FieldKind.SHAPE_LIST: '_list(_map({d}, {v}))',
+    FieldKind.SHAPE_MAP: '{{k: {d}(x) for k, x in {v}.items()}}',
+    FieldKind.SHAPE_LIST_MAP: '{{k: _list(_map({d}, x)) for k, x in {v}.items()}}',
+}
+
+_VALUE_ENCODERS = {
+    FieldKind.PLAIN: '{v}',
+    FieldKind.INT: '{v}',
+    FieldKind.FLOAT: '{v}',
+    FieldKind.BLOB: '_b64encode({v}).decode()',
+    FieldKind.TIMESTAMP: '{v}.timestamp()',
+    FieldKind.TIMESTAMP_UTC: '{v}.timestamp()',
+    FieldKind.SHAPE: '{v}.{m}()',
+    FieldKind.SHAPE_LIST: '[i.{m}() for i in {v}]',
+    FieldKind.SHAPE_MAP: '{{k: x.{m}() for k, x in {v}.items()}}',
+    FieldKind.SHAPE_LIST_MAP: '{{k: [i.{m}() for i in x] for k, x in {v}.items()}}',
+}
+
+
+def _compile(name: str, lines: List[str], namespace: Dict[str, Any]) -> Callable:
+    source = '\n'.join(lines)
+    code = compile(source, '<{} serializer>'.format(namespace['_cls'].__qualname__), 'exec')
+    exec(code, namespace)
+    return namespace[name]
+
+
+class _Compiler:
+    """Generates the source for one class's conversion functions"""
+
+    def __init__(self, shape_type: type, fields: Tuple[Field, ...], modeled: bool):
+        self.shape_type = shape_type
+        self.fields = fields
+        # ModeledClass decoders skip nulls; Shape decoders convert any key that is present
+        self.modeled = modeled
+        self.namespace = {
+            '__builtins__': {},
+            '_cls': shape_type,
+            '_new': shape_type.__new__,
+            '_missing': _MISSING,
+            '_int': int,
+            '_float': float,
+            '_list': list,
+            '_map': map,
+            '_b64decode': base64.b64decode,
+            '_b64encode': base64.b64encode,
+            '_fromtimestamp': datetime.datetime.fromtimestamp,
+            '_utc': datetime.timezone.utc,
+        }  # type: Dict[str, Any]
+
+        defaults = shape_type()
+        if modeled:
+            self.defaults = {slot: getattr(defaults, slot) for slot in shape_type.__slots__}
+        else:
+            self.defaults = dict(vars(defaults))
+        for attr in self.defaults:
+            if not attr.isidentifier() or keyword.iskeyword(attr):
+                raise ValueError("unsupported attribute name: {}".format(attr))
+
+    def _constant(self, value: Any) -> str:
+        if value is None or value is True or value is False:
+            return repr(value)
+        name = '_default_{}'.format(len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def _decode_field(self, index: int, field: Field) -> Tuple[List[str], str]:
+        """
+        Returns statements that decode the field, and the expression
+        holding the attribute's value afterwards.
+        """
+        default = self._constant(self.defaults[field.attr])
+        if field.kind is FieldKind.PLAIN and not field.nullable and default == 'None':
+            # flat fields need no statements, the lookup goes straight into the attribute
+            return [], 'payload.get({!r})'.format(field.key)
+
+        out = 'f{}'.format(index)
+        if field.nullable:
+            return [
+                'v = payload.get({!r}, _missing)'.format(field.key),
+                'if v is _missing:',
+                '    {} = {}'.format(out, default),
+                '    {}_nullable = False'.format(out),
+                'else:',
+                '    {} = v'.format(out),
+                '    {}_nullable = v is None'.format(out),
+            ], out
+
+        decoder = None
+        if field.kind in _NESTED_KINDS:
+            decoder = '_decode_{}'.format(index)
+            self.namespace[decoder] = _nested_decoder(field.shape)
+        convert = _VALUE_DECODERS[field.kind].format(v='v', d=decoder)
+        if self.modeled:
+            return [
+                'v = payload.get({!r})'.format(field.key),
+                '{} = {} if v is None else {}'.format(out, default, convert),
+            ], out
+        return [
+            'v = payload.get({!r}, _missing)'.format(field.key),
+            '{} = {} if v is _missing else {}'.format(out, default, convert),
+        ], out
+
+    def decoder_source(self) -> List[str]:
+        body = []
+        values = {attr: self._constant(value) for attr, value in self.defaults.items()}
+        for index, field in enumerate(self.fields):
+            statements, value = self._decode_field(index, field)
+            body.extend(statements)
+            values[field.attr] = value
+            if field.nullable:
+                values[field.attr + '_is_nullable'] = value + '_nullable'
+
+        body.append('new = _new(_cls)')
+        if self.modeled:
+            body.extend('new.{} = {}'.format(attr, value) for attr, value in values.items())
+        else:
+            # filling the instance dict in place is cheaper than setattr() or replacing it,
+            # and keeps the attribute order that Shape.__repr__() and __eq__() rely on
+            body.append('d = new.__dict__')
+            body.extend('d[{!r}] = {}'.format(attr, value) for attr, value in values.items())
+        body.append('return new')
+        return ['def from_payload(payload):'] + ['    ' + line for line in body]
+
+    def encoder_source(self) -> List[str]:
+        method = 'to_payload' if self.modeled else '_to_payload'
+        body = ['payload = {}']
+        for field in self.fields:
+            value = 'obj.' + field.attr
+            if field.nullable:
+                body.extend([
+                    'if obj.{}_is_nullable is True:'.format(field.attr),
+                    '    payload[{!r}] = {}'.format(field.key, value),
+                    'elif {} is not None:'.format(value),
+                    '    payload[{!r}] = {}'.format(field.key, value),
+                ])
+                continue
+            body.extend([
+                'v = ' + value,
+                'if v is not None:',
+                '    payload[{!r}] = {}'.format(field.key, _VALUE_ENCODERS[field.kind].format(v='v', m=method)),
+            ])
+        body.append('return payload')
+        return ['def to_payload(obj):'] + ['    ' + line for line in body]
+
+    def compile_decoder(self) -> Callable:
+        return _compile('from_payload', self.decoder_source(), self.namespace)
+
+    def compile_encoder(self) -> Callable:
+        return _compile('to_payload', self.encoder_source(), self.namespace)
+
+
+_MISSING = object()
+
+_serializers = {}  # type: Dict[type, ShapeSerializer]
+_serializers_lock = RLock()
+_building = set()  # classes whose serializer is being built, guarded by _serializers_lock
+
+
+def _fallback_serializer(shape_type: type) -> ShapeSerializer:
+    if hasattr(shape_type, '_from_payload') and not hasattr(shape_type, 'from_payload'):
+        return ShapeSerializer(shape_type, (), False, shape_type._from_payload, shape_type._to_payload)
+    return ShapeSerializer(shape_type, (), False, getattr(shape_type, 'from_payload', None),
+                           getattr(shape_type, 'to_payload', None))
+
+
+def _build_serializer(shape_type: type) -> ShapeSerializer:
+    modeled = 'from_payload' in shape_type.__dict__ or 'to_payload' in shape_type.__dict__
+    prefix = '' if modeled else '_'
+    decodes = prefix + 'from_payload' in shape_type.__dict__
+    encodes = prefix + 'to_payload' in shape_type.__dict__
+    if not (decodes or encodes):
+        raise ValueError("class defines no generated conversions")
+
+    fields = _declared_fields(shape_type)
+    compiler = _Compiler(shape_type, fields, modeled)
+    from_payload = compiler.compile_decoder() if decodes else None
+    to_payload = compiler.compile_encoder() if encodes else None
+    return ShapeSerializer(shape_type, fields, True, from_payload, to_payload)
+
+
+def get_serializer(shape_type: type) -> ShapeSerializer:
+    """
+    Returns the serializer for a generated class.
+
+    The serializer is built the first time a class is requested and
+    cached afterwards. This function is thread-safe.
+
+    Args:
+        shape_type: A :class:`awsiot.ModeledClass` or
+            :class:`awsiot.eventstreamrpc.Shape` subclass from one of
+            the generated service modules.
+
+    Returns:
+        :class:`ShapeSerializer` for the class.
+        Its `from_payload` or `to_payload` is None if the class
+        does not support that direction.
+    """
+    serializer = _serializers.get(shape_type)
+    if serializer is None:
+        with _serializers_lock:
+            serializer = _serializers.get(shape_type)
+            if serializer is None:
+                _building.add(shape_type)
+                try:
+                    serializer = _build_serializer(shape_type)
+                except Exception as e:
+                    if '_payload_fields' in shape_type.__dict__:
+                        # the generated table is broken, which is a code generation bug
+                        _logger.warning("Using generated methods to serialize %s: %s", shape_type.__qualname__, e)
+                    else:
+                        _logger.debug("Using generated methods to serialize %s: %s", shape_type.__qualname__, e)
+                    serializer = _fallback_serializer(shape_type)
+                finally:
+                    _building.discard(shape_type)
+                _serializers[shape_type] = serializer
+    return serializer
+
+
+def _nested_decoder(shape_type: type) -> Callable[[Dict[str, Any]], Any]:
+    # Building a class's serializer builds its nested classes' serializers too.
+    # A class that is still being built (a recursive shape) uses its generated method.
+    if shape_type in _building:
+        return _fallback_serializer(shape_type).from_payload
+    return get_serializer(shape_type).from_payload or _fallback_serializer(shape_type).from_payload
+
+
+def decoder_for(shape_type: type) -> Callable[[Dict[str, Any]], Any]:
+    """
+    Returns a function that builds an instance of `shape_type` from a dict
+    parsed from a JSON payload. This is the compiled decoder when one could
+    be built, and the class's generated method otherwise.
+
+    Raises:
+        TypeError: if the class is never deserialized.
+    """
+    serializer = get_serializer(shape_type)
+    if serializer.from_payload is None:
+        raise TypeError("{} cannot be deserialized".format(shape_type.__name__))
+    return serializer.from_payload
@@ -0,0 +1,354 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Local cache of shadow documents, kept current by shadow event streams.
+"""
+
+import awsiot
+from awscrt import mqtt_request_response
+from awsiot import iotshadow
+from awsiot.shadow_document import apply_update, compute_delta
+from concurrent.futures import Future
+import copy
+import datetime
+from threading import RLock
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = [
+    'ShadowCache',
+]
+
+_ShadowKey = Tuple[str, Optional[str]]
+
+# Both the delta and the documents stream must be subscribed for a shadow to stay current
+_STREAMS_PER_SHADOW = 2
+
+
+class _CachedShadow:
+    """Last known document of one shadow, and the state of its streams"""
+    __slots__ = ('desired', 'reported', 'metadata_desired', 'metadata_reported', 'version', 'timestamp',
+                 'partial', 'synced', 'streams', 'streams_established', 'streams_halted', 'subscribed', 'fetch')
+
+    def __init__(self):
+        self.desired = None  # type: Optional[Dict[str, Any]]
+        self.reported = None  # type: Optional[Dict[str, Any]]
+        self.metadata_desired = None  # type: Optional[Dict[str, Any]]
+        self.metadata_reported = None  # type: Optional[Dict[str, Any]]
+        self.version = None  # type: Optional[int]
+        self.timestamp = None  # type: Optional[datetime.datetime]
+        # True after a delta event, whose version's reported state is not known yet
+        self.partial = False
+        # True while the streams are subscribed and no version has been skipped
+        self.synced = False
+        self.streams = []  # type: List[mqtt_request_response.StreamingOperation]
+        self.streams_established = set()  # type: set
+        self.streams_halted = False
+        # completes once both streams have been subscribed (or have given up)
+        self.subscribed = Future()  # type: Future
+        # in-progress get_shadow request
+        self.fetch = None  # type: Optional[Future]
+
+    def set_document(self, state, metadata, version: int, timestamp: Optional[datetime.datetime]):
+        self.desired = copy.deepcopy(state.desired) if state is not None else None
+        self.reported = copy.deepcopy(state.reported) if state is not None else None
+        self.metadata_desired = copy.deepcopy(metadata.desired) if metadata is not None else None
+        self.metadata_reported = copy.deepcopy(metadata.reported) if metadata is not None else None
+        self.version = version
+        self.timestamp = timestamp
+        self.partial = False
+
+    def to_response(self) -> iotshadow.GetShadowResponse:
+        return iotshadow.GetShadowResponse(
+            state=iotshadow.ShadowStateWithDelta(
+                desired=copy.deepcopy(self.desired),
+                reported=copy.deepcopy(self.reported),
+                delta=compute_delta(self.desired, self.reported)),
+            metadata=iotshadow.ShadowMetadata(
+                desired=copy.deepcopy(self.metadata_desired),
+                reported=copy.deepcopy(self.metadata_reported)),
+            version=self.version,
+            timestamp=self.timestamp)
+
+
+class ShadowCache:
+    """
+    Keeps the last known document of each shadow it is asked about, so
+    reads can be served locally instead of with a request to the service.
+
+    The first :meth:`get_shadow` for a shadow opens its delta and documents
+    streams on `shadow_client`, waits for them to be subscribed, then fetches
+    the document with a `get_shadow` request. From then on the cached
+    document follows the events on those streams:
+
+    * a :class:`~awsiot.iotshadow.ShadowUpdatedEvent` carries the whole new
+      document, and replaces the cached one if it is not older.
+    * a :class:`~awsiot.iotshadow.ShadowDeltaUpdatedEvent` for the next
+      version is merged into the desired state. It does not carry the
+      reported state of that version, so the document is not served from the
+      cache until the documents event of the same version arrives.
+    * events for versions the cache already has are stale, and are dropped.
+
+    A new `get_shadow` request goes out only on a cold start, when an event
+    shows that a version was skipped, after a stream's subscription
+    was lost, or for a read between a delta event and its documents event.
+    While one is in flight, reads of that shadow share it.
+
+    This class is thread-safe.
+
+    Args:
+        shadow_client: Client used for the streams and requests.
+    """
+
+    def __init__(self, shadow_client: iotshadow.IotShadowClientV2):
+        self._shadow_client = shadow_client
+        self._lock = RLock()
+        self._shadows = {}  # type: Dict[_ShadowKey, _CachedShadow]
+        self._closed = False
+
+    def get_shadow(self, thing_name: str, shadow_name: Optional[str] = None) -> Future:
+        """
+        Returns a shadow's document.
+
+        Args:
+            thing_name: Thing that owns the shadow.
+            shadow_name: Name of the shadow, or None for the classic shadow.
+
+        Returns:
+            A Future whose result will be a :class:`~awsiot.iotshadow.GetShadowResponse`.
+            If the document is cached, the future is already complete.
+            Otherwise, it completes when the document has been fetched, or with
+            the :class:`awsiot.V2ServiceException` of the request if it fails.
+        """
+        key = (thing_name, shadow_name)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ShadowCache is closed")
+
+            shadow = self._shadows.get(key)
+            if shadow is None:
+                shadow = self._shadows[key] = _CachedShadow()
+                self._open_streams(key, shadow)
+
+            if shadow.synced:
+                future = Future()  # type: Future
+                future.set_result(shadow.to_response())
+                return future
+
+            return self._start_fetch(key, shadow)
+
+    def get_cached(self, thing_name: str, shadow_name: Optional[str] = None) -> Optional[iotshadow.GetShadowResponse]:
+        """
+        Returns a shadow's cached document without contacting the service.
+
+        Args:
+            thing_name: Thing that owns the shadow.
+            shadow_name: Name of the shadow, or None for the classic shadow.
+
+        Returns:
+            A :class:`~awsiot.iotshadow.GetShadowResponse` if the document is
+            cached and current, otherwise None.
+        """
+        with self._lock:
+            shadow = self._shadows.get((thing_name, shadow_name))
+            if shadow is None or not shadow.synced:
+                return None
+            return shadow.to_response()
+
+    def invalidate(self, thing_name: str, shadow_name: Optional[str] = None):
+        """
+        Forget a shadow's cached document, so the next read fetches it from the service.
+
+        Use this after the shadow is deleted, since deletions are not reported on the streams.
+
+        Args:
+            thing_name: Thing that owns the shadow.
+            shadow_name: Name of the shadow, or None for the classic shadow.
+        """
+        with self._lock:
+            shadow = self._shadows.get((thing_name, shadow_name))
+            if shadow is not None:
+                shadow.synced = False
+                shadow.version = None
+
+    def close(self):
+        """
+        Drop every cached document and close the streams.
+        """
+        with self._lock:
+            self._closed = True
+            self._shadows.clear()
+
+    def apply_get_response(self, thing_name: str, response: iotshadow.GetShadowResponse,
+                           shadow_name: Optional[str] = None):
+        """
+        Update the cache with a shadow document fetched elsewhere,
+        e.g. with the legacy :class:`~awsiot.iotshadow.IotShadowClient`.
+        The document is ignored if it is older than the cached one.
+        """
+        with self._lock:
+            shadow = self._shadows.get((thing_name, shadow_name))
+            if shadow is not None:
+                self._adopt_response(shadow, response)
+
+    def _adopt_response(self, shadow: _CachedShadow, response: iotshadow.GetShadowResponse) -> bool:
+        # must be called with the lock held
+        if response.version is None or (shadow.version is not None and response.version < shadow.version):
+            return False
+        shadow.set_document(response.state, response.metadata, response.version, response.timestamp)
+        return True
+
+    def apply_updated_event(self, thing_name: str, event: iotshadow.ShadowUpdatedEvent,
+                            shadow_name: Optional[str] = None):
+        """
+        Update the cache with a shadow's documents event.
+        Called for events on the streams the cache opens, and may be called
+        with events received elsewhere.
+        """
+        current = event.current
+        if current is None or current.version is None:
+            return
+        with self._lock:
+            shadow = self._shadows.get((thing_name, shadow_name))
+            if shadow is None or (shadow.version is not None and current.version < shadow.version):
+                return
+            shadow.set_document(current.state, current.metadata, current.version, event.timestamp)
+            shadow.synced = self._streams_up(shadow)
+
+    def apply_delta_event(self, thing_name: str, event: iotshadow.ShadowDeltaUpdatedEvent,
+                          shadow_name: Optional[str] = None):
+        """
+        Update the cache with a shadow's delta event.
+        Called for events on the streams the cache opens, and may be called
+        with events received elsewhere.
+        """
+        if event.version is None:
+            return
+        key = (thing_name, shadow_name)
+        with self._lock:
+            shadow = self._shadows.get(key)
+            if shadow is None or shadow.version is None or event.version <= shadow.version:
+                return
+
+            if event.version == shadow.version + 1:
+                shadow.desired = apply_update(shadow.desired or {}, event.state or {})
+                shadow.metadata_desired = apply_update(shadow.metadata_desired or {}, event.metadata or {})
+                shadow.version = event.version
+                shadow.timestamp = event.timestamp
+                shadow.partial = True
+                shadow.synced = False
+            else:
+                # skipped at least one version, the document must be fetched again
+                shadow.synced = False
+                self._start_fetch(key, shadow)
+
+    def _streams_up(self, shadow: _CachedShadow) -> bool:
+        return len(shadow.streams_established) == _STREAMS_PER_SHADOW
+
+    def _open_streams(self, key: _ShadowKey, shadow: _CachedShadow):
+        # must be called with the lock held
+        thing_name, shadow_name = key
+
+        def on_delta(event):
+            self.apply_delta_event(thing_name, event, shadow_name)
+
+        def on_updated(event):
+            self.apply_updated_event(thing_name, event, shadow_name)
+
+        client = self._shadow_client
+        if shadow_name is None:
+            delta_request = iotshadow.ShadowDeltaUpdatedSubscriptionRequest(thing_name=thing_name)
+            updated_request = iotshadow.ShadowUpdatedSubscriptionRequest(thing_name=thing_name)
+            streams = (
+                (client.create_shadow_delta_updated_stream, delta_request, on_delta),
+                (client.create_shadow_updated_stream, updated_request, on_updated),
+            )
+        else:
+            delta_request = iotshadow.NamedShadowDeltaUpdatedSubscriptionRequest(
+                thing_name=thing_name, shadow_name=shadow_name)
+            updated_request = iotshadow.NamedShadowUpdatedSubscriptionRequest(
+                thing_name=thing_name, shadow_name=shadow_name)
+            streams = (
+                (client.create_named_shadow_delta_updated_stream, delta_request, on_delta),
+                (client.create_named_shadow_updated_stream, updated_request, on_updated),
+            )
+
+        for index, (create_stream, request, listener) in enumerate(streams):
+            options = awsiot.ServiceStreamOptions(
+                incoming_event_listener=listener,
+                subscription_status_listener=lambda event, i=index: self._on_subscription_status(key, i, event))
+            stream = create_stream(request, options)
+            shadow.streams.append(stream)
+            stream.open()
+
+    def _on_subscription_status(self, key: _ShadowKey, stream_index: int,
+                                event: mqtt_request_response.SubscriptionStatusEvent):
+        with self._lock:
+            shadow = self._shadows.get(key)
+            if shadow is None:
+                return
+
+            event_type = event.type
+            if event_type == mqtt_request_response.SubscriptionStatusEventType.SUBSCRIPTION_ESTABLISHED:
+                shadow.streams_established.add(stream_index)
+            else:
+                # events may have been missed, the document can't be trusted until it is fetched again
+                shadow.streams_established.discard(stream_index)
+                shadow.synced = False
+                if event_type == mqtt_request_response.SubscriptionStatusEventType.SUBSCRIPTION_HALTED:
+                    shadow.streams_halted = True
+
+            subscribed = shadow.subscribed
+            if self._streams_up(shadow) or shadow.streams_halted:
+                if not subscribed.done():
+                    subscribed.set_result(None)
+                elif self._streams_up(shadow) and shadow.version is not None:
+                    # resubscribed after losing the subscription, refresh right away
+                    self._start_fetch(key, shadow)
+
+    def _start_fetch(self, key: _ShadowKey, shadow: _CachedShadow) -> Future:
+        # must be called with the lock held
+        if shadow.fetch is not None:
+            return shadow.fetch
+
+        fetch = shadow.fetch = Future()
+        # fetching after the streams are subscribed means no update can fall between the two
+        shadow.subscribed.add_done_callback(lambda _: self._send_get(key, shadow, fetch))
+        return fetch
+
+    def _send_get(self, key: _ShadowKey, shadow: _CachedShadow, fetch: Future):
+        thing_name, shadow_name = key
+        try:
+            if shadow_name is None:
+                request_future = self._shadow_client.get_shadow(
+                    iotshadow.GetShadowRequest(thing_name=thing_name))
+            else:
+                request_future = self._shadow_client.get_named_shadow(
+                    iotshadow.GetNamedShadowRequest(thing_name=thing_name, shadow_name=shadow_name))
+        except Exception as e:
+            request_future = Future()
+            request_future.set_exception(e)
+
+        request_future.add_done_callback(lambda f: self._on_get_done(key, shadow, fetch, f))
+
+    def _on_get_done(self, key: _ShadowKey, shadow: _CachedShadow, fetch: Future, request_future: Future):
+        exception = request_future.exception()
+        with self._lock:
+            shadow.fetch = None
+            if exception is None:
+                response = request_future.result()
+                if not self._adopt_response(shadow, response):
+                    if shadow.partial:
+                        # a newer delta event arrived while the request was in flight,
+                        # and the reported state of its version is still unknown
+                        shadow.fetch = fetch
+                        self._send_get(key, shadow, fetch)
+                        return
+                    # events arrived with a newer version while the request was in flight
+                    response = shadow.to_response()
+                shadow.synced = self._streams_up(shadow)
+
+        if exception is None:
+            fetch.set_result(response)
+        else:
+            fetch.set_exception(exception)
@@ -0,0 +1,248 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Helpers for working with shadow state documents (the `desired`, `reported`
+and `delta` dicts of :class:`awsiot.iotshadow.ShadowState`) on the client.
+
+These follow the rules the Device Shadow service uses when it applies an update:
+nested objects are merged key by key, a null value deletes its key, and any
+other value (including a list) replaces what was there.
+"""
+
+import copy
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from awsiot import iotshadow
+
+__all__ = [
+    'merge_into',
+    'apply_update',
+    'apply_delta',
+    'compute_delta',
+    'diff',
+    'diff_state',
+]
+
+Document = Dict[str, Any]
+
+
+def merge_into(document: Document, patch: Document) -> Document:
+    """
+    Deep-merge `patch` into `document`, as a shadow update would.
+
+    Nested dicts are merged key by key. Any other value in `patch`,
+    including None and lists, replaces the value in `document`.
+    None values are kept rather than removed, so the merged document
+    still deletes those keys when it is sent as an update.
+
+    `document` is modified in place. Values taken from `patch` are copied,
+    so later changes to `patch` do not affect `document`.
+
+    Args:
+        document: Document to update
+        patch: Partial document to merge in
+
+    Returns:
+        `document`
+    """
+    for key, value in patch.items():
+        if isinstance(value, dict):
+            existing = document.get(key)
+            if not isinstance(existing, dict):
+                existing = document[key] = {}
+            merge_into(existing, value)
+        elif isinstance(value, list):
+            document[key] = copy.deepcopy(value)
+        else:
+            document[key] = value
+    return document
+
+
+def apply_update(document: Document, patch: Document) -> Document:
+    """
+    Apply the partial document `patch` to the stored state `document`,
+    as the Device Shadow service does.
+
+    Unlike :func:`merge_into`, a None value in `patch` removes its key
+    from `document` rather than being kept.
+
+    `document` is modified in place. Values taken from `patch` are copied.
+
+    Args:
+        document: Stored state to update
+        patch: Partial document to apply
+
+    Returns:
+        `document`
+    """
+    for key, value in patch.items():
+        if value is None:
+            document.pop(key, None)
+        elif isinstance(value, dict):
+            existing = document.get(key)
+            if not isinstance(existing, dict):
+                existing = document[key] = {}
+            apply_update(existing, value)
+        else:
+            document[key] = copy.deepcopy(value)
+    return document
+
+
+def apply_delta(document: Document, delta: Document) -> Optional[Document]:
+    """
+    Apply the `state` of a :class:`~awsiot.iotshadow.ShadowDeltaUpdatedEvent`
+    to the local document `document`, and return what it changed.
+
+    Nested dicts are merged key by key. Values equal to the ones already in
+    `document` are left alone, so a device can act on the returned changes
+    only, rather than on every key the service repeats in each delta.
+
+    `document` is modified in place. Values taken from `delta` are copied.
+
+    Args:
+        document: Local document to update, such as the device's reported state
+        delta: Delta to apply
+
+    Returns:
+        The part of `delta` that changed `document`, or None if nothing changed.
+        Its values are the ones from `delta`.
+    """
+    changes = {}
+    for key, value in delta.items():
+        if value is None:
+            if key in document:
+                del document[key]
+                changes[key] = None
+        elif isinstance(value, dict):
+            existing = document.get(key)
+            if not isinstance(existing, dict):
+                existing = document[key] = {}
+            nested = apply_delta(existing, value)
+            if nested is not None:
+                changes[key] = nested
+        elif key not in document or not _same(document[key], value):
+            document[key] = copy.deepcopy(value)
+            changes[key] = value
+    return changes or None
+
+
+def _same(a: Any, b: Any) -> bool:
+    # True == 1 == 1.0 in Python, but not in JSON, so types are compared at every level
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(value, b[key]) for key, value in a.items())
+    return a == b
+
+
+def diff(old: Optional[Document], new: Optional[Document]) -> Optional[Document]:
+    """
+    Returns the smallest partial document that turns `old` into `new`
+    when the Device Shadow service applies it as an update.
+
+    Values that changed or were added are included, nested dicts are
+    compared key by key, and keys that `new` lacks are set to None, which
+    deletes them. Lists are compared, and sent, as a whole.
+
+    Args:
+        old: Document the service holds, such as the last acknowledged reported state, or None
+        new: Document it should hold, or None
+
+    Returns:
+        The update, or None if the documents are the same.
+        Values taken from `new` are copied.
+    """
+    old = old or {}
+    new = new or {}
+    patch = {}
+    for key, old_value in old.items():
+        if old_value is not None and new.get(key) is None:
+            patch[key] = None
+    for key, new_value in new.items():
+        if new_value is None:
+            continue
+        old_value = old.get(key)
+        if isinstance(new_value, dict) and isinstance(old_value, dict):
+            nested = diff(old_value, new_value)
+            if nested is not None:
+                patch[key] = nested
+        elif old_value is None or not _same(old_value, new_value):
+            patch[key] = copy.deepcopy(new_value)
+    return patch or None
+
+
+def diff_state(acknowledged: 'Optional[iotshadow.ShadowState]',
+               current: 'iotshadow.ShadowState') -> 'Optional[iotshadow.ShadowState]':
+    """
+    Returns the smallest :class:`~awsiot.iotshadow.ShadowState` to send with
+    :meth:`~awsiot.iotshadow.IotShadowClientV2.update_shadow` so that the
+    shadow goes from the `acknowledged` state to the `current` one.
+
+    Each of `desired` and `reported` is compared with :func:`diff`. A section
+    that is None in `current` is left alone, unless its `*_is_nullable` flag
+    is set, in which case the update clears it, if it held anything.
+
+    Args:
+        acknowledged: State the service last accepted, for example from the
+            `state` of an :class:`~awsiot.iotshadow.UpdateShadowResponse`
+            merged into what came before. If None, nothing is assumed to be
+            there, and all of `current` is sent.
+        current: State the shadow should have.
+
+    Returns:
+        The update, or None if there is nothing to send.
+    """
+    from awsiot import iotshadow
+
+    update = iotshadow.ShadowState()
+    changed = False
+    for section in ('desired', 'reported'):
+        old = getattr(acknowledged, section) if acknowledged is not None else None
+        new = getattr(current, section)
+        if new is None:
+            if getattr(current, section + '_is_nullable') and old is not None:
+                setattr(update, section + '_is_nullable', True)
+                changed = True
+            continue
+        patch = diff(old, new)
+        if patch is not None:
+            setattr(update, section, patch)
+            changed = True
+    return update if changed else None
+
+
+def compute_delta(desired: Optional[Document], reported: Optional[Document]) -> Optional[Document]:
+    """
+    Returns the delta between a shadow's desired and reported states,
+    as the Device Shadow service computes it.
+
+    The delta holds every desired value that differs from the reported value
+    at the same path. Nested dicts are compared key by key, anything
+    else (including lists) is compared as a whole.
+
+    Args:
+        desired: Desired state, or None
+        reported: Reported state, or None
+
+    Returns:
+        The delta, or None if the states agree.
+    """
+    if not desired:
+        return None
+    reported = reported or {}
+    delta = {}
+    for key, desired_value in desired.items():
+        if desired_value is None:
+            continue
+        reported_value = reported.get(key)
+        if isinstance(desired_value, dict) and isinstance(reported_value, dict):
+            nested = compute_delta(desired_value, reported_value)
+            if nested is not None:
+                delta[key] = nested
+        elif key not in reported or not _same(desired_value, reported_value):
+            delta[key] = copy.deepcopy(desired_value)
+    return delta or None
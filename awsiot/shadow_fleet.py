@@ -0,0 +1,496 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Shadow requests and events for many things at once, as handled by a gateway.
+"""
+
+from awscrt import mqtt_request_response
+import awsiot
+from awsiot import iotshadow, serialization
+from collections import deque
+from concurrent.futures import CancelledError, Future, as_completed
+import logging
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+__all__ = [
+    'ShadowFleetManager',
+    'ShadowResult',
+]
+
+logger = logging.getLogger(__name__)
+
+# Topic filters of the wildcard streams, by the event class they carry
+_WILDCARD_STREAMS = (
+    ('$aws/things/+/shadow/update/delta', iotshadow.ShadowDeltaUpdatedEvent),
+    ('$aws/things/+/shadow/name/+/update/delta', iotshadow.ShadowDeltaUpdatedEvent),
+    ('$aws/things/+/shadow/update/documents', iotshadow.ShadowUpdatedEvent),
+    ('$aws/things/+/shadow/name/+/update/documents', iotshadow.ShadowUpdatedEvent),
+)
+
+DeltaListener = Callable[[str, Optional[str], iotshadow.ShadowDeltaUpdatedEvent], None]
+UpdatedListener = Callable[[str, Optional[str], iotshadow.ShadowUpdatedEvent], None]
+
+
+class ShadowResult(NamedTuple):
+    """
+    Outcome of one request of a bulk operation.
+
+    Args:
+        thing_name (str): Thing that owns the shadow.
+        shadow_name (Optional[str]): Name of the shadow, or None for the classic shadow.
+        response (Any): Response of the request, or None if it failed.
+        error (Optional[Exception]): Why the request failed, or None if it succeeded.
+    """
+    thing_name: str
+    shadow_name: Optional[str]
+    response: Any
+    error: Optional[Exception]
+
+
+def _shadow_of_topic(topic: str) -> Tuple[str, Optional[str]]:
+    # $aws/things/<thing>/shadow[/name/<shadow>]/...
+    levels = topic.split('/')
+    shadow_name = levels[5] if len(levels) > 5 and levels[4] == 'name' else None
+    return levels[2], shadow_name
+
+
+class _Thing:
+    """Requests and known shadow versions of one thing"""
+    __slots__ = ('pending', 'in_flight', 'ready', 'versions')
+
+    def __init__(self):
+        # (send, future, shadow_name) of requests waiting for a slot
+        self.pending = deque()  # type: Deque[Tuple[Callable[[], Future], Future, Optional[str]]]
+        self.in_flight = 0
+        # True while the thing is in the manager's ready queue
+        self.ready = False
+        self.versions = {}  # type: Dict[Optional[str], int]
+
+
+class ShadowFleetManager:
+    """
+    Sends shadow requests for many things through one
+    :class:`~awsiot.iotshadow.IotShadowClientV2`, and reports the shadow
+    events of every thing through a handful of wildcard subscriptions.
+
+    Requests are queued, and at most `max_in_flight` are sent at a time,
+    no more than `max_in_flight_per_thing` of them for the same thing.
+    Things take turns, so a thing with a long queue does not hold up the
+    others. Bulk operations such as :meth:`get_many` queue every request
+    at once, and yield the results as they complete.
+
+    If `on_shadow_delta_updated` or `on_shadow_updated` is given, the events
+    of every thing's classic and named shadows arrive through four wildcard
+    streams, such as `$aws/things/+/shadow/update/delta`, rather than two
+    streams per shadow. This needs an IoT policy that allows subscribing to
+    those filters. With `wildcard_streams` False, call :meth:`watch` for
+    each shadow instead.
+
+    The manager also remembers the latest version it has seen of each
+    shadow, see :meth:`version`.
+
+    This class is thread-safe.
+
+    Args:
+        shadow_client: Client to send requests and open streams with.
+        max_in_flight: Number of requests that may await a response at once.
+        max_in_flight_per_thing: Number of requests for the same thing that
+            may await a response at once.
+        on_shadow_delta_updated: Callback for delta events, called with the
+            thing name, the shadow name (None for the classic shadow) and the event.
+        on_shadow_updated: Callback for documents events, called like `on_shadow_delta_updated`.
+        subscription_status_listener: Callback for the subscription status events of the streams.
+        deserialization_failure_listener: Callback for stream messages that
+            cannot be decoded, called with an :class:`awsiot.V2DeserializationFailure`.
+            If None, such messages are logged as warnings.
+        wildcard_streams: If True, events are received through wildcard streams.
+    """
+
+    def __init__(self, shadow_client: iotshadow.IotShadowClientV2, *,
+                 max_in_flight: int = 32,
+                 max_in_flight_per_thing: int = 1,
+                 on_shadow_delta_updated: Optional[DeltaListener] = None,
+                 on_shadow_updated: Optional[UpdatedListener] = None,
+                 subscription_status_listener: Optional[
+                     Callable[[mqtt_request_response.SubscriptionStatusEvent], None]] = None,
+                 deserialization_failure_listener: Optional[
+                     Callable[[awsiot.V2DeserializationFailure], None]] = None,
+                 wildcard_streams: bool = True):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        if max_in_flight_per_thing < 1:
+            raise ValueError("max_in_flight_per_thing must be at least 1")
+
+        self._shadow_client = shadow_client
+        self._max_in_flight = max_in_flight
+        self._max_in_flight_per_thing = max_in_flight_per_thing
+        self._on_delta = on_shadow_delta_updated
+        self._on_updated = on_shadow_updated
+        self._status_listener = subscription_status_listener
+        self._failure_listener = deserialization_failure_listener \
+            if deserialization_failure_listener is not None else _log_deserialization_failure
+        self._wildcard_streams = wildcard_streams
+
+        self._lock = Lock()
+        self._things = {}  # type: Dict[str, _Thing]
+        # things with a pending request and room for it to be sent, in turn
+        self._ready = deque()  # type: Deque[str]
+        self._in_flight = 0
+        self._queued = 0
+        self._streams = []  # type: List[mqtt_request_response.StreamingOperation]
+        self._watched = set()  # type: set
+        self._closed = False
+
+        if wildcard_streams and (on_shadow_delta_updated is not None or on_shadow_updated is not None):
+            self._open_wildcard_streams()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests awaiting a response"""
+        with self._lock:
+            return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting to be sent, including any cancelled since they were queued"""
+        with self._lock:
+            return self._queued
+
+    def version(self, thing_name: str, shadow_name: Optional[str] = None) -> Optional[int]:
+        """
+        Returns the latest version seen of a shadow, in a response or an
+        event, or None if there has been none since it was last deleted.
+        """
+        with self._lock:
+            thing = self._things.get(thing_name)
+            return thing.versions.get(shadow_name) if thing is not None else None
+
+    def get_shadow(self, thing_name: str, shadow_name: Optional[str] = None) -> Future:
+        """
+        Queues a request for a shadow's document.
+
+        Args:
+            thing_name: Thing that owns the shadow.
+            shadow_name: Name of the shadow, or None for the classic shadow.
+
+        Returns:
+            A Future whose result will be a :class:`~awsiot.iotshadow.GetShadowResponse`.
+            If the request fails, the future will be completed with a
+            :class:`awsiot.V2ServiceException`.
+        """
+        client = self._shadow_client
+        if shadow_name is None:
+            request = iotshadow.GetShadowRequest(thing_name=thing_name)
+            return self._submit(thing_name, shadow_name, lambda: client.get_shadow(request))
+        named_request = iotshadow.GetNamedShadowRequest(thing_name=thing_name, shadow_name=shadow_name)
+        return self._submit(thing_name, shadow_name, lambda: client.get_named_shadow(named_request))
+
+    def update_shadow(self, thing_name: str, state: iotshadow.ShadowState,
+                      shadow_name: Optional[str] = None, version: Optional[int] = None) -> Future:
+        """
+        Queues a request to update a shadow.
+
+        Args:
+            thing_name: Thing that owns the shadow.
+            state: Changes to the shadow's state.
+            shadow_name: Name of the shadow, or None for the classic shadow.
+            version: If set, the service only applies the update if this is
+                the shadow's current version.
+
+        Returns:
+            A Future whose result will be a :class:`~awsiot.iotshadow.UpdateShadowResponse`.
+            If the request fails, the future will be completed with a
+            :class:`awsiot.V2ServiceException`.
+        """
+        client = self._shadow_client
+        if shadow_name is None:
+            request = iotshadow.UpdateShadowRequest(thing_name=thing_name, state=state, version=version)
+            return self._submit(thing_name, shadow_name, lambda: client.update_shadow(request))
+        named_request = iotshadow.UpdateNamedShadowRequest(
+            thing_name=thing_name, shadow_name=shadow_name, state=state, version=version)
+        return self._submit(thing_name, shadow_name, lambda: client.update_named_shadow(named_request))
+
+    def delete_shadow(self, thing_name: str, shadow_name: Optional[str] = None) -> Future:
+        """
+        Queues a request to delete a shadow.
+
+        Args:
+            thing_name: Thing that owns the shadow.
+            shadow_name: Name of the shadow, or None for the classic shadow.
+
+        Returns:
+            A Future whose result will be a :class:`~awsiot.iotshadow.DeleteShadowResponse`.
+            If the request fails, the future will be completed with a
+            :class:`awsiot.V2ServiceException`.
+        """
+        client = self._shadow_client
+        if shadow_name is None:
+            request = iotshadow.DeleteShadowRequest(thing_name=thing_name)
+            return self._submit(thing_name, shadow_name, lambda: client.delete_shadow(request))
+        named_request = iotshadow.DeleteNamedShadowRequest(thing_name=thing_name, shadow_name=shadow_name)
+        return self._submit(thing_name, shadow_name, lambda: client.delete_named_shadow(named_request))
+
+    def get_many(self, shadows: Iterable[Tuple[str, Optional[str]]],
+                 timeout: Optional[float] = None) -> Iterator[ShadowResult]:
+        """
+        Queues a get request for each `(thing_name, shadow_name)` pair, and
+        yields the results as they complete. A shadow name of None stands for
+        the classic shadow.
+
+        Args:
+            shadows: Shadows to fetch.
+            timeout: Seconds to wait for all the results, or None to wait as long as it takes.
+
+        Raises:
+            concurrent.futures.TimeoutError: if the results are not all in by `timeout`
+        """
+        requests = {}  # type: Dict[Future, Tuple[str, Optional[str]]]
+        for thing_name, shadow_name in shadows:
+            requests[self.get_shadow(thing_name, shadow_name)] = (thing_name, shadow_name)
+        return self._as_completed(requests, timeout)
+
+    def update_many(self, updates: Iterable[Tuple[str, Optional[str], iotshadow.ShadowState]],
+                    timeout: Optional[float] = None) -> Iterator[ShadowResult]:
+        """
+        Queues an update request for each `(thing_name, shadow_name, state)`
+        triple, and yields the results as they complete. A shadow name of None
+        stands for the classic shadow.
+
+        Args:
+            updates: Shadows to update, and the changes to their state.
+            timeout: Seconds to wait for all the results, or None to wait as long as it takes.
+
+        Raises:
+            concurrent.futures.TimeoutError: if the results are not all in by `timeout`
+        """
+        requests = {}  # type: Dict[Future, Tuple[str, Optional[str]]]
+        for thing_name, shadow_name, state in updates:
+            requests[self.update_shadow(thing_name, state, shadow_name)] = (thing_name, shadow_name)
+        return self._as_completed(requests, timeout)
+
+    def watch(self, thing_name: str, shadow_name: Optional[str] = None):
+        """
+        Opens the delta and documents streams of one shadow, for when the
+        manager does not use wildcard streams. Calling it again for the same
+        shadow does nothing.
+
+        Args:
+            thing_name: Thing that owns the shadow.
+            shadow_name: Name of the shadow, or None for the classic shadow.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ShadowFleetManager is closed")
+            if self._wildcard_streams and self._streams:
+                # already covered by the wildcard streams
+                return
+            key = (thing_name, shadow_name)
+            if key in self._watched:
+                return
+            self._watched.add(key)
+
+        def on_delta(event):
+            self._handle_delta(thing_name, shadow_name, event)
+
+        def on_updated(event):
+            self._handle_updated(thing_name, shadow_name, event)
+
+        client = self._shadow_client
+        if shadow_name is None:
+            streams = (
+                (client.create_shadow_delta_updated_stream,
+                 iotshadow.ShadowDeltaUpdatedSubscriptionRequest(thing_name=thing_name), on_delta),
+                (client.create_shadow_updated_stream,
+                 iotshadow.ShadowUpdatedSubscriptionRequest(thing_name=thing_name), on_updated),
+            )
+        else:
+            streams = (
+                (client.create_named_shadow_delta_updated_stream,
+                 iotshadow.NamedShadowDeltaUpdatedSubscriptionRequest(
+                     thing_name=thing_name, shadow_name=shadow_name), on_delta),
+                (client.create_named_shadow_updated_stream,
+                 iotshadow.NamedShadowUpdatedSubscriptionRequest(
+                     thing_name=thing_name, shadow_name=shadow_name), on_updated),
+            )
+        for create_stream, request, listener in streams:
+            options = awsiot.ServiceStreamOptions(
+                incoming_event_listener=listener,
+                subscription_status_listener=self._status_listener,
+                deserialization_failure_listener=self._failure_listener)
+            stream = create_stream(request, options)
+            stream.open()
+            with self._lock:
+                self._streams.append(stream)
+
+    def close(self):
+        """
+        Closes the streams, and fails the requests that have not been sent
+        with a `RuntimeError`. Requests already sent still complete.
+        """
+        with self._lock:
+            self._closed = True
+            self._streams.clear()
+            self._ready.clear()
+            abandoned = []
+            for thing in self._things.values():
+                abandoned.extend(future for _, future, _ in thing.pending)
+                thing.pending.clear()
+                thing.ready = False
+            self._queued = 0
+        for future in abandoned:
+            # callers may have cancelled their futures
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("ShadowFleetManager is closed"))
+
+    def _as_completed(self, requests: Dict[Future, Tuple[str, Optional[str]]],
+                      timeout: Optional[float]) -> Iterator[ShadowResult]:
+        for future in as_completed(requests, timeout):
+            thing_name, shadow_name = requests[future]
+            error = future.exception()
+            yield ShadowResult(thing_name, shadow_name, None if error is not None else future.result(), error)
+
+    def _submit(self, thing_name: str, shadow_name: Optional[str], send: Callable[[], Future]) -> Future:
+        future = Future()  # type: Future
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ShadowFleetManager is closed")
+            thing = self._thing(thing_name)
+            thing.pending.append((send, future, shadow_name))
+            self._queued += 1
+            self._make_ready(thing_name, thing)
+            to_send = self._take_ready()
+        self._send_all(to_send)
+        return future
+
+    def _thing(self, thing_name: str) -> _Thing:
+        # must be called with the lock held
+        thing = self._things.get(thing_name)
+        if thing is None:
+            thing = self._things[thing_name] = _Thing()
+        return thing
+
+    def _make_ready(self, thing_name: str, thing: _Thing):
+        # must be called with the lock held
+        if thing.pending and not thing.ready and thing.in_flight < self._max_in_flight_per_thing:
+            thing.ready = True
+            self._ready.append(thing_name)
+
+    def _take_ready(self) -> list:
+        # must be called with the lock held. Claims slots for as many requests as may be sent now.
+        to_send = []
+        while self._ready and self._in_flight < self._max_in_flight:
+            thing_name = self._ready.popleft()
+            thing = self._things[thing_name]
+            thing.ready = False
+            request = None
+            while thing.pending and request is None:
+                request = thing.pending.popleft()
+                self._queued -= 1
+                if not request[1].set_running_or_notify_cancel():
+                    # cancelled by the caller while queued, never sent
+                    request = None
+            if request is None:
+                continue
+            send, future, shadow_name = request
+            thing.in_flight += 1
+            self._in_flight += 1
+            to_send.append((thing_name, shadow_name, send, future))
+            # back of the line, so other things get their turn
+            self._make_ready(thing_name, thing)
+        return to_send
+
+    def _send_all(self, to_send: list):
+        for thing_name, shadow_name, send, future in to_send:
+            try:
+                request_future = send()
+            except Exception as e:
+                request_future = Future()
+                request_future.set_exception(e)
+            request_future.add_done_callback(
+                lambda f, t=thing_name, s=shadow_name, u=future: self._on_response(t, s, u, f))
+
+    def _on_response(self, thing_name: str, shadow_name: Optional[str], future: Future, request_future: Future):
+        response, error = None, None  # type: Any, Optional[BaseException]
+        to_send = []
+        try:
+            if request_future.cancelled():
+                error = CancelledError()
+            else:
+                error = request_future.exception()
+                if error is None:
+                    response = request_future.result()
+        finally:
+            # the slots are released whatever happened to the request
+            with self._lock:
+                thing = self._things[thing_name]
+                thing.in_flight -= 1
+                self._in_flight -= 1
+                if isinstance(response, iotshadow.DeleteShadowResponse):
+                    thing.versions.pop(shadow_name, None)
+                elif response is not None:
+                    self._see_version(thing, shadow_name, response.version)
+                if not self._closed:
+                    self._make_ready(thing_name, thing)
+                    to_send = self._take_ready()
+        self._send_all(to_send)
+
+        if error is None:
+            future.set_result(response)
+        else:
+            future.set_exception(error)
+
+    def _see_version(self, thing: _Thing, shadow_name: Optional[str], version: Optional[int]):
+        # must be called with the lock held
+        if version is not None and version > thing.versions.get(shadow_name, -1):
+            thing.versions[shadow_name] = version
+
+    def _handle_delta(self, thing_name: str, shadow_name: Optional[str], event: iotshadow.ShadowDeltaUpdatedEvent):
+        with self._lock:
+            self._see_version(self._thing(thing_name), shadow_name, event.version)
+        if self._on_delta is not None:
+            self._on_delta(thing_name, shadow_name, event)
+
+    def _handle_updated(self, thing_name: str, shadow_name: Optional[str], event: iotshadow.ShadowUpdatedEvent):
+        with self._lock:
+            if event.current is not None:
+                self._see_version(self._thing(thing_name), shadow_name, event.current.version)
+        if self._on_updated is not None:
+            self._on_updated(thing_name, shadow_name, event)
+
+    def _open_wildcard_streams(self):
+        client = self._shadow_client
+        # the topics of a wildcard stream's events identify the shadow, so the
+        # stream is opened on the request-response client the shadow client wraps
+        decode = client.json_codec.decode
+        report_failure = self._failure_listener
+        for topic_filter, event_class in _WILDCARD_STREAMS:
+            if event_class is iotshadow.ShadowDeltaUpdatedEvent:
+                if self._on_delta is None:
+                    continue
+                handle = self._handle_delta
+            else:
+                if self._on_updated is None:
+                    continue
+                handle = self._handle_updated
+            from_payload = serialization.decoder_for(event_class)
+
+            def on_publish(publish, handle=handle, from_payload=from_payload):
+                thing_name, shadow_name = _shadow_of_topic(publish.topic)
+                try:
+                    event = from_payload(decode(publish.payload))
+                except Exception as e:
+                    report_failure(awsiot.V2DeserializationFailure(
+                        "{} wildcard stream deserialization failure".format(publish.topic), e, publish.payload))
+                    return
+                handle(thing_name, shadow_name, event)
+
+            stream = client.request_response_client.create_stream(mqtt_request_response.StreamingOperationOptions(
+                topic_filter, self._status_listener, on_publish))
+            stream.open()
+            self._streams.append(stream)
+
+
+def _log_deserialization_failure(failure: awsiot.V2DeserializationFailure):
+    logger.warning("%s: %s", failure.message, failure.inner_error)
@@ -0,0 +1,275 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Client-side coalescing of shadow updates.
+"""
+
+from awsiot import iotshadow
+from awsiot.shadow_document import merge_into
+from collections import deque
+from concurrent.futures import CancelledError, Future
+import heapq
+import itertools
+from threading import Condition, Thread
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+__all__ = [
+    'ShadowUpdateCoalescer',
+]
+
+_ShadowKey = Tuple[str, Optional[str]]
+
+
+class _PendingUpdate:
+    """Changes to one shadow that have not been sent yet"""
+    __slots__ = ('reported', 'desired', 'futures', 'deadline', 'due')
+
+    def __init__(self, deadline: float):
+        self.reported = None  # type: Optional[Dict[str, Any]]
+        self.desired = None  # type: Optional[Dict[str, Any]]
+        self.futures = []  # type: List[Future]
+        self.deadline = deadline
+        self.due = False
+
+
+class _ShadowSlot:
+    __slots__ = ('pending', 'closed', 'in_flight')
+
+    def __init__(self):
+        # update that new changes merge into
+        self.pending = None  # type: Optional[_PendingUpdate]
+        # updates that no more changes may merge into, sent before `pending`
+        self.closed = deque()  # type: Deque[_PendingUpdate]
+        self.in_flight = False
+
+
+def _replaces_deletion(pending: Optional[Dict[str, Any]], change: Dict[str, Any]) -> bool:
+    """
+    Whether `change` writes a dict where `pending` deletes a key. Sent one after
+    the other, the dict replaces the deleted value outright, but merged into one
+    update it would merge into the value the service still holds.
+    """
+    if not pending:
+        return False
+    for key, value in change.items():
+        if isinstance(value, dict) and key in pending:
+            existing = pending[key]
+            if existing is None:
+                return True
+            if isinstance(existing, dict) and _replaces_deletion(existing, value):
+                return True
+    return False
+
+
+class ShadowUpdateCoalescer:
+    """
+    Combines shadow updates from many callers into fewer requests.
+
+    Partial `reported` and `desired` documents sent to the same shadow are
+    deep-merged into one pending update, following the service's own merge
+    rules (see :func:`awsiot.shadow_document.merge_into`). A change that writes
+    a dict where the pending update deletes a key is not merged: the pending
+    update is sent first, so the service sees the deletion and then the new
+    value, as it would without coalescing. The pending update is
+    sent as a single :meth:`~awsiot.iotshadow.IotShadowClientV2.update_shadow` or
+    :meth:`~awsiot.iotshadow.IotShadowClientV2.update_named_shadow` request once
+    `flush_interval` seconds have passed since its first change, or as soon as
+    `max_batch_size` changes have been merged into it, whichever comes first.
+
+    At most one request per shadow is in flight. Changes made while a request is
+    in flight go into the next one, so they reach the service in the order they
+    were made.
+
+    Requests are sent from a background thread, which exits after :meth:`close()`
+    once every pending update has been sent. The coalescer may also be used as
+    a context manager, which closes it on exit.
+
+    Args:
+        shadow_client: Client used to send the updates.
+        flush_interval: Longest time, in seconds, that a change waits before being sent.
+        max_batch_size: Most changes to merge into one request.
+    """
+
+    def __init__(self, shadow_client: iotshadow.IotShadowClientV2, *,
+                 flush_interval: float = 0.1, max_batch_size: int = 64):
+        assert flush_interval >= 0
+        assert max_batch_size >= 1
+        self._shadow_client = shadow_client
+        self._flush_interval = flush_interval
+        self._max_batch_size = max_batch_size
+
+        self._condition = Condition()
+        self._slots = {}  # type: Dict[_ShadowKey, _ShadowSlot]
+        self._deadlines = []  # type: List[Tuple[float, int, _ShadowKey]]
+        self._ready = set()  # type: set
+        self._sequence = itertools.count()
+        self._closed = False
+        self._thread = Thread(target=self._run, name='ShadowUpdateCoalescer', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def update(self, thing_name: str, *, reported: Optional[Dict[str, Any]] = None,
+               desired: Optional[Dict[str, Any]] = None, shadow_name: Optional[str] = None) -> Future:
+        """
+        Queue a change to a shadow.
+
+        Args:
+            thing_name: Thing whose shadow is updated.
+            reported: Partial reported state to merge in. A None value within it deletes that key.
+            desired: Partial desired state to merge in. A None value within it deletes that key.
+            shadow_name: Name of the shadow to update, or None for the classic shadow.
+
+        Returns:
+            A Future whose result will be the :class:`~awsiot.iotshadow.UpdateShadowResponse`
+            of the request that carried this change. If that request fails, the future is
+            completed with its :class:`awsiot.V2ServiceException`.
+        """
+        future = Future()  # type: Future
+        key = (thing_name, shadow_name)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("ShadowUpdateCoalescer is closed")
+
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = _ShadowSlot()
+            pending = slot.pending
+            if pending is not None and (_replaces_deletion(pending.reported, reported or {})
+                                        or _replaces_deletion(pending.desired, desired or {})):
+                slot.closed.append(pending)
+                self._ready.add(key)
+                self._condition.notify()
+                pending = slot.pending = None
+            if pending is None:
+                pending = slot.pending = _PendingUpdate(time.monotonic() + self._flush_interval)
+                heapq.heappush(self._deadlines, (pending.deadline, next(self._sequence), key))
+                self._condition.notify()
+
+            if reported is not None:
+                pending.reported = merge_into(pending.reported or {}, reported)
+            if desired is not None:
+                pending.desired = merge_into(pending.desired or {}, desired)
+            pending.futures.append(future)
+
+            if len(pending.futures) >= self._max_batch_size:
+                self._mark_due(key, pending)
+        return future
+
+    def flush(self):
+        """
+        Send every pending update now, without waiting for its window to end.
+        """
+        with self._condition:
+            for key, slot in self._slots.items():
+                if slot.pending is not None:
+                    self._mark_due(key, slot.pending)
+                if slot.closed:
+                    self._ready.add(key)
+                    self._condition.notify()
+
+    def close(self):
+        """
+        Send every pending update now, and stop accepting new ones.
+
+        Returns immediately. The futures of pending updates
+        complete as their requests finish.
+        """
+        with self._condition:
+            self._closed = True
+            self.flush()
+            self._condition.notify()
+
+    def _mark_due(self, key: _ShadowKey, pending: _PendingUpdate):
+        # must be called with the lock held
+        if not pending.due:
+            pending.due = True
+            self._ready.add(key)
+            self._condition.notify()
+
+    def _take_ready(self) -> List[Tuple[_ShadowKey, _PendingUpdate]]:
+        # must be called with the lock held
+        now = time.monotonic()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, key = heapq.heappop(self._deadlines)
+            slot = self._slots.get(key)
+            if slot is not None and slot.pending is not None and slot.pending.deadline <= now:
+                slot.pending.due = True
+                self._ready.add(key)
+
+        batches = []
+        for key in self._ready:
+            slot = self._slots[key]
+            # if a request is in flight, the key is made ready again when it finishes
+            if slot.in_flight:
+                continue
+            if slot.closed:
+                batches.append((key, slot.closed.popleft()))
+                slot.in_flight = True
+            elif slot.pending is not None and slot.pending.due:
+                batches.append((key, slot.pending))
+                slot.pending = None
+                slot.in_flight = True
+        self._ready.clear()
+        return batches
+
+    def _run(self):
+        while True:
+            with self._condition:
+                batches = self._take_ready()
+                while not batches:
+                    if self._closed and not self._slots:
+                        return
+                    timeout = self._deadlines[0][0] - time.monotonic() if self._deadlines else None
+                    self._condition.wait(timeout)
+                    batches = self._take_ready()
+
+            for key, pending in batches:
+                self._send(key, pending)
+
+    def _send(self, key: _ShadowKey, pending: _PendingUpdate):
+        thing_name, shadow_name = key
+        state = iotshadow.ShadowState(reported=pending.reported, desired=pending.desired)
+        try:
+            if shadow_name is None:
+                request_future = self._shadow_client.update_shadow(
+                    iotshadow.UpdateShadowRequest(thing_name=thing_name, state=state))
+            else:
+                request_future = self._shadow_client.update_named_shadow(
+                    iotshadow.UpdateNamedShadowRequest(thing_name=thing_name, shadow_name=shadow_name, state=state))
+        except Exception as e:
+            request_future = Future()
+            request_future.set_exception(e)
+
+        request_future.add_done_callback(lambda f: self._on_request_done(key, pending, f))
+
+    def _on_request_done(self, key: _ShadowKey, pending: _PendingUpdate, request_future: Future):
+        try:
+            if request_future.cancelled():
+                exception = CancelledError()  # type: Optional[BaseException]
+            else:
+                exception = request_future.exception()
+            for future in pending.futures:
+                # callers may have cancelled their futures
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if exception is None:
+                    future.set_result(request_future.result())
+                else:
+                    future.set_exception(exception)
+        finally:
+            with self._condition:
+                slot = self._slots[key]
+                slot.in_flight = False
+                if slot.closed or (slot.pending is not None and slot.pending.due):
+                    self._ready.add(key)
+                elif slot.pending is None:
+                    del self._slots[key]
+                # wakes the thread to send the next update, or to exit once closed
+                self._condition.notify()
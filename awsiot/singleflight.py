@@ -0,0 +1,260 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Shares one request between concurrent identical reads.
+"""
+
+from concurrent.futures import Future
+import copy
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+__all__ = [
+    'SingleFlight',
+    'SingleFlightClient',
+    'SingleFlightStats',
+]
+
+
+class SingleFlightStats(NamedTuple):
+    """
+    Snapshot of a :class:`SingleFlight`'s activity.
+
+    Args:
+        calls (int): Number of calls made.
+        sent (int): Number of calls that started a request of their own.
+        shared (int): Number of calls that joined a request already in flight.
+        cached (int): Number of calls answered from the cache.
+    """
+    calls: int
+    sent: int
+    shared: int
+    cached: int
+
+
+class _Flight:
+    __slots__ = ('waiters',)
+
+    def __init__(self):
+        self.waiters = []  # type: List[Future]
+
+
+class SingleFlight:
+    """
+    Runs at most one request at a time for each key. Calls made with a key
+    whose request is in flight wait for that request instead of starting
+    another, and all of them get its result.
+
+    If `ttl` is set, successful results are also kept for that many seconds,
+    and calls with the same key are answered from them. Failures are never kept.
+
+    Each caller gets a Future of its own. Unless `copy_results` is False,
+    every caller but the first gets a deep copy of the result, so callers
+    may modify what they get.
+
+    This class is thread-safe.
+
+    Args:
+        ttl: Seconds to keep results for, or 0 to keep none.
+        copy_results: Whether to give each caller a copy of the result.
+    """
+
+    def __init__(self, ttl: float = 0.0, copy_results: bool = True):
+        if ttl < 0:
+            raise ValueError("ttl must not be negative")
+        self._ttl = ttl
+        self._copy_results = copy_results
+        self._lock = threading.Lock()
+        self._flights = {}  # type: Dict[Hashable, _Flight]
+        # key -> (expiry time, result)
+        self._results = {}  # type: Dict[Hashable, Tuple[float, Any]]
+        self._calls = 0
+        self._sent = 0
+        self._shared = 0
+        self._cached = 0
+
+    def run(self, key: Hashable, send: Callable[[], Future]) -> Future:
+        """
+        Returns a Future of the result of `send()`, calling it only if no
+        request with `key` is in flight and no result for `key` is kept.
+
+        Args:
+            key: Identifies the request. Requests with equal keys must be interchangeable.
+            send: Starts the request, and returns a Future of its result.
+        """
+        future = Future()  # type: Future
+        with self._lock:
+            self._calls += 1
+            kept = self._results.get(key)
+            if kept is not None:
+                if kept[0] > time.monotonic():
+                    self._cached += 1
+                    future.set_result(self._copy(kept[1]))
+                    return future
+                del self._results[key]
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._shared += 1
+                flight.waiters.append(future)
+                return future
+
+            flight = self._flights[key] = _Flight()
+            flight.waiters.append(future)
+            self._sent += 1
+
+        try:
+            request_future = send()
+        except Exception as e:
+            request_future = Future()
+            request_future.set_exception(e)
+        request_future.add_done_callback(lambda f: self._on_done(key, flight, f))
+        return future
+
+    def invalidate(self, matches: Optional[Callable[[Hashable], bool]] = None):
+        """
+        Drops kept results, and detaches requests in flight so later calls
+        start new ones. Callers already waiting still get their results.
+
+        Args:
+            matches: Returns True for the keys to invalidate. If None, all are.
+        """
+        with self._lock:
+            for table in (self._results, self._flights):
+                for key in [k for k in table if matches is None or matches(k)]:
+                    del table[key]
+
+    def stats(self) -> SingleFlightStats:
+        """
+        Returns:
+            A snapshot of the counters.
+        """
+        with self._lock:
+            return SingleFlightStats(calls=self._calls, sent=self._sent, shared=self._shared, cached=self._cached)
+
+    def _copy(self, result):
+        return copy.deepcopy(result) if self._copy_results else result
+
+    def _on_done(self, key: Hashable, flight: _Flight, request_future: Future):
+        exception = request_future.exception()
+        result = request_future.result() if exception is None else None
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+                if exception is None and self._ttl > 0:
+                    self._results[key] = (time.monotonic() + self._ttl, self._copy(result))
+            waiters = flight.waiters
+
+        for index, waiter in enumerate(waiters):
+            # claiming the waiter first means a concurrent cancel() can't slip in before it is completed
+            if not waiter.set_running_or_notify_cancel():
+                continue
+            if exception is not None:
+                waiter.set_exception(exception)
+            else:
+                waiter.set_result(result if index == 0 else self._copy(result))
+
+
+# Read operations of the V2 service clients that are safe to share
+_READS = frozenset((
+    'get_shadow',
+    'get_named_shadow',
+    'get_pending_job_executions',
+    'describe_job_execution',
+))
+
+# Operations that change what the reads of the same thing return
+_WRITES = frozenset((
+    'update_shadow',
+    'update_named_shadow',
+    'delete_shadow',
+    'delete_named_shadow',
+    'update_job_execution',
+    'start_next_pending_job_execution',
+))
+
+
+def _request_key(operation: str, request) -> Optional[Hashable]:
+    # the client token differs between otherwise identical requests
+    values = tuple(getattr(request, slot, None) for slot in type(request).__slots__ if slot != 'client_token')
+    key = (operation, getattr(request, 'thing_name', None), values)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class SingleFlightClient:
+    """
+    Wraps an :class:`~awsiot.iotshadow.IotShadowClientV2` or
+    :class:`~awsiot.iotjobs.IotJobsClientV2`, so concurrent identical reads
+    share one request. The reads are `get_shadow`, `get_named_shadow`,
+    `get_pending_job_executions` and `describe_job_execution`. Requests are
+    identical when every field but the client token is equal.
+
+    Calling a write operation through the wrapper, such as `update_shadow`
+    or `update_job_execution`, invalidates the reads of the same thing, so
+    reads made after it get a fresh result. Writes made elsewhere are not
+    seen, so keep `ttl` short, or call :meth:`invalidate`.
+
+    Every other attribute is the wrapped client's.
+
+    Args:
+        client: Client to wrap.
+        ttl: Seconds to keep read results for, or 0 to only share requests in flight.
+        copy_results: Whether to give each caller a copy of the result.
+    """
+
+    def __init__(self, client, *, ttl: float = 0.0, copy_results: bool = True):
+        self._client = client
+        self._single_flight = SingleFlight(ttl=ttl, copy_results=copy_results)
+
+    @property
+    def client(self):
+        """The wrapped client"""
+        return self._client
+
+    def stats(self) -> SingleFlightStats:
+        """
+        Returns:
+            A snapshot of how many reads were sent, shared and answered from the cache.
+        """
+        return self._single_flight.stats()
+
+    def invalidate(self, thing_name: Optional[str] = None):
+        """
+        Makes the next reads of a thing, or of every thing, send a new request.
+
+        Args:
+            thing_name: Thing whose reads to invalidate, or None for all.
+        """
+        if thing_name is None:
+            self._single_flight.invalidate()
+        else:
+            self._single_flight.invalidate(lambda key: key[1] == thing_name)
+
+    def __getattr__(self, name):
+        operation = getattr(self._client, name)
+        if name in _READS:
+            @functools.wraps(operation)
+            def read(request):
+                key = _request_key(name, request)
+                if key is None:
+                    return operation(request)
+                return self._single_flight.run(key, lambda: operation(request))
+            return read
+        if name in _WRITES:
+            @functools.wraps(operation)
+            def write(request):
+                thing_name = getattr(request, 'thing_name', None)
+                self.invalidate(thing_name)
+                future = operation(request)
+                # reads sent while the write was in flight may have missed it
+                future.add_done_callback(lambda _: self.invalidate(thing_name))
+                return future
+            return write
+        return operation
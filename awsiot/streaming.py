@@ -0,0 +1,459 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Pull-based access to streaming operations.
+
+The streaming operations of the service clients deliver events through
+callbacks, on threads owned by the SDK. A :class:`BufferedStream` takes those
+events into a bounded buffer, and lets the application pull them at its own
+pace, either as a regular iterator or as an async iterator::
+
+    stream = streaming.open_stream(shadow_client.create_shadow_delta_updated_stream,
+                                   ShadowDeltaUpdatedSubscriptionRequest(thing_name="thing"),
+                                   maxsize=16)
+    with stream:
+        for delta in stream:
+            ...
+
+    response, stream = streaming.subscribe(ipc_client.subscribe_to_topic, topic="my/topic")
+    async with stream:
+        async for message in stream:
+            ...
+
+What happens when events arrive faster than they are consumed is decided
+by the stream's :class:`OverflowPolicy`. By default the oldest event is
+dropped, so a slow consumer never stalls the thread that delivers events
+and responses.
+"""
+
+import asyncio
+from awscrt import mqtt_request_response
+import awsiot
+from collections import deque
+from concurrent.futures import Future
+from enum import Enum
+import queue
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+__all__ = [
+    'OverflowPolicy',
+    'BufferedStream',
+    'open_stream',
+    'subscribe',
+    'DEFAULT_MAXSIZE',
+]
+
+DEFAULT_MAXSIZE = 64
+"""Number of events a :class:`BufferedStream` buffers by default"""
+
+
+class OverflowPolicy(Enum):
+    """
+    What a :class:`BufferedStream` does with an event that arrives while its buffer is full.
+    """
+
+    BLOCK = 0
+    """
+    The thread delivering the event waits until the consumer makes room.
+    This holds back the connection the events arrive on, so nothing is lost.
+    Events delivered on a thread that runs an asyncio event loop cannot wait
+    (the loop may be the consumer), and are buffered regardless.
+
+    Events usually arrive on the connection's event-loop thread, which also
+    delivers responses to requests. A consumer that waits for a response
+    while the buffer is full therefore deadlocks with the stalled thread.
+    """
+
+    DROP_OLDEST = 1
+    """The oldest buffered event is discarded to make room"""
+
+    DROP_NEWEST = 2
+    """The arriving event is discarded"""
+
+    COALESCE_BY_KEY = 3
+    """
+    A buffered event with the same key as the arriving event is replaced by it,
+    keeping its place in the buffer. If no event shares its key, the oldest
+    buffered event is discarded to make room.
+    Requires a `key` function.
+    """
+
+
+def _on_event_loop_thread() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class BufferedStream:
+    """
+    Bounded buffer of the events of a streaming operation, consumed by pulling.
+
+    Iterate over it, with `for` or `async for`, to take events in the order
+    they were delivered. Iteration ends after the operation has closed and the
+    buffered events have been consumed. If the operation ended with an error,
+    that error is raised instead of ending iteration.
+
+    Events are handed to the stream with :meth:`put`. :func:`open_stream` and
+    :func:`subscribe` connect a stream to an operation's callbacks.
+
+    This class is thread-safe.
+
+    Args:
+        maxsize: Number of events the stream buffers.
+        overflow: What to do with an event that arrives while the buffer is full.
+            Defaults to :attr:`OverflowPolicy.DROP_OLDEST`. :attr:`OverflowPolicy.BLOCK`
+            loses nothing, but can deadlock a consumer that waits for a response,
+            see its documentation.
+        key: Function returning the key of an event. Required by
+            :attr:`OverflowPolicy.COALESCE_BY_KEY`, ignored by the other policies.
+
+    Attributes:
+        operation: The streaming operation feeding this stream, if any.
+            Closing the stream releases it.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                 key: Optional[Callable[[Any], Hashable]] = None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if overflow == OverflowPolicy.COALESCE_BY_KEY and key is None:
+            raise ValueError("COALESCE_BY_KEY requires a key function")
+        self.operation = None  # type: Any
+        self._maxsize = maxsize
+        self._overflow = overflow
+        self._key = key if overflow == OverflowPolicy.COALESCE_BY_KEY else None
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        # with a key function, the buffer holds keys, and the events are in _by_key
+        self._buffer = deque()  # type: deque
+        self._by_key = {}  # type: Dict[Hashable, Any]
+        self._async_waiters = []  # type: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]
+        self._finished = False
+        self._error = None  # type: Optional[BaseException]
+
+        self._received = 0
+        self._dropped = 0
+        self._coalesced = 0
+
+    @property
+    def maxsize(self) -> int:
+        """Number of events the stream buffers"""
+        return self._maxsize
+
+    @property
+    def overflow(self) -> OverflowPolicy:
+        """What the stream does with events that arrive while it is full"""
+        return self._overflow
+
+    @property
+    def received(self) -> int:
+        """Number of events delivered to the stream"""
+        return self._received
+
+    @property
+    def dropped(self) -> int:
+        """Number of events discarded because the buffer was full"""
+        return self._dropped
+
+    @property
+    def coalesced(self) -> int:
+        """Number of buffered events replaced by a newer event with the same key"""
+        return self._coalesced
+
+    @property
+    def closed(self) -> bool:
+        """True once the stream has been closed, by the operation or by :meth:`close`"""
+        return self._finished
+
+    def __len__(self):
+        """Number of buffered events"""
+        return len(self._buffer)
+
+    def put(self, event):
+        """
+        Delivers an event to the stream, applying its overflow policy if the
+        buffer is full. Events delivered after the stream is closed are ignored.
+
+        Args:
+            event: The event.
+        """
+        with self._lock:
+            if self._finished:
+                return
+            self._received += 1
+
+            if self._key is not None:
+                key = self._key(event)
+                if key in self._by_key:
+                    self._by_key[key] = event
+                    self._coalesced += 1
+                    return
+                if len(self._buffer) >= self._maxsize:
+                    del self._by_key[self._buffer.popleft()]
+                    self._dropped += 1
+                self._by_key[key] = event
+                self._buffer.append(key)
+
+            else:
+                if len(self._buffer) >= self._maxsize:
+                    if self._overflow == OverflowPolicy.DROP_NEWEST:
+                        self._dropped += 1
+                        return
+                    if self._overflow == OverflowPolicy.DROP_OLDEST:
+                        self._buffer.popleft()
+                        self._dropped += 1
+                    elif not _on_event_loop_thread():
+                        while len(self._buffer) >= self._maxsize and not self._finished:
+                            self._not_full.wait()
+                        if self._finished:
+                            return
+                self._buffer.append(event)
+
+            self._wake_consumer()
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Takes the next event, waiting for one if the buffer is empty.
+
+        Args:
+            timeout: Seconds to wait, or None to wait as long as it takes.
+
+        Returns:
+            The event.
+
+        Raises:
+            queue.Empty: if no event arrived within `timeout`
+            StopIteration: if the stream is closed and no events are left
+            Exception: the error the operation ended with, once no events are left
+        """
+        with self._lock:
+            if not self._not_empty.wait_for(lambda: self._buffer or self._finished, timeout):
+                raise queue.Empty
+            return self._take(StopIteration)
+
+    async def get_async(self):
+        """
+        Takes the next event, waiting for one if the buffer is empty.
+
+        Returns:
+            The event.
+
+        Raises:
+            StopAsyncIteration: if the stream is closed and no events are left
+            Exception: the error the operation ended with, once no events are left
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._buffer or self._finished:
+                    return self._take(StopAsyncIteration)
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            except BaseException:
+                with self._lock:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+                    elif self._buffer:
+                        # this waiter was already woken for an event, let another consumer have it
+                        self._wake_consumer()
+                raise
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get_async()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close the stream, and release its operation. Buffered events are discarded,
+        and iteration ends.
+        """
+        with self._lock:
+            self._buffer.clear()
+            self._by_key.clear()
+            self._error = None
+            self._finish_locked(None)
+        operation, self.operation = self.operation, None
+        close = getattr(operation, 'close', None)
+        if close is not None:
+            # eventstream operations close explicitly, MQTT streams close once released
+            try:
+                close()
+            except Exception:
+                pass
+
+    def _finish(self, error: Optional[BaseException] = None):
+        """Marks the end of the stream. Events already buffered can still be consumed."""
+        with self._lock:
+            self._finish_locked(error)
+
+    def _finish_locked(self, error: Optional[BaseException]):
+        if self._finished:
+            return
+        self._finished = True
+        self._error = error
+        self._not_full.notify_all()
+        self._not_empty.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            self._wake_async(loop, waiter)
+
+    def _take(self, end_of_stream):
+        # called with the lock held, when there is an event or the stream is finished
+        if not self._buffer:
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            raise end_of_stream
+        event = self._buffer.popleft()
+        if self._key is not None:
+            event = self._by_key.pop(event)
+        self._not_full.notify()
+        return event
+
+    def _wake_consumer(self):
+        # called with the lock held, after an event was buffered
+        self._not_empty.notify()
+        if self._async_waiters:
+            loop, waiter = self._async_waiters.pop(0)
+            self._wake_async(loop, waiter)
+
+    @staticmethod
+    def _wake_async(loop: asyncio.AbstractEventLoop, waiter: asyncio.Future):
+        try:
+            loop.call_soon_threadsafe(_wake, waiter)
+        except RuntimeError:
+            # the loop is closed, so nobody is waiting anymore
+            pass
+
+
+def open_stream(create_stream: Callable, request, *,
+                maxsize: int = DEFAULT_MAXSIZE,
+                overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                key: Optional[Callable[[Any], Hashable]] = None,
+                subscription_status_listener: Optional[Callable[[mqtt_request_response.SubscriptionStatusEvent], None]] = None,
+                deserialization_failure_listener: Optional[Callable[[awsiot.V2DeserializationFailure], None]] = None) -> BufferedStream:
+    """
+    Creates and opens a streaming operation of an MQTT based V2 service client,
+    delivering its events to a :class:`BufferedStream`.
+
+    The stream ends with an error if the operation's subscription is halted.
+
+    Args:
+        create_stream: A `create_*_stream` method of a V2 service client,
+            such as :meth:`awsiot.iotshadow.IotShadowClientV2.create_shadow_delta_updated_stream`.
+        request: Subscription request to pass to `create_stream`.
+        maxsize: Number of events to buffer.
+        overflow: What to do with events that arrive while the buffer is full.
+            Defaults to :attr:`OverflowPolicy.DROP_OLDEST`. :attr:`OverflowPolicy.BLOCK`
+            loses nothing, but can deadlock a consumer that waits for a response,
+            see its documentation.
+        key: Function returning the key of an event, for :attr:`OverflowPolicy.COALESCE_BY_KEY`.
+        subscription_status_listener: Optional function object to invoke when the
+            operation's subscription status changes.
+        deserialization_failure_listener: Optional function object to invoke when
+            an event cannot be deserialized.
+
+    Returns:
+        The stream. Its `operation` is the opened `awscrt.mqtt_request_response.StreamingOperation`.
+    """
+    stream = BufferedStream(maxsize, overflow, key)
+
+    def on_subscription_status(event: mqtt_request_response.SubscriptionStatusEvent):
+        if event.type == mqtt_request_response.SubscriptionStatusEventType.SUBSCRIPTION_HALTED:
+            stream._finish(event.error if event.error is not None else RuntimeError("stream subscription halted"))
+        if subscription_status_listener is not None:
+            subscription_status_listener(event)
+
+    options = awsiot.ServiceStreamOptions(
+        incoming_event_listener=stream.put,
+        subscription_status_listener=on_subscription_status,
+        deserialization_failure_listener=deserialization_failure_listener)
+    stream.operation = create_stream(request, options)
+    stream.operation.open()
+    return stream
+
+
+def subscribe(operation: Callable, *,
+              maxsize: int = DEFAULT_MAXSIZE,
+              overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+              key: Optional[Callable[[Any], Hashable]] = None,
+              **kwargs) -> Tuple[Any, BufferedStream]:
+    """
+    Starts a streaming operation of a
+    :class:`~awsiot.greengrasscoreipc.clientv2.GreengrassCoreIPCClientV2`,
+    delivering its events to a :class:`BufferedStream` in place of the stream
+    handler callbacks.
+
+    The stream ends when the operation closes, and ends with the error if the
+    operation reports one.
+
+    The client runs stream callbacks in its executor, if it has one. Events
+    handed to the stream from more than one executor thread may be reordered,
+    so a client created with `executor=None` is the better fit.
+
+    Args:
+        operation: A `subscribe_to_*` or `subscribe_to_*_async` method of the client.
+        maxsize: Number of events to buffer.
+        overflow: What to do with events that arrive while the buffer is full.
+            Defaults to :attr:`OverflowPolicy.DROP_OLDEST`. :attr:`OverflowPolicy.BLOCK`
+            loses nothing, but can deadlock a consumer that waits for a response,
+            see its documentation.
+        key: Function returning the key of an event, for :attr:`OverflowPolicy.COALESCE_BY_KEY`.
+        **kwargs: Request arguments for `operation`.
+
+    Returns:
+        A tuple of what `operation` returns first (the initial response, or a
+        future of it for the `_async` variant), and the stream. The stream's
+        `operation` is the streaming operation.
+    """
+    stream = BufferedStream(maxsize, overflow, key)
+
+    def on_stream_error(error: Exception) -> bool:
+        stream._finish(error)
+        return True
+
+    result, stream.operation = operation(
+        on_stream_event=stream.put,
+        on_stream_error=on_stream_error,
+        on_stream_closed=stream._finish,
+        **kwargs)
+    if isinstance(result, Future):
+        def on_response(future):
+            if future.exception() is not None:
+                stream._finish(future.exception())
+        result.add_done_callback(on_response)
+    return result, stream
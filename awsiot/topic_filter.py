@@ -0,0 +1,203 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+MQTT topic filter matching.
+
+Topic filters follow MQTT rules: levels are separated by `/`, `+` matches
+exactly one level, and `#` matches any number of levels, including none, so
+`a/#` matches both `a` and `a/b/c`. `#` may only appear as the last level.
+Topics starting with `$` are not matched by a wildcard in the first level.
+"""
+
+from typing import Dict, Generic, Iterator, List, Tuple, TypeVar
+
+__all__ = [
+    'TopicTrie',
+    'validate_topic_filter',
+    'filter_matches',
+    'filter_covers',
+]
+
+T = TypeVar('T')
+
+
+def validate_topic_filter(topic_filter: str):
+    """
+    Checks that `topic_filter` is a valid MQTT topic filter.
+
+    Raises:
+        ValueError: if it is not
+    """
+    if not isinstance(topic_filter, str) or not topic_filter:
+        raise ValueError("topic filter must be a non-empty string")
+    levels = topic_filter.split('/')
+    for i, level in enumerate(levels):
+        if level == '#':
+            if i != len(levels) - 1:
+                raise ValueError("'#' must be the last level of topic filter: " + topic_filter)
+        elif level != '+' and ('#' in level or '+' in level):
+            raise ValueError("wildcards must occupy a whole level of topic filter: " + topic_filter)
+
+
+def filter_matches(topic_filter: str, topic: str) -> bool:
+    """
+    Returns True if `topic` matches `topic_filter`.
+    """
+    return _levels_match(topic_filter.split('/'), topic.split('/'))
+
+
+def filter_covers(topic_filter: str, other_filter: str) -> bool:
+    """
+    Returns True if every topic matching `other_filter` also matches `topic_filter`.
+    """
+    return _levels_match(topic_filter.split('/'), other_filter.split('/'))
+
+
+def _levels_match(filter_levels: List[str], levels: List[str]) -> bool:
+    # `levels` may be those of a topic or of another filter. A wildcard in
+    # `levels` is only matched by the same or a broader wildcard.
+    if levels[0].startswith('$') and filter_levels[0] in ('+', '#'):
+        return False
+    for i, filter_level in enumerate(filter_levels):
+        if filter_level == '#':
+            return True
+        if i == len(levels):
+            # `a/#` matches `a`
+            return filter_levels[i:] == ['#']
+        level = levels[i]
+        if filter_level == '+':
+            if level == '#':
+                return False
+        elif filter_level != level:
+            return False
+    return len(filter_levels) == len(levels)
+
+
+class _Node:
+    __slots__ = ('children', 'values')
+
+    def __init__(self):
+        self.children = {}  # type: Dict[str, _Node]
+        self.values = []  # type: list
+
+
+class TopicTrie(Generic[T]):
+    """
+    Maps topic filters to values, and finds the values of every filter
+    matching a topic in time proportional to the topic's depth rather
+    than to the number of filters.
+
+    A filter can hold several values, and the same value can be held by
+    several filters.
+
+    This class is not thread-safe.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._count = 0
+
+    def __len__(self):
+        """Number of (filter, value) entries"""
+        return self._count
+
+    def add(self, topic_filter: str, value: T):
+        """
+        Adds `value` under `topic_filter`.
+
+        Raises:
+            ValueError: if `topic_filter` is not a valid topic filter
+        """
+        validate_topic_filter(topic_filter)
+        node = self._root
+        for level in topic_filter.split('/'):
+            child = node.children.get(level)
+            if child is None:
+                child = node.children[level] = _Node()
+            node = child
+        node.values.append(value)
+        self._count += 1
+
+    def remove(self, topic_filter: str, value: T) -> bool:
+        """
+        Removes one occurrence of `value` from under `topic_filter`.
+
+        Returns:
+            True if it was found
+        """
+        path = []  # type: List[Tuple[_Node, str]]
+        node = self._root
+        for level in topic_filter.split('/'):
+            child = node.children.get(level)
+            if child is None:
+                return False
+            path.append((node, level))
+            node = child
+        try:
+            node.values.remove(value)
+        except ValueError:
+            return False
+        self._count -= 1
+
+        # prune nodes left empty
+        for parent, level in reversed(path):
+            child = parent.children[level]
+            if child.values or child.children:
+                break
+            del parent.children[level]
+        return True
+
+    def get(self, topic_filter: str) -> List[T]:
+        """
+        Returns the values held under exactly `topic_filter`.
+        """
+        node = self._root
+        for level in topic_filter.split('/'):
+            node = node.children.get(level)
+            if node is None:
+                return []
+        return list(node.values)
+
+    def match(self, topic: str) -> List[T]:
+        """
+        Returns the values of every filter that matches `topic`.
+        """
+        levels = topic.split('/')
+        depth = len(levels)
+        no_wildcards_at_root = levels[0].startswith('$')
+        found = []
+        stack = [(self._root, 0)]
+        while stack:
+            node, i = stack.pop()
+            children = node.children
+            wildcards = not (i == 0 and no_wildcards_at_root)
+            if wildcards:
+                multi = children.get('#')
+                if multi is not None:
+                    found.extend(multi.values)
+            if i == depth:
+                found.extend(node.values)
+                continue
+            child = children.get(levels[i])
+            if child is not None:
+                stack.append((child, i + 1))
+            if wildcards:
+                single = children.get('+')
+                if single is not None:
+                    stack.append((single, i + 1))
+        return found
+
+    def items(self) -> Iterator[Tuple[str, T]]:
+        """
+        Yields every (filter, value) entry.
+        """
+        stack = [(self._root, [])]  # type: List[Tuple[_Node, List[str]]]
+        while stack:
+            node, levels = stack.pop()
+            if node.values:
+                topic_filter = '/'.join(levels)
+                for value in node.values:
+                    yield topic_filter, value
+            for level, child in node.children.items():
+                stack.append((child, levels + [level]))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Measures building mTLS clients with the builder functions, with and without
+a shared ResourceCache. Clients are built but never started, so no network
+is used. Needs the openssl command to make a throwaway certificate.
+
+Built clients are kept until the process exits: destroying MQTT5 clients
+while tracemalloc stops can crash the interpreter. The memory columns only
+count Python allocations, not the native TLS contexts.
+
+    python3 benchmarks/client_builders.py [--number N] [--filter TEXT] [--json PATH] [--baseline PATH]
+"""
+
+import atexit
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from awsiot import mqtt5_client_builder, mqtt_connection_builder  # noqa: E402
+from awsiot.resource_cache import ResourceCache  # noqa: E402
+from harness import Case, main  # noqa: E402
+
+ENDPOINT = 'example.iot.us-east-1.amazonaws.com'
+
+_directory = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, _directory, True)
+CERT_PATH = os.path.join(_directory, 'cert.pem')
+KEY_PATH = os.path.join(_directory, 'key.pem')
+subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=benchmark',
+                '-keyout', KEY_PATH, '-out', CERT_PATH], check=True, capture_output=True)
+
+# built clients, kept until exit
+_clients = []
+
+
+def build(builder, cached):
+    def setup():
+        counter = itertools.count()
+        kwargs = {}
+        if cached:
+            kwargs['resource_cache'] = ResourceCache()
+
+        def fn():
+            _clients.append(builder.mtls_from_path(
+                endpoint=ENDPOINT, client_id='thing{}'.format(next(counter)),
+                cert_filepath=CERT_PATH, pri_key_filepath=KEY_PATH, ca_filepath=CERT_PATH, **kwargs))
+        return fn
+    return setup
+
+
+CASES = [
+    Case("mqtt5_client_builder.mtls_from_path", build(mqtt5_client_builder, cached=False)),
+    Case("mqtt5_client_builder.mtls_from_path with ResourceCache", build(mqtt5_client_builder, cached=True)),
+    Case("mqtt_connection_builder.mtls_from_path", build(mqtt_connection_builder, cached=False)),
+    Case("mqtt_connection_builder.mtls_from_path with ResourceCache", build(mqtt_connection_builder, cached=True)),
+]
+
+
+if __name__ == '__main__':
+    main("Benchmark building clients with and without a shared ResourceCache", CASES, number=1000)
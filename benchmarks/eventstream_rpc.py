@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Measures eventstream RPC message handling in the Greengrass IPC client,
+against an in-process stand-in for the connection: request/response
+operations from activation to close, and stream events from the moment a
+message arrives until the stream handler has the decoded shape.
+
+    python3 benchmarks/eventstream_rpc.py [--number N] [--filter TEXT] [--json PATH] [--baseline PATH]
+"""
+
+from concurrent.futures import Future
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from awscrt.eventstream import Header  # noqa: E402
+from awscrt.eventstream.rpc import MessageFlag, MessageType  # noqa: E402
+import awsiot  # noqa: E402
+from awsiot.eventstreamrpc import (  # noqa: E402
+    CONTENT_TYPE_APPLICATION_JSON,
+    CONTENT_TYPE_HEADER,
+    SERVICE_MODEL_TYPE_HEADER,
+)
+from awsiot.greengrasscoreipc import client, model  # noqa: E402
+from harness import Case, main  # noqa: E402
+
+
+def _done(result=None):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def _headers(model_name):
+    return [Header.from_string(CONTENT_TYPE_HEADER, CONTENT_TYPE_APPLICATION_JSON),
+            Header.from_string(SERVICE_MODEL_TYPE_HEADER, model_name)]
+
+
+def _encode(shape):
+    return awsiot.get_default_json_codec().encode(shape._to_payload())
+
+
+# operation -> (headers, payload) of its response
+RESPONSES = {
+    op._model_name(): (_headers(op._response_type()._model_name()), payload)
+    for op, payload in [
+        (client.PublishToTopicOperation, b'{}'),
+        (client.SubscribeToTopicOperation, b'{}'),
+        (client.SubscribeToIoTCoreOperation, b'{}'),
+        (client.GetConfigurationOperation, _encode(model.GetConfigurationResponse(
+            component_name="com.example.Bench",
+            value={"key{}".format(i): {"enabled": True, "limit": i} for i in range(200)}))),
+    ]
+}
+
+
+class LoopbackContinuation:
+    """Answers activation with the operation's canned response, on the calling thread"""
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def activate(self, *, operation, headers, payload, message_type, flags=0):
+        response_headers, response_payload = RESPONSES[operation]
+        self.handler.on_continuation_message(headers=response_headers, payload=response_payload,
+                                             message_type=MessageType.APPLICATION_MESSAGE, flags=0)
+        return _done()
+
+    def send_message(self, *, headers=None, payload=None, message_type, flags=0):
+        if flags & MessageFlag.TERMINATE_STREAM:
+            self.handler.on_continuation_closed()
+        return _done()
+
+    def push(self, headers, payload):
+        self.handler.on_continuation_message(headers=headers, payload=payload,
+                                             message_type=MessageType.APPLICATION_MESSAGE, flags=0)
+
+
+class LoopbackConnection:
+    """Stands in for an eventstream RPC connection, keeping the last stream opened"""
+
+    def __init__(self):
+        self.last_continuation = None
+
+    def _new_stream(self, handler):
+        self.last_continuation = LoopbackContinuation(handler)
+        return self.last_continuation
+
+    def _on_operation_closing(self, operation):
+        pass
+
+    def _on_operation_disconnected(self, operation):
+        return False
+
+
+class CountingStreamHandler:
+    """Stream handler keeping only the last event, so the benchmark itself holds no memory"""
+
+    def __init__(self):
+        self.count = 0
+        self.last = None
+        self.error = None
+
+    def on_stream_event(self, event):
+        self.count += 1
+        self.last = event
+
+    def on_stream_error(self, error):
+        self.error = error
+        return True
+
+    def on_stream_closed(self):
+        pass
+
+
+def publish_to_topic():
+    ipc = client.GreengrassCoreIPCClient(LoopbackConnection())
+    request = model.PublishToTopicRequest(topic="bench/topic", publish_message=model.PublishMessage(
+        json_message=model.JsonMessage(message={"temperature": 21.5, "unit": "C", "seq": 1})))
+
+    def run():
+        operation = ipc.new_publish_to_topic()
+        operation.activate(request)
+        operation.get_response().result()
+        operation.close().result()
+
+    run()
+    return run
+
+
+def get_configuration():
+    ipc = client.GreengrassCoreIPCClient(LoopbackConnection())
+    request = model.GetConfigurationRequest(key_path=[])
+
+    def run():
+        operation = ipc.new_get_configuration()
+        operation.activate(request)
+        response = operation.get_response().result()
+        operation.close().result()
+        return response
+
+    assert len(run().value) == 200
+    return run
+
+
+def stream_events(new_operation, request, event):
+    def setup():
+        connection = LoopbackConnection()
+        ipc = client.GreengrassCoreIPCClient(connection)
+        handler = CountingStreamHandler()
+        operation = new_operation(ipc, handler)
+        operation.activate(request)
+        operation.get_response().result()
+        push = connection.last_continuation.push
+        headers = _headers(event._model_name())
+        payload = _encode(event)
+
+        def run():
+            push(headers, payload)
+
+        run()
+        assert handler.count == 1, handler.error
+        return run
+    return setup
+
+
+def json_event(keys):
+    return model.SubscriptionResponseMessage(json_message=model.JsonMessage(
+        message={"field{}".format(i): i for i in range(keys)},
+        context=model.MessageContext(topic="bench/topic")))
+
+
+def binary_event(size):
+    return model.SubscriptionResponseMessage(binary_message=model.BinaryMessage(
+        message=os.urandom(size), context=model.MessageContext(topic="bench/topic")))
+
+
+def iot_core_event(size):
+    return model.IoTCoreMessage(message=model.MQTTMessage(
+        topic_name="bench/topic", payload=os.urandom(size), retain=False,
+        user_properties=[model.UserProperty(key="k", value="v")] * 3, content_type="application/octet-stream"))
+
+
+def subscribe_to_topic(ipc, handler):
+    return ipc.new_subscribe_to_topic(handler)
+
+
+def subscribe_to_iot_core(ipc, handler):
+    return ipc.new_subscribe_to_iot_core(handler)
+
+
+TOPIC_REQUEST = model.SubscribeToTopicRequest(topic="bench/topic")
+IOT_CORE_REQUEST = model.SubscribeToIoTCoreRequest(topic_name="bench/topic", qos=model.QOS.AT_LEAST_ONCE)
+
+CASES = [
+    Case("PublishToTopic activate, response, close", publish_to_topic),
+    Case("GetConfiguration activate, response (200 keys), close", get_configuration),
+    Case("SubscribeToTopic event (json, 10 keys)",
+         stream_events(subscribe_to_topic, TOPIC_REQUEST, json_event(10))),
+    Case("SubscribeToTopic event (json, 1000 keys)",
+         stream_events(subscribe_to_topic, TOPIC_REQUEST, json_event(1000))),
+    Case("SubscribeToTopic event (binary, 256 B)",
+         stream_events(subscribe_to_topic, TOPIC_REQUEST, binary_event(256))),
+    Case("SubscribeToTopic event (binary, 64 KiB)",
+         stream_events(subscribe_to_topic, TOPIC_REQUEST, binary_event(64 * 1024))),
+    Case("SubscribeToIoTCore event (binary, 4 KiB)",
+         stream_events(subscribe_to_iot_core, IOT_CORE_REQUEST, iot_core_event(4096))),
+]
+
+
+if __name__ == '__main__':
+    main("Benchmark eventstream RPC message handling against an in-process connection", CASES, number=5000)
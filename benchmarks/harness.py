@@ -0,0 +1,160 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Shared runner for the benchmark scripts in this directory.
+
+Each case is measured three ways:
+throughput, from the total time of `--number` calls;
+latency percentiles, from timing every call individually;
+and allocations, from a separate pass under tracemalloc, so its overhead
+does not skew the timings.
+
+Results can be saved with `--json` and compared against a saved baseline
+with `--baseline`, which exits with status 1 if any case's throughput
+dropped by more than `--tolerance`.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, NamedTuple, Optional
+
+
+class Case(NamedTuple):
+    """
+    A benchmark case.
+
+    Args:
+        name: Name shown in the results.
+        setup: Prepares the case, and returns the function to measure.
+            Work done by `setup` is not measured.
+    """
+    name: str
+    setup: Callable[[], Callable[[], None]]
+
+
+class Result(NamedTuple):
+    name: str
+    ops_per_sec: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+    # tracemalloc high-water mark above the starting point, over the allocation pass
+    peak_bytes: int
+    # memory still held after the allocation pass, per call
+    retained_bytes_per_op: float
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_samples) - 1, max(0, int(round(fraction * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def measure(name: str, fn: Callable[[], None], number: int, warmup: int, alloc_number: int) -> Result:
+    for _ in range(warmup):
+        fn()
+
+    perf_counter_ns = time.perf_counter_ns
+    samples = [0] * number
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        start = perf_counter_ns()
+        for i in range(number):
+            call_start = perf_counter_ns()
+            fn()
+            samples[i] = perf_counter_ns() - call_start
+        total_ns = perf_counter_ns() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples.sort()
+
+    gc.collect()
+    # only memory allocated after start() is traced, so the peak starts from here too
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        for _ in range(alloc_number):
+            fn()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Result(
+        name=name,
+        ops_per_sec=number / (total_ns / 1e9),
+        p50_us=percentile(samples, 0.50) / 1e3,
+        p90_us=percentile(samples, 0.90) / 1e3,
+        p99_us=percentile(samples, 0.99) / 1e3,
+        peak_bytes=peak - base,
+        retained_bytes_per_op=(current - base) / alloc_number)
+
+
+def compare(results: List[Result], baseline_path: str, tolerance: float) -> List[str]:
+    """Returns a description of each case whose throughput regressed against the baseline"""
+    with open(baseline_path) as f:
+        baseline = {entry['name']: entry for entry in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        change = result.ops_per_sec / before['ops_per_sec'] - 1
+        if change < -tolerance:
+            regressions.append("{}: {:.0f} -> {:.0f} ops/s ({:+.1%})".format(
+                result.name, before['ops_per_sec'], result.ops_per_sec, change))
+    return regressions
+
+
+def main(description: str, cases: List[Case], number: int = 20000, argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--number', type=int, default=number, help="Timed calls per case")
+    parser.add_argument('--warmup', type=int, default=None, help="Untimed calls before timing (default: number / 10)")
+    parser.add_argument('--alloc-number', type=int, default=None,
+                        help="Calls in the allocation pass (default: number / 10)")
+    parser.add_argument('--filter', default=None, help="Only run cases whose name contains this")
+    parser.add_argument('--json', default=None, metavar='PATH', help="Write the results to this file")
+    parser.add_argument('--baseline', default=None, metavar='PATH',
+                        help="Results saved with --json to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Largest allowed drop in throughput against the baseline (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    warmup = args.warmup if args.warmup is not None else max(1, args.number // 10)
+    alloc_number = args.alloc_number if args.alloc_number is not None else max(1, args.number // 10)
+
+    row = "{:<52} {:>11} {:>9} {:>9} {:>9} {:>10} {:>10}"
+    print(row.format("case", "ops/s", "p50 us", "p90 us", "p99 us", "peak KiB", "kept B/op"))
+    results = []
+    for case in cases:
+        if args.filter is not None and args.filter not in case.name:
+            continue
+        result = measure(case.name, case.setup(), args.number, warmup, alloc_number)
+        results.append(result)
+        print(row.format(
+            result.name,
+            "{:.0f}".format(result.ops_per_sec),
+            "{:.2f}".format(result.p50_us),
+            "{:.2f}".format(result.p90_us),
+            "{:.2f}".format(result.p99_us),
+            "{:.1f}".format(result.peak_bytes / 1024),
+            "{:.1f}".format(result.retained_bytes_per_op)))
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version, 'results': [r._asdict() for r in results]}, f, indent=2)
+
+    if args.baseline is not None:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            sys.exit(1)
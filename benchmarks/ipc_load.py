@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Load generator for Greengrass IPC publish/subscribe. Publishers send
+messages as fast as their window allows, and every subscriber receives each
+of them. Reports the publish rate and latency (request to response), and the
+delivery rate and fan-out latency (request to arrival at a subscriber).
+
+By default runs against a LocalIpcServer started in-process. Pass --socket
+and --auth-token to load a running Greengrass Nucleus instead.
+
+    python3 benchmarks/ipc_load.py [--publishers P] [--subscribers S] [--messages N]
+                                   [--payload-size BYTES] [--binary] [--window W]
+                                   [--socket PATH --auth-token TOKEN]
+"""
+
+import argparse
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import awsiot.greengrasscoreipc  # noqa: E402
+from awsiot.greengrasscoreipc import model  # noqa: E402
+from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2  # noqa: E402
+from harness import percentile  # noqa: E402
+from local_ipc_server import LocalIpcServer  # noqa: E402
+
+TOPIC = "benchmarks/ipc_load"
+_SENT_AT = struct.Struct('>q')
+
+
+def connect(args):
+    connection = awsiot.greengrasscoreipc.connect(ipc_socket=args.socket, authtoken=args.auth_token)
+    # events are handled on the connection's thread, to time the IPC path and not an executor's queue
+    return GreengrassCoreIPCClientV2(connection, executor=None)
+
+
+class Subscriber:
+    def __init__(self, client, binary, expected):
+        self.latencies = []
+        self.expected = expected
+        self.done = threading.Event()
+        self.first_ns = None
+        self.last_ns = None
+        self._binary = binary
+        client.subscribe_to_topic(topic=TOPIC, on_stream_event=self.on_stream_event)
+
+    def on_stream_event(self, event):
+        now = time.perf_counter_ns()
+        if self._binary:
+            sent_at, = _SENT_AT.unpack_from(event.binary_message.message)
+        else:
+            sent_at = event.json_message.message['sentAt']
+        self.latencies.append(now - sent_at)
+        if self.first_ns is None:
+            self.first_ns = now
+        self.last_ns = now
+        if len(self.latencies) == self.expected:
+            self.done.set()
+
+
+def publish(client, args, latencies):
+    """Publishes args.messages messages, with at most args.window awaiting a response"""
+    window = threading.BoundedSemaphore(args.window)
+    padding = b'x' * args.payload_size
+
+    for _ in range(args.messages):
+        window.acquire()
+        sent_at = time.perf_counter_ns()
+        if args.binary:
+            message = model.PublishMessage(binary_message=model.BinaryMessage(
+                message=_SENT_AT.pack(sent_at) + padding))
+        else:
+            message = model.PublishMessage(json_message=model.JsonMessage(
+                message={'sentAt': sent_at, 'padding': padding.decode()}))
+
+        def on_done(future, sent_at=sent_at):
+            latencies.append(time.perf_counter_ns() - sent_at)
+            window.release()
+            if future.exception() is not None:
+                print("publish failed: {!r}".format(future.exception()), file=sys.stderr)
+
+        client.publish_to_topic_async(topic=TOPIC, publish_message=message).add_done_callback(on_done)
+
+    for _ in range(args.window):
+        window.acquire()
+
+
+def report(name, count, elapsed_ns, latencies):
+    latencies.sort()
+    print("{:<10} {:>10} {:>12.0f} {:>10.1f} {:>10.1f}".format(
+        name, count, count / (elapsed_ns / 1e9),
+        percentile(latencies, 0.50) / 1e3, percentile(latencies, 0.99) / 1e3))
+
+
+def run(args):
+    publishers = [connect(args) for _ in range(args.publishers)]
+    subscriber_clients = [connect(args) for _ in range(args.subscribers)]
+    expected = args.publishers * args.messages
+    subscribers = [Subscriber(client, args.binary, expected) for client in subscriber_clients]
+
+    publish_latencies = [[] for _ in publishers]
+    threads = [threading.Thread(target=publish, args=(client, args, latencies))
+               for client, latencies in zip(publishers, publish_latencies)]
+    start = time.perf_counter_ns()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    published_ns = time.perf_counter_ns() - start
+
+    for subscriber in subscribers:
+        if not subscriber.done.wait(args.timeout):
+            print("subscriber received {} of {} messages".format(len(subscriber.latencies), expected),
+                  file=sys.stderr)
+    delivered = sum(len(s.latencies) for s in subscribers)
+    delivered_ns = max((s.last_ns for s in subscribers if s.last_ns is not None), default=start + 1) - start
+
+    print("{} publisher(s), {} subscriber(s), {} messages each, {} {}-byte payloads, window {}".format(
+        args.publishers, args.subscribers, args.messages, "binary" if args.binary else "json",
+        args.payload_size, args.window))
+    print("{:<10} {:>10} {:>12} {:>10} {:>10}".format("", "messages", "msgs/sec", "p50 us", "p99 us"))
+    report("publish", expected, published_ns, [x for latencies in publish_latencies for x in latencies])
+    if subscribers:
+        report("fan-out", delivered, delivered_ns, [x for s in subscribers for x in s.latencies])
+
+    for client in publishers + subscriber_clients:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test Greengrass IPC publish/subscribe")
+    parser.add_argument('--publishers', type=int, default=1, help="Publishing connections")
+    parser.add_argument('--subscribers', type=int, default=4, help="Subscribing connections")
+    parser.add_argument('--messages', type=int, default=5000, help="Messages per publisher")
+    parser.add_argument('--payload-size', type=int, default=64, help="Padding bytes per message")
+    parser.add_argument('--binary', action='store_true', help="Publish binary messages instead of JSON")
+    parser.add_argument('--window', type=int, default=16, help="Publishes per publisher awaiting a response")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Seconds to wait for deliveries")
+    parser.add_argument('--socket', default=None, help="IPC socket of a running server (default: start one)")
+    parser.add_argument('--auth-token', default='benchmark', help="Auth token to connect with")
+    args = parser.parse_args()
+
+    if args.socket is not None:
+        run(args)
+        return
+
+    directory = tempfile.mkdtemp()
+    try:
+        args.socket = os.path.join(directory, 'ipc.socket')
+        with LocalIpcServer(args.socket, auth_token=args.auth_token):
+            run(args)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
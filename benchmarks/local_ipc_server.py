@@ -0,0 +1,563 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+A local stand-in for the GreengrassCoreIPC service of Greengrass Nucleus,
+used by benchmarks/ipc_load.py and the tests to exercise the IPC clients
+without a Greengrass device. It is not part of the installed SDK.
+"""
+
+import awsiot
+from awsiot import shadow_document
+from awsiot.greengrasscoreipc import model
+from awsiot.topic_filter import TopicTrie, validate_topic_filter
+import copy
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import zlib
+
+__all__ = [
+    'LocalIpcServer',
+]
+
+logger = logging.getLogger(__name__)
+
+# eventstream RPC message types and flags, as in awscrt.eventstream.rpc
+_APPLICATION_MESSAGE = 0
+_APPLICATION_ERROR = 1
+_PING = 2
+_PING_RESPONSE = 3
+_CONNECT = 4
+_CONNECT_ACK = 5
+_PROTOCOL_ERROR = 6
+
+_CONNECTION_ACCEPTED = 0x1
+_TERMINATE_STREAM = 0x2
+
+# eventstream header value types, as in awscrt.eventstream.HeaderType
+_BOOL_TRUE = 0
+_BOOL_FALSE = 1
+_BYTE = 2
+_INT16 = 3
+_INT32 = 4
+_INT64 = 5
+_BYTE_BUF = 6
+_STRING = 7
+_TIMESTAMP = 8
+_UUID = 9
+
+_FIXED_HEADER_FORMATS = {
+    _BYTE: struct.Struct('>b'),
+    _INT16: struct.Struct('>h'),
+    _INT32: struct.Struct('>i'),
+    _INT64: struct.Struct('>q'),
+    _TIMESTAMP: struct.Struct('>q'),
+}
+_LENGTH = struct.Struct('>H')
+_PRELUDE = struct.Struct('>II')
+_CRC = struct.Struct('>I')
+_INT32_HEADER = struct.Struct('>Bi')
+
+_MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+
+def _string_header(name: str, value: str) -> bytes:
+    name_bytes = name.encode()
+    value_bytes = value.encode()
+    return bytes((len(name_bytes),)) + name_bytes + bytes((_STRING,)) + _LENGTH.pack(len(value_bytes)) + value_bytes
+
+
+def _int32_header(name: str, value: int) -> bytes:
+    name_bytes = name.encode()
+    return bytes((len(name_bytes),)) + name_bytes + _INT32_HEADER.pack(_INT32, value)
+
+
+def _protocol_headers(message_type: int, flags: int, stream_id: int) -> bytes:
+    return (_int32_header(':message-type', message_type) +
+            _int32_header(':message-flags', flags) +
+            _int32_header(':stream-id', stream_id))
+
+
+def _shape_headers(model_name: str) -> bytes:
+    return _string_header(':content-type', 'application/json') + _string_header('service-model-type', model_name)
+
+
+def _encode_message(headers: bytes, payload: bytes) -> bytes:
+    prelude = _PRELUDE.pack(_PRELUDE.size + _CRC.size + len(headers) + len(payload) + _CRC.size, len(headers))
+    prelude += _CRC.pack(zlib.crc32(prelude))
+    crc = zlib.crc32(payload, zlib.crc32(headers, zlib.crc32(prelude)))
+    return b''.join((prelude, headers, payload, _CRC.pack(crc)))
+
+
+def _decode_headers(data: bytes) -> Dict[str, Any]:
+    headers = {}
+    offset = 0
+    while offset < len(data):
+        name_length = data[offset]
+        name = data[offset + 1:offset + 1 + name_length].decode()
+        offset += 1 + name_length
+        header_type = data[offset]
+        offset += 1
+        if header_type in (_BOOL_TRUE, _BOOL_FALSE):
+            value = header_type == _BOOL_TRUE
+        elif header_type in _FIXED_HEADER_FORMATS:
+            value_format = _FIXED_HEADER_FORMATS[header_type]
+            value, = value_format.unpack_from(data, offset)
+            offset += value_format.size
+        elif header_type in (_BYTE_BUF, _STRING):
+            value_length, = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            value = data[offset:offset + value_length]
+            offset += value_length
+            if header_type == _STRING:
+                value = value.decode()
+        elif header_type == _UUID:
+            value = data[offset:offset + 16]
+            offset += 16
+        else:
+            raise ValueError("Unknown header type {}".format(header_type))
+        headers[name] = value
+    return headers
+
+
+def _read_message(reader) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """Returns the headers and payload of the next message, or None at the end of the stream"""
+    prelude = reader.read(_PRELUDE.size + _CRC.size)
+    if not prelude:
+        return None
+    if len(prelude) < _PRELUDE.size + _CRC.size:
+        raise ValueError("Connection closed mid-message")
+    total_length, headers_length = _PRELUDE.unpack_from(prelude)
+    prelude_crc, = _CRC.unpack_from(prelude, _PRELUDE.size)
+    if zlib.crc32(prelude[:_PRELUDE.size]) != prelude_crc:
+        raise ValueError("Prelude checksum mismatch")
+    if total_length > _MAX_MESSAGE_SIZE or headers_length > total_length - len(prelude) - _CRC.size:
+        raise ValueError("Invalid message length")
+    rest = reader.read(total_length - len(prelude))
+    if len(rest) < total_length - len(prelude):
+        raise ValueError("Connection closed mid-message")
+    message_crc, = _CRC.unpack_from(rest, len(rest) - _CRC.size)
+    if zlib.crc32(rest[:-_CRC.size], zlib.crc32(prelude)) != message_crc:
+        raise ValueError("Message checksum mismatch")
+    headers = _decode_headers(rest[:headers_length])
+    return headers, rest[headers_length:-_CRC.size]
+
+
+class _Subscription:
+    """A SubscribeToTopic stream"""
+
+    def __init__(self, connection: '_Connection', stream_id: int, topic_filter: str, receive_mode: Optional[str]):
+        self.connection = connection
+        self.stream_id = stream_id
+        self.topic_filter = topic_filter
+        self.from_others_only = receive_mode == model.ReceiveMode.RECEIVE_MESSAGES_FROM_OTHERS
+
+
+class _Connection(socketserver.BaseRequestHandler):
+    """One client connection, served on a thread of its own"""
+
+    def setup(self):
+        self.service = self.server.service  # type: LocalIpcServer
+        self.connected = False
+        # client stream IDs only increase, so a message on an older ID belongs to an ended stream
+        self.last_stream_id = 0
+        # stream ID -> subscription, for open SubscribeToTopic streams
+        self.subscriptions = {}  # type: Dict[int, _Subscription]
+        self.write_lock = threading.Lock()
+
+    def handle(self):
+        reader = self.request.makefile('rb')
+        self.service._connection_opened(self)
+        try:
+            while True:
+                message = _read_message(reader)
+                if message is None or not self._on_message(*message):
+                    return
+        except (OSError, ValueError) as e:
+            logger.debug("%r closed: %r", self, e)
+        finally:
+            reader.close()
+            self.service._connection_closed(self)
+
+    def _on_message(self, headers: Dict[str, Any], payload: bytes) -> bool:
+        """Returns False if the connection should be closed"""
+        message_type = headers.get(':message-type')
+        flags = headers.get(':message-flags', 0)
+        stream_id = headers.get(':stream-id', 0)
+
+        if not self.connected:
+            if message_type != _CONNECT:
+                self.send(_PROTOCOL_ERROR, 0, 0)
+                return False
+            self.connected = self.service._authorize(payload)
+            self.send(_CONNECT_ACK, _CONNECTION_ACCEPTED if self.connected else 0, 0)
+            return self.connected
+
+        if message_type == _PING:
+            self.send(_PING_RESPONSE, 0, 0, payload=payload)
+            return True
+        if message_type != _APPLICATION_MESSAGE or stream_id <= 0:
+            self.send(_PROTOCOL_ERROR, 0, 0)
+            return False
+
+        if stream_id > self.last_stream_id:
+            self.last_stream_id = stream_id
+            if not flags & _TERMINATE_STREAM:
+                self.service._handle_request(self, stream_id, headers.get('operation'), payload)
+        elif flags & _TERMINATE_STREAM:
+            self.service._end_stream(self, stream_id)
+        return True
+
+    def send(self, message_type: int, flags: int, stream_id: int, headers: bytes = b'', payload: bytes = b''):
+        message = _encode_message(_protocol_headers(message_type, flags, stream_id) + headers, payload)
+        with self.write_lock:
+            self.request.sendall(message)
+
+    def __repr__(self):
+        return '<LocalIpcServer connection {}>'.format(id(self))
+
+
+class _SocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: 'LocalIpcServer'):
+        self.service = service
+        super().__init__(socket_path, _Connection)
+
+
+class LocalIpcServer:
+    """
+    Serves the GreengrassCoreIPC operations used most by components from
+    in-memory state, over a Unix domain socket, so that components and the
+    IPC clients can be tested and load tested without Greengrass Nucleus.
+
+    The supported operations are:
+
+    *   PublishToTopic and SubscribeToTopic, with `+` and `#` wildcards and
+        both receive modes. Messages are delivered to subscribers as the
+        publish is handled, before it is acknowledged.
+    *   GetThingShadow, UpdateThingShadow and DeleteThingShadow, which keep
+        each shadow's state, version and delta. Updates follow the Device
+        Shadow service's merge rules, and are rejected with a ConflictError
+        if they carry a version that is not the current one. Shadow metadata
+        is not kept.
+    *   GetConfiguration, for the configurations given to the server or set
+        with :meth:`set_configuration`.
+
+    Other operations fail with a ServiceError.
+
+    Each connection is served on a thread of its own, and a slow subscriber
+    slows down the publishers sending to it. The server is meant for
+    development machines and CI. It only checks the auth token, and offers
+    none of the Nucleus's authorization policies.
+
+    Connect to it as to the Nucleus::
+
+        with LocalIpcServer('/tmp/ipc.socket', auth_token='token') as server:
+            ipc_client = GreengrassCoreIPCClientV2(
+                awsiot.greengrasscoreipc.connect(ipc_socket=server.socket_path, authtoken='token'))
+
+    Args:
+        socket_path: Path of the Unix domain socket to listen on. Any file
+            already there is replaced.
+        auth_token: Token that clients must connect with, or None to accept any.
+        component_name: Name of the component that clients are taken to be,
+            whose configuration GetConfiguration returns if the request names none.
+        configuration: Configuration of each component, by component name.
+        json_codec: Codec for message payloads. Defaults to :func:`awsiot.get_default_json_codec()`.
+    """
+
+    def __init__(self, socket_path: str, *,
+                 auth_token: Optional[str] = None,
+                 component_name: str = 'com.example.LocalComponent',
+                 configuration: Optional[Dict[str, Dict[str, Any]]] = None,
+                 json_codec: Optional[awsiot.JsonCodec] = None):
+        self._socket_path = socket_path
+        self._auth_token = auth_token
+        self._component_name = component_name
+        self._json_codec = json_codec if json_codec is not None else awsiot.get_default_json_codec()
+        self._lock = threading.Lock()
+        # component name -> configuration
+        self._configuration = copy.deepcopy(configuration) if configuration else {}
+        # (thing name, shadow name) -> {'desired': ..., 'reported': ..., 'version': ...}
+        self._shadows = {}  # type: Dict[Tuple[str, str], Dict[str, Any]]
+        self._subscriptions = TopicTrie()  # type: TopicTrie[_Subscription]
+        self._connections = set()  # type: set
+        self._operations = {
+            model._PublishToTopicOperation._model_name():
+                (model.PublishToTopicRequest, self._publish_to_topic),
+            model._SubscribeToTopicOperation._model_name():
+                (model.SubscribeToTopicRequest, self._subscribe_to_topic),
+            model._GetThingShadowOperation._model_name():
+                (model.GetThingShadowRequest, self._get_thing_shadow),
+            model._UpdateThingShadowOperation._model_name():
+                (model.UpdateThingShadowRequest, self._update_thing_shadow),
+            model._DeleteThingShadowOperation._model_name():
+                (model.DeleteThingShadowRequest, self._delete_thing_shadow),
+            model._GetConfigurationOperation._model_name():
+                (model.GetConfigurationRequest, self._get_configuration),
+        }  # type: Dict[str, Tuple[type, Callable]]
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self._server = _SocketServer(socket_path, self)
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05},
+                                        name='LocalIpcServer', daemon=True)
+        self._thread.start()
+
+    @property
+    def socket_path(self) -> str:
+        """Path of the Unix domain socket the server listens on"""
+        return self._socket_path
+
+    def set_configuration(self, component_name: str, configuration: Dict[str, Any]):
+        """
+        Replaces a component's configuration.
+
+        Args:
+            component_name: Name of the component.
+            configuration: Its new configuration.
+        """
+        with self._lock:
+            self._configuration[component_name] = copy.deepcopy(configuration)
+
+    def get_shadow_state(self, thing_name: str, shadow_name: str = '') -> Optional[Dict[str, Any]]:
+        """
+        Returns a copy of a shadow's `state`, with its `desired`, `reported`
+        and `delta` documents, or None if the shadow does not exist.
+
+        Args:
+            thing_name: Name of the thing.
+            shadow_name: Name of the shadow, or '' for the classic shadow.
+        """
+        with self._lock:
+            shadow = self._shadows.get((thing_name, shadow_name))
+            return None if shadow is None else self._shadow_state(shadow)
+
+    def close(self):
+        """
+        Stops the server, closes every connection and removes the socket file.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join()
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _authorize(self, payload: bytes) -> bool:
+        if self._auth_token is None:
+            return True
+        try:
+            return json.loads(payload).get('authToken') == self._auth_token
+        except (ValueError, AttributeError):
+            return False
+
+    def _connection_opened(self, connection: _Connection):
+        with self._lock:
+            self._connections.add(connection)
+
+    def _connection_closed(self, connection: _Connection):
+        with self._lock:
+            self._connections.discard(connection)
+            for subscription in connection.subscriptions.values():
+                self._subscriptions.remove(subscription.topic_filter, subscription)
+            connection.subscriptions.clear()
+
+    def _end_stream(self, connection: _Connection, stream_id: int):
+        with self._lock:
+            subscription = connection.subscriptions.pop(stream_id, None)
+            if subscription is not None:
+                self._subscriptions.remove(subscription.topic_filter, subscription)
+
+    def _handle_request(self, connection: _Connection, stream_id: int, operation: Optional[str], payload: bytes):
+        try:
+            entry = self._operations.get(operation)
+            if entry is None:
+                raise model.ServiceError(message="Operation {} is not supported by LocalIpcServer".format(operation))
+            request_type, handler = entry
+            try:
+                request = request_type._from_payload(self._json_codec.decode(payload))
+            except Exception as e:
+                raise model.InvalidArgumentsError(message="Invalid request: {!r}".format(e))
+            response, subscription = handler(connection, request)
+        except model.GreengrassCoreIPCError as e:
+            self._send_shape(connection, _APPLICATION_ERROR, _TERMINATE_STREAM, stream_id, e)
+            return
+        except Exception as e:
+            logger.exception("%s failed", operation)
+            self._send_shape(connection, _APPLICATION_ERROR, _TERMINATE_STREAM, stream_id,
+                             model.ServiceError(message=repr(e)))
+            return
+
+        if subscription is None:
+            self._send_shape(connection, _APPLICATION_MESSAGE, _TERMINATE_STREAM, stream_id, response)
+            return
+
+        # the response must reach the client before the first message of the stream
+        subscription.stream_id = stream_id
+        with connection.write_lock:
+            with self._lock:
+                connection.subscriptions[stream_id] = subscription
+                self._subscriptions.add(subscription.topic_filter, subscription)
+            message = _encode_message(
+                _protocol_headers(_APPLICATION_MESSAGE, 0, stream_id) + _shape_headers(response._model_name()),
+                self._json_codec.encode(response._to_payload()))
+            connection.request.sendall(message)
+
+    def _send_shape(self, connection: _Connection, message_type: int, flags: int, stream_id: int, shape):
+        try:
+            connection.send(message_type, flags, stream_id, _shape_headers(shape._model_name()),
+                            self._json_codec.encode(shape._to_payload()))
+        except OSError as e:
+            logger.debug("%r failed to send: %r", connection, e)
+
+    def _publish_to_topic(self, connection: _Connection, request: model.PublishToTopicRequest):
+        if not request.topic:
+            raise model.InvalidArgumentsError(message="topic is required")
+        publish_message = request.publish_message
+        if publish_message is None or (publish_message.json_message is None) == (publish_message.binary_message is None):
+            raise model.InvalidArgumentsError(message="publish_message must have one of json_message or binary_message")
+
+        context = model.MessageContext(topic=request.topic)
+        if publish_message.json_message is not None:
+            event = model.SubscriptionResponseMessage(json_message=model.JsonMessage(
+                message=publish_message.json_message.message, context=context))
+        else:
+            event = model.SubscriptionResponseMessage(binary_message=model.BinaryMessage(
+                message=publish_message.binary_message.message, context=context))
+        # encoded once, for every subscriber
+        headers = _shape_headers(event._model_name())
+        payload = self._json_codec.encode(event._to_payload())
+
+        with self._lock:
+            subscriptions = self._subscriptions.match(request.topic)
+        for subscription in subscriptions:
+            if subscription.from_others_only and subscription.connection is connection:
+                continue
+            try:
+                subscription.connection.send(_APPLICATION_MESSAGE, 0, subscription.stream_id, headers, payload)
+            except OSError as e:
+                logger.debug("%r failed to deliver to %r: %r", self, subscription.connection, e)
+        return model.PublishToTopicResponse(), None
+
+    def _subscribe_to_topic(self, connection: _Connection, request: model.SubscribeToTopicRequest):
+        try:
+            validate_topic_filter(request.topic or '')
+        except ValueError as e:
+            raise model.InvalidArgumentsError(message=str(e))
+        subscription = _Subscription(connection, 0, request.topic, request.receive_mode)
+        return model.SubscribeToTopicResponse(topic_name=request.topic), subscription
+
+    def _shadow_key(self, request) -> Tuple[str, str]:
+        if not request.thing_name:
+            raise model.InvalidArgumentsError(message="thing_name is required")
+        return request.thing_name, request.shadow_name or ''
+
+    def _shadow_not_found(self, key: Tuple[str, str]):
+        name = key[1] or 'Classic'
+        return model.ResourceNotFoundError(
+            message="No shadow exists with name: {}".format(name), resource_type='Shadow', resource_name=name)
+
+    def _shadow_state(self, shadow: Dict[str, Any]) -> Dict[str, Any]:
+        # must be called with the lock held
+        state = {}
+        for section in ('desired', 'reported'):
+            if shadow[section] is not None:
+                state[section] = copy.deepcopy(shadow[section])
+        delta = shadow_document.compute_delta(shadow['desired'], shadow['reported'])
+        if delta is not None:
+            state['delta'] = delta
+        return state
+
+    def _get_thing_shadow(self, connection: _Connection, request: model.GetThingShadowRequest):
+        key = self._shadow_key(request)
+        with self._lock:
+            shadow = self._shadows.get(key)
+            if shadow is None:
+                raise self._shadow_not_found(key)
+            document = {'state': self._shadow_state(shadow), 'version': shadow['version'],
+                        'timestamp': int(time.time())}
+        return model.GetThingShadowResponse(payload=self._json_codec.encode(document)), None
+
+    def _update_thing_shadow(self, connection: _Connection, request: model.UpdateThingShadowRequest):
+        key = self._shadow_key(request)
+        try:
+            update = self._json_codec.decode(request.payload or b'')
+        except Exception:
+            raise model.InvalidArgumentsError(message="payload is not a JSON document")
+        state = update.get('state') if isinstance(update, dict) else None
+        if not isinstance(state, dict):
+            raise model.InvalidArgumentsError(message="payload must have a state")
+
+        with self._lock:
+            shadow = self._shadows.get(key)
+            current_version = 0 if shadow is None else shadow['version']
+            expected_version = update.get('version')
+            if expected_version is not None and expected_version != current_version:
+                raise model.ConflictError(message="Version conflict")
+            if shadow is None:
+                shadow = self._shadows[key] = {'desired': None, 'reported': None, 'version': 0}
+            for section in ('desired', 'reported'):
+                if section not in state:
+                    continue
+                if state[section] is None:
+                    shadow[section] = None
+                else:
+                    shadow[section] = shadow_document.apply_update(shadow[section] or {}, state[section])
+            shadow['version'] += 1
+            version = shadow['version']
+
+        document = {'state': state, 'version': version, 'timestamp': int(time.time())}
+        if 'clientToken' in update:
+            document['clientToken'] = update['clientToken']
+        return model.UpdateThingShadowResponse(payload=self._json_codec.encode(document)), None
+
+    def _delete_thing_shadow(self, connection: _Connection, request: model.DeleteThingShadowRequest):
+        key = self._shadow_key(request)
+        with self._lock:
+            shadow = self._shadows.pop(key, None)
+            if shadow is None:
+                raise self._shadow_not_found(key)
+        document = {'version': shadow['version'], 'timestamp': int(time.time())}
+        return model.DeleteThingShadowResponse(payload=self._json_codec.encode(document)), None
+
+    def _get_configuration(self, connection: _Connection, request: model.GetConfigurationRequest):
+        component_name = request.component_name or self._component_name
+        key_path = request.key_path or []  # type: List[str]
+        with self._lock:
+            value = self._configuration.get(component_name)
+            if value is None:
+                raise model.ResourceNotFoundError(
+                    message="Component {} has no configuration".format(component_name),
+                    resource_type='Component', resource_name=component_name)
+            for key in key_path:
+                if not isinstance(value, dict) or key not in value:
+                    raise model.ResourceNotFoundError(
+                        message="Key not found: {}".format('/'.join(key_path)),
+                        resource_type='Configuration', resource_name=component_name)
+                value = value[key]
+            value = copy.deepcopy(value)
+        if not isinstance(value, dict):
+            # GetConfiguration always answers with an object, so a single value is keyed by its name
+            value = {key_path[-1]: value}
+        return model.GetConfigurationResponse(component_name=component_name, value=value), None
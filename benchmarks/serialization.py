@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Compares the compiled serializers in awsiot.serialization against the
+generated from_payload()/to_payload() methods on representative shapes.
+
+    python3 benchmarks/serialization.py [--number N] [--repeat R]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from awsiot import iotjobs, iotshadow, serialization  # noqa: E402
+from awsiot.greengrasscoreipc import model  # noqa: E402
+
+JOB_SUMMARY = {"jobId": "job-1", "executionNumber": 1, "versionNumber": 2,
+               "startedAt": 1700000000, "lastUpdatedAt": 1700000100}
+
+# (name, class, payload, generated decoder, generated encoder)
+CASES = [
+    ("shadow GetShadowResponse (nested)", iotshadow.GetShadowResponse, {
+        "clientToken": "token",
+        "state": {"desired": {"color": "red"}, "reported": {"color": "blue"}},
+        "metadata": {"desired": {"color": {"timestamp": 1700000000}}},
+        "timestamp": 1700000002,
+        "version": 42,
+    }, iotshadow.GetShadowResponse.from_payload, None),
+    ("shadow UpdateShadowRequest (encode only)", iotshadow.UpdateShadowRequest, None,
+     None, iotshadow.UpdateShadowRequest.to_payload),
+    ("jobs JobExecutionSummary (timestamps)", iotjobs.JobExecutionSummary, JOB_SUMMARY,
+     iotjobs.JobExecutionSummary.from_payload, None),
+    ("jobs GetPendingJobExecutionsResponse (lists)", iotjobs.GetPendingJobExecutionsResponse, {
+        "inProgressJobs": [JOB_SUMMARY] * 5,
+        "queuedJobs": [JOB_SUMMARY] * 5,
+        "timestamp": 1700000003,
+    }, iotjobs.GetPendingJobExecutionsResponse.from_payload, None),
+    ("ipc UserProperty (flat)", model.UserProperty, {"key": "k", "value": "v"},
+     model.UserProperty._from_payload, model.UserProperty._to_payload),
+    ("ipc ComponentDetails (flat)", model.ComponentDetails, {
+        "componentName": "com.example.Hello", "version": "1.0.0", "state": "RUNNING",
+        "configuration": {"message": "hello"},
+    }, model.ComponentDetails._from_payload, model.ComponentDetails._to_payload),
+    ("ipc MQTTMessage (blobs, list)", model.MQTTMessage, {
+        "topicName": "a/b", "payload": "aGVsbG8gd29ybGQ=", "retain": False,
+        "userProperties": [{"key": "k", "value": "v"}] * 3,
+        "messageExpiryIntervalSeconds": 60, "contentType": "application/json",
+    }, model.MQTTMessage._from_payload, model.MQTTMessage._to_payload),
+]
+
+
+def measure(fn, number, repeat):
+    """Returns the best time per call, in microseconds"""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compiled serializers against generated methods")
+    parser.add_argument('--number', type=int, default=20000, help="Calls per measurement")
+    parser.add_argument('--repeat', type=int, default=5, help="Measurements per case (best is reported)")
+    parser.add_argument('--bulk', type=int, default=100, help="Objects per bulk (from_payloads) call")
+    args = parser.parse_args()
+
+    row = "{:<46} {:<14} {:>12} {:>12} {:>8}"
+    print(row.format("shape", "operation", "generated us", "compiled us", "speedup"))
+
+    for name, shape_type, payload, generated_decode, generated_encode in CASES:
+        serializer = serialization.get_serializer(shape_type)
+        assert serializer.compiled, name
+        compiled_decode, compiled_encode = serializer.from_payload, serializer.to_payload
+        compiled_bulk_decode, compiled_bulk_encode = serializer.from_payloads, serializer.to_payloads
+
+        if generated_decode is not None:
+            payloads = [payload] * args.bulk
+            results = [
+                ("decode", lambda: generated_decode(payload), lambda: compiled_decode(payload), 1),
+                ("bulk decode", lambda: [generated_decode(p) for p in payloads],
+                 lambda: compiled_bulk_decode(payloads), args.bulk),
+            ]
+            obj = generated_decode(payload)
+        else:
+            results = []
+            obj = shape_type(thing_name="thing", client_token="token", version=3,
+                             state=iotshadow.ShadowState(reported={"color": "red"}))
+
+        if generated_encode is not None:
+            objs = [obj] * args.bulk
+            results += [
+                ("encode", lambda: generated_encode(obj), lambda: compiled_encode(obj), 1),
+                ("bulk encode", lambda: [generated_encode(o) for o in objs],
+                 lambda: compiled_bulk_encode(objs), args.bulk),
+            ]
+
+        for operation, generated, compiled, per_call in results:
+            number = max(1, args.number // per_call)
+            generated_us = measure(generated, number, args.repeat) / per_call
+            compiled_us = measure(compiled, number, args.repeat) / per_call
+            print(row.format(name, operation, "{:.3f}".format(generated_us), "{:.3f}".format(compiled_us),
+                             "{:.2f}x".format(generated_us / compiled_us)))
+
+
+if __name__ == '__main__':
+    main()
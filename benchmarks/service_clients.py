@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+"""
+Measures the MQTT service clients against in-process stand-ins for the
+broker and for the request-response client, so only the SDK's own work is
+timed: publish/subscribe round trips through MqttServiceClient, request/
+response through IotShadowClientV2, and (de)serialization of large shadow
+and job payloads.
+
+    python3 benchmarks/service_clients.py [--number N] [--filter TEXT] [--json PATH] [--baseline PATH]
+"""
+
+from concurrent.futures import Future
+import itertools
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from awscrt import mqtt, mqtt_request_response  # noqa: E402
+import awsiot  # noqa: E402
+from awsiot import iotjobs, iotshadow, serialization  # noqa: E402
+from awsiot.scheduler import RequestScheduler  # noqa: E402
+from awsiot.singleflight import SingleFlightClient  # noqa: E402
+from awsiot.topic_filter import TopicTrie  # noqa: E402
+from harness import Case, main  # noqa: E402
+
+QOS = mqtt.QoS.AT_LEAST_ONCE
+THING = "bench-thing"
+THINGS = ["thing-{}".format(i) for i in range(1000)]
+
+
+def _done(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def sensor_state(keys):
+    return {"sensor{}".format(i): {"value": i * 1.5, "unit": "C", "ok": True} for i in range(keys)}
+
+
+def shadow_document(keys):
+    state = sensor_state(keys)
+    metadata = {name: {"value": {"timestamp": 1700000000}, "unit": {"timestamp": 1700000000},
+                       "ok": {"timestamp": 1700000000}} for name in state}
+    return {
+        "state": {"desired": state, "reported": state},
+        "metadata": {"desired": metadata, "reported": metadata},
+        "version": 1042,
+        "timestamp": 1700000001,
+    }
+
+
+def job_summary(i):
+    return {"jobId": "job-{}".format(i), "executionNumber": i, "versionNumber": 1,
+            "queuedAt": 1700000000, "startedAt": 1700000010, "lastUpdatedAt": 1700000020}
+
+
+def job_execution(steps):
+    return {
+        "execution": {
+            "jobId": "job-1", "thingName": THING, "status": "IN_PROGRESS",
+            "statusDetails": {"step": "3"}, "queuedAt": 1700000000, "startedAt": 1700000010,
+            "lastUpdatedAt": 1700000020, "versionNumber": 4, "executionNumber": 1,
+            "jobDocument": {"operation": "install", "steps": [
+                {"name": "step-{}".format(i), "url": "https://example.com/artifacts/{}".format(i),
+                 "sha256": "0" * 64, "args": ["--verbose", "--retries", "3"]} for i in range(steps)]},
+        },
+        "timestamp": 1700000030,
+    }
+
+
+class LoopbackConnection(mqtt.Connection):
+    """
+    Stands in for an MQTT connection and the broker behind it. Publishes are
+    delivered to matching subscriptions on the calling thread, and passed to
+    `responder`, which may answer with a (topic, payload) of its own.
+    """
+
+    def __init__(self, responder=None):
+        # no native connection is created
+        self._subscriptions = TopicTrie()
+        self._responder = responder
+
+    def subscribe(self, topic, qos, callback=None):
+        self._subscriptions.add(topic, callback)
+        return _done({'packet_id': 1, 'topic': topic, 'qos': qos}), 1
+
+    def unsubscribe(self, topic):
+        for callback in self._subscriptions.get(topic):
+            self._subscriptions.remove(topic, callback)
+        return _done({'packet_id': 2}), 2
+
+    def publish(self, topic, payload, qos, retain=False):
+        self.deliver(topic, payload)
+        if self._responder is not None:
+            reply = self._responder(topic, payload)
+            if reply is not None:
+                self.deliver(*reply)
+        return _done({'packet_id': 3}), 3
+
+    def deliver(self, topic, payload):
+        for callback in self._subscriptions.match(topic):
+            callback(topic=topic, payload=payload, dup=False, qos=QOS, retain=False)
+
+
+class Sink:
+    """Callback keeping only the last event, so the benchmark itself holds no memory"""
+
+    def __init__(self):
+        self.count = 0
+        self.last = None
+
+    def __call__(self, event):
+        self.count += 1
+        self.last = event
+
+
+def shadow_service(get_accepted):
+    """Returns a responder acting as the shadow service, for LoopbackConnection"""
+    def respond(topic, payload):
+        if topic.endswith('/get'):
+            return topic + '/accepted', get_accepted
+        if topic.endswith('/update'):
+            return topic + '/accepted', payload
+        return None
+    return respond
+
+
+class LoopbackRequestResponseClient:
+    """
+    Stands in for `awscrt.mqtt_request_response.Client`, answering every
+    request at once on its accepted topic with a canned response carrying
+    the request's client token.
+    """
+
+    def __init__(self, responses, json_codec):
+        # last level of the request topic -> response payload, without the leading '{'
+        self._responses = responses
+        self._decode = json_codec.decode
+
+    def make_request(self, options):
+        token = self._decode(options.payload)['clientToken']
+        accepted = next(p.topic for p in options.response_paths if p.topic.endswith('/accepted'))
+        body = self._responses[options.publish_topic.rsplit('/', 1)[1]]
+        payload = b'{"clientToken":"' + token.encode() + b'",' + body
+        return _done(mqtt_request_response.Response(topic=accepted, payload=payload))
+
+    def create_stream(self, options):
+        raise NotImplementedError()
+
+
+def shadow_client_v2(**kwargs):
+    codec = awsiot.get_default_json_codec()
+    responses = {
+        'get': codec.encode(shadow_document(10))[1:],
+        'update': b'"state":{"reported":{"color":"red"}},"version":2,"timestamp":1700000001}',
+    }
+    stand_in = LoopbackRequestResponseClient(responses, codec)
+    with mock.patch('awscrt.mqtt_request_response.Client', return_value=stand_in):
+        return iotshadow.IotShadowClientV2(LoopbackConnection(), mqtt_request_response.ClientOptions(8, 8), **kwargs)
+
+
+def legacy_get_round_trip():
+    codec = awsiot.get_default_json_codec()
+    connection = LoopbackConnection(shadow_service(codec.encode(shadow_document(10))))
+    client = iotshadow.IotShadowClient(connection)
+    received = Sink()
+    client.subscribe_to_get_shadow_accepted(
+        iotshadow.GetShadowSubscriptionRequest(thing_name=THING), QOS, received)
+    request = iotshadow.GetShadowRequest(thing_name=THING)
+
+    def run():
+        client.publish_get_shadow(request, QOS)
+
+    run()
+    assert received.last.version == 1042
+    return run
+
+
+def legacy_update_round_trip():
+    connection = LoopbackConnection(shadow_service(None))
+    client = iotshadow.IotShadowClient(connection)
+    received = Sink()
+    client.subscribe_to_update_shadow_accepted(
+        iotshadow.UpdateShadowSubscriptionRequest(thing_name=THING), QOS, received)
+    request = iotshadow.UpdateShadowRequest(
+        thing_name=THING, state=iotshadow.ShadowState(reported=sensor_state(100)), version=1)
+
+    def run():
+        client.publish_update_shadow(request, QOS)
+
+    run()
+    assert received.last.state.reported == sensor_state(100)
+    return run
+
+
+def legacy_delta_fan_in(dispatch):
+    def setup():
+        connection = LoopbackConnection()
+        client = iotshadow.IotShadowClient(connection)
+        if dispatch:
+            client.add_dispatch_subscription("$aws/things/+/shadow/#", QOS)
+        received = Sink()
+        for thing in THINGS:
+            client.subscribe_to_shadow_delta_updated_events(
+                iotshadow.ShadowDeltaUpdatedSubscriptionRequest(thing_name=thing), QOS, received)
+        topics = itertools.cycle(["$aws/things/{}/shadow/update/delta".format(t) for t in THINGS])
+        payload = b'{"state":{"color":"green"},"version":7,"timestamp":1700000001}'
+        deliver = connection.deliver
+
+        def run():
+            deliver(next(topics), payload)
+
+        run()
+        assert received.count == 1 and received.last.version == 7
+        return run
+    return setup
+
+
+def v2_get_shadow(wrap=None, **kwargs):
+    def setup():
+        client = shadow_client_v2(**kwargs)
+        if wrap is not None:
+            client = wrap(client)
+
+        def run():
+            client.get_shadow(iotshadow.GetShadowRequest(thing_name=THING)).result()
+
+        run()
+        return run
+    return setup
+
+
+def v2_update_shadow():
+    client = shadow_client_v2()
+    state = sensor_state(100)
+
+    def run():
+        client.update_shadow(iotshadow.UpdateShadowRequest(
+            thing_name=THING, state=iotshadow.ShadowState(reported=state))).result()
+
+    run()
+    return run
+
+
+def decode_case(shape_type, payload_obj, lazy=False):
+    def setup():
+        codec = awsiot.get_default_json_codec()
+        decode = codec.decode
+        payload = codec.encode(payload_obj)
+        to_class = shape_type.from_payload_lazy if lazy else serialization.decoder_for(shape_type)
+
+        def run():
+            to_class(decode(payload))
+
+        return run
+    return setup
+
+
+def encode_case(request):
+    def setup():
+        encode = awsiot.get_default_json_codec().encode
+
+        def run():
+            encode(request.to_payload())
+
+        return run
+    return setup
+
+
+CASES = [
+    Case("MqttServiceClient get_shadow round trip", legacy_get_round_trip),
+    Case("MqttServiceClient update_shadow round trip (100 keys)", legacy_update_round_trip),
+    Case("MqttServiceClient delta, 1000 topic subscriptions", legacy_delta_fan_in(dispatch=False)),
+    Case("MqttServiceClient delta, 1 dispatch subscription", legacy_delta_fan_in(dispatch=True)),
+    Case("IotShadowClientV2 get_shadow", v2_get_shadow()),
+    Case("IotShadowClientV2 get_shadow (lazy)", v2_get_shadow(lazy_deserialization=True)),
+    Case("IotShadowClientV2 get_shadow via RequestScheduler",
+         v2_get_shadow(request_scheduler=RequestScheduler().lane())),
+    Case("IotShadowClientV2 get_shadow via SingleFlightClient", v2_get_shadow(wrap=SingleFlightClient)),
+    Case("IotShadowClientV2 update_shadow (100 keys)", v2_update_shadow),
+    Case("decode GetShadowResponse (1000 keys)",
+         decode_case(iotshadow.GetShadowResponse, shadow_document(1000))),
+    Case("decode GetShadowResponse (1000 keys, lazy)",
+         decode_case(iotshadow.GetShadowResponse, shadow_document(1000), lazy=True)),
+    Case("encode UpdateShadowRequest (1000 keys)", encode_case(iotshadow.UpdateShadowRequest(
+        thing_name=THING, client_token="token", version=3,
+        state=iotshadow.ShadowState(desired=sensor_state(1000), reported=sensor_state(1000))))),
+    Case("decode GetPendingJobExecutionsResponse (500 jobs)",
+         decode_case(iotjobs.GetPendingJobExecutionsResponse, {
+             "inProgressJobs": [job_summary(i) for i in range(250)],
+             "queuedJobs": [job_summary(i) for i in range(250, 500)],
+             "timestamp": 1700000030,
+         })),
+    Case("decode DescribeJobExecutionResponse (1000 steps)",
+         decode_case(iotjobs.DescribeJobExecutionResponse, job_execution(1000))),
+    Case("encode UpdateJobExecutionRequest (100 details)", encode_case(iotjobs.UpdateJobExecutionRequest(
+        thing_name=THING, job_id="job-1", status="IN_PROGRESS", expected_version=4, client_token="token",
+        status_details={"detail{}".format(i): "value{}".format(i) for i in range(100)}))),
+]
+
+
+if __name__ == '__main__':
+    main("Benchmark the MQTT service clients against in-process stand-ins", CASES, number=2000)
@@ -0,0 +1,210 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+import asyncio
+from awscrt import mqtt_request_response
+from awsiot import iotjobs, iotshadow
+from awsiot.aio import (AsyncGreengrassCoreIPCClientV2, AsyncIotIdentityClientV2, AsyncIotJobsClientV2,
+                        AsyncIotShadowClientV2)
+from awsiot.greengrasscoreipc import model
+from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2
+from awsiot.streaming import BufferedStream, OverflowPolicy
+from concurrent.futures import Future
+import threading
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+
+def complete_later(future, result=None, error=None):
+    """Completes a future from another thread, as the SDK does"""
+    def complete():
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    thread = threading.Thread(target=complete)
+    thread.start()
+    return thread
+
+
+class AsyncV2ClientTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.sync_client = mock.Mock(spec=iotshadow.IotShadowClientV2)
+        self.client = AsyncIotShadowClientV2(self.sync_client, stream_maxsize=2)
+
+    def test_requires_running_loop(self):
+        with self.assertRaises(RuntimeError):
+            AsyncIotJobsClientV2(mock.Mock(spec=iotjobs.IotJobsClientV2))
+
+    def test_operations(self):
+        self.assertTrue(asyncio.iscoroutinefunction(AsyncIotShadowClientV2.get_shadow))
+        self.assertTrue(asyncio.iscoroutinefunction(AsyncIotJobsClientV2.start_next_pending_job_execution))
+        self.assertTrue(asyncio.iscoroutinefunction(AsyncIotIdentityClientV2.create_certificate_from_csr))
+        self.assertFalse(asyncio.iscoroutinefunction(AsyncIotShadowClientV2.create_shadow_delta_updated_stream))
+        self.assertIn("IotShadowClientV2.get_shadow", AsyncIotShadowClientV2.get_shadow.__doc__)
+
+    async def test_request(self):
+        future = Future()
+        self.sync_client.get_shadow.return_value = future
+        request = iotshadow.GetShadowRequest(thing_name="thing")
+        response = iotshadow.GetShadowResponse(version=3)
+        complete_later(future, response)
+        self.assertIs(response, await asyncio.wait_for(self.client.get_shadow(request), TIMEOUT))
+        self.sync_client.get_shadow.assert_called_once_with(request)
+
+    async def test_request_error(self):
+        future = Future()
+        self.sync_client.update_shadow.return_value = future
+        complete_later(future, error=RuntimeError("rejected"))
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(self.client.update_shadow(iotshadow.UpdateShadowRequest()), TIMEOUT)
+
+    async def test_many_concurrent_requests(self):
+        futures = [Future() for _ in range(1000)]
+        self.sync_client.get_shadow.side_effect = futures
+
+        def complete_all():
+            for i, future in enumerate(futures):
+                future.set_result(i)
+
+        pending = asyncio.gather(*(self.client.get_shadow(iotshadow.GetShadowRequest()) for _ in futures))
+        await asyncio.sleep(0)
+        threading.Thread(target=complete_all).start()
+        self.assertEqual(list(range(1000)), await asyncio.wait_for(pending, TIMEOUT))
+
+    async def test_stream_drops_oldest_by_default(self):
+        stream = self.client.create_shadow_delta_updated_stream(iotshadow.ShadowDeltaUpdatedSubscriptionRequest())
+        options = self.sync_client.create_shadow_delta_updated_stream.call_args[0][1]
+
+        # the delivering thread never waits for the consumer
+        thread = threading.Thread(target=lambda: [options.incoming_event_listener(i) for i in range(5)])
+        thread.start()
+        thread.join(TIMEOUT)
+        self.assertFalse(thread.is_alive())
+
+        received = [await asyncio.wait_for(stream.__anext__(), TIMEOUT) for _ in range(2)]
+        self.assertEqual([3, 4], received)
+        stream.close()
+
+    async def test_stream_backpressure(self):
+        stream = self.client.create_shadow_delta_updated_stream(iotshadow.ShadowDeltaUpdatedSubscriptionRequest(),
+                                                                overflow=OverflowPolicy.BLOCK)
+        self.assertIsInstance(stream, BufferedStream)
+        options = self.sync_client.create_shadow_delta_updated_stream.call_args[0][1]
+        stream.operation.open.assert_called_once_with()
+
+        delivered = []
+
+        def deliver():
+            for i in range(5):
+                options.incoming_event_listener(i)
+                delivered.append(i)
+
+        thread = threading.Thread(target=deliver)
+        thread.start()
+        # the delivering thread waits once the buffer is full
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual([0, 1], delivered)
+
+        received = []
+        async for event in stream:
+            received.append(event)
+            if len(received) == 5:
+                break
+        thread.join(TIMEOUT)
+        self.assertEqual(list(range(5)), received)
+
+        stream.close()
+        with self.assertRaises(StopAsyncIteration):
+            await stream.__anext__()
+        self.assertIsNone(stream.operation)
+
+    async def test_stream_halted(self):
+        listener = mock.Mock()
+        stream = self.client.create_shadow_updated_stream(
+            iotshadow.ShadowUpdatedSubscriptionRequest(), subscription_status_listener=listener)
+        options = self.sync_client.create_shadow_updated_stream.call_args[0][1]
+        error = RuntimeError("halted")
+        event = mqtt_request_response.SubscriptionStatusEvent(
+            mqtt_request_response.SubscriptionStatusEventType.SUBSCRIPTION_HALTED, error)
+
+        def deliver():
+            options.incoming_event_listener("event")
+            options.subscription_status_listener(event)
+        threading.Thread(target=deliver).start()
+
+        self.assertEqual("event", await asyncio.wait_for(stream.__anext__(), TIMEOUT))
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(stream.__anext__(), TIMEOUT)
+        listener.assert_called_once_with(event)
+
+    async def test_close_releases_waiting_delivery(self):
+        stream = self.client.create_shadow_delta_updated_stream(iotshadow.ShadowDeltaUpdatedSubscriptionRequest())
+        options = self.sync_client.create_shadow_delta_updated_stream.call_args[0][1]
+        thread = threading.Thread(target=lambda: [options.incoming_event_listener(i) for i in range(10)])
+        thread.start()
+        thread.join(0.1)
+        stream.close()
+        thread.join(TIMEOUT)
+        self.assertFalse(thread.is_alive())
+
+
+class AsyncGreengrassCoreIPCClientV2Test(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.sync_client = mock.Mock(spec=GreengrassCoreIPCClientV2)
+        self.client = AsyncGreengrassCoreIPCClientV2(self.sync_client)
+
+    async def test_request(self):
+        future = Future()
+        self.sync_client.publish_to_topic_async.return_value = future
+        complete_later(future, model.PublishToTopicResponse())
+        response = await asyncio.wait_for(self.client.publish_to_topic(topic="t"), TIMEOUT)
+        self.assertIsInstance(response, model.PublishToTopicResponse)
+        self.sync_client.publish_to_topic_async.assert_called_once_with(topic="t")
+
+    async def test_subscription(self):
+        future = Future()
+        operation = mock.Mock()
+        operation.close.return_value = Future()
+        operation.close.return_value.set_result(None)
+        self.sync_client.subscribe_to_topic_async.return_value = (future, operation)
+        complete_later(future, model.SubscribeToTopicResponse(topic_name="t"))
+
+        response, stream = await asyncio.wait_for(self.client.subscribe_to_topic(topic="t", maxsize=4), TIMEOUT)
+        self.assertEqual("t", response.topic_name)
+        self.assertIs(operation, stream.operation)
+        self.assertEqual(4, stream.maxsize)
+        handlers = self.sync_client.subscribe_to_topic_async.call_args[1]
+        self.assertEqual("t", handlers["topic"])
+
+        def deliver():
+            for i in range(3):
+                handlers["on_stream_event"](i)
+            handlers["on_stream_closed"]()
+        threading.Thread(target=deliver).start()
+
+        received = []
+        async with stream:
+            async for event in stream:
+                received.append(event)
+        self.assertEqual([0, 1, 2], received)
+        operation.close.assert_called_once_with()
+
+    async def test_subscription_error(self):
+        future = Future()
+        self.sync_client.subscribe_to_iot_core_async.return_value = (future, mock.Mock())
+        complete_later(future, model.SubscribeToIoTCoreResponse())
+        _, stream = await asyncio.wait_for(self.client.subscribe_to_iot_core(topic_name="t", qos="0"), TIMEOUT)
+        on_stream_error = self.sync_client.subscribe_to_iot_core_async.call_args[1]["on_stream_error"]
+        self.assertTrue(on_stream_error(ValueError("bad")))
+        with self.assertRaises(ValueError):
+            await asyncio.wait_for(stream.__anext__(), TIMEOUT)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt, mqtt5
+from awsiot import iotshadow, mqtt5_client_builder
+from awsiot.connection_pool import ConnectionPool, PooledConnection, shard_key
+from awsiot.resource_cache import ResourceCache
+from concurrent.futures import Future
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+QOS = mqtt.QoS.AT_LEAST_ONCE
+
+THINGS = ['thing{}'.format(i) for i in range(2000)]
+
+
+def fake_client():
+    client = mock.Mock(spec=mqtt5.Client)
+    connection = mock.Mock(spec=mqtt.Connection)
+    connection.subscribe.side_effect = lambda **kwargs: (Future(), 1)
+    connection.unsubscribe.side_effect = lambda topic: (Future(), 2)
+    connection.publish.side_effect = lambda **kwargs: (Future(), 3)
+    client.new_connection.return_value = connection
+    return client
+
+
+def connection_of(client):
+    return client.new_connection.return_value
+
+
+class ShardKeyTest(unittest.TestCase):
+
+    def test_shard_key(self):
+        self.assertEqual("a", shard_key("$aws/things/a/shadow/update/delta"))
+        self.assertEqual("a", shard_key("$aws/things/a/jobs/notify-next"))
+        self.assertEqual("$aws/things/+/shadow/update", shard_key("$aws/things/+/shadow/update"))
+        self.assertEqual("$aws/certificates/create/json", shard_key("$aws/certificates/create/json"))
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clients = [fake_client() for _ in range(4)]
+        self.pool = ConnectionPool(self.clients)
+
+    def _placement(self):
+        return {thing: self.pool.client_for(thing) for thing in THINGS}
+
+    def test_spread(self):
+        placement = self._placement()
+        for client in self.clients:
+            share = sum(1 for placed in placement.values() if placed is client) / len(THINGS)
+            self.assertGreater(share, 0.15)
+            self.assertLess(share, 0.35)
+        self.assertEqual(placement, self._placement())
+
+    def test_disconnect_only_moves_its_keys(self):
+        before = self._placement()
+        self.pool.set_connected(self.clients[1], False)
+        self.assertEqual(3, self.pool.connected_count)
+        during = self._placement()
+        for thing in THINGS:
+            if before[thing] is self.clients[1]:
+                self.assertIsNot(self.clients[1], during[thing])
+            else:
+                self.assertIs(before[thing], during[thing])
+
+        self.pool.set_connected(self.clients[1], True)
+        self.assertEqual(before, self._placement())
+
+    def test_nothing_connected(self):
+        before = self._placement()
+        for client in self.clients:
+            self.pool.set_connected(client, False)
+        self.assertEqual(before, self._placement())
+
+    def test_unknown_client(self):
+        with self.assertRaises(ValueError):
+            self.pool.set_connected(fake_client(), False)
+        with self.assertRaises(ValueError):
+            ConnectionPool([])
+
+    def test_service_client(self):
+        shadow = iotshadow.IotShadowClient(self.pool)
+        self.assertIsInstance(shadow.mqtt_connection, PooledConnection)
+        owner = connection_of(self.pool.client_for("a"))
+
+        shadow.subscribe_to_shadow_delta_updated_events(
+            iotshadow.ShadowDeltaUpdatedSubscriptionRequest(thing_name="a"), QOS, lambda event: None)
+        self.assertEqual("$aws/things/a/shadow/update/delta", owner.subscribe.call_args.kwargs['topic'])
+
+        shadow.publish_update_shadow(iotshadow.UpdateShadowRequest(thing_name="a", state=iotshadow.ShadowState()), QOS)
+        self.assertEqual("$aws/things/a/shadow/update", owner.publish.call_args.kwargs['topic'])
+
+        for client in self.clients:
+            if connection_of(client) is not owner:
+                connection_of(client).subscribe.assert_not_called()
+                connection_of(client).publish.assert_not_called()
+
+    def test_subscriptions_follow_rebalance(self):
+        connection = self.pool.connection()
+        owner_client = self.pool.client_for("a")
+        callback = mock.Mock()
+        connection.subscribe("$aws/things/a/shadow/update/delta", QOS, callback)
+
+        self.pool.set_connected(owner_client, False)
+        fallback_client = self.pool.client_for("a")
+        self.assertIsNot(owner_client, fallback_client)
+        moved = connection_of(fallback_client).subscribe.call_args.kwargs
+        self.assertEqual(("$aws/things/a/shadow/update/delta", QOS), (moved['topic'], moved['qos']))
+        self.assertIs(callback, moved['callback'])
+        connection_of(owner_client).unsubscribe.assert_called_once_with("$aws/things/a/shadow/update/delta")
+
+        self.pool.set_connected(owner_client, True)
+        self.assertEqual(2, connection_of(owner_client).subscribe.call_count)
+        connection_of(fallback_client).unsubscribe.assert_called_once_with("$aws/things/a/shadow/update/delta")
+
+        connection.unsubscribe("$aws/things/a/shadow/update/delta")
+        self.assertEqual(2, connection_of(owner_client).unsubscribe.call_count)
+
+    def test_v2_client(self):
+        created = []
+
+        def client_class(protocol_client, options, **kwargs):
+            instance = mock.Mock()
+            instance.protocol_client = protocol_client
+            created.append(instance)
+            return instance
+
+        shadow = self.pool.v2_client(client_class, options="options")
+        request = iotshadow.GetShadowRequest(thing_name="a")
+        shadow.get_shadow(request)
+        shadow.get_shadow(iotshadow.GetShadowRequest(thing_name="a"))
+
+        self.assertEqual(1, len(created))
+        self.assertIs(self.pool.client_for("a"), created[0].protocol_client)
+        created[0].get_shadow.assert_called_with(mock.ANY)
+        self.assertEqual(2, created[0].get_shadow.call_count)
+
+
+class BuildTest(unittest.TestCase):
+
+    def test_build(self):
+        built = []
+        disconnections = []
+
+        def builder(**kwargs):
+            built.append(kwargs)
+            return fake_client()
+
+        pool = ConnectionPool.build(3, builder, endpoint="example.com", client_id="bridge",
+                                    on_lifecycle_disconnection=disconnections.append)
+        self.assertEqual(["bridge-0", "bridge-1", "bridge-2"], [kwargs['client_id'] for kwargs in built])
+        self.assertIs(built[0]['resource_cache'], built[2]['resource_cache'])
+
+        built[1]['on_lifecycle_disconnection']("data")
+        self.assertEqual(["data"], disconnections)
+        self.assertEqual(2, pool.connected_count)
+        built[1]['on_lifecycle_connection_success']("data")
+        self.assertEqual(3, pool.connected_count)
+
+    def test_build_shares_tls_context(self):
+        cache = ResourceCache()
+        pool = ConnectionPool.build(4, mqtt5_client_builder.new_default_builder,
+                                    endpoint="example.iot.us-east-1.amazonaws.com", client_id="bridge",
+                                    resource_cache=cache)
+        self.assertEqual(4, len(pool.clients))
+        self.assertTrue(all(isinstance(client, mqtt5.Client) for client in pool.clients))
+        self.assertEqual((3, 1), cache.stats[:2])
+
+
+if __name__ == '__main__':
+    unittest.main()
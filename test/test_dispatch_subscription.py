@@ -0,0 +1,132 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt
+from awsiot import iotshadow
+from concurrent.futures import Future
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+QOS = mqtt.QoS.AT_LEAST_ONCE
+
+
+def delta_request(thing_name):
+    return iotshadow.ShadowDeltaUpdatedSubscriptionRequest(thing_name=thing_name)
+
+
+def delta_topic(thing_name):
+    return "$aws/things/{}/shadow/update/delta".format(thing_name)
+
+
+class DispatchSubscriptionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = mock.Mock(spec=mqtt.Connection)
+        self.subacks = []
+        self.connection.subscribe.side_effect = self._subscribe
+        self.connection.unsubscribe.side_effect = lambda topic: (self._done(None), 3)
+        self.client = iotshadow.IotShadowClient(self.connection)
+
+    def _done(self, result):
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def _subscribe(self, topic, qos, callback):
+        suback = Future()
+        self.subacks.append(suback)
+        return suback, 1
+
+    def _callback(self, topic_filter):
+        for call in self.connection.subscribe.call_args_list:
+            if call.kwargs['topic'] == topic_filter:
+                return call.kwargs['callback']
+        self.fail("no subscription to " + topic_filter)
+
+    def _deliver(self, topic_filter, topic, payload=b'{"version": 1}'):
+        self._callback(topic_filter)(topic=topic, payload=payload, dup=False, qos=QOS, retain=False)
+
+    def test_covered_topics_share_subscription(self):
+        shared = self.client.add_dispatch_subscription("$aws/things/+/shadow/#", QOS)
+        events = {name: [] for name in ["a", "b"]}
+        futures = []
+        for name, received in events.items():
+            future, topic = self.client.subscribe_to_shadow_delta_updated_events(
+                delta_request(name), QOS, received.append)
+            self.assertEqual(delta_topic(name), topic)
+            futures.append(future)
+        self.assertEqual(1, self.connection.subscribe.call_count)
+        self.assertFalse(futures[0].done())
+
+        self.subacks[0].set_result({'qos': QOS})
+        self.assertEqual(QOS, shared.result(TIMEOUT))
+        self.assertEqual([QOS, QOS], [f.result(TIMEOUT) for f in futures])
+
+        self._deliver("$aws/things/+/shadow/#", delta_topic("a"))
+        self._deliver("$aws/things/+/shadow/#", delta_topic("a"))
+        self._deliver("$aws/things/+/shadow/#", "$aws/things/c/shadow/update/delta")
+        self.assertEqual(2, len(events["a"]))
+        self.assertEqual(1, events["a"][0].version)
+        self.assertEqual([], events["b"])
+
+    def test_uncovered_topic_subscribes(self):
+        self.client.add_dispatch_subscription("$aws/things/+/shadow/name/+/update/delta", QOS)
+        self.client.subscribe_to_shadow_delta_updated_events(delta_request("a"), QOS, print)
+        self.assertEqual(["$aws/things/+/shadow/name/+/update/delta", delta_topic("a")],
+                         [c.kwargs['topic'] for c in self.connection.subscribe.call_args_list])
+
+    def test_overlapping_dispatch_subscriptions_deliver_once(self):
+        self.client.add_dispatch_subscription("$aws/things/a/#", QOS)
+        self.client.add_dispatch_subscription("$aws/things/+/shadow/#", QOS)
+        events = []
+        self.client.subscribe_to_shadow_delta_updated_events(delta_request("a"), QOS, events.append)
+        self._deliver("$aws/things/a/#", delta_topic("a"))
+        self._deliver("$aws/things/+/shadow/#", delta_topic("a"))
+        self.assertEqual(1, len(events))
+
+    def test_unsubscribe_served_topic(self):
+        self.client.add_dispatch_subscription("$aws/things/+/shadow/#", QOS)
+        events = []
+        _, topic = self.client.subscribe_to_shadow_delta_updated_events(delta_request("a"), QOS, events.append)
+        self._deliver("$aws/things/+/shadow/#", topic)
+
+        self.assertIsNone(self.client.unsubscribe(topic).result(TIMEOUT))
+        self.connection.unsubscribe.assert_not_called()
+        self._deliver("$aws/things/+/shadow/#", topic)
+        self.assertEqual(1, len(events))
+
+    def test_unsubscribe_dispatch_filter(self):
+        self.client.add_dispatch_subscription("$aws/things/+/shadow/#", QOS)
+        events = []
+        self.client.subscribe_to_shadow_delta_updated_events(delta_request("a"), QOS, events.append)
+        self.client.unsubscribe("$aws/things/+/shadow/#").result(TIMEOUT)
+        self.connection.unsubscribe.assert_called_once_with("$aws/things/+/shadow/#")
+        self._deliver("$aws/things/+/shadow/#", delta_topic("a"))
+        self.assertEqual([], events)
+
+        self.client.subscribe_to_shadow_delta_updated_events(delta_request("a"), QOS, events.append)
+        self.assertEqual(delta_topic("a"), self.connection.subscribe.call_args.kwargs['topic'])
+
+    def test_failed_dispatch_subscription(self):
+        shared = self.client.add_dispatch_subscription("$aws/things/+/shadow/#", QOS)
+        future, _ = self.client.subscribe_to_shadow_delta_updated_events(delta_request("a"), QOS, print)
+        self.subacks[0].set_exception(RuntimeError("suback"))
+        self.assertIsInstance(shared.exception(TIMEOUT), RuntimeError)
+        self.assertIsInstance(future.exception(TIMEOUT), RuntimeError)
+
+        # later subscriptions go to the server again
+        self.client.subscribe_to_shadow_delta_updated_events(delta_request("a"), QOS, print)
+        self.assertEqual(delta_topic("a"), self.connection.subscribe.call_args.kwargs['topic'])
+
+    def test_same_filter_twice(self):
+        first = self.client.add_dispatch_subscription("$aws/things/+/shadow/#", QOS)
+        self.assertIs(first, self.client.add_dispatch_subscription("$aws/things/+/shadow/#", QOS))
+        self.assertEqual(1, self.connection.subscribe.call_count)
+        with self.assertRaises(ValueError):
+            self.client.add_dispatch_subscription("$aws/things/#/shadow", QOS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awsiot.dispatcher import StreamDispatcher
+from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2
+from awsiot.greengrasscoreipc.model import SubscribeToTopicResponse, SubscriptionResponseMessage
+from awsiot.streaming import OverflowPolicy
+from concurrent.futures import Future, wait
+import threading
+import time
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+
+class StreamDispatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def _blocked(self):
+        self.started.set()
+        self.assertTrue(self.gate.wait(TIMEOUT))
+
+    def _wait_started(self):
+        self.assertTrue(self.started.wait(TIMEOUT))
+
+    def test_order_per_key(self):
+        dispatcher = StreamDispatcher(max_workers=4)
+        seen = {"a": [], "b": []}
+        lock = threading.Lock()
+
+        def record(key, i):
+            time.sleep(0.001 * (i % 3))
+            with lock:
+                seen[key].append(i)
+
+        futures = []
+        for i in range(50):
+            for key in seen:
+                futures.append(dispatcher.submit_ordered(key, record, key, i))
+        wait(futures, TIMEOUT)
+        dispatcher.shutdown()
+        self.assertEqual(list(range(50)), seen["a"])
+        self.assertEqual(list(range(50)), seen["b"])
+        self.assertEqual(100, dispatcher.stats().completed)
+
+    def test_keys_run_in_parallel(self):
+        dispatcher = StreamDispatcher(max_workers=2)
+        blocked = dispatcher.submit_ordered("slow", self._blocked)
+        queued_behind = dispatcher.submit_ordered("slow", lambda: "second")
+        other = dispatcher.submit_ordered("fast", lambda: "fast")
+        self.assertEqual("fast", other.result(TIMEOUT))
+        self.assertFalse(queued_behind.done())
+        self.gate.set()
+        self.assertEqual("second", queued_behind.result(TIMEOUT))
+        blocked.result(TIMEOUT)
+        dispatcher.shutdown()
+
+    def test_exceptions_reach_future(self):
+        dispatcher = StreamDispatcher(max_workers=1)
+        future = dispatcher.submit(lambda: 1 / 0)
+        self.assertIsInstance(future.exception(TIMEOUT), ZeroDivisionError)
+        self.assertEqual(2, dispatcher.submit(lambda: 2).result(TIMEOUT))
+        dispatcher.shutdown()
+
+    def test_block_when_full(self):
+        dispatcher = StreamDispatcher(max_workers=1, max_queue_size=2)
+        dispatcher.submit(self._blocked)
+        self._wait_started()
+        dispatcher.submit(lambda: None)
+        dispatcher.submit(lambda: None)
+        self.assertEqual(2, dispatcher.stats().queue_depth)
+
+        submitter = threading.Thread(target=dispatcher.submit, args=(lambda: None,))
+        submitter.start()
+        submitter.join(0.1)
+        self.assertTrue(submitter.is_alive())
+
+        self.gate.set()
+        submitter.join(TIMEOUT)
+        self.assertFalse(submitter.is_alive())
+        dispatcher.shutdown()
+        stats = dispatcher.stats()
+        self.assertEqual(4, stats.completed)
+        self.assertEqual(0, stats.dropped)
+        self.assertEqual(2, stats.max_queue_depth)
+        self.assertGreater(stats.max_callback_latency, 0.0)
+
+    def test_drop_newest(self):
+        dispatcher = StreamDispatcher(max_workers=1, max_queue_size=1, overflow=OverflowPolicy.DROP_NEWEST)
+        dispatcher.submit(self._blocked)
+        self._wait_started()
+        kept = dispatcher.submit(lambda: "kept")
+        dropped = dispatcher.submit(lambda: "dropped")
+        self.assertTrue(dropped.cancelled())
+        self.gate.set()
+        self.assertEqual("kept", kept.result(TIMEOUT))
+        dispatcher.shutdown()
+        self.assertEqual(1, dispatcher.stats().dropped)
+
+    def test_drop_oldest(self):
+        dispatcher = StreamDispatcher(max_workers=1, max_queue_size=2, overflow=OverflowPolicy.DROP_OLDEST)
+        dispatcher.submit(self._blocked)
+        self._wait_started()
+        oldest = dispatcher.submit_ordered("a", lambda: "a1")
+        second = dispatcher.submit_ordered("a", lambda: "a2")
+        newest = dispatcher.submit_ordered("b", lambda: "b1")
+        self.assertTrue(oldest.cancelled())
+        self.gate.set()
+        self.assertEqual("a2", second.result(TIMEOUT))
+        self.assertEqual("b1", newest.result(TIMEOUT))
+        dispatcher.shutdown()
+        self.assertEqual(1, dispatcher.stats().dropped)
+
+    def test_submit_from_worker_when_full(self):
+        dispatcher = StreamDispatcher(max_workers=1, max_queue_size=1)
+        inner = Future()
+
+        def resubmit():
+            dispatcher.submit(lambda: None)
+            inner.set_result(dispatcher.submit(lambda: "inner"))
+        dispatcher.submit(resubmit)
+        self.assertEqual("inner", inner.result(TIMEOUT).result(TIMEOUT))
+        dispatcher.shutdown()
+
+    def test_shutdown(self):
+        dispatcher = StreamDispatcher(max_workers=1)
+        running = dispatcher.submit(self._blocked)
+        self._wait_started()
+        pending = dispatcher.submit(lambda: None)
+        threading.Timer(0.05, self.gate.set).start()
+        dispatcher.shutdown(cancel_futures=True)
+        self.assertTrue(running.done())
+        self.assertTrue(pending.cancelled())
+        with self.assertRaises(RuntimeError):
+            dispatcher.submit(lambda: None)
+
+
+class GreengrassCoreIPCClientV2DispatchTest(unittest.TestCase):
+
+    def test_stream_callbacks_keyed_by_stream(self):
+        ipc_client = mock.Mock()
+        operations = []
+
+        def new_operation(handler):
+            operation = mock.Mock()
+            operation.activate.return_value = Future()
+            operation.activate.return_value.set_result(None)
+            operation.get_response.return_value = Future()
+            operation.get_response.return_value.set_result(SubscribeToTopicResponse())
+            operations.append((operation, handler))
+            return operation
+        ipc_client.new_subscribe_to_topic.side_effect = new_operation
+
+        dispatcher = mock.Mock(spec=StreamDispatcher)
+        client = GreengrassCoreIPCClientV2(client=ipc_client, executor=dispatcher)
+        client.subscribe_to_topic(topic="a", on_stream_event=print, on_stream_closed=print)
+        client.subscribe_to_topic(topic="b", on_stream_event=print)
+
+        first, second = (handler for _, handler in operations)
+        message = SubscriptionResponseMessage()
+        first.on_stream_event(message)
+        first.on_stream_closed()
+        second.on_stream_event(message)
+
+        keys = [call[0][0] for call in dispatcher.submit_ordered.call_args_list]
+        self.assertEqual(3, len(keys))
+        self.assertIs(keys[0], keys[1])
+        self.assertIsNot(keys[0], keys[2])
+        dispatcher.submit.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt_request_response
+import awsiot
+from awsiot import iotjobs
+from awsiot.job_documents import JobDocument, JobDocumentCodec, artifact_urls, download_artifact
+from concurrent.futures import Future
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+
+TIMEOUT = 5.0
+
+DOCUMENT = {
+    "operation": "ota",
+    "version": "2.1.0",
+    "files": [{"name": "firmware.bin", "url": "https://example.com/firmware.bin?X-Amz-Signature=abc", "size": 3}],
+    "tricky \"key\"": {"text": "]}{[\"", "list": [1, -2.5e3, True, False, None]},
+    "empty": {},
+}
+
+
+def done(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class JobDocumentTest(unittest.TestCase):
+
+    def _check(self, document):
+        self.assertEqual(DOCUMENT, document)
+        self.assertEqual(list(DOCUMENT), list(document))
+        self.assertEqual(len(DOCUMENT), len(document))
+        self.assertEqual(DOCUMENT["tricky \"key\""], document["tricky \"key\""])
+        self.assertEqual("ota", document.get("operation"))
+        self.assertIsNone(document.get("missing"))
+        self.assertEqual(DOCUMENT, document.load())
+        self.assertEqual(DOCUMENT, json.loads(document.open().read()))
+
+    def test_in_memory(self):
+        with JobDocument(json.dumps(DOCUMENT).encode()) as document:
+            self.assertFalse(document.spilled)
+            self._check(document)
+
+    def test_spilled(self):
+        data = json.dumps(DOCUMENT, indent=2).encode()
+        with JobDocument(data, spill_threshold=len(data)) as document:
+            self.assertTrue(document.spilled)
+            self.assertEqual(len(data), document.size)
+            self._check(document)
+            self.assertEqual(data, document.read())
+
+    def test_not_an_object(self):
+        with self.assertRaises(ValueError):
+            JobDocument(b'[1, 2]')
+
+    def test_artifact_urls(self):
+        self.assertEqual([("files[0].url", DOCUMENT["files"][0]["url"])],
+                         artifact_urls(JobDocument(json.dumps(DOCUMENT).encode())))
+
+
+class JobDocumentCodecTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.codec = JobDocumentCodec(awsiot.JsonCodec(), spill_threshold=64, directory=directory)
+
+    def test_describe_response(self):
+        payload = json.dumps({
+            "clientToken": "token",
+            "execution": {"jobId": "ota", "status": "QUEUED", "jobDocument": DOCUMENT, "versionNumber": 3},
+            "timestamp": 1700000000,
+        }).encode()
+        future = awsiot.create_v2_service_modeled_future(
+            done(mqtt_request_response.Response(topic="accepted", payload=payload)), "describe_job_execution",
+            "accepted", iotjobs.DescribeJobExecutionResponse, iotjobs.V2ErrorResponse, json_codec=self.codec)
+        execution = future.result(TIMEOUT).execution
+
+        self.assertIsInstance(execution.job_document, JobDocument)
+        self.assertTrue(execution.job_document.spilled)
+        self.assertEqual(DOCUMENT, execution.job_document)
+        self.assertEqual("ota", execution.job_id)
+        self.assertEqual(3, execution.version_number)
+
+    def test_top_level_document(self):
+        payload = b'{"executionState": {"status": "IN_PROGRESS"}, "jobDocument": {"a": [1]}}'
+        response = iotjobs.UpdateJobExecutionResponse.from_payload(self.codec.decode(payload))
+        self.assertIsInstance(response.job_document, JobDocument)
+        self.assertEqual({"a": [1]}, response.job_document)
+        self.assertEqual("IN_PROGRESS", response.execution_state.status)
+
+    def test_other_payloads_unchanged(self):
+        for payload in (b'{"jobDocument": null}', b'{"jobs": {"QUEUED": [{"jobId": "a"}]}}', b'[]'):
+            self.assertEqual(json.loads(payload), self.codec.decode(payload))
+        with self.assertRaises(ValueError):
+            self.codec.decode(b'{"jobDocument": {')
+
+
+ARTIFACT = bytes(range(256)) * 1024
+
+
+class ArtifactServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ArtifactHandler)
+        self.requests = []
+        self.supports_ranges = True
+        # responses to cut short after this many bytes, one per response
+        self.cut_after = []
+        self.fail_with = []
+
+
+class ArtifactHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get('Range'))
+        if self.path != '/artifact':
+            self.send_error(404)
+            return
+        if server.fail_with:
+            self.send_error(server.fail_with.pop(0))
+            return
+
+        start = 0
+        match = re.match(r'bytes=(\d+)-', self.headers.get('Range') or '')
+        if match is not None and server.supports_ranges:
+            start = int(match.group(1))
+            if start >= len(ARTIFACT):
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */{}'.format(len(ARTIFACT)))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, len(ARTIFACT) - 1, len(ARTIFACT)))
+        else:
+            self.send_response(200)
+        body = ARTIFACT[start:]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if server.cut_after:
+            self.wfile.write(body[:server.cut_after.pop(0)])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class DownloadArtifactTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ArtifactServer()
+        thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = 'http://127.0.0.1:{}/artifact'.format(self.server.server_address[1])
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'firmware.bin')
+
+    def _download(self, **kwargs):
+        return download_artifact(self.url, self.path, timeout=TIMEOUT, retry_delay=0.01, chunk_size=8192, **kwargs)
+
+    def _assert_downloaded(self):
+        with open(self.path, 'rb') as f:
+            self.assertEqual(ARTIFACT, f.read())
+        self.assertFalse(os.path.exists(self.path + '.part'))
+
+    def test_download(self):
+        progress = []
+        size = self._download(sha256=hashlib.sha256(ARTIFACT).hexdigest(),
+                              on_progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(len(ARTIFACT), size)
+        self._assert_downloaded()
+        self.assertEqual((len(ARTIFACT), len(ARTIFACT)), progress[-1])
+        self.assertEqual([None], self.server.requests)
+
+    def test_resumes_after_cut(self):
+        self.server.cut_after = [100000, 50000]
+        self._download()
+        self._assert_downloaded()
+        self.assertEqual([None, 'bytes=100000-', 'bytes=150000-'], self.server.requests)
+
+    def test_resumes_earlier_partial_file(self):
+        with open(self.path + '.part', 'wb') as f:
+            f.write(ARTIFACT[:1000])
+        self._download()
+        self._assert_downloaded()
+        self.assertEqual(['bytes=1000-'], self.server.requests)
+
+    def test_complete_partial_file(self):
+        with open(self.path + '.part', 'wb') as f:
+            f.write(ARTIFACT)
+        self.assertEqual(len(ARTIFACT), self._download())
+        self._assert_downloaded()
+
+    def test_server_without_ranges(self):
+        self.server.supports_ranges = False
+        with open(self.path + '.part', 'wb') as f:
+            f.write(b'stale data')
+        self._download()
+        self._assert_downloaded()
+
+    def test_retries_server_errors(self):
+        self.server.fail_with = [503, 500]
+        self._download()
+        self._assert_downloaded()
+        self.assertEqual(3, len(self.server.requests))
+
+    def test_gives_up(self):
+        self.server.fail_with = [503] * 3
+        with self.assertRaises(urllib.error.HTTPError):
+            self._download(max_attempts=3)
+
+    def test_client_error_not_retried(self):
+        self.url += '-missing'
+        with self.assertRaises(urllib.error.HTTPError):
+            self._download()
+        self.assertEqual(1, len(self.server.requests))
+
+    def test_checksum_mismatch(self):
+        with self.assertRaises(ValueError):
+            self._download(sha256=hashlib.sha256(b'other').hexdigest())
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + '.part'))
+
+
+if __name__ == '__main__':
+    unittest.main()
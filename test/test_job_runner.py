@@ -0,0 +1,396 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+import awsiot
+from awsiot import iotjobs, job_runner
+from awsiot.job_runner import CheckpointStore, FileCheckpointStore, JobFailure, JobRunner
+from concurrent.futures import Future
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+THING = "thing"
+
+Status = iotjobs.JobStatus
+
+
+def done(result=None, error=None):
+    future = Future()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+    return future
+
+
+def rejected(code, execution=None):
+    state = None
+    if execution is not None:
+        state = iotjobs.JobExecutionState(status=execution['status'], version_number=execution['version'])
+    return awsiot.V2ServiceException("rejected", None, iotjobs.V2ErrorResponse(code=code, execution_state=state))
+
+
+class FakeJobsClient:
+    """Keeps job executions the way the Jobs service does, and enforces expected_version"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.executions = {}
+        self.updates = []
+        self.listeners = {}
+        # called with each update request before it is applied, may return an error to fail it with
+        self.on_update = None
+
+    def add_job(self, job_id, document=None, status=Status.QUEUED, execution_number=1):
+        with self.condition:
+            self.executions[job_id] = {'status': status, 'version': 1, 'document': document or {},
+                                       'details': {}, 'execution_number': execution_number}
+        self.emit_changed()
+
+    def set_status(self, job_id, status):
+        with self.condition:
+            execution = self.executions[job_id]
+            execution['status'] = status
+            execution['version'] += 1
+        self.emit_changed()
+
+    def status(self, job_id):
+        with self.condition:
+            return self.executions[job_id]['status']
+
+    def wait_for(self, predicate):
+        deadline = time.monotonic() + TIMEOUT
+        with self.condition:
+            # also checked every few milliseconds, for changes that come with no update
+            while not predicate():
+                if time.monotonic() > deadline:
+                    raise AssertionError("timed out")
+                self.condition.wait(0.01)
+
+    def emit_changed(self):
+        listener = self.listeners.get('changed')
+        if listener is None:
+            return
+        jobs = {}
+        with self.condition:
+            for job_id, execution in self.executions.items():
+                if execution['status'] in (Status.QUEUED, Status.IN_PROGRESS):
+                    jobs.setdefault(execution['status'], []).append(iotjobs.JobExecutionSummary(job_id=job_id))
+        listener(iotjobs.JobExecutionsChangedEvent(jobs=jobs))
+
+    def emit_next_changed(self):
+        self.listeners['next'](iotjobs.NextJobExecutionChangedEvent())
+
+    def _stream(self, name, options):
+        self.listeners[name] = options.incoming_event_listener
+        return mock.Mock()
+
+    def create_job_executions_changed_stream(self, request, options):
+        return self._stream('changed', options)
+
+    def create_next_job_execution_changed_stream(self, request, options):
+        return self._stream('next', options)
+
+    def get_pending_job_executions(self, request):
+        with self.condition:
+            response = iotjobs.GetPendingJobExecutionsResponse(
+                in_progress_jobs=[iotjobs.JobExecutionSummary(job_id=job_id)
+                                  for job_id, e in self.executions.items() if e['status'] == Status.IN_PROGRESS],
+                queued_jobs=[iotjobs.JobExecutionSummary(job_id=job_id)
+                             for job_id, e in self.executions.items() if e['status'] == Status.QUEUED])
+        return done(response)
+
+    def describe_job_execution(self, request):
+        with self.condition:
+            execution = self.executions.get(request.job_id)
+            if execution is None:
+                return done(error=rejected(iotjobs.RejectedErrorCode.RESOURCE_NOT_FOUND))
+            return done(iotjobs.DescribeJobExecutionResponse(execution=iotjobs.JobExecutionData(
+                job_id=request.job_id, thing_name=request.thing_name, status=execution['status'],
+                version_number=execution['version'], execution_number=execution['execution_number'],
+                job_document=execution['document'], status_details=dict(execution['details']))))
+
+    def update_job_execution(self, request):
+        error = self.on_update(request) if self.on_update is not None else None
+        if error is not None:
+            return done(error=error)
+        with self.condition:
+            execution = self.executions[request.job_id]
+            if request.expected_version != execution['version']:
+                return done(error=rejected(iotjobs.RejectedErrorCode.VERSION_MISMATCH, execution))
+            if execution['status'] not in (Status.QUEUED, Status.IN_PROGRESS):
+                return done(error=rejected(iotjobs.RejectedErrorCode.INVALID_STATE_TRANSITION, execution))
+            execution['status'] = request.status
+            execution['version'] += 1
+            if request.status_details is not None:
+                execution['details'] = request.status_details
+            self.updates.append((request.job_id, request.status, request.step_timeout_in_minutes))
+            state = iotjobs.JobExecutionState(status=execution['status'], version_number=execution['version'])
+            self.condition.notify_all()
+        if request.status != Status.IN_PROGRESS or execution['version'] == 2:
+            self.emit_changed()
+        return done(iotjobs.UpdateJobExecutionResponse(execution_state=state))
+
+
+class JobRunnerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeJobsClient()
+
+    def _runner(self, handler, **kwargs):
+        runner = JobRunner(self.client, THING, handler, request_timeout=TIMEOUT, **kwargs)
+        self.addCleanup(runner.close)
+        return runner
+
+    def _wait_for_status(self, job_ids, status):
+        self.client.wait_for(lambda: all(self.client.executions[j]['status'] == status for j in job_ids))
+
+    def test_runs_jobs_in_parallel(self):
+        jobs = ["ota", "config", "logs"]
+        for job_id in jobs:
+            self.client.add_job(job_id, {"operation": job_id})
+        barrier = threading.Barrier(len(jobs), timeout=TIMEOUT)
+
+        def handler(context):
+            barrier.wait()
+            return {"ran": context.job_document["operation"]}
+
+        self._runner(handler, max_concurrent_jobs=3).start()
+        self._wait_for_status(jobs, Status.SUCCEEDED)
+        for job_id in jobs:
+            self.assertEqual({"ran": job_id}, self.client.executions[job_id]['details'])
+
+    def test_concurrency_limit(self):
+        jobs = ["job{}".format(i) for i in range(6)]
+        for job_id in jobs:
+            self.client.add_job(job_id)
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def handler(context):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        self._runner(handler, max_concurrent_jobs=2).start()
+        self._wait_for_status(jobs, Status.SUCCEEDED)
+        self.assertEqual(2, running[1])
+
+    def test_failures(self):
+        self.client.add_job("broken")
+        self.client.add_job("unsupported")
+
+        def handler(context):
+            if context.job_id == "broken":
+                raise ValueError("disk full")
+            raise JobFailure("unsupported", {"operation": "reboot"}, rejected=True)
+
+        with self.assertLogs('awsiot.job_runner', 'ERROR'):
+            self._runner(handler).start()
+            self._wait_for_status(["broken"], Status.FAILED)
+        self._wait_for_status(["unsupported"], Status.REJECTED)
+        self.assertIn("disk full", self.client.executions["broken"]['details']['reason'])
+        self.assertEqual({"operation": "reboot"}, self.client.executions["unsupported"]['details'])
+
+    def test_job_changed_elsewhere_is_skipped(self):
+        self.client.add_job("a")
+        ran = []
+
+        def on_update(request):
+            # someone else updates the execution between the describe and the update
+            self.client.on_update = None
+            self.client.set_status("a", Status.IN_PROGRESS)
+
+        self.client.on_update = on_update
+        runner = self._runner(ran.append)
+        runner.start()
+        self.client.wait_for(lambda: not runner.running)
+        self.assertEqual([], ran)
+        self.assertEqual([], self.client.updates)
+
+    def test_cancelled_while_running(self):
+        self.client.add_job("a")
+        started = threading.Event()
+        cancelled = []
+
+        def handler(context):
+            started.set()
+            deadline = time.monotonic() + TIMEOUT
+            while not context.cancelled and time.monotonic() < deadline:
+                time.sleep(0.01)
+            cancelled.append(context.cancelled)
+
+        runner = self._runner(handler)
+        runner.start()
+        self.assertTrue(started.wait(TIMEOUT))
+        self.client.set_status("a", Status.CANCELED)
+        self.client.wait_for(lambda: not runner.running)
+        self.assertEqual([True], cancelled)
+        self.assertEqual([("a", Status.IN_PROGRESS, None)], self.client.updates)
+
+    def test_heartbeats(self):
+        self.client.add_job("a")
+
+        def handler(context):
+            self.client.wait_for(lambda: len(self.client.updates) >= 4)
+
+        self._runner(handler, step_timeout_in_minutes=5, heartbeat_interval=0.02).start()
+        self._wait_for_status(["a"], Status.SUCCEEDED)
+        self.assertEqual([("a", Status.IN_PROGRESS, 5)] * 4, self.client.updates[:4])
+        self.assertEqual(("a", Status.SUCCEEDED, None), self.client.updates[-1])
+
+    def _count_heartbeat_warnings(self):
+        patcher = mock.patch.object(job_runner.logger, 'warning')
+        warning = patcher.start()
+        self.addCleanup(patcher.stop)
+        return warning
+
+    def test_cancelled_during_heartbeats(self):
+        self.client.add_job("a")
+        warning = self._count_heartbeat_warnings()
+        started = threading.Event()
+
+        def handler(context):
+            started.set()
+            self.client.wait_for(lambda: context.cancelled)
+            # heartbeats would fail now, so they must stop rather than retry
+            time.sleep(0.3)
+
+        runner = self._runner(handler, heartbeat_interval=0.02)
+        runner.start()
+        self.assertTrue(started.wait(TIMEOUT))
+        self.client.wait_for(lambda: len(self.client.updates) >= 2)
+        self.client.set_status("a", Status.CANCELED)
+        self.client.wait_for(lambda: not runner.running)
+        self.assertLessEqual(warning.call_count, 1)
+
+    def test_failed_heartbeat_waits_an_interval(self):
+        self.client.add_job("a")
+        warning = self._count_heartbeat_warnings()
+
+        def fail_progress_reports(request):
+            if request.status == Status.IN_PROGRESS and request.expected_version > 1:
+                return Exception("connection lost")
+
+        def handler(context):
+            time.sleep(0.3)
+
+        self.client.on_update = fail_progress_reports
+        self._runner(handler, heartbeat_interval=0.05).start()
+        self._wait_for_status(["a"], Status.SUCCEEDED)
+        self.assertGreaterEqual(warning.call_count, 1)
+        self.assertLessEqual(warning.call_count, 8)
+
+    def test_lost_response(self):
+        self.client.add_job("a")
+        errors = []
+
+        def lose_first_progress_report(request):
+            if request.status_details == {"step": "1"}:
+                self.client.on_update = None
+                # applied by the service, but the response never arrives
+                self.client.update_job_execution(request)
+                return awsiot.V2ServiceException("timed out", TimeoutError(), None)
+
+        def handler(context):
+            self.client.on_update = lose_first_progress_report
+            try:
+                context.report_progress({"step": "1"})
+            except awsiot.V2ServiceException as e:
+                errors.append(e)
+            context.report_progress({"step": "2"})
+
+        self._runner(handler).start()
+        self._wait_for_status(["a"], Status.SUCCEEDED)
+        self.assertEqual(1, len(errors))
+        self.assertEqual({"step": "2"}, self.client.executions["a"]['details'])
+
+    def test_new_jobs_are_picked_up(self):
+        ran = []
+        runner = self._runner(lambda context: ran.append(context.job_id))
+        runner.start()
+        self.client.add_job("a")
+        self._wait_for_status(["a"], Status.SUCCEEDED)
+
+        # also started when only NextJobExecutionChanged says so
+        with self.client.condition:
+            self.client.executions["b"] = {'status': Status.QUEUED, 'version': 1, 'document': {},
+                                           'details': {}, 'execution_number': 1}
+        self.client.emit_next_changed()
+        self._wait_for_status(["b"], Status.SUCCEEDED)
+        self.assertEqual(["a", "b"], ran)
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeJobsClient()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.directory = os.path.join(directory, "checkpoints")
+
+    def test_file_store(self):
+        store = FileCheckpointStore(self.directory)
+        self.assertIsNone(store.load("a/b"))
+        store.save("a/b", 3, {"downloaded": 1024})
+        store.save("a/b", 3, {"downloaded": 2048})
+        self.assertEqual((3, {"downloaded": 2048}), FileCheckpointStore(self.directory).load("a/b"))
+        store.delete("a/b")
+        store.delete("a/b")
+        self.assertIsNone(store.load("a/b"))
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_resume_after_restart(self):
+        # a previous run of the program started these jobs, and saved checkpoints
+        self.client.add_job("ota", status=Status.IN_PROGRESS, execution_number=2)
+        self.client.add_job("config", status=Status.IN_PROGRESS, execution_number=2)
+        store = FileCheckpointStore(self.directory)
+        store.save("ota", 2, {"downloaded": 4096})
+        store.save("config", 1, {"applied": True})
+
+        seen = {}
+
+        def handler(context):
+            seen[context.job_id] = (context.resumed, context.checkpoint)
+            context.save_checkpoint({"done": True})
+
+        runner = JobRunner(self.client, THING, handler, checkpoint_store=FileCheckpointStore(self.directory))
+        self.addCleanup(runner.close)
+        runner.start()
+        self.client.wait_for(lambda: all(e['status'] == Status.SUCCEEDED for e in self.client.executions.values()))
+        runner.close()
+
+        self.assertEqual((True, {"downloaded": 4096}), seen["ota"])
+        # saved by an earlier execution of the job
+        self.assertEqual((True, None), seen["config"])
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_checkpoint_kept_when_final_update_fails(self):
+        self.client.add_job("a")
+        store = CheckpointStore()
+
+        def handler(context):
+            context.save_checkpoint("almost")
+            self.client.on_update = lambda request: awsiot.V2ServiceException("timed out", TimeoutError(), None)
+
+        runner = JobRunner(self.client, THING, handler, checkpoint_store=store)
+        self.addCleanup(runner.close)
+        with self.assertLogs('awsiot.job_runner', 'ERROR'):
+            runner.start()
+            self.client.wait_for(lambda: not runner.running)
+            runner.close()
+        self.assertEqual((1, "almost"), store.load("a"))
+        self.assertEqual(Status.IN_PROGRESS, self.client.status("a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt, mqtt_request_response
+import awsiot
+from awsiot import iotshadow
+from concurrent.futures import Future
+import importlib.util
+import unittest
+from unittest import mock
+
+
+class RecordingCodec(awsiot.JsonCodec):
+    def __init__(self):
+        self.encoded = []
+        self.decoded = []
+
+    def encode(self, obj):
+        self.encoded.append(obj)
+        return super().encode(obj)
+
+    def decode(self, data):
+        self.decoded.append(data)
+        return super().decode(data)
+
+
+class JsonCodecTest(unittest.TestCase):
+
+    def tearDown(self):
+        awsiot.set_default_json_codec(None)
+
+    def _check_round_trip(self, codec):
+        doc = {"state": {"reported": {"color": "red", "temp": 21.5, "on": True, "tags": ["a", "b"]}},
+               "version": 12, "clientToken": None, "name": "ünïcödé"}
+        encoded = codec.encode(doc)
+        self.assertIsInstance(encoded, bytes)
+        self.assertEqual(doc, codec.decode(encoded))
+        self.assertEqual(doc, codec.decode(bytearray(encoded)))
+        self.assertEqual(doc, codec.decode(memoryview(encoded)))
+
+    def test_stdlib_codec(self):
+        self._check_round_trip(awsiot.JsonCodec())
+
+    def test_optional_codecs(self):
+        for module_name, codec_type in (('orjson', awsiot.OrjsonCodec),
+                                        ('msgspec', awsiot.MsgspecCodec),
+                                        ('ujson', awsiot.UjsonCodec)):
+            with self.subTest(codec=codec_type.__name__):
+                if importlib.util.find_spec(module_name) is None:
+                    with self.assertRaises(ImportError):
+                        codec_type()
+                else:
+                    self._check_round_trip(codec_type())
+
+    def test_default_codec(self):
+        default = awsiot.get_default_json_codec()
+        self.assertIsInstance(default, awsiot.JsonCodec)
+        self.assertIs(default, awsiot.get_default_json_codec())
+
+        codec = RecordingCodec()
+        awsiot.set_default_json_codec(codec)
+        self.assertIs(codec, awsiot.get_default_json_codec())
+
+        awsiot.set_default_json_codec(None)
+        self.assertIsInstance(awsiot.get_default_json_codec(), type(default))
+
+    def test_service_client_uses_codec(self):
+        connection = mock.Mock(spec=mqtt.Connection)
+        connection.publish.return_value = (Future(), 1)
+        subscribe_future = Future()
+        connection.subscribe.return_value = (subscribe_future, 2)
+
+        codec = RecordingCodec()
+        client = iotshadow.IotShadowClient(connection, json_codec=codec)
+        self.assertIs(codec, client.json_codec)
+
+        client.publish_get_shadow(iotshadow.GetShadowRequest(thing_name="thing"), mqtt.QoS.AT_LEAST_ONCE)
+        self.assertEqual([{}], codec.encoded)
+        self.assertEqual(b'{}', connection.publish.call_args.kwargs['payload'])
+
+        events = []
+        client.subscribe_to_shadow_delta_updated_events(
+            iotshadow.ShadowDeltaUpdatedSubscriptionRequest(thing_name="thing"),
+            mqtt.QoS.AT_LEAST_ONCE,
+            events.append)
+        callback = connection.subscribe.call_args.kwargs['callback']
+        callback(topic="$aws/things/thing/shadow/update/delta", payload=b'{"version": 3, "state": {"on": true}}',
+                 dup=False, qos=mqtt.QoS.AT_LEAST_ONCE, retain=False)
+        self.assertEqual([b'{"version": 3, "state": {"on": true}}'], codec.decoded)
+        self.assertEqual(3, events[0].version)
+        self.assertEqual({"on": True}, events[0].state)
+
+    def test_v2_modeled_future_uses_codec(self):
+        codec = RecordingCodec()
+        unmodeled_future = Future()
+        modeled_future = awsiot.create_v2_service_modeled_future(
+            unmodeled_future, "get_shadow", "accepted", iotshadow.GetShadowResponse, iotshadow.V2ErrorResponse, codec)
+        unmodeled_future.set_result(mqtt_request_response.Response(topic="accepted", payload=b'{"version": 7}'))
+
+        self.assertEqual(7, modeled_future.result().version)
+        self.assertEqual([b'{"version": 7}'], codec.decoded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+import awsiot.greengrasscoreipc
+from awsiot.greengrasscoreipc import model
+from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2
+from benchmarks.local_ipc_server import LocalIpcServer, _encode_message, _read_message, _string_header
+import io
+import json
+import os
+import queue
+import shutil
+import socket
+import tempfile
+import unittest
+
+TIMEOUT = 5.0
+
+AUTH_TOKEN = "local-token"
+COMPONENT = "com.example.Test"
+
+
+def json_message(message):
+    return model.PublishMessage(json_message=model.JsonMessage(message=message))
+
+
+class FramingTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        data = _encode_message(_string_header("name", "value"), b'{"a": 1}')
+        headers, payload = _read_message(io.BytesIO(data))
+        self.assertEqual({"name": "value"}, headers)
+        self.assertEqual(b'{"a": 1}', payload)
+        self.assertIsNone(_read_message(io.BytesIO(b'')))
+
+    def test_checksum_mismatch(self):
+        data = bytearray(_encode_message(b'', b'payload'))
+        data[-5] ^= 0xff
+        with self.assertRaises(ValueError):
+            _read_message(io.BytesIO(bytes(data)))
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "requires Unix domain sockets")
+class LocalIpcServerTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.server = LocalIpcServer(os.path.join(directory, "ipc.socket"), auth_token=AUTH_TOKEN,
+                                     component_name=COMPONENT,
+                                     configuration={COMPONENT: {"limits": {"rate": 5}, "name": "test"}})
+        self.addCleanup(self.server.close)
+
+    def _client(self, authtoken=AUTH_TOKEN):
+        connection = awsiot.greengrasscoreipc.connect(
+            ipc_socket=self.server.socket_path, authtoken=authtoken, timeout=TIMEOUT)
+        client = GreengrassCoreIPCClientV2(connection)
+        self.addCleanup(client.close)
+        return client
+
+    def _subscribe(self, client, topic, receive_mode=None):
+        events = queue.Queue()
+        _, operation = client.subscribe_to_topic(topic=topic, receive_mode=receive_mode, on_stream_event=events.put)
+        return events, operation
+
+    def test_publish_subscribe(self):
+        subscriber = self._client()
+        publisher = self._client()
+        wildcard, _ = self._subscribe(subscriber, "sensors/+/temperature")
+        everything, _ = self._subscribe(subscriber, "sensors/#")
+
+        publisher.publish_to_topic(topic="sensors/a/temperature", publish_message=json_message({"value": 21}))
+        publisher.publish_to_topic(topic="sensors/a/humidity", publish_message=model.PublishMessage(
+            binary_message=model.BinaryMessage(message=b'\x00\x01')))
+
+        event = wildcard.get(timeout=TIMEOUT)
+        self.assertEqual({"value": 21}, event.json_message.message)
+        self.assertEqual("sensors/a/temperature", event.json_message.context.topic)
+        self.assertEqual({"value": 21}, everything.get(timeout=TIMEOUT).json_message.message)
+        event = everything.get(timeout=TIMEOUT)
+        self.assertEqual(b'\x00\x01', event.binary_message.message)
+        self.assertEqual("sensors/a/humidity", event.binary_message.context.topic)
+        self.assertTrue(wildcard.empty())
+
+    def test_receive_mode(self):
+        client = self._client()
+        other = self._client()
+        own, _ = self._subscribe(client, "status")
+        others_only, _ = self._subscribe(client, "status", model.ReceiveMode.RECEIVE_MESSAGES_FROM_OTHERS)
+
+        client.publish_to_topic(topic="status", publish_message=json_message({"from": "self"}))
+        other.publish_to_topic(topic="status", publish_message=json_message({"from": "other"}))
+
+        self.assertEqual({"from": "self"}, own.get(timeout=TIMEOUT).json_message.message)
+        self.assertEqual({"from": "other"}, own.get(timeout=TIMEOUT).json_message.message)
+        self.assertEqual({"from": "other"}, others_only.get(timeout=TIMEOUT).json_message.message)
+        self.assertTrue(others_only.empty())
+
+    def test_closed_subscription(self):
+        client = self._client()
+        closed, operation = self._subscribe(client, "a")
+        still_open, _ = self._subscribe(client, "a")
+        operation.close().result(TIMEOUT)
+
+        client.publish_to_topic(topic="a", publish_message=json_message({}))
+        still_open.get(timeout=TIMEOUT)
+        self.assertTrue(closed.empty())
+
+    def test_invalid_topic_filter(self):
+        with self.assertRaises(model.InvalidArgumentsError):
+            self._client().subscribe_to_topic(topic="a/#/b", on_stream_event=print)
+
+    def test_thing_shadow(self):
+        client = self._client()
+        with self.assertRaises(model.ResourceNotFoundError):
+            client.get_thing_shadow(thing_name="thing")
+
+        response = client.update_thing_shadow(thing_name="thing", payload=json.dumps(
+            {"state": {"desired": {"color": "red", "size": 2}}, "clientToken": "t1"}))
+        self.assertEqual({"state": {"desired": {"color": "red", "size": 2}}, "version": 1, "clientToken": "t1"},
+                         {k: v for k, v in json.loads(response.payload).items() if k != 'timestamp'})
+        client.update_thing_shadow(thing_name="thing", payload=json.dumps(
+            {"state": {"reported": {"color": "red"}, "desired": {"size": None}}, "version": 1}))
+
+        document = json.loads(client.get_thing_shadow(thing_name="thing").payload)
+        self.assertEqual(2, document["version"])
+        self.assertEqual({"desired": {"color": "red"}, "reported": {"color": "red"}}, document["state"])
+        self.assertEqual({"desired": {"color": "red"}, "reported": {"color": "red"}},
+                         self.server.get_shadow_state("thing"))
+
+        with self.assertRaises(model.ConflictError):
+            client.update_thing_shadow(thing_name="thing", payload=json.dumps(
+                {"state": {"reported": {"color": "blue"}}, "version": 1}))
+
+        client.update_thing_shadow(thing_name="thing", shadow_name="config", payload=json.dumps(
+            {"state": {"desired": {"mode": "eco"}, "reported": {"mode": "normal"}}}))
+        document = json.loads(client.get_thing_shadow(thing_name="thing", shadow_name="config").payload)
+        self.assertEqual({"mode": "eco"}, document["state"]["delta"])
+
+        client.delete_thing_shadow(thing_name="thing")
+        self.assertIsNone(self.server.get_shadow_state("thing"))
+        self.assertIsNotNone(self.server.get_shadow_state("thing", "config"))
+        with self.assertRaises(model.ResourceNotFoundError):
+            client.delete_thing_shadow(thing_name="thing")
+
+    def test_configuration(self):
+        client = self._client()
+        response = client.get_configuration()
+        self.assertEqual(COMPONENT, response.component_name)
+        self.assertEqual({"limits": {"rate": 5}, "name": "test"}, response.value)
+        self.assertEqual({"rate": 5}, client.get_configuration(key_path=["limits"]).value)
+        self.assertEqual({"rate": 5}, client.get_configuration(key_path=["limits", "rate"]).value)
+        with self.assertRaises(model.ResourceNotFoundError):
+            client.get_configuration(key_path=["missing"])
+        with self.assertRaises(model.ResourceNotFoundError):
+            client.get_configuration(component_name="com.example.Other")
+
+        self.server.set_configuration("com.example.Other", {"enabled": True})
+        self.assertEqual({"enabled": True}, client.get_configuration(component_name="com.example.Other").value)
+
+    def test_unsupported_operation(self):
+        with self.assertRaises(model.ServiceError):
+            self._client().list_components()
+
+    def test_wrong_auth_token(self):
+        with self.assertRaises(Exception):
+            self._client(authtoken="wrong")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt, mqtt_request_response
+import awsiot
+from awsiot import iotshadow, metrics
+from awsiot.metrics import HistogramRecorder, LatencyHistogram, Metric
+from concurrent.futures import Future
+import importlib.util
+import os
+import queue
+import shutil
+import socket
+import tempfile
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+QOS = mqtt.QoS.AT_LEAST_ONCE
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(0, histogram.count)
+        self.assertEqual(0.0, histogram.percentile(99))
+        self.assertEqual(0.0, histogram.mean)
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for i in range(1, 10001):
+            histogram.record(i / 1e6)
+        self.assertEqual(10000, histogram.count)
+        self.assertEqual(1e-6, histogram.min)
+        self.assertEqual(0.01, histogram.max)
+        self.assertAlmostEqual(0.0050005, histogram.mean)
+        for percent in (50, 90, 99, 99.9):
+            self.assertAlmostEqual(percent / 1e4, histogram.percentile(percent), delta=percent / 1e4 / 256)
+        self.assertEqual(0.01, histogram.percentile(100))
+        self.assertEqual(1e-6, histogram.percentile(0))
+
+    def test_wide_range(self):
+        histogram = LatencyHistogram()
+        for seconds in (100e-9, 3600.0):
+            histogram.record(seconds)
+        self.assertAlmostEqual(100e-9, histogram.percentile(50), delta=1e-9)
+        self.assertEqual(3600.0, histogram.percentile(99))
+
+    def test_merge(self):
+        a = LatencyHistogram()
+        b = LatencyHistogram()
+        a.record(0.001)
+        b.record(0.003)
+        a.merge(b)
+        self.assertEqual(2, a.count)
+        self.assertEqual(0.001, a.min)
+        self.assertEqual(0.003, a.max)
+        self.assertEqual(1, b.count)
+
+
+class HistogramRecorderTest(unittest.TestCase):
+
+    def test_record(self):
+        recorder = HistogramRecorder()
+        recorder.record(Metric.REQUEST_LATENCY, "get_shadow", 0.002)
+        recorder.record(Metric.REQUEST_LATENCY, "get_shadow", 0.004)
+        recorder.record(Metric.CALLBACK, "get_shadow", 0.0001)
+        recorder.add_in_flight("get_shadow", 1)
+        recorder.add_in_flight("update_shadow", 2)
+
+        self.assertEqual(2, recorder.histogram(Metric.REQUEST_LATENCY, "get_shadow").count)
+        self.assertEqual(0, recorder.histogram(Metric.DESERIALIZATION, "get_shadow").count)
+        self.assertEqual(1, recorder.in_flight("get_shadow"))
+        self.assertEqual(3, recorder.in_flight())
+
+        summaries = recorder.summaries()
+        self.assertEqual([(Metric.CALLBACK, "get_shadow", 1), (Metric.REQUEST_LATENCY, "get_shadow", 2)],
+                         [(s.metric, s.operation, s.count) for s in summaries])
+        self.assertAlmostEqual(0.004, summaries[1].max)
+
+        recorder.reset()
+        self.assertEqual([], recorder.summaries())
+        self.assertEqual(3, recorder.in_flight())
+
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = HistogramRecorder()
+        metrics.set_metrics_recorder(self.recorder)
+        self.addCleanup(metrics.set_metrics_recorder, None)
+
+    def assertRecorded(self, metric, operation, count=1):
+        self.assertEqual(count, self.recorder.histogram(metric, operation).count,
+                         "{} of {}".format(metric, operation))
+
+
+class MqttServiceClientMetricsTest(InstrumentationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.connection = mock.Mock(spec=mqtt.Connection)
+        self.puback = Future()
+        self.connection.publish.return_value = (self.puback, 1)
+        self.connection.subscribe.return_value = (Future(), 2)
+        self.client = iotshadow.IotShadowClient(self.connection)
+
+    def test_publish(self):
+        self.client.publish_get_shadow(iotshadow.GetShadowRequest(thing_name="a"), QOS)
+        self.assertEqual(1, self.recorder.in_flight("publish_get_shadow"))
+        self.assertRecorded(Metric.REQUEST_LATENCY, "publish_get_shadow", 0)
+
+        self.puback.set_result({'packet_id': 1})
+        self.assertEqual(0, self.recorder.in_flight("publish_get_shadow"))
+        self.assertRecorded(Metric.REQUEST_LATENCY, "publish_get_shadow")
+
+    def test_subscribe(self):
+        received = []
+        self.client.subscribe_to_get_shadow_accepted(
+            iotshadow.GetShadowSubscriptionRequest(thing_name="a"), QOS, received.append)
+        callback = self.connection.subscribe.call_args.kwargs['callback']
+        callback(topic="$aws/things/a/shadow/get/accepted", payload=b'{"version": 3}', dup=False, qos=QOS, retain=False)
+
+        self.assertEqual(3, received[0].version)
+        self.assertRecorded(Metric.DESERIALIZATION, "subscribe_to_get_shadow_accepted")
+        self.assertRecorded(Metric.CALLBACK, "subscribe_to_get_shadow_accepted")
+
+    def test_not_recorded_without_recorder(self):
+        metrics.set_metrics_recorder(None)
+        self.client.publish_get_shadow(iotshadow.GetShadowRequest(thing_name="a"), QOS)
+        self.puback.set_result({'packet_id': 1})
+        self.assertEqual([], self.recorder.summaries())
+        self.assertEqual(0, self.recorder.in_flight())
+
+
+class V2ServiceClientMetricsTest(InstrumentationTestCase):
+
+    def test_request(self):
+        unmodeled = Future()
+        modeled = awsiot.create_v2_service_modeled_future(
+            unmodeled, "get_shadow", "$aws/things/a/shadow/get/accepted",
+            iotshadow.GetShadowResponse, iotshadow.V2ErrorResponse)
+        self.assertEqual(1, self.recorder.in_flight("get_shadow"))
+
+        unmodeled.set_result(mqtt_request_response.Response(
+            topic="$aws/things/a/shadow/get/accepted", payload=b'{"version": 7}'))
+        self.assertEqual(7, modeled.result(TIMEOUT).version)
+        self.assertEqual(0, self.recorder.in_flight("get_shadow"))
+        for metric in (Metric.REQUEST_LATENCY, Metric.DESERIALIZATION, Metric.CALLBACK):
+            self.assertRecorded(metric, "get_shadow")
+
+    def test_stream(self):
+        events = []
+        options = awsiot.create_streaming_unmodeled_options(
+            awsiot.ServiceStreamOptions(incoming_event_listener=events.append),
+            "$aws/things/a/shadow/update/delta", "ShadowDeltaUpdatedEvent", iotshadow.ShadowDeltaUpdatedEvent)
+        options.incoming_publish_listener(mqtt_request_response.IncomingPublishEvent(
+            topic="$aws/things/a/shadow/update/delta", payload=b'{"version": 2}'))
+
+        self.assertEqual(2, events[0].version)
+        self.assertRecorded(Metric.DESERIALIZATION, "ShadowDeltaUpdatedEvent")
+        self.assertRecorded(Metric.CALLBACK, "ShadowDeltaUpdatedEvent")
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "requires Unix domain sockets")
+class GreengrassIpcMetricsTest(InstrumentationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        import awsiot.greengrasscoreipc
+        from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2
+        from benchmarks.local_ipc_server import LocalIpcServer
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        server = LocalIpcServer(os.path.join(directory, "ipc.socket"))
+        self.addCleanup(server.close)
+        self.client = GreengrassCoreIPCClientV2(
+            awsiot.greengrasscoreipc.connect(ipc_socket=server.socket_path, authtoken="token", timeout=TIMEOUT))
+        self.addCleanup(self.client.close)
+
+    def test_operations(self):
+        from awsiot.greengrasscoreipc import model
+
+        events = queue.Queue()
+        self.client.subscribe_to_topic(topic="a", on_stream_event=events.put)
+        self.client.publish_to_topic(topic="a", publish_message=model.PublishMessage(
+            json_message=model.JsonMessage(message={})))
+        events.get(timeout=TIMEOUT)
+        self.client.close()
+
+        self.assertRecorded(Metric.REQUEST_LATENCY, "aws.greengrass#SubscribeToTopic")
+        self.assertRecorded(Metric.REQUEST_LATENCY, "aws.greengrass#PublishToTopic")
+        self.assertRecorded(Metric.EXECUTOR_QUEUE_WAIT, "aws.greengrass#SubscribeToTopic")
+        # timed where the callback ran, on the executor, and not where it was submitted
+        self.assertRecorded(Metric.CALLBACK, "aws.greengrass#SubscribeToTopic")
+        self.assertEqual(0, self.recorder.in_flight())
+
+
+class FakeInstrument:
+    def __init__(self):
+        self.calls = []
+
+    def record(self, value, attributes):
+        self.calls.append((value, attributes))
+
+    add = record
+
+
+class FakeMeter:
+    def __init__(self):
+        self.instruments = {}
+
+    def _create(self, name, unit, description):
+        self.instruments[name] = FakeInstrument()
+        return self.instruments[name]
+
+    create_histogram = _create
+    create_up_down_counter = _create
+
+
+class ExportRecorderTest(unittest.TestCase):
+
+    def test_open_telemetry(self):
+        meter = FakeMeter()
+        recorder = metrics.OpenTelemetryRecorder(meter)
+        recorder.record(Metric.REQUEST_LATENCY, "get_shadow", 0.25)
+        recorder.add_in_flight("get_shadow", 1)
+        self.assertEqual([(0.25, {'operation': "get_shadow"})],
+                         meter.instruments["awsiot.request_latency"].calls)
+        self.assertEqual([(1, {'operation': "get_shadow"})], meter.instruments["awsiot.in_flight"].calls)
+
+    @unittest.skipUnless(importlib.util.find_spec('prometheus_client'), "requires prometheus_client")
+    def test_prometheus(self):
+        import prometheus_client
+        registry = prometheus_client.CollectorRegistry()
+        recorder = metrics.PrometheusRecorder(registry=registry)
+        recorder.record(Metric.CALLBACK, "get_shadow", 0.003)
+        recorder.add_in_flight("get_shadow", 2)
+        self.assertEqual(1, registry.get_sample_value(
+            'awsiot_callback_seconds_count', {'operation': "get_shadow"}))
+        self.assertEqual(2, registry.get_sample_value('awsiot_in_flight', {'operation': "get_shadow"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt
+import awsiot
+from awsiot import iotjobs, iotshadow
+from concurrent.futures import Future
+import unittest
+from unittest import mock
+
+GET_SHADOW_PAYLOAD = {
+    "clientToken": "token",
+    "state": {
+        "desired": {"color": "red"},
+        "reported": {"color": "blue"},
+        "delta": {"color": "red"},
+    },
+    "metadata": {
+        "desired": {"color": {"timestamp": 1700000000}},
+        "reported": {"color": {"timestamp": 1700000001}},
+    },
+    "timestamp": 1700000002,
+    "version": 42,
+}
+
+PENDING_JOBS_PAYLOAD = {
+    "inProgressJobs": [{"jobId": "job-1", "executionNumber": 1, "versionNumber": 2, "startedAt": 1700000000}],
+    "queuedJobs": [{"jobId": "job-2", "executionNumber": 1, "versionNumber": 1, "queuedAt": 1700000000}],
+    "timestamp": 1700000003,
+}
+
+
+class LazyDeserializationTest(unittest.TestCase):
+
+    def _assert_same_fields(self, eager, lazy):
+        self.assertEqual(repr(eager), repr(lazy))
+        for slot in type(eager).__slots__:
+            self.assertEqual(repr(getattr(eager, slot)), repr(getattr(lazy, slot)))
+
+    def test_matches_eager(self):
+        for modeled_class, payload in ((iotshadow.GetShadowResponse, GET_SHADOW_PAYLOAD),
+                                       (iotshadow.ShadowDeltaUpdatedEvent, GET_SHADOW_PAYLOAD),
+                                       (iotjobs.GetPendingJobExecutionsResponse, PENDING_JOBS_PAYLOAD),
+                                       (iotjobs.GetPendingJobExecutionsResponse, {})):
+            with self.subTest(modeled_class=modeled_class.__name__):
+                lazy = modeled_class.from_payload_lazy(payload)
+                self.assertIsInstance(lazy, modeled_class)
+                self._assert_same_fields(modeled_class.from_payload(payload), lazy)
+
+    def test_fields_built_on_first_access(self):
+        with mock.patch.object(iotjobs.JobExecutionSummary, 'from_payload',
+                               wraps=iotjobs.JobExecutionSummary.from_payload) as summary_from_payload:
+            response = iotjobs.GetPendingJobExecutionsResponse.from_payload_lazy(PENDING_JOBS_PAYLOAD)
+            self.assertEqual(1700000003, response.timestamp.timestamp())
+            summary_from_payload.assert_not_called()
+
+            self.assertEqual("job-1", response.in_progress_jobs[0].job_id)
+            self.assertEqual(1, summary_from_payload.call_count)
+
+            # materialized values are kept
+            self.assertIs(response.in_progress_jobs, response.in_progress_jobs)
+            self.assertEqual(1, summary_from_payload.call_count)
+
+    def test_nullable_fields(self):
+        state = iotshadow.ShadowState.from_payload_lazy({"desired": None, "reported": {"on": True}})
+        self.assertTrue(state.desired_is_nullable)
+        self.assertFalse(state.reported_is_nullable)
+        self.assertEqual({"desired": None, "reported": {"on": True}}, state.to_payload())
+
+    def test_fields_can_be_assigned(self):
+        event = iotshadow.ShadowDeltaUpdatedEvent.from_payload_lazy(GET_SHADOW_PAYLOAD)
+        event.version = 1
+        self.assertEqual(1, event.version)
+        with self.assertRaises(AttributeError):
+            event.not_a_field
+
+    def test_legacy_client(self):
+        connection = mock.Mock(spec=mqtt.Connection)
+        connection.subscribe.return_value = (Future(), 1)
+        client = iotshadow.IotShadowClient(connection, lazy_deserialization=True)
+
+        events = []
+        client.subscribe_to_shadow_delta_updated_events(
+            iotshadow.ShadowDeltaUpdatedSubscriptionRequest(thing_name="thing"),
+            mqtt.QoS.AT_LEAST_ONCE,
+            events.append)
+        callback = connection.subscribe.call_args.kwargs['callback']
+        callback(topic="$aws/things/thing/shadow/update/delta", payload=b'{"version": 5}',
+                 dup=False, qos=mqtt.QoS.AT_LEAST_ONCE, retain=False)
+
+        self.assertIsInstance(events[0], iotshadow.ShadowDeltaUpdatedEvent)
+        self.assertIsNot(iotshadow.ShadowDeltaUpdatedEvent, type(events[0]))
+        self.assertEqual(5, events[0].version)
+
+    def test_v2_modeled_future(self):
+        unmodeled_future = Future()
+        modeled_future = awsiot.create_v2_service_modeled_future(
+            unmodeled_future, "get_shadow", "accepted", iotshadow.GetShadowResponse, iotshadow.V2ErrorResponse,
+            lazy_deserialization=True)
+        unmodeled_future.set_result(mock.Mock(topic="accepted", payload=b'{"version": 9}'))
+
+        self.assertEqual(9, modeled_future.result().version)
+        self.assertIsNone(modeled_future.result().state)
+
+    def test_v2_modeled_future_cancelled(self):
+        unmodeled_future = Future()
+        modeled_future = awsiot.create_v2_service_modeled_future(
+            unmodeled_future, "get_shadow", "accepted", iotshadow.GetShadowResponse, iotshadow.V2ErrorResponse)
+        self.assertTrue(modeled_future.cancel())
+
+        # the request-response client still owns and completes its own future
+        self.assertFalse(unmodeled_future.cancelled())
+        unmodeled_future.set_result(mock.Mock(topic="accepted", payload=b'{"version": 9}'))
+        self.assertTrue(modeled_future.cancelled())
+
+
+if __name__ == '__main__':
+    unittest.main()
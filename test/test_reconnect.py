@@ -0,0 +1,306 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt.eventstream import Header
+from awscrt.eventstream.rpc import MessageFlag, MessageType
+from awsiot.eventstreamrpc import (
+    CONTENT_TYPE_APPLICATION_JSON,
+    CONTENT_TYPE_HEADER,
+    SERVICE_MODEL_TYPE_HEADER,
+    ConnectionClosedError,
+    LifecycleHandler,
+    ReconnectingConnection,
+)
+from concurrent.futures import Future, ThreadPoolExecutor
+import json
+import test.echotestrpc.client as client
+import test.echotestrpc.model as model
+import threading
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+RESPONSES = {
+    'awstest#EchoStreamMessages': 'awstest#EchoStreamingResponse',
+    'awstest#EchoMessage': 'awstest#EchoMessageResponse',
+}
+
+
+def _done(result=None):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def _headers(model_name):
+    return [Header.from_string(CONTENT_TYPE_HEADER, CONTENT_TYPE_APPLICATION_JSON),
+            Header.from_string(SERVICE_MODEL_TYPE_HEADER, model_name)]
+
+
+class FakeContinuation:
+    def __init__(self, network, handler):
+        self.network = network
+        self.handler = handler
+        self.activation = None
+        self.closed = False
+
+    def activate(self, *, operation, headers, payload, message_type, flags=0):
+        self.activation = (operation, json.loads(payload))
+        self.network.activations.append(self.activation)
+        self.network.activated.release()
+        error = self.network.fail_activations.pop(0) if self.network.fail_activations else None
+        if error is not None:
+            self.network.run(self.handler.on_continuation_message, headers=_headers(error), payload=b'{}',
+                             message_type=MessageType.APPLICATION_ERROR, flags=MessageFlag.TERMINATE_STREAM)
+            self.network.run(self.close)
+        else:
+            self.network.run(self.handler.on_continuation_message, headers=_headers(RESPONSES[operation]),
+                             payload=b'{}', message_type=MessageType.APPLICATION_MESSAGE, flags=0)
+        return _done()
+
+    def send_message(self, *, headers=None, payload=None, message_type, flags=0):
+        if flags & MessageFlag.TERMINATE_STREAM:
+            self.network.run(self.close)
+        return _done()
+
+    def push(self, event):
+        self.network.run(self.handler.on_continuation_message, headers=_headers(event._model_name()),
+                         payload=json.dumps(event._to_payload()).encode(),
+                         message_type=MessageType.APPLICATION_MESSAGE, flags=0)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.handler.on_continuation_closed()
+
+
+class FakeProtocolConnection:
+    def __init__(self, network, handler):
+        self.network = network
+        self.handler = handler
+        self.continuations = []
+
+    def send_protocol_message(self, *, headers=None, payload=None, message_type, flags=0):
+        if message_type == MessageType.CONNECT:
+            self.network.run(self.handler.on_protocol_message, headers=[], payload=b'',
+                             message_type=MessageType.CONNECT_ACK, flags=MessageFlag.CONNECTION_ACCEPTED)
+        return _done()
+
+    def new_stream(self, handler):
+        continuation = FakeContinuation(self.network, handler)
+        self.continuations.append(continuation)
+        return continuation
+
+    def close(self, reason=None):
+        def shutdown():
+            for continuation in self.continuations:
+                continuation.close()
+            self.handler.on_connection_shutdown(reason=reason)
+        self.network.run(shutdown)
+
+
+class FakeNetwork:
+    """Stands in for the CRT eventstream layer, running its callbacks on a single thread"""
+
+    def __init__(self):
+        self.loop = ThreadPoolExecutor(max_workers=1)
+        self.accepting = True
+        self.connections = []
+        self.attempts = threading.Semaphore(0)
+        self.activations = []
+        self.activated = threading.Semaphore(0)
+        self.fail_activations = []
+
+    def run(self, fn, *args, **kwargs):
+        self.loop.submit(fn, *args, **kwargs)
+
+    def connect(self, *, handler, **kwargs):
+        def setup():
+            self.attempts.release()
+            if self.accepting:
+                connection = FakeProtocolConnection(self, handler)
+                self.connections.append(connection)
+                handler.on_connection_setup(connection=connection, error=None)
+            else:
+                handler.on_connection_setup(connection=None, error=ConnectionRefusedError())
+        self.run(setup)
+
+    def drop(self):
+        self.connections[-1].close(ConnectionResetError())
+
+
+class RecordingLifecycleHandler(LifecycleHandler):
+    def __init__(self):
+        self.connects = threading.Semaphore(0)
+        self.disconnects = []
+
+    def on_connect(self):
+        self.connects.release()
+
+    def on_disconnect(self, reason):
+        self.disconnects.append(reason)
+
+
+class RecordingStreamHandler(client.EchoStreamMessagesStreamHandler):
+    def __init__(self):
+        self.events = []
+        self.event_received = threading.Semaphore(0)
+        self.errors = []
+        self.closed = threading.Event()
+
+    def on_stream_event(self, event):
+        self.events.append(event)
+        self.event_received.release()
+
+    def on_stream_error(self, error):
+        self.errors.append(error)
+        return True
+
+    def on_stream_closed(self):
+        self.closed.set()
+
+
+def stream_message(value):
+    return model.EchoStreamingMessage(stream_message=model.MessageData(string_message=value))
+
+
+class ReconnectingConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.network = FakeNetwork()
+        patcher = mock.patch('awscrt.eventstream.rpc.ClientConnection.connect', side_effect=self.network.connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.lifecycle = RecordingLifecycleHandler()
+
+    def _connect(self, **kwargs):
+        kwargs.setdefault('min_reconnect_delay', 0.01)
+        kwargs.setdefault('max_reconnect_delay', 0.05)
+        connection = ReconnectingConnection(host_name="socket", port=0, bootstrap=None, **kwargs)
+        connection.connect(self.lifecycle).result(TIMEOUT)
+        self.assertTrue(self.lifecycle.connects.acquire(timeout=TIMEOUT))
+        self.addCleanup(connection.close)
+        return connection, client.EchoTestRPCClient(connection)
+
+    def _wait_activation(self):
+        self.assertTrue(self.network.activated.acquire(timeout=TIMEOUT), "nothing was activated")
+        return self.network.activations[-1]
+
+    def _open_stream(self, rpc_client):
+        handler = RecordingStreamHandler()
+        operation = rpc_client.new_echo_stream_messages(handler)
+        operation.activate(model.EchoStreamingRequest()).result(TIMEOUT)
+        operation.get_response().result(TIMEOUT)
+        self._wait_activation()
+        return handler, operation
+
+    def test_stream_resumed_after_reconnect(self):
+        connection, rpc_client = self._connect()
+        handler, operation = self._open_stream(rpc_client)
+        self.network.connections[-1].continuations[-1].push(stream_message("before"))
+        self.assertTrue(handler.event_received.acquire(timeout=TIMEOUT))
+
+        self.network.drop()
+        self.assertTrue(self.lifecycle.connects.acquire(timeout=TIMEOUT), "did not reconnect")
+        self.assertEqual(('awstest#EchoStreamMessages', {}), self._wait_activation())
+        self.assertEqual(2, len(self.network.connections))
+
+        self.network.connections[-1].continuations[-1].push(stream_message("after"))
+        self.assertTrue(handler.event_received.acquire(timeout=TIMEOUT))
+        self.assertEqual(["before", "after"], [e.stream_message.string_message for e in handler.events])
+        self.assertFalse(handler.closed.is_set())
+        self.assertEqual([], handler.errors)
+        self.assertIsInstance(self.lifecycle.disconnects[0], ConnectionResetError)
+
+        operation.close().result(TIMEOUT)
+        self.assertTrue(handler.closed.wait(TIMEOUT))
+
+    def test_requests_queued_while_disconnected(self):
+        connection, rpc_client = self._connect(max_queued_requests=1)
+        self.network.accepting = False
+        self.network.drop()
+        self.assertTrue(self.network.attempts.acquire(timeout=TIMEOUT))  # first connect
+        self.assertTrue(self.network.attempts.acquire(timeout=TIMEOUT))  # a refused reconnect
+
+        operation = rpc_client.new_echo_message()
+        sent = operation.activate(model.EchoMessageRequest(message=model.MessageData(string_message="queued")))
+        self.assertFalse(sent.done())
+        with self.assertRaises(ConnectionClosedError):
+            rpc_client.new_echo_message().activate(model.EchoMessageRequest())
+
+        self.network.accepting = True
+        sent.result(TIMEOUT)
+        operation.get_response().result(TIMEOUT)
+        self.assertEqual(('awstest#EchoMessage', {'message': {'stringMessage': 'queued'}}), self._wait_activation())
+
+    def test_close_while_disconnected(self):
+        connection, rpc_client = self._connect()
+        handler, _ = self._open_stream(rpc_client)
+        self.network.accepting = False
+        self.network.drop()
+        self.assertTrue(self.network.attempts.acquire(timeout=TIMEOUT))
+        self.assertTrue(self.network.attempts.acquire(timeout=TIMEOUT))
+
+        queued = rpc_client.new_echo_message()
+        sent = queued.activate(model.EchoMessageRequest())
+        connection.close()
+        self.assertTrue(handler.closed.wait(TIMEOUT))
+        self.assertIsInstance(sent.exception(TIMEOUT), ConnectionClosedError)
+        self.assertIsNotNone(queued.get_response().exception(TIMEOUT))
+
+        with self.assertRaises(ConnectionClosedError):
+            rpc_client.new_echo_message()
+
+    def test_gives_up(self):
+        connection, rpc_client = self._connect(max_reconnect_attempts=2)
+        handler, _ = self._open_stream(rpc_client)
+        self.network.accepting = False
+        self.network.drop()
+        self.assertTrue(handler.closed.wait(TIMEOUT))
+        # the first connect, and two reconnect attempts
+        for _ in range(3):
+            self.assertTrue(self.network.attempts.acquire(timeout=TIMEOUT))
+        self.assertFalse(self.network.attempts.acquire(timeout=0.1))
+        with self.assertRaises(ConnectionClosedError):
+            rpc_client.new_echo_message()
+
+    def test_failed_resume(self):
+        connection, rpc_client = self._connect()
+        handler, _ = self._open_stream(rpc_client)
+        self.network.fail_activations.append('awstest#ServiceError')
+        self.network.drop()
+        self._wait_activation()
+        self.assertTrue(handler.closed.wait(TIMEOUT))
+        self.assertEqual(1, len(handler.errors))
+        self.assertIsInstance(handler.errors[0], model.ServiceError)
+
+    def test_stream_closed_by_service_is_not_resumed(self):
+        connection, rpc_client = self._connect()
+        handler, operation = self._open_stream(rpc_client)
+        operation.close().result(TIMEOUT)
+        self.assertTrue(handler.closed.wait(TIMEOUT))
+        self.network.drop()
+        self.assertTrue(self.lifecycle.connects.acquire(timeout=TIMEOUT))
+        self.assertFalse(self.network.activated.acquire(timeout=0.1))
+
+    def test_backoff(self):
+        limits = []
+
+        def uniform(low, high):
+            limits.append(high)
+            return 0.0
+
+        with mock.patch('awsiot.eventstreamrpc.random.uniform', side_effect=uniform):
+            connection, rpc_client = self._connect(min_reconnect_delay=0.1, max_reconnect_delay=0.5,
+                                                   max_reconnect_attempts=5)
+            self.network.accepting = False
+            self.network.drop()
+            for _ in range(6):
+                self.assertTrue(self.network.attempts.acquire(timeout=TIMEOUT))
+            self.assertFalse(self.network.attempts.acquire(timeout=0.1))
+        self.assertEqual([0.1, 0.2, 0.4, 0.5, 0.5], limits)
+
+
+if __name__ == '__main__':
+    unittest.main()
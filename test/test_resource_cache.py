@@ -0,0 +1,106 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+import awscrt.io
+from awsiot import mqtt5_client_builder, mqtt_connection_builder
+from awsiot.resource_cache import ResourceCache, _tls_context_key
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+ENDPOINT = 'example.iot.us-east-1.amazonaws.com'
+
+
+def make_certificate(directory):
+    cert_path = os.path.join(directory, 'cert.pem')
+    key_path = os.path.join(directory, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=test',
+                    '-keyout', key_path, '-out', cert_path], check=True, capture_output=True)
+    return cert_path, key_path
+
+
+class ResourceCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResourceCache()
+        self.addCleanup(self.cache.close)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_tls_context_shared(self):
+        first = self.cache.tls_context(awscrt.io.TlsContextOptions())
+        self.assertIs(first, self.cache.tls_context(awscrt.io.TlsContextOptions()))
+
+        options = awscrt.io.TlsContextOptions()
+        options.alpn_list = ['x-amzn-mqtt-ca']
+        self.assertIsNot(first, self.cache.tls_context(options))
+        self.assertEqual((1, 2, 2), self.cache.stats)
+
+    def test_tls_context_key(self):
+        def key(cert, key, cipher_pref=awscrt.io.TlsCipherPref.DEFAULT):
+            options = awscrt.io.TlsContextOptions.create_client_with_mtls(cert, key)
+            options.cipher_pref = cipher_pref
+            return _tls_context_key(options)
+
+        self.assertEqual(key(b'cert', b'key'), key(b'cert', b'key'))
+        self.assertNotEqual(key(b'cert', b'key'), key(b'cert', b'other key'))
+        self.assertNotEqual(key(b'cert', b'key'), key(b'cert', b'key', awscrt.io.TlsCipherPref.PQ_DEFAULT))
+        self.assertNotIn(b'key', key(b'cert', b'key'))
+
+    def test_read_file(self):
+        path = os.path.join(self.directory, 'ca.pem')
+        with open(path, 'wb') as f:
+            f.write(b'first')
+        self.assertEqual(b'first', self.cache.read_file(path))
+        self.assertIs(self.cache.read_file(path), self.cache.read_file(path))
+
+        with open(path, 'wb') as f:
+            f.write(b'rotated')
+        self.assertEqual(b'rotated', self.cache.read_file(path))
+
+    def test_client_bootstrap(self):
+        bootstrap = self.cache.client_bootstrap(num_threads=1)
+        self.assertIs(bootstrap, self.cache.client_bootstrap(num_threads=1))
+        self.assertIsNot(bootstrap, self.cache.client_bootstrap(num_threads=2))
+
+    def test_mqtt5_builder(self):
+        for i in range(3):
+            mqtt5_client_builder.new_default_builder(endpoint=ENDPOINT, client_id='thing{}'.format(i),
+                                                     resource_cache=self.cache)
+        self.assertEqual((2, 1, 1), self.cache.stats)
+
+    def test_mqtt3_builder_shares_client(self):
+        connections = [
+            mqtt_connection_builder.new_default_builder(endpoint=ENDPOINT, client_id='thing{}'.format(i),
+                                                        resource_cache=self.cache)
+            for i in range(3)]
+        self.assertIs(connections[0].client, connections[2].client)
+        self.assertIsNot(connections[0], connections[1])
+
+    @unittest.skipIf(shutil.which('openssl') is None, 'requires openssl')
+    def test_mtls_from_path(self):
+        cert_path, key_path = make_certificate(self.directory)
+        for i in range(3):
+            mqtt5_client_builder.mtls_from_path(endpoint=ENDPOINT, client_id='thing{}'.format(i),
+                                                cert_filepath=cert_path, pri_key_filepath=key_path,
+                                                ca_filepath=cert_path, resource_cache=self.cache)
+        # the certificate, the key and one TLS context were created once
+        self.assertEqual(3, self.cache.stats.misses)
+
+    def test_clear_and_close(self):
+        context = self.cache.tls_context(awscrt.io.TlsContextOptions())
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+        self.assertIsNot(context, self.cache.tls_context(awscrt.io.TlsContextOptions()))
+
+        with self.cache:
+            pass
+        self.assertEqual(0, len(self.cache))
+        with self.assertRaises(RuntimeError):
+            self.cache.tls_context(awscrt.io.TlsContextOptions())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt_request_response
+from awsiot import iotshadow
+from awsiot.scheduler import Priority, RequestRejectedError, RequestScheduler
+from concurrent.futures import Future
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+
+class FakeRequestResponseClient:
+    def __init__(self):
+        self.sent = []
+
+    def make_request(self, options):
+        future = Future()
+        self.sent.append((options, future))
+        return future
+
+    def create_stream(self, options):
+        return ("stream", options)
+
+    def names(self):
+        return [options for options, _ in self.sent]
+
+    def respond(self, index, result="response"):
+        self.sent[index][1].set_result(result)
+
+
+class RequestSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rr_client = FakeRequestResponseClient()
+
+    def test_priority_lanes(self):
+        scheduler = RequestScheduler(max_in_flight=1)
+        bulk = scheduler.lane(Priority.LOW).wrap(self.rr_client)
+        urgent = scheduler.lane(Priority.HIGH).wrap(self.rr_client)
+
+        first = bulk.make_request("bulk1")
+        bulk.make_request("bulk2")
+        status = urgent.make_request("status")
+        self.assertEqual(["bulk1"], self.rr_client.names())
+        self.assertEqual(2, scheduler.stats().queue_depth)
+
+        self.rr_client.respond(0)
+        self.assertEqual("response", first.result(TIMEOUT))
+        self.assertEqual(["bulk1", "status"], self.rr_client.names())
+        self.rr_client.respond(1)
+        self.assertEqual(["bulk1", "status", "bulk2"], self.rr_client.names())
+
+        stats = scheduler.stats()
+        self.assertEqual(3, stats.submitted)
+        self.assertEqual(2, stats.completed)
+        self.assertEqual(1, stats.in_flight)
+        self.assertGreater(stats.max_queue_wait, 0.0)
+
+    def test_full_queue(self):
+        scheduler = RequestScheduler(max_in_flight=1, max_queued=1)
+        low = scheduler.lane(Priority.LOW).wrap(self.rr_client)
+        high = scheduler.lane(Priority.HIGH).wrap(self.rr_client)
+        low.make_request("sent")
+        evicted = low.make_request("queued")
+        refused = low.make_request("refused")
+        self.assertIsInstance(refused.exception(TIMEOUT), RequestRejectedError)
+
+        kept = high.make_request("urgent")
+        self.assertIsInstance(evicted.exception(TIMEOUT), RequestRejectedError)
+        self.rr_client.respond(0)
+        self.assertEqual(["sent", "urgent"], self.rr_client.names())
+        self.assertFalse(kept.done())
+        self.assertEqual(2, scheduler.stats().rejected)
+
+    def test_cancel_queued(self):
+        scheduler = RequestScheduler(max_in_flight=1)
+        client = scheduler.wrap(self.rr_client)
+        client.make_request("sent")
+        cancelled = client.make_request("cancelled")
+        client.make_request("next")
+        self.assertTrue(cancelled.cancel())
+        self.rr_client.respond(0)
+        self.assertEqual(["sent", "next"], self.rr_client.names())
+        self.assertEqual(1, scheduler.stats().cancelled)
+
+    def test_deadline(self):
+        scheduler = RequestScheduler(max_in_flight=1)
+        client = scheduler.lane(timeout=0.05).wrap(self.rr_client)
+        in_flight = client.make_request("in flight")
+        queued = client.make_request("queued")
+        self.assertIsInstance(in_flight.exception(TIMEOUT), TimeoutError)
+        self.assertIsInstance(queued.exception(TIMEOUT), TimeoutError)
+
+        # the slot is held until the service responds
+        self.assertEqual(["in flight"], self.rr_client.names())
+        self.rr_client.respond(0)
+        self.assertEqual(["in flight"], self.rr_client.names())
+        stats = scheduler.stats()
+        self.assertEqual(2, stats.timed_out)
+        self.assertEqual(0, stats.queue_depth)
+        self.assertEqual(0, stats.in_flight)
+
+    def test_request_options(self):
+        scheduler = RequestScheduler(max_in_flight=1)
+        client = scheduler.lane(Priority.LOW).wrap(self.rr_client)
+        client.make_request("first")
+        client.make_request("low")
+        with RequestScheduler.request_options(priority=Priority.HIGH, timeout=TIMEOUT):
+            client.make_request("high")
+        self.rr_client.respond(0)
+        self.assertEqual(["first", "high"], self.rr_client.names())
+
+    def test_failed_send(self):
+        scheduler = RequestScheduler(max_in_flight=1)
+        self.rr_client.make_request = mock.Mock(side_effect=[RuntimeError("closed"), Future()])
+        client = scheduler.wrap(self.rr_client)
+        self.assertIsInstance(client.make_request("fails").exception(TIMEOUT), RuntimeError)
+        client.make_request("next")
+        self.assertEqual(2, self.rr_client.make_request.call_count)
+
+    def test_close(self):
+        scheduler = RequestScheduler(max_in_flight=1)
+        client = scheduler.wrap(self.rr_client)
+        sent = client.make_request("sent")
+        queued = client.make_request("queued")
+        scheduler.close()
+        self.assertIsInstance(queued.exception(TIMEOUT), RequestRejectedError)
+        with self.assertRaises(RequestRejectedError):
+            client.make_request("late")
+        self.rr_client.respond(0)
+        self.assertEqual("response", sent.result(TIMEOUT))
+
+    def test_streams_not_scheduled(self):
+        client = RequestScheduler().wrap(self.rr_client)
+        self.assertEqual(("stream", "options"), client.create_stream("options"))
+
+
+class ServiceClientSchedulingTest(unittest.TestCase):
+
+    @mock.patch('awscrt.mqtt_request_response.Client')
+    def test_shadow_client(self, rr_client_class):
+        rr_client = rr_client_class.return_value
+        rr_client.make_request.side_effect = lambda options: Future()
+        scheduler = RequestScheduler(max_in_flight=1)
+        shadow_client = iotshadow.IotShadowClientV2(
+            mock.Mock(), mqtt_request_response.ClientOptions(2, 2), request_scheduler=scheduler.lane(Priority.LOW))
+
+        shadow_client.get_shadow(iotshadow.GetShadowRequest(thing_name="a"))
+        queued = shadow_client.get_shadow(iotshadow.GetShadowRequest(thing_name="b"))
+        self.assertEqual(1, rr_client.make_request.call_count)
+        self.assertEqual(1, scheduler.stats().queue_depth)
+
+        self.assertTrue(queued.cancel())
+        self.assertEqual(0, scheduler.stats().queue_depth)
+
+
+if __name__ == '__main__':
+    unittest.main()
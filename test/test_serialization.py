@@ -0,0 +1,209 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+import awsiot
+import datetime
+from awsiot import eventstreamrpc, iotidentity, iotjobs, iotshadow, serialization
+from awsiot.greengrasscoreipc import model
+from awsiot.serialization import FieldKind
+import unittest
+from unittest import mock
+
+SERVICE_MODULES = (iotshadow, iotjobs, iotidentity, model)
+
+
+def generated_classes():
+    for module in SERVICE_MODULES:
+        for value in vars(module).values():
+            if isinstance(value, type) and value.__module__ == module.__name__ and \
+                    issubclass(value, (awsiot.ModeledClass, eventstreamrpc.Shape)):
+                yield value
+
+
+def sample_value(field, depth):
+    if field.kind is FieldKind.INT:
+        return 7
+    if field.kind is FieldKind.FLOAT:
+        return 2.5
+    if field.kind is FieldKind.BLOB:
+        return 'aGVsbG8='
+    if field.kind in (FieldKind.TIMESTAMP, FieldKind.TIMESTAMP_UTC):
+        return 1700000000
+    if field.kind is FieldKind.SHAPE:
+        return sample_payload(field.shape, depth + 1)
+    if field.kind is FieldKind.SHAPE_LIST:
+        return [sample_payload(field.shape, depth + 1)] * 2
+    if field.kind is FieldKind.SHAPE_MAP:
+        return {'a': sample_payload(field.shape, depth + 1)}
+    if field.kind is FieldKind.SHAPE_LIST_MAP:
+        return {'a': [sample_payload(field.shape, depth + 1)]}
+    return {'nested': [1, 'two']} if depth % 2 else 'text'
+
+
+def sample_payload(shape_type, depth=0):
+    if shape_type is None or depth > 4:
+        return {}
+    fields = serialization.get_serializer(shape_type).fields
+    return {field.key: sample_value(field, depth) for field in fields}
+
+
+def sample_instance(shape_type):
+    # for classes that are only ever serialized
+    obj = shape_type()
+    for field in serialization.get_serializer(shape_type).fields:
+        if field.kind is FieldKind.BLOB:
+            setattr(obj, field.attr, b'hello')
+        elif field.kind is FieldKind.TIMESTAMP:
+            setattr(obj, field.attr, datetime.datetime.fromtimestamp(1700000000))
+        elif field.kind is FieldKind.PLAIN:
+            setattr(obj, field.attr, 'text')
+        if field.nullable:
+            setattr(obj, field.attr + '_is_nullable', True)
+    return obj
+
+
+def fields_of(obj):
+    if isinstance(obj, awsiot.ModeledClass):
+        return [(slot, fields_of(getattr(obj, slot))) for slot in obj.__slots__]
+    if isinstance(obj, eventstreamrpc.Shape):
+        return [(attr, fields_of(value)) for attr, value in vars(obj).items()]
+    if isinstance(obj, list):
+        return [fields_of(i) for i in obj]
+    if isinstance(obj, dict):
+        return {k: fields_of(v) for k, v in obj.items()}
+    return (type(obj), obj)
+
+
+class SerializerTest(unittest.TestCase):
+
+    def _generated_methods(self, shape_type):
+        if issubclass(shape_type, awsiot.ModeledClass):
+            return getattr(shape_type, 'from_payload', None), getattr(shape_type, 'to_payload', None)
+        return shape_type._from_payload, shape_type._to_payload
+
+    def _check_decode(self, serializer, generated_from_payload, payload):
+        try:
+            expected = generated_from_payload(payload)
+        except Exception:
+            # malformed payloads fail either way, though not necessarily with the same exception
+            with self.assertRaises(Exception):
+                serializer.from_payload(payload)
+            return None
+        actual = serializer.from_payload(payload)
+        self.assertIs(type(expected), type(actual))
+        self.assertEqual(fields_of(expected), fields_of(actual))
+        return actual
+
+    def test_all_classes_compile(self):
+        count = 0
+        for shape_type in generated_classes():
+            serializer = serialization.get_serializer(shape_type)
+            if {'from_payload', '_from_payload', 'to_payload', '_to_payload'} & vars(shape_type).keys():
+                with self.subTest(shape=shape_type.__qualname__):
+                    self.assertTrue(serializer.compiled)
+                    count += 1
+        self.assertGreater(count, 150)
+
+    def test_declared_fields(self):
+        for shape_type in generated_classes():
+            if '_payload_fields' not in vars(shape_type):
+                continue
+            with self.subTest(shape=shape_type.__qualname__):
+                defaults = shape_type()
+                for field in serialization.get_serializer(shape_type).fields:
+                    self.assertTrue(hasattr(defaults, field.attr), field.attr)
+
+    def test_built_from_declared_fields(self):
+        serializer = serialization._build_serializer(iotjobs.JobExecutionData)
+        self.assertTrue(serializer.compiled)
+        self.assertEqual(serialization._declared_fields(iotjobs.JobExecutionData), serializer.fields)
+        execution = serializer.from_payload({'jobId': 'a', 'lastUpdatedAt': 5})
+        self.assertEqual('a', execution.job_id)
+        self.assertEqual(datetime.datetime.fromtimestamp(5), execution.last_updated_at)
+
+        # the table alone decides what the compiled code converts
+        table = (('job_id', 'jobId'), ('last_updated_at', 'lastUpdatedAt'))
+        with mock.patch.object(iotjobs.JobExecutionData, '_payload_fields', table):
+            serializer = serialization._build_serializer(iotjobs.JobExecutionData)
+        self.assertEqual(['job_id', 'last_updated_at'], [field.attr for field in serializer.fields])
+        execution = serializer.from_payload({'jobId': 'a', 'lastUpdatedAt': 5, 'thingName': 'thing'})
+        self.assertEqual(5, execution.last_updated_at)
+        self.assertIsNone(execution.thing_name)
+
+    def test_broken_table(self):
+        class Broken(awsiot.ModeledClass):
+            __slots__ = ('value',)
+            _payload_fields = (('value', 'v', 'shape', 'Missing'),)
+
+            def __init__(self, value=None):
+                self.value = value
+
+            @classmethod
+            def from_payload(cls, payload):
+                return cls(payload.get('v'))
+
+        with self.assertLogs('awsiot.serialization', 'WARNING'):
+            serializer = serialization.get_serializer(Broken)
+        self.assertFalse(serializer.compiled)
+        self.assertEqual(2, serializer.from_payload({'v': 2}).value)
+
+    def test_matches_generated_methods(self):
+        for shape_type in generated_classes():
+            serializer = serialization.get_serializer(shape_type)
+            if not serializer.compiled:
+                continue
+            generated_from_payload, generated_to_payload = self._generated_methods(shape_type)
+            with self.subTest(shape=shape_type.__qualname__):
+                payload = sample_payload(shape_type)
+                null_payload = {field.key: None for field in serializer.fields}
+                if serializer.from_payload is not None:
+                    for p in (payload, {}, null_payload):
+                        decoded = self._check_decode(serializer, generated_from_payload, p)
+                        if decoded is not None and serializer.to_payload is not None:
+                            self.assertEqual(generated_to_payload(decoded), serializer.to_payload(decoded))
+                if serializer.to_payload is not None:
+                    for obj in (shape_type(), sample_instance(shape_type)):
+                        self.assertEqual(generated_to_payload(obj), serializer.to_payload(obj))
+
+    def test_nullable_fields(self):
+        serializer = serialization.get_serializer(iotshadow.ShadowState)
+        state = serializer.from_payload({'desired': None, 'reported': {'on': True}})
+        self.assertIsNone(state.desired)
+        self.assertTrue(state.desired_is_nullable)
+        self.assertFalse(state.reported_is_nullable)
+        self.assertEqual({'desired': None, 'reported': {'on': True}}, serializer.to_payload(state))
+
+    def test_bulk(self):
+        serializer = serialization.get_serializer(model.UserProperty)
+        payloads = [{'key': str(i), 'value': 'v'} for i in range(3)]
+        properties = serializer.from_payloads(payloads)
+        self.assertEqual([model.UserProperty(key=str(i), value='v') for i in range(3)], properties)
+        self.assertEqual(payloads, serializer.to_payloads(properties))
+
+    def test_error_shapes(self):
+        error = serialization.decoder_for(model.ServiceError)({'message': 'oops'})
+        self.assertIsInstance(error, Exception)
+        self.assertEqual(model.ServiceError(message='oops'), error)
+
+    def test_fallback(self):
+        class Unrecognized(awsiot.ModeledClass):
+            __slots__ = ('value',)
+
+            def __init__(self, value=None):
+                self.value = value
+
+            @classmethod
+            def from_payload(cls, payload):
+                return cls(payload.get('v', 0) * 2)
+
+        serializer = serialization.get_serializer(Unrecognized)
+        self.assertFalse(serializer.compiled)
+        self.assertEqual(4, serializer.from_payload({'v': 2}).value)
+        self.assertIsNone(serializer.to_payload)
+
+        with self.assertRaises(TypeError):
+            serialization.decoder_for(iotshadow.GetShadowSubscriptionRequest)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt
+from awsiot import JsonCodec, iotshadow, metrics
+from awsiot.dispatcher import StreamDispatcher
+from awsiot.metrics import HistogramRecorder, Metric
+from concurrent.futures import Future, ThreadPoolExecutor
+import queue
+import threading
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+QOS = mqtt.QoS.AT_LEAST_ONCE
+
+
+def delta_request(thing_name):
+    return iotshadow.ShadowDeltaUpdatedSubscriptionRequest(thing_name=thing_name)
+
+
+def delta_payload(version):
+    return '{{"version": {}}}'.format(version).encode()
+
+
+class ThreadRecordingCodec(JsonCodec):
+    def __init__(self):
+        self.threads = []
+
+    def decode(self, data):
+        self.threads.append(threading.current_thread())
+        return super().decode(data)
+
+
+class ServiceClientExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = mock.Mock(spec=mqtt.Connection)
+        self.connection.subscribe.return_value = (Future(), 1)
+
+    def _client(self, executor, **kwargs):
+        self.addCleanup(executor.shutdown)
+        return iotshadow.IotShadowClient(self.connection, executor=executor, **kwargs)
+
+    def _subscribe(self, client, thing_name, callback):
+        client.subscribe_to_shadow_delta_updated_events(delta_request(thing_name), QOS, callback)
+        return self.connection.subscribe.call_args.kwargs['callback']
+
+    def _deliver(self, wrapper, thing_name, version):
+        wrapper(topic="$aws/things/{}/shadow/update/delta".format(thing_name),
+                payload=delta_payload(version), dup=False, qos=QOS, retain=False)
+
+    def test_callbacks_run_on_executor(self):
+        client = self._client(ThreadPoolExecutor(2))
+        events = queue.Queue()
+        wrapper = self._subscribe(client, "a", lambda event: events.put((event, threading.current_thread())))
+        self._deliver(wrapper, "a", 1)
+
+        event, thread = events.get(timeout=TIMEOUT)
+        self.assertEqual(1, event.version)
+        self.assertIsNot(threading.current_thread(), thread)
+
+    def test_decode_on_executor(self):
+        codec = ThreadRecordingCodec()
+        client = self._client(ThreadPoolExecutor(2), json_codec=codec, decode_on_executor=True)
+        events = queue.Queue()
+        wrapper = self._subscribe(client, "a", events.put)
+        self._deliver(wrapper, "a", 1)
+
+        self.assertEqual(1, events.get(timeout=TIMEOUT).version)
+        self.assertNotIn(threading.current_thread(), codec.threads)
+
+    def test_decode_on_executor_requires_executor(self):
+        with self.assertRaises(ValueError):
+            iotshadow.IotShadowClient(self.connection, decode_on_executor=True)
+
+    def _check_topic_order(self, executor):
+        # a slow first callback must not let later messages on its topic overtake it,
+        # while another topic's messages are delivered in the meantime
+        client = self._client(executor)
+        received = queue.Queue()
+        other_done = threading.Event()
+
+        def on_a(event):
+            if event.version == 1:
+                self.assertTrue(other_done.wait(TIMEOUT))
+            received.put(("a", event.version))
+
+        def on_b(event):
+            received.put(("b", event.version))
+            if event.version == 3:
+                other_done.set()
+
+        wrapper_a = self._subscribe(client, "a", on_a)
+        wrapper_b = self._subscribe(client, "b", on_b)
+        for version in range(1, 4):
+            self._deliver(wrapper_a, "a", version)
+            self._deliver(wrapper_b, "b", version)
+
+        order = [received.get(timeout=TIMEOUT) for _ in range(6)]
+        self.assertEqual([1, 2, 3], [version for name, version in order if name == "a"])
+        self.assertEqual([1, 2, 3], [version for name, version in order if name == "b"])
+        self.assertEqual(("b", 3), order[2])
+
+    def test_topic_order_with_thread_pool(self):
+        self._check_topic_order(ThreadPoolExecutor(4))
+
+    def test_topic_order_with_stream_dispatcher(self):
+        self._check_topic_order(StreamDispatcher(max_workers=4))
+
+    def test_callback_exception_logged(self):
+        client = self._client(ThreadPoolExecutor(1))
+        events = queue.Queue()
+
+        def callback(event):
+            events.put(event)
+            if event.version == 1:
+                raise RuntimeError("callback failed")
+
+        wrapper = self._subscribe(client, "a", callback)
+        with self.assertLogs('awsiot', 'ERROR'):
+            self._deliver(wrapper, "a", 1)
+            self._deliver(wrapper, "a", 2)
+            self.assertEqual([1, 2], [events.get(timeout=TIMEOUT).version for _ in range(2)])
+
+    def test_executor_shut_down(self):
+        executor = ThreadPoolExecutor(1)
+        client = self._client(executor)
+        wrapper = self._subscribe(client, "a", lambda event: None)
+        executor.shutdown()
+        with self.assertLogs('awsiot', 'WARNING'):
+            self._deliver(wrapper, "a", 1)
+
+    def test_metrics(self):
+        recorder = HistogramRecorder()
+        metrics.set_metrics_recorder(recorder)
+        self.addCleanup(metrics.set_metrics_recorder, None)
+        client = self._client(ThreadPoolExecutor(1))
+        events = queue.Queue()
+        wrapper = self._subscribe(client, "a", events.put)
+        self._deliver(wrapper, "a", 1)
+        events.get(timeout=TIMEOUT)
+        client.executor.shutdown(wait=True)
+
+        operation = "subscribe_to_shadow_delta_updated_events"
+        for metric in (Metric.DESERIALIZATION, Metric.EXECUTOR_QUEUE_WAIT, Metric.CALLBACK):
+            self.assertEqual(1, recorder.histogram(metric, operation).count, metric)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt_request_response
+from awsiot import iotshadow
+from awsiot.shadow_cache import ShadowCache
+from concurrent.futures import Future
+import unittest
+from unittest import mock
+
+ESTABLISHED = mqtt_request_response.SubscriptionStatusEvent(
+    mqtt_request_response.SubscriptionStatusEventType.SUBSCRIPTION_ESTABLISHED)
+LOST = mqtt_request_response.SubscriptionStatusEvent(
+    mqtt_request_response.SubscriptionStatusEventType.SUBSCRIPTION_LOST)
+
+
+class FakeShadowClient:
+    """Keeps the stream options and pending get requests so tests can drive them"""
+
+    def __init__(self):
+        self.streams = {}
+        self.gets = []
+
+    def _create_stream(self, kind):
+        def create_stream(request, options):
+            self.streams[(kind, request.thing_name, getattr(request, 'shadow_name', None))] = options
+            return mock.Mock(spec=mqtt_request_response.StreamingOperation)
+        return create_stream
+
+    def _get(self, request):
+        future = Future()
+        self.gets.append((request, future))
+        return future
+
+    def __getattr__(self, name):
+        if name.endswith('delta_updated_stream'):
+            return self._create_stream('delta')
+        if name.endswith('updated_stream'):
+            return self._create_stream('updated')
+        if name in ('get_shadow', 'get_named_shadow'):
+            return self._get
+        raise AttributeError(name)
+
+    def subscribe_all(self, event=ESTABLISHED):
+        for options in self.streams.values():
+            options.subscription_status_listener(event)
+
+    def emit(self, kind, event, thing_name="thing", shadow_name=None):
+        self.streams[(kind, thing_name, shadow_name)].incoming_event_listener(event)
+
+
+def get_response(version, desired=None, reported=None):
+    return iotshadow.GetShadowResponse(
+        state=iotshadow.ShadowStateWithDelta(desired=desired, reported=reported),
+        metadata=iotshadow.ShadowMetadata(desired={}, reported={}),
+        version=version)
+
+
+def updated_event(version, desired=None, reported=None):
+    return iotshadow.ShadowUpdatedEvent(current=iotshadow.ShadowUpdatedSnapshot(
+        state=iotshadow.ShadowState(desired=desired, reported=reported),
+        metadata=iotshadow.ShadowMetadata(),
+        version=version))
+
+
+class ShadowCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeShadowClient()
+        self.cache = ShadowCache(self.client)
+
+    def _warm(self, version=1, desired=None, reported=None, shadow_name=None):
+        future = self.cache.get_shadow("thing", shadow_name)
+        self.assertEqual([], self.client.gets, "fetched before streams were subscribed")
+        self.client.subscribe_all()
+        request, get_future = self.client.gets.pop()
+        get_future.set_result(get_response(version, desired, reported))
+        return future.result(0), request
+
+    def test_cold_start_then_local_reads(self):
+        response, request = self._warm(reported={"temp": 20}, desired={"temp": 22})
+        self.assertIsInstance(request, iotshadow.GetShadowRequest)
+        self.assertEqual({"temp": 20}, response.state.reported)
+
+        cached = self.cache.get_shadow("thing").result(0)
+        self.assertEqual([], self.client.gets)
+        self.assertEqual(1, cached.version)
+        self.assertEqual({"temp": 22}, cached.state.delta)
+
+        # callers get copies
+        cached.state.reported["temp"] = 99
+        self.assertEqual({"temp": 20}, self.cache.get_cached("thing").state.reported)
+
+    def test_concurrent_cold_reads_share_request(self):
+        first = self.cache.get_shadow("thing", "config")
+        second = self.cache.get_shadow("thing", "config")
+        self.client.subscribe_all()
+        self.assertEqual(1, len(self.client.gets))
+        request, get_future = self.client.gets.pop()
+        self.assertIsInstance(request, iotshadow.GetNamedShadowRequest)
+        get_future.set_result(get_response(3))
+        self.assertEqual(3, first.result(0).version)
+        self.assertEqual(3, second.result(0).version)
+
+    def test_updated_events(self):
+        self._warm(version=1, reported={"temp": 20})
+        self.client.emit('updated', updated_event(2, reported={"temp": 21}))
+        self.assertEqual({"temp": 21}, self.cache.get_cached("thing").state.reported)
+
+        # stale
+        self.client.emit('updated', updated_event(1, reported={"temp": 0}))
+        self.assertEqual(2, self.cache.get_cached("thing").version)
+
+        # whole documents are carried, so a gap is fine
+        self.client.emit('updated', updated_event(5, reported={"temp": 25}))
+        self.assertEqual(5, self.cache.get_cached("thing").version)
+        self.assertEqual([], self.client.gets)
+
+    def test_delta_events(self):
+        self._warm(version=1, desired={"light": {"on": False, "level": 1}}, reported={"light": {"on": False}})
+        self.client.emit('delta', iotshadow.ShadowDeltaUpdatedEvent(
+            state={"light": {"on": True}}, metadata={"light": {"on": {"timestamp": 1}}}, version=2))
+        # the reported state of version 2 is not known yet
+        self.assertIsNone(self.cache.get_cached("thing"))
+
+        # the documents event of the same version brings it
+        self.client.emit('updated', updated_event(2, desired={"light": {"on": True, "level": 1}},
+                                                  reported={"light": {"on": True, "level": 1}}))
+        cached = self.cache.get_cached("thing")
+        self.assertEqual(2, cached.version)
+        self.assertIsNone(cached.state.delta)
+
+        # stale
+        self.client.emit('delta', iotshadow.ShadowDeltaUpdatedEvent(state={"light": None}, version=2))
+        self.assertEqual({"light": {"on": True, "level": 1}}, self.cache.get_cached("thing").state.desired)
+        self.assertEqual([], self.client.gets)
+
+    def test_read_after_delta_event_refetches(self):
+        self._warm(version=1, reported={"temp": 20})
+        self.client.emit('delta', iotshadow.ShadowDeltaUpdatedEvent(state={"temp": 22}, version=2))
+        future = self.cache.get_shadow("thing")
+        self.assertFalse(future.done())
+
+        # a response older than the delta event is not enough
+        _, get_future = self.client.gets.pop()
+        get_future.set_result(get_response(1, reported={"temp": 20}))
+        self.assertFalse(future.done())
+
+        _, get_future = self.client.gets.pop()
+        get_future.set_result(get_response(2, desired={"temp": 22}, reported={"temp": 21}))
+        self.assertEqual({"temp": 21}, future.result(0).state.reported)
+        self.assertEqual(2, self.cache.get_cached("thing").version)
+
+    def test_version_gap_refetches(self):
+        self._warm(version=1)
+        self.client.emit('delta', iotshadow.ShadowDeltaUpdatedEvent(state={"x": 1}, version=4))
+        self.assertIsNone(self.cache.get_cached("thing"))
+        self.assertEqual(1, len(self.client.gets))
+
+        pending = self.cache.get_shadow("thing")
+        _, get_future = self.client.gets.pop()
+        get_future.set_result(get_response(4, desired={"x": 1}))
+        self.assertEqual(4, pending.result(0).version)
+        self.assertEqual(4, self.cache.get_cached("thing").version)
+
+    def test_lost_subscription(self):
+        self._warm(version=1)
+        self.client.subscribe_all(LOST)
+        self.assertIsNone(self.cache.get_cached("thing"))
+        self.assertEqual([], self.client.gets)
+
+        self.client.subscribe_all(ESTABLISHED)
+        _, get_future = self.client.gets.pop()
+        get_future.set_result(get_response(7))
+        self.assertEqual(7, self.cache.get_shadow("thing").result(0).version)
+
+    def test_failed_fetch(self):
+        future = self.cache.get_shadow("thing")
+        self.client.subscribe_all()
+        _, get_future = self.client.gets.pop()
+        error = RuntimeError("rejected")
+        get_future.set_exception(error)
+        self.assertIs(error, future.exception(0))
+
+        # the next read tries again
+        self.cache.get_shadow("thing")
+        self.assertEqual(1, len(self.client.gets))
+
+    def test_invalidate(self):
+        self._warm(version=1)
+        self.cache.invalidate("thing")
+        self.assertIsNone(self.cache.get_cached("thing"))
+        self.cache.get_shadow("thing")
+        _, get_future = self.client.gets.pop()
+        get_future.set_result(get_response(1))
+        self.assertEqual(1, self.cache.get_cached("thing").version)
+
+    def test_close(self):
+        self._warm()
+        self.cache.close()
+        self.assertIsNone(self.cache.get_cached("thing"))
+        with self.assertRaises(RuntimeError):
+            self.cache.get_shadow("thing")
+
+
+if __name__ == '__main__':
+    unittest.main()
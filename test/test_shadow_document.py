@@ -0,0 +1,140 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awsiot import iotshadow, shadow_document
+import copy
+import unittest
+
+
+class MergeIntoTest(unittest.TestCase):
+
+    def test_nested_merge(self):
+        document = {"light": {"on": True, "level": 1}, "temp": 20}
+        result = shadow_document.merge_into(document, {"light": {"level": 3}, "fan": "low"})
+        self.assertIs(document, result)
+        self.assertEqual({"light": {"on": True, "level": 3}, "temp": 20, "fan": "low"}, document)
+
+    def test_replacing_values(self):
+        document = {"a": {"b": 1}, "tags": ["x", "y"], "c": 1}
+        shadow_document.merge_into(document, {"a": None, "tags": ["z"], "c": {"d": 2}})
+        self.assertEqual({"a": None, "tags": ["z"], "c": {"d": 2}}, document)
+
+        shadow_document.merge_into(document, {"a": {"e": 3}})
+        self.assertEqual({"e": 3}, document["a"])
+
+    def test_patch_is_copied(self):
+        patch = {"nested": {"list": [1, {"k": "v"}]}}
+        document = shadow_document.merge_into({}, patch)
+        patch["nested"]["list"][1]["k"] = "changed"
+        patch["nested"]["new"] = True
+        self.assertEqual({"nested": {"list": [1, {"k": "v"}]}}, document)
+
+
+class ApplyUpdateTest(unittest.TestCase):
+
+    def test_null_removes(self):
+        document = {"a": {"b": 1, "c": 2}, "d": 3}
+        shadow_document.apply_update(document, {"a": {"b": None}, "d": None, "e": [1]})
+        self.assertEqual({"a": {"c": 2}, "e": [1]}, document)
+
+
+class ComputeDeltaTest(unittest.TestCase):
+
+    def test_delta(self):
+        desired = {"light": {"on": True, "level": 3}, "mode": "eco", "tags": ["a"], "fan": None}
+        reported = {"light": {"on": True, "level": 1}, "mode": "eco", "tags": ["a", "b"]}
+        self.assertEqual({"light": {"level": 3}, "tags": ["a"]}, shadow_document.compute_delta(desired, reported))
+
+    def test_no_delta(self):
+        self.assertIsNone(shadow_document.compute_delta(None, {"a": 1}))
+        self.assertIsNone(shadow_document.compute_delta({"a": {"b": 1}}, {"a": {"b": 1}, "c": 2}))
+        self.assertEqual({"a": 1}, shadow_document.compute_delta({"a": 1}, None))
+
+    def test_json_types(self):
+        self.assertEqual({"on": True}, shadow_document.compute_delta({"on": True}, {"on": 1}))
+        self.assertEqual({"level": 1.0}, shadow_document.compute_delta({"level": 1.0}, {"level": 1}))
+        self.assertEqual({"tags": [True]}, shadow_document.compute_delta({"tags": [True]}, {"tags": [1]}))
+        self.assertIsNone(shadow_document.compute_delta({"tags": [{"a": 1}]}, {"tags": [{"a": 1}]}))
+
+
+class DiffTest(unittest.TestCase):
+
+    PAIRS = [
+        ({}, {"a": 1}),
+        ({"a": 1, "b": 2}, {"a": 1}),
+        ({"light": {"on": True, "level": 1}, "tags": ["a"]}, {"light": {"on": True, "level": 3}, "tags": ["a", "b"]}),
+        ({"light": {"on": True}}, {"light": 5}),
+        ({"light": 5}, {"light": {"on": False}}),
+        ({"on": 1}, {"on": True}),
+        ({"a": {"b": {"c": 1, "d": 2}}}, {"a": {"b": {"c": 1}}, "e": None}),
+    ]
+
+    def test_round_trip(self):
+        for old, new in self.PAIRS:
+            with self.subTest(old=old, new=new):
+                patch = shadow_document.diff(old, new)
+                self.assertIsNotNone(patch)
+                expected = {key: value for key, value in new.items() if value is not None}
+                self.assertEqual(expected, shadow_document.apply_update(copy.deepcopy(old), patch))
+
+    def test_minimal(self):
+        old = {"light": {"on": True, "level": 1}, "mode": "eco", "fan": 2}
+        new = {"light": {"on": True, "level": 3}, "mode": "eco"}
+        self.assertEqual({"light": {"level": 3}, "fan": None}, shadow_document.diff(old, new))
+
+    def test_no_change(self):
+        self.assertIsNone(shadow_document.diff({"a": {"b": [1]}}, {"a": {"b": [1]}}))
+        self.assertIsNone(shadow_document.diff(None, {}))
+
+    def test_values_copied(self):
+        new = {"tags": ["a"]}
+        patch = shadow_document.diff({}, new)
+        patch["tags"].append("b")
+        self.assertEqual(["a"], new["tags"])
+
+
+class DiffStateTest(unittest.TestCase):
+
+    def test_sections(self):
+        acknowledged = iotshadow.ShadowState(desired={"a": 1}, reported={"a": 1, "b": 2})
+        current = iotshadow.ShadowState(desired={"a": 1}, reported={"a": 2})
+        update = shadow_document.diff_state(acknowledged, current)
+        self.assertEqual({"reported": {"a": 2, "b": None}}, update.to_payload())
+
+    def test_unset_section_left_alone(self):
+        acknowledged = iotshadow.ShadowState(desired={"a": 1}, reported={"a": 1})
+        self.assertIsNone(shadow_document.diff_state(acknowledged, iotshadow.ShadowState(reported={"a": 1})))
+
+    def test_nullable_section_cleared(self):
+        acknowledged = iotshadow.ShadowState(desired={"a": 1}, reported={"a": 1})
+        current = iotshadow.ShadowState(desired_is_nullable=True, reported={"a": 1})
+        self.assertEqual({"desired": None}, shadow_document.diff_state(acknowledged, current).to_payload())
+        self.assertIsNone(shadow_document.diff_state(iotshadow.ShadowState(reported={"a": 1}), current))
+
+    def test_nothing_acknowledged(self):
+        current = iotshadow.ShadowState(reported={"a": 1})
+        self.assertEqual({"reported": {"a": 1}}, shadow_document.diff_state(None, current).to_payload())
+
+
+class ApplyDeltaTest(unittest.TestCase):
+
+    def test_apply(self):
+        document = {"light": {"on": True, "level": 1}, "mode": "eco", "tags": ["a"]}
+        delta = {"light": {"on": True, "level": 3}, "mode": "eco", "tags": ["a", "b"], "fan": {"speed": 2}}
+        changes = shadow_document.apply_delta(document, delta)
+        self.assertEqual({"light": {"level": 3}, "tags": ["a", "b"], "fan": {"speed": 2}}, changes)
+        self.assertEqual({"light": {"on": True, "level": 3}, "mode": "eco", "tags": ["a", "b"], "fan": {"speed": 2}},
+                         document)
+        delta["tags"].append("c")
+        self.assertEqual(["a", "b"], document["tags"])
+
+    def test_event(self):
+        event = iotshadow.ShadowDeltaUpdatedEvent.from_payload({"state": {"on": True, "old": None}, "version": 3})
+        document = {"on": 1, "old": 5}
+        self.assertEqual({"on": True, "old": None}, shadow_document.apply_delta(document, event.state))
+        self.assertEqual({"on": True}, document)
+        self.assertIsNone(shadow_document.apply_delta(document, event.state))
+
+
+if __name__ == '__main__':
+    unittest.main()
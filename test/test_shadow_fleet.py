@@ -0,0 +1,220 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt_request_response
+import awsiot
+from awsiot import iotshadow
+from awsiot.shadow_fleet import ShadowFleetManager
+from concurrent.futures import CancelledError, Future
+import threading
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+
+class FakeShadowClient:
+    """Records requests, and leaves their futures for the test to complete"""
+
+    def __init__(self):
+        self.request_response_client = mock.Mock(spec=mqtt_request_response.Client)
+        self.json_codec = awsiot.JsonCodec()
+        self.requests = []
+        self.lock = threading.Lock()
+        self.streams = []
+
+    def _request(self, request):
+        future = Future()
+        with self.lock:
+            self.requests.append((request, future))
+        return future
+
+    get_shadow = get_named_shadow = update_shadow = update_named_shadow = _request
+    delete_shadow = delete_named_shadow = _request
+
+    def _create_stream(self, request, options):
+        self.streams.append((request, options))
+        return mock.Mock(spec=mqtt_request_response.StreamingOperation)
+
+    create_shadow_delta_updated_stream = create_shadow_updated_stream = _create_stream
+    create_named_shadow_delta_updated_stream = create_named_shadow_updated_stream = _create_stream
+
+    def sent(self):
+        with self.lock:
+            return [(r.thing_name, getattr(r, 'shadow_name', None)) for r, _ in self.requests]
+
+    def respond(self, index, response=None, error=None):
+        future = self.requests[index][1]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(response)
+
+
+class ShadowFleetManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeShadowClient()
+
+    def test_limits(self):
+        manager = ShadowFleetManager(self.client, max_in_flight=2, max_in_flight_per_thing=1)
+        futures = [manager.get_shadow(thing) for thing in ["a", "a", "a", "b", "c"]]
+        self.assertEqual([("a", None), ("b", None)], self.client.sent())
+        self.assertEqual(2, manager.in_flight)
+        self.assertEqual(3, manager.queued)
+
+        # "a" goes to the back of the line, behind "c"
+        self.client.respond(0, iotshadow.GetShadowResponse(version=4))
+        self.assertEqual(4, futures[0].result(TIMEOUT).version)
+        self.assertEqual(["a", "b", "c"], [t for t, _ in self.client.sent()])
+
+        self.client.respond(1)
+        self.client.respond(2)
+        # one request per thing at a time
+        self.assertEqual(["a", "b", "c", "a"], [t for t, _ in self.client.sent()])
+        self.client.respond(3)
+        self.assertEqual(["a", "b", "c", "a", "a"], [t for t, _ in self.client.sent()])
+        self.assertEqual(0, manager.queued)
+        self.assertEqual(4, manager.version("a"))
+
+    def test_get_many(self):
+        manager = ShadowFleetManager(self.client, max_in_flight=10)
+        shadows = [("thing{}".format(i), None) for i in range(3)] + [("thing0", "config")]
+        responder = threading.Thread(target=self._respond_all, args=(4,))
+        responder.start()
+        results = list(manager.get_many(shadows, timeout=TIMEOUT))
+        responder.join(TIMEOUT)
+
+        self.assertEqual(sorted(shadows, key=str), sorted(((r.thing_name, r.shadow_name) for r in results), key=str))
+        failed = [r for r in results if r.error is not None]
+        self.assertEqual(1, len(failed))
+        self.assertIsNone(failed[0].response)
+        # thing0 has one request in flight at a time, so its named shadow goes last
+        self.assertIsInstance(self.client.requests[3][0], iotshadow.GetNamedShadowRequest)
+
+    def _respond_all(self, count):
+        for index in range(count):
+            while len(self.client.requests) <= index:
+                threading.Event().wait(0.001)
+            if index == 2:
+                self.client.respond(index, error=awsiot.V2ServiceException("get_shadow failure", None, None))
+            else:
+                self.client.respond(index, iotshadow.GetShadowResponse(version=index))
+
+    def test_update_and_delete(self):
+        manager = ShadowFleetManager(self.client)
+        state = iotshadow.ShadowState(reported={"on": True})
+        results = manager.update_many([("a", None, state), ("b", "config", state)])
+        self.assertIsInstance(self.client.requests[0][0], iotshadow.UpdateShadowRequest)
+        self.assertIsInstance(self.client.requests[1][0], iotshadow.UpdateNamedShadowRequest)
+        self.assertIs(state, self.client.requests[1][0].state)
+        self.client.respond(0, iotshadow.UpdateShadowResponse(version=7))
+        self.client.respond(1, iotshadow.UpdateShadowResponse(version=2))
+        self.assertEqual(2, len(list(results)))
+        self.assertEqual(2, manager.version("b", "config"))
+
+        manager.delete_shadow("a").add_done_callback(lambda f: None)
+        self.client.respond(2, iotshadow.DeleteShadowResponse(version=8))
+        self.assertIsNone(manager.version("a"))
+
+    def test_cancelled_while_queued(self):
+        manager = ShadowFleetManager(self.client, max_in_flight=1)
+        sent = manager.get_shadow("a")
+        cancelled = manager.get_shadow("b")
+        queued = manager.get_shadow("c")
+        self.assertTrue(cancelled.cancel())
+        self.assertFalse(sent.cancel())
+
+        self.client.respond(0, iotshadow.GetShadowResponse(version=1))
+        self.assertEqual(["a", "c"], [t for t, _ in self.client.sent()])
+        self.assertEqual((1, 0), (manager.in_flight, manager.queued))
+        self.client.respond(1, iotshadow.GetShadowResponse(version=2))
+        self.assertEqual(2, queued.result(TIMEOUT).version)
+
+    def test_cancelled_request(self):
+        manager = ShadowFleetManager(self.client)
+        first = manager.get_shadow("a")
+        second = manager.get_shadow("a")
+        self.client.requests[0][1].cancel()
+        with self.assertRaises(CancelledError):
+            first.result(TIMEOUT)
+
+        # the thing's slot was released
+        self.assertEqual(2, len(self.client.requests))
+        self.client.respond(1, iotshadow.GetShadowResponse(version=3))
+        self.assertEqual(3, second.result(TIMEOUT).version)
+        self.assertEqual(0, manager.in_flight)
+
+    def test_close_skips_cancelled(self):
+        manager = ShadowFleetManager(self.client, max_in_flight=1)
+        manager.get_shadow("a")
+        cancelled = manager.get_shadow("b")
+        queued = manager.get_shadow("c")
+        self.assertTrue(cancelled.cancel())
+        manager.close()
+        self.assertIsInstance(queued.exception(TIMEOUT), RuntimeError)
+
+    def test_close_fails_queued(self):
+        manager = ShadowFleetManager(self.client, max_in_flight=1)
+        sent = manager.get_shadow("a")
+        queued = manager.get_shadow("b")
+        manager.close()
+        self.assertIsInstance(queued.exception(TIMEOUT), RuntimeError)
+        self.client.respond(0, iotshadow.GetShadowResponse(version=1))
+        self.assertEqual(1, sent.result(TIMEOUT).version)
+        self.assertEqual(1, len(self.client.requests))
+        with self.assertRaises(RuntimeError):
+            manager.get_shadow("c")
+
+    def test_wildcard_streams(self):
+        deltas = []
+        failures = []
+        manager = ShadowFleetManager(self.client, on_shadow_delta_updated=lambda *args: deltas.append(args),
+                                     deserialization_failure_listener=failures.append)
+        created = self.client.request_response_client.create_stream.call_args_list
+        filters = [call[0][0].subscription_topic_filter for call in created]
+        self.assertEqual(['$aws/things/+/shadow/update/delta', '$aws/things/+/shadow/name/+/update/delta'], filters)
+        self.client.request_response_client.create_stream.return_value.open.assert_called_with()
+
+        on_publish = created[1][0][0].incoming_publish_listener
+        on_publish(mqtt_request_response.IncomingPublishEvent(
+            topic='$aws/things/lamp/shadow/name/config/update/delta',
+            payload=b'{"version": 5, "state": {"on": true}}'))
+        on_publish(mqtt_request_response.IncomingPublishEvent(
+            topic='$aws/things/lamp/shadow/name/config/update/delta', payload=b'not json'))
+        self.assertEqual(1, len(deltas))
+        thing_name, shadow_name, event = deltas[0]
+        self.assertEqual(("lamp", "config", {"on": True}), (thing_name, shadow_name, event.state))
+        self.assertEqual(5, manager.version("lamp", "config"))
+        self.assertEqual([b'not json'], [failure.payload for failure in failures])
+
+        # covered by the wildcard streams
+        manager.watch("lamp")
+        self.assertEqual([], self.client.streams)
+
+    def test_wildcard_stream_failure_logged(self):
+        ShadowFleetManager(self.client, on_shadow_updated=lambda *args: None)
+        on_publish = self.client.request_response_client.create_stream.call_args[0][0].incoming_publish_listener
+        with self.assertLogs('awsiot.shadow_fleet', 'WARNING'):
+            on_publish(mqtt_request_response.IncomingPublishEvent(
+                topic='$aws/things/lamp/shadow/update/documents', payload=b'not json'))
+
+    def test_watch(self):
+        updates = []
+        manager = ShadowFleetManager(self.client, on_shadow_updated=lambda *args: updates.append(args),
+                                     wildcard_streams=False)
+        self.client.request_response_client.create_stream.assert_not_called()
+        manager.watch("lamp", "config")
+        manager.watch("lamp", "config")
+        self.assertEqual(2, len(self.client.streams))
+
+        request, options = self.client.streams[1]
+        self.assertIsInstance(request, iotshadow.NamedShadowUpdatedSubscriptionRequest)
+        options.incoming_event_listener(iotshadow.ShadowUpdatedEvent(
+            current=iotshadow.ShadowUpdatedSnapshot(version=3)))
+        self.assertEqual(("lamp", "config"), updates[0][:2])
+        self.assertEqual(3, manager.version("lamp", "config"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awsiot import iotshadow
+from awsiot.shadow_update_coalescer import ShadowUpdateCoalescer
+from concurrent.futures import Future
+import threading
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+
+class FakeShadowClient:
+    """Records update requests, and lets the test decide when each one completes"""
+
+    def __init__(self):
+        self.requests = []
+        self.futures = []
+        self.sent = threading.Semaphore(0)
+        self.waited = 0
+
+    def _request(self, request):
+        future = Future()
+        self.requests.append(request)
+        self.futures.append(future)
+        self.sent.release()
+        return future
+
+    update_shadow = _request
+    update_named_shadow = _request
+
+    def wait_for_request(self, test):
+        test.assertTrue(self.sent.acquire(timeout=TIMEOUT), "no request was sent")
+        self.waited += 1
+        return self.requests[self.waited - 1], self.futures[self.waited - 1]
+
+
+class ShadowUpdateCoalescerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeShadowClient()
+
+    def test_merges_updates_in_window(self):
+        with ShadowUpdateCoalescer(self.client, flush_interval=0.05) as coalescer:
+            first = coalescer.update("thing", reported={"temp": 20, "light": {"on": True}})
+            second = coalescer.update("thing", reported={"temp": 21, "light": {"level": 3}})
+            third = coalescer.update("thing", desired={"mode": "eco"})
+
+            request, request_future = self.client.wait_for_request(self)
+            self.assertIsInstance(request, iotshadow.UpdateShadowRequest)
+            self.assertEqual("thing", request.thing_name)
+            self.assertEqual({"temp": 21, "light": {"on": True, "level": 3}}, request.state.reported)
+            self.assertEqual({"mode": "eco"}, request.state.desired)
+
+            response = iotshadow.UpdateShadowResponse(version=4)
+            request_future.set_result(response)
+            for future in (first, second, third):
+                self.assertIs(response, future.result(TIMEOUT))
+        self.assertEqual(1, len(self.client.requests))
+
+    def test_flushes_at_batch_size(self):
+        with ShadowUpdateCoalescer(self.client, flush_interval=60, max_batch_size=3) as coalescer:
+            for i in range(3):
+                coalescer.update("thing", reported={"count": i}, shadow_name="counter")
+            request, request_future = self.client.wait_for_request(self)
+            self.assertIsInstance(request, iotshadow.UpdateNamedShadowRequest)
+            self.assertEqual("counter", request.shadow_name)
+            self.assertEqual({"count": 2}, request.state.reported)
+            request_future.set_result(iotshadow.UpdateShadowResponse())
+
+    def test_shadows_batched_separately(self):
+        with ShadowUpdateCoalescer(self.client, flush_interval=0) as coalescer:
+            coalescer.update("a", reported={"x": 1})
+            coalescer.update("b", reported={"x": 2})
+            coalescer.update("a", reported={"y": 1}, shadow_name="named")
+            for _ in range(3):
+                self.client.wait_for_request(self)[1].set_result(iotshadow.UpdateShadowResponse())
+        sent = {(r.thing_name, getattr(r, 'shadow_name', None)): r.state.reported for r in self.client.requests}
+        self.assertEqual({("a", None): {"x": 1}, ("b", None): {"x": 2}, ("a", "named"): {"y": 1}}, sent)
+
+    def test_one_request_in_flight_per_shadow(self):
+        with ShadowUpdateCoalescer(self.client, flush_interval=0) as coalescer:
+            first = coalescer.update("thing", reported={"v": 1})
+            _, first_request_future = self.client.wait_for_request(self)
+
+            second = coalescer.update("thing", reported={"v": 2})
+            third = coalescer.update("thing", reported={"w": 3})
+            self.assertFalse(self.client.sent.acquire(timeout=0.1))
+
+            first_request_future.set_result(iotshadow.UpdateShadowResponse(version=1))
+            self.assertEqual(1, first.result(TIMEOUT).version)
+
+            request, request_future = self.client.wait_for_request(self)
+            self.assertEqual({"v": 2, "w": 3}, request.state.reported)
+            request_future.set_result(iotshadow.UpdateShadowResponse(version=2))
+            self.assertEqual(2, second.result(TIMEOUT).version)
+            self.assertEqual(2, third.result(TIMEOUT).version)
+
+    def test_dict_after_deletion_sent_separately(self):
+        with ShadowUpdateCoalescer(self.client, flush_interval=0.05) as coalescer:
+            deleted = coalescer.update("thing", reported={"light": None, "temp": 20})
+            replaced = coalescer.update("thing", reported={"light": {"on": True}})
+            merged = coalescer.update("thing", reported={"temp": 21})
+
+            request, request_future = self.client.wait_for_request(self)
+            self.assertEqual({"light": None, "temp": 20}, request.state.reported)
+            request_future.set_result(iotshadow.UpdateShadowResponse(version=2))
+            self.assertEqual(2, deleted.result(TIMEOUT).version)
+
+            request, request_future = self.client.wait_for_request(self)
+            self.assertEqual({"light": {"on": True}, "temp": 21}, request.state.reported)
+            request_future.set_result(iotshadow.UpdateShadowResponse(version=3))
+            self.assertEqual(3, replaced.result(TIMEOUT).version)
+            self.assertEqual(3, merged.result(TIMEOUT).version)
+
+    def test_nested_dict_after_deletion_sent_separately(self):
+        with ShadowUpdateCoalescer(self.client, flush_interval=0) as coalescer:
+            coalescer.update("thing", desired={"light": {"color": None}})
+            coalescer.update("thing", desired={"light": {"color": {"r": 1}}})
+            for expected in ({"light": {"color": None}}, {"light": {"color": {"r": 1}}}):
+                request, request_future = self.client.wait_for_request(self)
+                self.assertEqual(expected, request.state.desired)
+                request_future.set_result(iotshadow.UpdateShadowResponse())
+
+    def test_cancelled_caller(self):
+        with ShadowUpdateCoalescer(self.client, flush_interval=0) as coalescer:
+            cancelled = coalescer.update("thing", reported={"x": 1})
+            kept = coalescer.update("thing", reported={"y": 1})
+            request_future = self.client.wait_for_request(self)[1]
+            self.assertTrue(cancelled.cancel())
+            response = iotshadow.UpdateShadowResponse(version=2)
+            request_future.set_result(response)
+            self.assertIs(response, kept.result(TIMEOUT))
+
+            # the shadow is still sent to after a caller gave up
+            later = coalescer.update("thing", reported={"z": 1})
+            self.client.wait_for_request(self)[1].set_result(response)
+            self.assertIs(response, later.result(TIMEOUT))
+
+    def test_failure_reaches_every_caller(self):
+        with ShadowUpdateCoalescer(self.client, flush_interval=0.05) as coalescer:
+            futures = [coalescer.update("thing", reported={"k": i}) for i in range(2)]
+            _, request_future = self.client.wait_for_request(self)
+            error = RuntimeError("throttled")
+            request_future.set_exception(error)
+            for future in futures:
+                self.assertIs(error, future.exception(TIMEOUT))
+
+    def test_send_error(self):
+        client = mock.Mock(spec=iotshadow.IotShadowClientV2)
+        client.update_shadow.side_effect = ValueError("thing_name is required")
+        with ShadowUpdateCoalescer(client, flush_interval=0) as coalescer:
+            future = coalescer.update("", reported={"k": 1})
+            self.assertIsInstance(future.exception(TIMEOUT), ValueError)
+
+    def test_close(self):
+        coalescer = ShadowUpdateCoalescer(self.client, flush_interval=60)
+        future = coalescer.update("thing", reported={"k": 1})
+        coalescer.close()
+        with self.assertRaises(RuntimeError):
+            coalescer.update("thing", reported={"k": 2})
+
+        _, request_future = self.client.wait_for_request(self)
+        request_future.set_result(iotshadow.UpdateShadowResponse())
+        future.result(TIMEOUT)
+        coalescer._thread.join(TIMEOUT)
+        self.assertFalse(coalescer._thread.is_alive())
+
+    def test_caller_changes_after_update_are_not_sent(self):
+        with ShadowUpdateCoalescer(self.client, flush_interval=0.05) as coalescer:
+            reported = {"tags": ["a"], "nested": {"k": 1}}
+            coalescer.update("thing", reported=reported)
+            reported["tags"].append("b")
+            reported["nested"]["k"] = 2
+            request, request_future = self.client.wait_for_request(self)
+            self.assertEqual({"tags": ["a"], "nested": {"k": 1}}, request.state.reported)
+            request_future.set_result(iotshadow.UpdateShadowResponse())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awsiot import iotjobs, iotshadow
+from awsiot.singleflight import SingleFlight, SingleFlightClient
+from concurrent.futures import Future
+import time
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = []
+
+    def _send(self, request):
+        future = Future()
+        self.requests.append((request, future))
+        return future
+
+    get_shadow = get_named_shadow = update_shadow = describe_job_execution = _send
+
+    def create_shadow_updated_stream(self, request, options):
+        return "stream"
+
+    def respond(self, index, result):
+        self.requests[index][1].set_result(result)
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_shares_request_in_flight(self):
+        single_flight = SingleFlight()
+        pending = Future()
+        send = mock.Mock(return_value=pending)
+        first = single_flight.run("key", send)
+        second = single_flight.run("key", send)
+        other = single_flight.run("other", lambda: Future())
+        send.assert_called_once_with()
+
+        result = {"state": {"on": True}}
+        pending.set_result(result)
+        self.assertIs(result, first.result(TIMEOUT))
+        self.assertEqual(result, second.result(TIMEOUT))
+        self.assertIsNot(result, second.result(TIMEOUT))
+        self.assertFalse(other.done())
+
+        # nothing kept without a ttl
+        single_flight.run("key", send)
+        self.assertEqual(2, send.call_count)
+        self.assertEqual((4, 3, 1, 0), tuple(single_flight.stats()))
+
+    def test_cancelled_waiter(self):
+        single_flight = SingleFlight()
+        pending = Future()
+        first = single_flight.run("key", lambda: pending)
+        second = single_flight.run("key", lambda: pending)
+        third = single_flight.run("key", lambda: pending)
+        self.assertTrue(second.cancel())
+
+        pending.set_result({"version": 1})
+        self.assertEqual({"version": 1}, first.result(TIMEOUT))
+        self.assertEqual({"version": 1}, third.result(TIMEOUT))
+        self.assertFalse(first.cancel())
+
+    def test_ttl(self):
+        single_flight = SingleFlight(ttl=0.05, copy_results=False)
+        result = object()
+        send = mock.Mock(side_effect=lambda: self._done(result))
+        self.assertIs(result, single_flight.run("key", send).result(TIMEOUT))
+        self.assertIs(result, single_flight.run("key", send).result(TIMEOUT))
+        self.assertEqual(1, send.call_count)
+        self.assertEqual(1, single_flight.stats().cached)
+
+        time.sleep(0.06)
+        single_flight.run("key", send)
+        self.assertEqual(2, send.call_count)
+
+    def test_failures_not_kept(self):
+        single_flight = SingleFlight(ttl=60)
+        pending = Future()
+        first = single_flight.run("key", lambda: pending)
+        second = single_flight.run("key", lambda: Future())
+        pending.set_exception(ValueError("rejected"))
+        self.assertIsInstance(first.exception(TIMEOUT), ValueError)
+        self.assertIsInstance(second.exception(TIMEOUT), ValueError)
+
+        send = mock.Mock(side_effect=RuntimeError("closed"))
+        self.assertIsInstance(single_flight.run("key", send).exception(TIMEOUT), RuntimeError)
+        send.assert_called_once_with()
+
+    def test_invalidate(self):
+        single_flight = SingleFlight(ttl=60)
+        stale = Future()
+        waiting = single_flight.run("key", lambda: stale)
+        single_flight.invalidate(lambda key: key == "key")
+        fresh = single_flight.run("key", lambda: self._done("fresh"))
+        self.assertEqual("fresh", fresh.result(TIMEOUT))
+
+        # the detached request still answers its callers, but is not kept
+        stale.set_result("stale")
+        self.assertEqual("stale", waiting.result(TIMEOUT))
+        self.assertEqual("fresh", single_flight.run("key", lambda: Future()).result(TIMEOUT))
+
+    def _done(self, result):
+        future = Future()
+        future.set_result(result)
+        return future
+
+
+class SingleFlightClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeClient()
+        self.client = SingleFlightClient(self.fake, ttl=60)
+
+    def test_identical_reads_share(self):
+        futures = [self.client.get_shadow(iotshadow.GetShadowRequest(thing_name="a")) for _ in range(20)]
+        self.client.get_shadow(iotshadow.GetShadowRequest(thing_name="b"))
+        self.client.get_named_shadow(iotshadow.GetNamedShadowRequest(thing_name="a", shadow_name="config"))
+        self.assertEqual(3, len(self.fake.requests))
+
+        self.fake.respond(0, iotshadow.GetShadowResponse(version=3, state=iotshadow.ShadowStateWithDelta()))
+        responses = [f.result(TIMEOUT) for f in futures]
+        self.assertEqual({3}, {r.version for r in responses})
+        self.assertEqual(20, len({id(r) for r in responses}))
+        self.assertEqual(3, self.client.get_shadow(iotshadow.GetShadowRequest(thing_name="a")).result(TIMEOUT).version)
+
+    def test_client_token_ignored(self):
+        self.client.describe_job_execution(iotjobs.DescribeJobExecutionRequest(thing_name="a", job_id="j"))
+        self.client.describe_job_execution(
+            iotjobs.DescribeJobExecutionRequest(thing_name="a", job_id="j", client_token="mine"))
+        self.client.describe_job_execution(
+            iotjobs.DescribeJobExecutionRequest(thing_name="a", job_id="j", include_job_document=True))
+        self.assertEqual(2, len(self.fake.requests))
+
+    def test_write_invalidates(self):
+        read = iotshadow.GetShadowRequest(thing_name="a")
+        self.client.get_shadow(read)
+        self.fake.respond(0, iotshadow.GetShadowResponse(version=1))
+        self.client.get_shadow(read).result(TIMEOUT)
+        self.assertEqual(1, len(self.fake.requests))
+
+        self.client.update_shadow(iotshadow.UpdateShadowRequest(thing_name="a", state=iotshadow.ShadowState()))
+        self.client.get_shadow(read)
+        self.assertEqual(3, len(self.fake.requests))
+
+        # a read sent during the write is not kept once the write completes
+        self.fake.respond(2, iotshadow.GetShadowResponse(version=1))
+        self.fake.respond(1, iotshadow.UpdateShadowResponse(version=2))
+        self.client.get_shadow(read)
+        self.assertEqual(4, len(self.fake.requests))
+
+    def test_other_attributes(self):
+        self.assertEqual("stream", self.client.create_shadow_updated_stream(None, None))
+        self.assertIs(self.fake, self.client.client)
+
+
+if __name__ == '__main__':
+    unittest.main()
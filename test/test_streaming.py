@@ -0,0 +1,211 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+import asyncio
+from awscrt import mqtt_request_response
+from awsiot import iotjobs, streaming
+from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2
+from awsiot.streaming import BufferedStream, OverflowPolicy
+from concurrent.futures import Future
+import queue
+import threading
+import unittest
+from unittest import mock
+
+TIMEOUT = 5.0
+
+
+def put_all(stream, events):
+    for event in events:
+        stream.put(event)
+
+
+class BufferedStreamTest(unittest.TestCase):
+
+    def test_iteration(self):
+        stream = BufferedStream(maxsize=8)
+        put_all(stream, range(3))
+        stream._finish()
+        self.assertEqual([0, 1, 2], list(stream))
+        self.assertEqual(3, stream.received)
+        self.assertEqual(0, stream.dropped)
+
+    def test_ends_with_error(self):
+        stream = BufferedStream()
+        stream.put("last")
+        stream._finish(ValueError("stream error"))
+        self.assertEqual("last", next(stream))
+        with self.assertRaises(ValueError):
+            next(stream)
+        with self.assertRaises(StopIteration):
+            next(stream)
+
+    def test_get_timeout(self):
+        stream = BufferedStream()
+        with self.assertRaises(queue.Empty):
+            stream.get(timeout=0.01)
+
+    def test_drop_oldest(self):
+        stream = BufferedStream(maxsize=3, overflow=OverflowPolicy.DROP_OLDEST)
+        put_all(stream, range(5))
+        stream._finish()
+        self.assertEqual([2, 3, 4], list(stream))
+        self.assertEqual(2, stream.dropped)
+        self.assertEqual(5, stream.received)
+
+    def test_drop_newest(self):
+        stream = BufferedStream(maxsize=3, overflow=OverflowPolicy.DROP_NEWEST)
+        put_all(stream, range(5))
+        stream._finish()
+        self.assertEqual([0, 1, 2], list(stream))
+        self.assertEqual(2, stream.dropped)
+
+    def test_coalesce_by_key(self):
+        with self.assertRaises(ValueError):
+            BufferedStream(overflow=OverflowPolicy.COALESCE_BY_KEY)
+
+        stream = BufferedStream(maxsize=2, overflow=OverflowPolicy.COALESCE_BY_KEY, key=lambda e: e[0])
+        put_all(stream, [("a", 1), ("b", 1), ("a", 2), ("c", 1), ("c", 2)])
+        stream._finish()
+        # "a" was replaced in place, then dropped as the oldest to make room for "c"
+        self.assertEqual([("b", 1), ("c", 2)], list(stream))
+        self.assertEqual(2, stream.coalesced)
+        self.assertEqual(1, stream.dropped)
+
+    def test_drops_oldest_by_default(self):
+        stream = BufferedStream(maxsize=2)
+        put_all(stream, range(3))
+        self.assertEqual(OverflowPolicy.DROP_OLDEST, stream.overflow)
+        self.assertEqual([1, 2], [stream.get(TIMEOUT) for _ in range(2)])
+
+    def test_block(self):
+        stream = BufferedStream(maxsize=2, overflow=OverflowPolicy.BLOCK)
+        producer = threading.Thread(target=put_all, args=(stream, range(6)))
+        producer.start()
+        producer.join(0.1)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(2, len(stream))
+
+        self.assertEqual(list(range(6)), [stream.get(TIMEOUT) for _ in range(6)])
+        producer.join(TIMEOUT)
+        self.assertEqual(0, stream.dropped)
+
+    def test_close(self):
+        operation = mock.Mock()
+        stream = BufferedStream(maxsize=1, overflow=OverflowPolicy.BLOCK)
+        stream.operation = operation
+        stream.put(1)
+        producer = threading.Thread(target=put_all, args=(stream, range(3)))
+        producer.start()
+        producer.join(0.1)
+
+        stream.close()
+        producer.join(TIMEOUT)
+        self.assertFalse(producer.is_alive())
+        self.assertTrue(stream.closed)
+        self.assertEqual([], list(stream))
+        operation.close.assert_called_once_with()
+        self.assertIsNone(stream.operation)
+
+        stream.put(4)
+        self.assertEqual(0, len(stream))
+
+
+class AsyncBufferedStreamTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_iteration(self):
+        stream = BufferedStream(maxsize=2, overflow=OverflowPolicy.BLOCK)
+
+        def produce():
+            put_all(stream, range(5))
+            stream._finish()
+        threading.Thread(target=produce).start()
+
+        received = []
+        async with stream:
+            async for event in stream:
+                received.append(event)
+        self.assertEqual(list(range(5)), received)
+
+    async def test_block_on_loop_thread(self):
+        # the consumer runs on this thread, so waiting here could never end
+        stream = BufferedStream(maxsize=1, overflow=OverflowPolicy.BLOCK)
+        put_all(stream, range(3))
+        self.assertEqual(3, len(stream))
+        self.assertEqual(0, await stream.get_async())
+
+    async def test_cancelled_consumer(self):
+        stream = BufferedStream()
+        first = asyncio.ensure_future(stream.get_async())
+        second = asyncio.ensure_future(stream.get_async())
+        await asyncio.sleep(0)
+        stream.put("event")
+        first.cancel()
+        self.assertEqual("event", await asyncio.wait_for(second, TIMEOUT))
+
+    async def test_async_error(self):
+        stream = BufferedStream()
+        pending = asyncio.ensure_future(stream.get_async())
+        await asyncio.sleep(0)
+        threading.Thread(target=stream._finish, args=(RuntimeError("closed"),)).start()
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(pending, TIMEOUT)
+        with self.assertRaises(StopAsyncIteration):
+            await stream.get_async()
+
+
+class OpenStreamTest(unittest.TestCase):
+
+    def test_open_stream(self):
+        client = mock.Mock(spec=iotjobs.IotJobsClientV2)
+        listener = mock.Mock()
+        request = iotjobs.JobExecutionsChangedSubscriptionRequest(thing_name="thing")
+        stream = streaming.open_stream(client.create_job_executions_changed_stream, request,
+                                       maxsize=4, subscription_status_listener=listener)
+        self.assertEqual(4, stream.maxsize)
+        self.assertEqual(OverflowPolicy.DROP_OLDEST, stream.overflow)
+        stream.operation.open.assert_called_once_with()
+        sent_request, options = client.create_job_executions_changed_stream.call_args[0]
+        self.assertIs(request, sent_request)
+
+        event = iotjobs.JobExecutionsChangedEvent()
+        options.incoming_event_listener(event)
+        halted = mqtt_request_response.SubscriptionStatusEvent(
+            mqtt_request_response.SubscriptionStatusEventType.SUBSCRIPTION_HALTED)
+        options.subscription_status_listener(halted)
+        listener.assert_called_once_with(halted)
+
+        self.assertIs(event, next(stream))
+        with self.assertRaises(RuntimeError):
+            next(stream)
+
+    def test_subscribe(self):
+        client = mock.Mock(spec=GreengrassCoreIPCClientV2)
+        operation = mock.Mock()
+        client.subscribe_to_topic.return_value = ("response", operation)
+        response, stream = streaming.subscribe(client.subscribe_to_topic, topic="t",
+                                               overflow=OverflowPolicy.DROP_NEWEST, maxsize=1)
+        self.assertEqual("response", response)
+        self.assertIs(operation, stream.operation)
+
+        handlers = client.subscribe_to_topic.call_args[1]
+        self.assertEqual("t", handlers["topic"])
+        handlers["on_stream_event"](1)
+        handlers["on_stream_event"](2)
+        handlers["on_stream_closed"]()
+        self.assertEqual([1], list(stream))
+        self.assertEqual(1, stream.dropped)
+
+    def test_subscribe_async_failure(self):
+        client = mock.Mock(spec=GreengrassCoreIPCClientV2)
+        future = Future()
+        client.subscribe_to_iot_core_async.return_value = (future, mock.Mock())
+        result, stream = streaming.subscribe(client.subscribe_to_iot_core_async, topic_name="t")
+        self.assertIs(future, result)
+        future.set_exception(ValueError("unauthorized"))
+        with self.assertRaises(ValueError):
+            stream.get(TIMEOUT)
+
+
+if __name__ == '__main__':
+    unittest.main()
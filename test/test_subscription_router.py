@@ -0,0 +1,158 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awsiot.greengrasscoreipc import model
+from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2
+from awsiot.greengrasscoreipc.subscription_router import SubscriptionRouter
+import unittest
+from unittest import mock
+
+
+def local_message(topic, text="hello"):
+    return model.SubscriptionResponseMessage(
+        json_message=model.JsonMessage(message={"text": text}, context=model.MessageContext(topic=topic)))
+
+
+def iot_core_message(topic):
+    return model.IoTCoreMessage(message=model.MQTTMessage(topic_name=topic, payload=b'{}'))
+
+
+class FakeSubscription:
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        self.operation = mock.Mock()
+
+    @property
+    def topic(self):
+        return self.kwargs.get('topic', self.kwargs.get('topic_name'))
+
+    def push(self, event):
+        self.kwargs['on_stream_event'](event)
+
+
+class SubscriptionRouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = mock.Mock(spec=GreengrassCoreIPCClientV2)
+        self.subscriptions = []
+        self.client.subscribe_to_topic.side_effect = self._subscribe
+        self.client.subscribe_to_iot_core.side_effect = self._subscribe
+        self.router = SubscriptionRouter(self.client)
+        self.addCleanup(self.router.close)
+
+    def _subscribe(self, **kwargs):
+        subscription = FakeSubscription(kwargs)
+        self.subscriptions.append(subscription)
+        return "response", subscription.operation
+
+    def _open(self):
+        return {s.topic: s for s in self.subscriptions if not s.operation.close.called}
+
+    def test_one_ipc_subscription_per_filter(self):
+        first, second = mock.Mock(), mock.Mock()
+        self.router.subscribe_to_topic("sensors/+", first)
+        self.router.subscribe_to_topic("sensors/+", second)
+        self.assertEqual(["sensors/+"], list(self._open()))
+
+        message = local_message("sensors/temperature")
+        self._open()["sensors/+"].push(message)
+        first.assert_called_once_with(message)
+        second.assert_called_once_with(message)
+
+    def test_covered_filter_reuses_subscription(self):
+        broad, narrow = mock.Mock(), mock.Mock()
+        self.router.subscribe_to_topic("sensors/#", broad)
+        self.router.subscribe_to_topic("sensors/temperature", narrow)
+        self.assertEqual(["sensors/#"], list(self._open()))
+
+        self._open()["sensors/#"].push(local_message("sensors/humidity"))
+        self._open()["sensors/#"].push(local_message("sensors/temperature"))
+        self.assertEqual(2, broad.call_count)
+        self.assertEqual(1, narrow.call_count)
+
+    def test_broader_filter_replaces_narrower(self):
+        narrow, broad = mock.Mock(), mock.Mock()
+        narrow_subscription = self.router.subscribe_to_topic("a/b", narrow)
+        self.router.subscribe_to_topic("a/+", broad)
+        self.assertEqual(["a/+"], list(self._open()))
+        self.subscriptions[0].operation.close.assert_called_once_with()
+
+        # a late message on the closed subscription is not delivered again
+        self.subscriptions[0].push(local_message("a/b"))
+        self._open()["a/+"].push(local_message("a/b"))
+        self.assertEqual(1, narrow.call_count)
+        self.assertEqual(1, broad.call_count)
+
+        narrow_subscription.close()
+        self.assertEqual(["a/+"], list(self._open()))
+
+    def test_removing_broad_filter_restores_narrower(self):
+        broad_subscription = self.router.subscribe_to_topic("a/#", mock.Mock())
+        narrow = mock.Mock()
+        self.router.subscribe_to_topic("a/b", narrow)
+        broad_subscription.close()
+        self.assertEqual(["a/b"], list(self._open()))
+        self._open()["a/b"].push(local_message("a/b"))
+        narrow.assert_called_once()
+
+        self.router.close()
+        self.assertEqual({}, self._open())
+
+    def test_overlapping_filters_deliver_once(self):
+        first, second = mock.Mock(), mock.Mock()
+        self.router.subscribe_to_topic("a/+/c", first)
+        self.router.subscribe_to_topic("a/b/+", second)
+        self.assertEqual({"a/+/c", "a/b/+"}, set(self._open()))
+
+        # the service sends a matching message on both IPC subscriptions
+        message = local_message("a/b/c")
+        for subscription in self._open().values():
+            subscription.push(message)
+        first.assert_called_once_with(message)
+        second.assert_called_once_with(message)
+
+    def test_handler_error_isolated(self):
+        failing = mock.Mock(side_effect=ValueError("handler"))
+        working = mock.Mock()
+        self.router.subscribe_to_topic("t", failing)
+        self.router.subscribe_to_topic("t", working)
+        with self.assertLogs('awsiot.greengrasscoreipc.subscription_router', 'ERROR'):
+            self._open()["t"].push(local_message("t"))
+        working.assert_called_once()
+
+    def test_iot_core(self):
+        handler = mock.Mock()
+        self.router.subscribe_to_iot_core("things/+/status", handler)
+        self.assertEqual(model.QOS.AT_LEAST_ONCE, self.subscriptions[0].kwargs['qos'])
+        self.subscriptions[0].push(iot_core_message("things/x/status"))
+        self.subscriptions[0].push(iot_core_message("things/x/other"))
+        handler.assert_called_once()
+        self.client.subscribe_to_topic.assert_not_called()
+
+    def test_rejected_subscription(self):
+        self.client.subscribe_to_topic.side_effect = model.UnauthorizedError()
+        with self.assertRaises(model.UnauthorizedError):
+            self.router.subscribe_to_topic("t", mock.Mock())
+        self.client.subscribe_to_topic.side_effect = self._subscribe
+        self.router.subscribe_to_topic("u", mock.Mock())
+        self.assertEqual(["u"], list(self._open()))
+
+    def test_closed_by_service(self):
+        on_closed = mock.Mock()
+        subscription = self.router.subscribe_to_topic("t", mock.Mock(), on_closed)
+        with self.assertLogs('awsiot.greengrasscoreipc.subscription_router', 'ERROR'):
+            self.subscriptions[0].kwargs['on_stream_closed']()
+        on_closed.assert_called_once_with()
+        self.assertTrue(subscription.closed)
+
+        self.router.subscribe_to_topic("t", mock.Mock())
+        self.assertEqual(2, len(self.subscriptions))
+
+    def test_invalid_filter(self):
+        with self.assertRaises(ValueError):
+            self.router.subscribe_to_topic("a/#/b", mock.Mock())
+        self.client.subscribe_to_topic.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awsiot.topic_filter import TopicTrie, filter_covers, filter_matches, validate_topic_filter
+import unittest
+
+MATCHES = [
+    ("a/b", "a/b", True),
+    ("a/b", "a/c", False),
+    ("a/+", "a/b", True),
+    ("a/+", "a/b/c", False),
+    ("a/+", "a", False),
+    ("+/+", "a/b", True),
+    ("a/#", "a", True),
+    ("a/#", "a/b/c", True),
+    ("a/#", "b", False),
+    ("#", "a/b", True),
+    ("a/+/c", "a/b/c", True),
+    ("a/+/c", "a/b/d", False),
+    ("+", "", True),
+    ("a/+", "a/", True),
+    ("#", "$aws/things", False),
+    ("+/things", "$aws/things", False),
+    ("$aws/#", "$aws/things", True),
+]
+
+COVERS = [
+    ("a/+", "a/b", True),
+    ("a/b", "a/+", False),
+    ("a/#", "a/+/c", True),
+    ("a/#", "a", True),
+    ("a/+", "a/#", False),
+    ("a/+/#", "a/#", False),
+    ("#", "+/#", True),
+    ("+/#", "#", False),
+    ("#", "$aws/#", False),
+    ("a/+/c", "a/b/+", False),
+]
+
+
+class TopicFilterTest(unittest.TestCase):
+
+    def test_validate(self):
+        for valid in ["a", "a/b", "+", "#", "a/+/b", "a/#", "/", "$aws/+"]:
+            validate_topic_filter(valid)
+        for invalid in ["", "a/#/b", "a/b#", "a+/b", None]:
+            with self.assertRaises(ValueError, msg=invalid):
+                validate_topic_filter(invalid)
+
+    def test_filter_matches(self):
+        for topic_filter, topic, expected in MATCHES:
+            with self.subTest(topic_filter=topic_filter, topic=topic):
+                self.assertEqual(expected, filter_matches(topic_filter, topic))
+
+    def test_filter_covers(self):
+        for topic_filter, other, expected in COVERS:
+            with self.subTest(topic_filter=topic_filter, other=other):
+                self.assertEqual(expected, filter_covers(topic_filter, other))
+
+
+class TopicTrieTest(unittest.TestCase):
+
+    def test_match_agrees_with_filter_matches(self):
+        trie = TopicTrie()
+        filters = sorted({f for f, _, _ in MATCHES})
+        for topic_filter in filters:
+            trie.add(topic_filter, topic_filter)
+        for topic in sorted({t for _, t, _ in MATCHES}):
+            with self.subTest(topic=topic):
+                expected = [f for f in filters if filter_matches(f, topic)]
+                self.assertEqual(expected, sorted(trie.match(topic)))
+
+    def test_values(self):
+        trie = TopicTrie()
+        trie.add("a/+", 1)
+        trie.add("a/+", 2)
+        trie.add("a/b", 1)
+        self.assertEqual(3, len(trie))
+        self.assertEqual([1, 1, 2], sorted(trie.match("a/b")))
+        self.assertEqual([1, 2], trie.get("a/+"))
+        self.assertEqual(sorted([("a/+", 1), ("a/+", 2), ("a/b", 1)]), sorted(trie.items()))
+
+    def test_remove(self):
+        trie = TopicTrie()
+        trie.add("a/b/c", 1)
+        trie.add("a/#", 2)
+        self.assertFalse(trie.remove("a/b", 1))
+        self.assertFalse(trie.remove("a/#", 1))
+        self.assertTrue(trie.remove("a/b/c", 1))
+        self.assertEqual([2], trie.match("a/b/c"))
+        self.assertTrue(trie.remove("a/#", 2))
+        self.assertEqual(0, len(trie))
+        # emptied nodes are pruned
+        self.assertEqual({}, trie._root.children)
+
+    def test_invalid_filter(self):
+        with self.assertRaises(ValueError):
+            TopicTrie().add("a/#/b", 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0.
+
+from awscrt import mqtt_request_response
+import awsiot
+from awsiot import iotidentity, iotjobs, iotshadow
+from concurrent.futures import Future
+import unittest
+from unittest import mock
+
+NAMED_GET_TEMPLATE = '$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/get'
+NAMED_GET_SUBSCRIPTIONS = ('$aws/things/{0.thing_name}/shadow/name/{0.shadow_name}/get/+',)
+
+
+class V2RequestTopicsTest(unittest.TestCase):
+
+    def tearDown(self):
+        awsiot.set_v2_topic_cache_size(1024)
+
+    def _get_named(self, thing_name, shadow_name):
+        request = iotshadow.GetNamedShadowRequest(thing_name=thing_name, shadow_name=shadow_name)
+        return awsiot.get_v2_request_topics(NAMED_GET_TEMPLATE, NAMED_GET_SUBSCRIPTIONS, "clientToken", request)
+
+    def test_topics(self):
+        topics = self._get_named("thing", "config")
+        self.assertEqual("$aws/things/thing/shadow/name/config/get", topics.publish_topic)
+        self.assertEqual("$aws/things/thing/shadow/name/config/get/accepted", topics.accepted_topic)
+        self.assertEqual("$aws/things/thing/shadow/name/config/get/rejected", topics.rejected_topic)
+        self.assertEqual(("$aws/things/thing/shadow/name/config/get/+",), topics.subscription_topic_filters)
+        self.assertEqual((mqtt_request_response.ResponsePath(topics.accepted_topic, "clientToken"),
+                          mqtt_request_response.ResponsePath(topics.rejected_topic, "clientToken")),
+                         topics.response_paths)
+
+    def test_cached_per_request_values(self):
+        topics = self._get_named("thing", "config")
+        self.assertIs(topics, self._get_named("thing", "config"))
+        self.assertIsNot(topics, self._get_named("thing", "other"))
+        self.assertIsNot(topics, self._get_named("other", "config"))
+
+    def test_bounded(self):
+        awsiot.set_v2_topic_cache_size(2)
+        first = self._get_named("thing", "a")
+        self._get_named("thing", "b")
+        self._get_named("thing", "c")
+        refetched = self._get_named("thing", "a")
+        self.assertEqual(first, refetched)
+        self.assertIsNot(first, refetched)
+
+        awsiot.set_v2_topic_cache_size(0)
+        self.assertIsNot(self._get_named("thing", "a"), self._get_named("thing", "a"))
+
+    def test_unhashable_values(self):
+        request = mock.Mock(thing_name=["not", "hashable"])
+        topics = awsiot.get_v2_request_topics('$aws/things/{0.thing_name}/shadow/get', (), None, request)
+        self.assertEqual("$aws/things/['not', 'hashable']/shadow/get", topics.publish_topic)
+
+    def _make_client(self, client_type):
+        rr_client = mock.Mock(spec=mqtt_request_response.Client)
+        rr_client.make_request.return_value = Future()
+        with mock.patch.object(mqtt_request_response, 'Client', return_value=rr_client):
+            client = client_type(mock.Mock(), mqtt_request_response.ClientOptions(8, 2))
+        return client, rr_client
+
+    def test_clients(self):
+        shadow_client, rr_client = self._make_client(iotshadow.IotShadowClientV2)
+        shadow_client.update_named_shadow(iotshadow.UpdateNamedShadowRequest(thing_name="thing", shadow_name="config"))
+        options = rr_client.make_request.call_args.args[0]
+        self.assertEqual("$aws/things/thing/shadow/name/config/update", options.publish_topic)
+        self.assertEqual(("$aws/things/thing/shadow/name/config/update/accepted",
+                          "$aws/things/thing/shadow/name/config/update/rejected"), options.subscription_topic_filters)
+        self.assertEqual("clientToken", options.response_paths[0].correlation_token_json_path)
+        self.assertIsNotNone(options.correlation_token)
+
+        jobs_client, rr_client = self._make_client(iotjobs.IotJobsClientV2)
+        jobs_client.update_job_execution(iotjobs.UpdateJobExecutionRequest(thing_name="thing", job_id="job"))
+        options = rr_client.make_request.call_args.args[0]
+        self.assertEqual("$aws/things/thing/jobs/job/update", options.publish_topic)
+        self.assertEqual(("$aws/things/thing/jobs/job/update/+",), options.subscription_topic_filters)
+
+        identity_client, rr_client = self._make_client(iotidentity.IotIdentityClientV2)
+        identity_client.register_thing(iotidentity.RegisterThingRequest(template_name="template"))
+        options = rr_client.make_request.call_args.args[0]
+        self.assertEqual("$aws/provisioning-templates/template/provision/json", options.publish_topic)
+        self.assertIsNone(options.response_paths[1].correlation_token_json_path)
+        self.assertEqual("$aws/provisioning-templates/template/provision/json/rejected",
+                         options.response_paths[1].topic)
+
+
+if __name__ == '__main__':
+    unittest.main()